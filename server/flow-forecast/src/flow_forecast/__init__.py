@@ -3,8 +3,8 @@
 __version__ = "0.1.0"
 
 
-def main() -> None:
-    """Entry point for running the Flow Forecast API server"""
+def main() -> int:
+    """Entry point for the API server and the batch command"""
     from flow_forecast.__main__ import main as _main
 
-    _main()
+    return _main()
@@ -1,20 +1,60 @@
-"""Entry point for running the Flow Forecast API server"""
+"""Entry point for the Flow Forecast API server and its batch command
 
-import asyncio
+flow-forecast            # or `flow-forecast serve`: start the API server
+flow-forecast batch ...  # forecast many sites offline; see `batch --help`
+flow-forecast backtest ...  # compare engines over past origins; see `backtest --help`
+"""
 
-from hypercorn.asyncio import serve
-from hypercorn.config import Config as HypercornConfig
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from typing import Optional
 
-from flow_forecast.app import app
 from flow_forecast.config import config
 
 
-def main() -> None:
+def serve(args: Optional[argparse.Namespace] = None) -> int:
     """Start the Flow Forecast API server"""
+    from hypercorn.asyncio import serve as hypercorn_serve
+    from hypercorn.config import Config as HypercornConfig
+
+    from flow_forecast.app import app
+
     app_config = HypercornConfig()
     app_config.bind = [f"{config.host}:{config.port}"]
-    asyncio.run(serve(app, config=app_config))
+    asyncio.run(hypercorn_serve(app, config=app_config))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    from flow_forecast.backtest.cli import add_backtest_parser
+    from flow_forecast.batch.cli import add_batch_parser
+
+    parser = argparse.ArgumentParser(
+        prog="flow-forecast",
+        description="Flow Forecast API, batch forecasts and backtests",
+    )
+    parser.set_defaults(handler=serve)
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("serve", help="Start the API server (default)").set_defaults(
+        handler=serve
+    )
+    add_batch_parser(commands)
+    add_backtest_parser(commands)
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command in ("batch", "backtest"):
+        logging.basicConfig(
+            level=os.environ.get("LOG_LEVEL", "INFO"),
+            format="%(asctime)s [%(name)s] %(levelname)s: %(message)s",
+        )
+    return args.handler(args)
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
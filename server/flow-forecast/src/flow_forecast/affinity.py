@@ -0,0 +1,310 @@
+"""Site affinity across replicas with a consistent-hash ring
+
+Every replica builds the same ring from the configured peer list, so they
+agree on which one owns each site. Forecast requests for a site another
+replica owns are forwarded to it, or the client is redirected there, so
+the site's history fetch, fit and cache entry live on one replica instead
+of on every one the load balancer happens to pick. Virtual nodes keep the
+ring balanced, and adding or removing a replica only moves the sites on
+its arcs.
+
+Peers are health-checked in the background and each has a circuit
+breaker; while a site's owner is down, or a forward to it fails, the
+request is computed locally instead.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import hmac
+import logging
+from typing import Optional
+
+import httpx
+from fastapi import Request, Response
+
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from .config import config
+from .drivers.session import DriverSession
+from .metrics import metrics
+
+log = logging.getLogger(__name__)
+
+# Set on forwarded requests to the forwarding replica's URL so the receiving
+# replica always computes locally, even if its view of the ring differs
+HOP_HEADER = "X-Affinity-Hop"
+# The client id the forwarding replica rate limited the request under
+CLIENT_HEADER = "X-Affinity-Client"
+# The shared affinity secret, proving a forwarded request comes from a peer
+SECRET_HEADER = "X-Affinity-Secret"
+# Response header naming the replica that served a forwarded request
+SERVED_BY_HEADER = "X-Served-By"
+
+# Request headers passed on to the owner; the rest describe this hop
+_FORWARDED_REQUEST_HEADERS = (
+    "content-type",
+    "accept",
+    "x-api-key",
+    "x-fit-deadline",
+)
+# Owner response headers passed back to the client
+_RETURNED_RESPONSE_HEADERS = (
+    "content-type",
+    "age",
+    "retry-after",
+    "x-forecast-cache",
+    "x-forecast-fallback",
+    "x-forecast-version",
+    "x-ratelimit-limit",
+    "x-ratelimit-remaining",
+    "x-ratelimit-reset",
+    "x-fit-quota-limit",
+    "x-fit-quota-used",
+    "server-timing",
+)
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big"
+    )
+
+
+class HashRing:
+    """Consistent-hash ring placing `virtual_nodes` points per node"""
+
+    def __init__(self, nodes: list[str], virtual_nodes: int):
+        points = sorted(
+            (_hash(f"{node}#{i}"), node) for node in nodes for i in range(virtual_nodes)
+        )
+        self.nodes = list(nodes)
+        self._hashes = [h for h, _ in points]
+        self._owners = [node for _, node in points]
+
+    def owner(self, key: str) -> str:
+        """The node whose point follows `key`'s hash clockwise"""
+        index = bisect.bisect_right(self._hashes, _hash(key))
+        return self._owners[index % len(self._owners)]
+
+
+def parse_peers(peers: str) -> list[str]:
+    """Comma-separated base URLs, normalized and deduplicated in order"""
+    urls = (peer.strip().rstrip("/") for peer in peers.split(","))
+    return list(dict.fromkeys(url for url in urls if url))
+
+
+class SiteAffinity:
+    """Routes single-site forecast requests to the replica owning the site
+
+    In "forward" mode the request is proxied to the owner and its response
+    returned; in "redirect" mode the client gets a 307 to the owner. With
+    fewer than two peers, mode "off", or "forward" without a shared secret,
+    every request is served locally.
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        self_url: str,
+        peers: list[str],
+        virtual_nodes: int,
+        session: DriverSession,
+        health_seconds: float,
+        secret: str = "",
+    ):
+        self.mode = mode
+        self.secret = secret
+        if mode == "forward" and not secret:
+            # Without the secret a client could pose as a peer to skip
+            # routing and rate limits, so hops are never trusted
+            log.warning("AFFINITY_SECRET is not set; site affinity is disabled")
+        self.self_url = self_url.rstrip("/")
+        self.peers = list(dict.fromkeys([self.self_url, *peers]))
+        self.ring = HashRing(self.peers, virtual_nodes)
+        self.session = session
+        self.health_seconds = health_seconds
+        # Down after two failed probes or forwards; the next probe after
+        # `health_seconds` is the trial that brings a peer back
+        self.breakers = {
+            peer: CircuitBreaker(
+                name=f"peer {peer}",
+                failure_threshold=2,
+                reset_timeout=health_seconds,
+            )
+            for peer in self.peers
+            if peer != self.self_url
+        }
+
+    @property
+    def enabled(self) -> bool:
+        if self.mode == "forward" and not self.secret:
+            return False
+        return self.mode != "off" and len(self.peers) > 1
+
+    def owner(self, site_id: str) -> str:
+        return self.ring.owner(site_id)
+
+    def peer_hop(self, request: Request) -> Optional[str]:
+        """The peer that forwarded this request, or None if no peer did
+
+        A hop counts only if it names another configured peer and carries
+        the shared secret; otherwise any client could claim to be a peer to
+        skip routing and rate limits. Without a secret no hop counts.
+        """
+        if not self.secret:
+            return None
+        hop = request.headers.get(HOP_HEADER, "").rstrip("/")
+        if hop == self.self_url or hop not in self.peers:
+            return None
+        if not hmac.compare_digest(
+            request.headers.get(SECRET_HEADER, "").encode("utf-8"),
+            self.secret.encode("utf-8"),
+        ):
+            return None
+        return hop
+
+    def forwarded_client(self, request: Request) -> Optional[str]:
+        """The client id a peer already rate limited this request under"""
+        if self.peer_hop(request) is None:
+            return None
+        return request.headers.get(CLIENT_HEADER) or None
+
+    def remote_owner(self, site_id: str, request: Request) -> Optional[str]:
+        """The peer to route this request to, or None to serve it locally"""
+        if not self.enabled or self.peer_hop(request) is not None:
+            return None
+        owner = self.owner(site_id)
+        if owner == self.self_url:
+            return None
+        if self.breakers[owner].state == CircuitState.open:
+            metrics.increment("affinity", "owner_down")
+            return None
+        return owner
+
+    async def route(self, site_id: str, request: Request) -> Optional[Response]:
+        """Sends the request to the site's owner if another replica owns it
+
+        Returns:
+            The response to give the client, or None if the request should
+            be served locally, because this replica owns the site or the
+            owner is unreachable
+        """
+        owner = self.remote_owner(site_id, request)
+        if owner is None:
+            return None
+
+        if self.mode == "redirect":
+            metrics.increment("affinity", "redirected")
+            return Response(
+                status_code=307,
+                headers={"Location": self._owner_url(owner, request)},
+            )
+        return await self.forward(owner, request)
+
+    def _owner_url(self, owner: str, request: Request) -> str:
+        url = owner + request.url.path
+        if request.url.query:
+            url += "?" + request.url.query
+        return url
+
+    async def forward(self, owner: str, request: Request) -> Optional[Response]:
+        """Proxies the request to `owner`; None if the owner is unreachable"""
+        breaker = self.breakers[owner]
+        try:
+            breaker.check()
+        except CircuitOpenError:
+            metrics.increment("affinity", "owner_down")
+            return None
+
+        headers = {
+            name: value
+            for name, value in request.headers.items()
+            if name.lower() in _FORWARDED_REQUEST_HEADERS
+        }
+        headers[HOP_HEADER] = self.self_url
+        headers[SECRET_HEADER] = self.secret
+        # Set by the rate_limit dependency, which has already taken a token
+        client_id = getattr(request.state, "client_id", None)
+        if client_id:
+            headers[CLIENT_HEADER] = client_id
+        if request.client is not None:
+            forwarded_for = request.headers.get("x-forwarded-for")
+            headers["X-Forwarded-For"] = ", ".join(
+                filter(None, [forwarded_for, request.client.host])
+            )
+        body = await request.body()
+        url = self._owner_url(owner, request)
+
+        async def send(client: httpx.AsyncClient) -> httpx.Response:
+            return await client.request(
+                request.method, url, headers=headers, content=body
+            )
+
+        try:
+            upstream = await asyncio.wrap_future(self.session.submit(send))
+        except httpx.HTTPError as e:
+            breaker.record_failure()
+            metrics.increment("affinity", "forward_failed")
+            log.warning(f"Forward to {owner} failed, serving locally: {e}")
+            return None
+
+        breaker.record_success()
+        metrics.increment("affinity", "forwarded")
+        response = Response(content=upstream.content, status_code=upstream.status_code)
+        for name in _RETURNED_RESPONSE_HEADERS:
+            if name in upstream.headers:
+                response.headers[name] = upstream.headers[name]
+        # The owner does not charge forwarded requests, so the client's
+        # rate limit is this replica's
+        response.headers.update(getattr(request.state, "rate_limit_headers", {}))
+        response.headers[SERVED_BY_HEADER] = owner
+        return response
+
+    async def probe(self, peer: str) -> bool:
+        """Checks `peer` answers its root route, updating its breaker"""
+
+        async def get(client: httpx.AsyncClient) -> httpx.Response:
+            return await client.get(f"{peer}/", timeout=5.0)
+
+        try:
+            response = await asyncio.wrap_future(self.session.submit(get))
+            healthy = response.status_code == 200
+        except httpx.HTTPError:
+            healthy = False
+
+        if healthy:
+            self.breakers[peer].record_success()
+        else:
+            self.breakers[peer].record_failure()
+        return healthy
+
+    async def run(self) -> None:
+        """Probes every peer each `health_seconds` until cancelled"""
+        while True:
+            await asyncio.gather(*(self.probe(peer) for peer in self.breakers))
+            await asyncio.sleep(self.health_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode if self.enabled else "off",
+            "self": self.self_url,
+            "peers": {
+                peer: breaker.state.value for peer, breaker in self.breakers.items()
+            },
+        }
+
+
+site_affinity = SiteAffinity(
+    mode=config.affinity_mode,
+    self_url=config.affinity_self_url or config.server_url,
+    peers=parse_peers(config.affinity_peers),
+    virtual_nodes=config.affinity_virtual_nodes,
+    session=DriverSession(
+        max_connections=config.affinity_max_connections,
+        timeout_seconds=config.affinity_timeout_seconds,
+        name="affinity-peers",
+    ),
+    health_seconds=config.affinity_health_seconds,
+    secret=config.affinity_secret,
+)
+metrics.register_gauge("affinity", site_affinity.stats)
@@ -1,21 +1,72 @@
-from fastapi import FastAPI, Request
-import logging
-import time
+import asyncio
+from contextlib import asynccontextmanager
 
+from fastapi import FastAPI
+
+from . import tracing
+from .affinity import site_affinity
+from .catalog.router import catalog_router
+from .catalog.service import get_catalog
+from .drivers.router import source_routers
+from .drivers.session import driver_session
+from .fit_pool import fit_pool
+from .jobs import forecast_jobs
+from .logs import configure_logging
+from .middleware import RequestTimingMiddleware
 from .router.router import app_router
+from .snapshot import forecast_snapshot
+from .usgs.prefetch import hot_site_prefetcher
 from .usgs.router import usgs_router
+from .usgs.updates import update_poller
 from .config import config
 
-logging.basicConfig(
-    level=config.log_level,
-    format="%(asctime)s [%(name)s] %(levelname)s: %(message)s",
-)
-logger = logging.getLogger(__name__)
-logger.setLevel(config.log_level)
+configure_logging(config.log_level, config.log_format)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tracing.configure_tracing(config.tracing_exporter, config.tracing_file)
+    await asyncio.to_thread(get_catalog)
+    snapshots = None
+    if forecast_snapshot.enabled:
+        await asyncio.to_thread(forecast_snapshot.load)
+        if config.snapshot_reload_seconds > 0:
+            snapshots = asyncio.create_task(
+                forecast_snapshot.run(config.snapshot_reload_seconds)
+            )
+    if config.fit_pool_workers > 0:
+        await asyncio.to_thread(fit_pool.start)
+    poller = None
+    if config.subscription_poll_seconds > 0:
+        poller = asyncio.create_task(update_poller.run())
+    prefetcher = None
+    if config.prefetch_top_k > 0:
+        prefetcher = asyncio.create_task(hot_site_prefetcher.run())
+    health = None
+    if site_affinity.enabled:
+        health = asyncio.create_task(site_affinity.run())
+    yield
+    if snapshots is not None:
+        snapshots.cancel()
+    if health is not None:
+        health.cancel()
+    if poller is not None:
+        poller.cancel()
+    if prefetcher is not None:
+        prefetcher.cancel()
+    forecast_jobs.shutdown(wait=False)
+    driver_session.close()
+    site_affinity.session.close()
+    fit_pool.shutdown()
+    tracing.shutdown()
+
 
 app = FastAPI(
     title="Flow Forecast API",
-    description="API for forecasting water flow data using the USGS API",
+    description=(
+        "API for forecasting water flow data from USGS, Environment Canada, "
+        "LAWA and Colorado DWR gauges"
+    ),
     version="0.1.0",
     license={
         "name": "MIT License",
@@ -23,23 +74,19 @@ app = FastAPI(
     },
     servers=[
         {"url": config.server_url, "description": "Development"},
-    ]
+    ],
+    lifespan=lifespan,
 )
 
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.perf_counter()
-    response = await call_next(request)
-    response_time = time.perf_counter() - start_time
-    logger.info(
-        f"{request.method} {request.url.path} {response.status_code} {response_time:.3f}s"
-    )
-    return response
+app.add_middleware(RequestTimingMiddleware)
 
 
 app.include_router(app_router)
 app.include_router(usgs_router)
+app.include_router(catalog_router)
+for router in source_routers:
+    app.include_router(router)
 
 
 @app.get("/", include_in_schema=False)
@@ -0,0 +1,20 @@
+"""Rolling-origin backtests comparing forecast accuracy with fit cost
+
+Run `flow-forecast backtest --help` for the command line.
+"""
+
+from .engines import ENGINES, Engine, get_engine
+from .runner import BacktestReport, BacktestSettings, VariantSummary, run_backtest
+from .worker import BacktestResult, Variant
+
+__all__ = [
+    "ENGINES",
+    "BacktestReport",
+    "BacktestResult",
+    "BacktestSettings",
+    "Engine",
+    "Variant",
+    "VariantSummary",
+    "get_engine",
+    "run_backtest",
+]
@@ -0,0 +1,139 @@
+"""Command line for `flow-forecast backtest`
+
+# Stan against the in-process fit and climatology, on 30 or 10 years of history
+flow-forecast backtest --state CO --engine prophet-cmdstan --engine prophet-numpy \
+    --engine climatology --training-years 30 --training-years 10
+
+# Reproducibly and offline, from recorded USGS responses
+USGS_RECORD_MODE=replay flow-forecast backtest --sites-file sites.txt \
+    --max-rows 1000 --max-rows 4000 --results results.jsonl
+"""
+
+import argparse
+import datetime as dt
+import itertools
+import json
+import logging
+from pathlib import Path
+
+from ..batch import select_sites
+from .engines import ENGINES
+from .runner import BacktestSettings, run_backtest
+from .worker import Variant
+
+log = logging.getLogger(__name__)
+
+
+def add_backtest_parser(commands: argparse._SubParsersAction) -> None:
+    backtest = commands.add_parser(
+        "backtest",
+        help="Compare engines' accuracy and cost over past forecast origins",
+        description=(
+            "Refit each engine and training setting from several past origins "
+            "at each site on a process pool, and report MAE and 50%% band "
+            "coverage next to fit and predict time and peak memory. Every "
+            "combination of --engine, --training-years and --max-rows is run."
+        ),
+    )
+    selection = backtest.add_argument_group("sites")
+    selection.add_argument("--site", action="append", help="A USGS site id")
+    selection.add_argument(
+        "--sites-file", type=Path, help="File of site_id[,state] lines"
+    )
+    selection.add_argument(
+        "--state",
+        action="append",
+        help="Every USGS catalog gauge in this state, e.g. CO",
+    )
+    selection.add_argument(
+        "--catalog-dir", type=Path, help="Catalog files; defaults to CATALOG_DIR"
+    )
+
+    variants = backtest.add_argument_group("variants")
+    variants.add_argument(
+        "--engine",
+        action="append",
+        choices=list(ENGINES),
+        help="Engine to compare; defaults to prophet and climatology",
+    )
+    variants.add_argument(
+        "--training-years",
+        action="append",
+        type=int,
+        help="Years of history to train on; defaults to all fetched",
+    )
+    variants.add_argument(
+        "--max-rows",
+        action="append",
+        type=int,
+        help="Training row budget; defaults to none",
+    )
+
+    backtest.add_argument("--reading-parameter", default="00060")
+    backtest.add_argument(
+        "--end-date",
+        type=dt.date.fromisoformat,
+        default=dt.date.today(),
+        help="Last day of history fetched (YYYY-MM-DD)",
+    )
+    backtest.add_argument("--history-years", type=int, default=12)
+    backtest.add_argument("--horizon-days", type=int, default=30)
+    backtest.add_argument("--origins", type=int, default=4, help="Origins per site")
+    backtest.add_argument(
+        "--step-days", type=int, default=91, help="Days between origins"
+    )
+    backtest.add_argument("--workers", type=int, help="Processes; 0 runs in-process")
+    backtest.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Also measure peak memory, in a second traced run of every fit",
+    )
+    backtest.add_argument(
+        "--results", type=Path, help="Write every result to this JSON lines file"
+    )
+    backtest.add_argument(
+        "--json", action="store_true", help="Print the report as JSON"
+    )
+    backtest.set_defaults(handler=backtest_command)
+
+
+def backtest_command(args: argparse.Namespace) -> int:
+    try:
+        sites = select_sites(args.site, args.sites_file, args.state, args.catalog_dir)
+    except ValueError as e:
+        log.error(str(e))
+        return 2
+
+    settings = BacktestSettings(
+        site_ids=[site.site_id for site in sites],
+        variants=[
+            Variant(engine, training_years, max_rows)
+            for engine, training_years, max_rows in itertools.product(
+                args.engine or ["prophet", "climatology"],
+                args.training_years or [None],
+                args.max_rows or [None],
+            )
+        ],
+        reading_parameter=args.reading_parameter,
+        end_date=args.end_date,
+        history_years=args.history_years,
+        horizon_days=args.horizon_days,
+        origins=args.origins,
+        step_days=args.step_days,
+        trace_memory=args.trace_memory,
+        results_file=args.results,
+    )
+    if args.workers is not None:
+        settings.workers = args.workers
+
+    try:
+        report = run_backtest(settings)
+    except ValueError as e:
+        log.error(str(e))
+        return 2
+
+    if args.json:
+        print(json.dumps(report.to_dict(), indent=2))
+    else:
+        print(report.format())
+    return 0
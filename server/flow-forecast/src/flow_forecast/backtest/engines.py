@@ -0,0 +1,80 @@
+"""Forecast engines a backtest can compare
+
+An engine is split into a fit and a predict step so the two can be timed
+separately. Each produces the same `yhat`, `yhat_lower` and `yhat_upper`
+columns as `generate_forecast`, with the 50% band the API serves, and a
+`ds` column dating each row.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import pandas as pd
+
+from ..usgs.service import generate_climatology_forecast, prophet_model
+
+COLUMNS = ["yhat", "yhat_lower", "yhat_upper"]
+
+
+@dataclass(frozen=True)
+class Engine:
+    name: str
+    # Fits training data with 'ds' and 'y' columns, returning the fitted model
+    fit: Callable[[pd.DataFrame], Any]
+    # Predicts the given number of days after the training data; where
+    # that starts differs by engine, so rows are dated in 'ds'
+    predict: Callable[[Any, int], pd.DataFrame]
+
+
+def _prophet(backend: str | None) -> Engine:
+    def fit(history: pd.DataFrame) -> Any:
+        model = prophet_model(backend)
+        model.fit(history)
+        return model
+
+    def predict(model: Any, periods: int) -> pd.DataFrame:
+        # Starts the day after the last observed training day
+        future = model.make_future_dataframe(periods=periods, include_history=False)
+        forecast = model.predict(future)
+        return forecast[["ds"]].join(forecast[COLUMNS].round())
+
+    return Engine(f"prophet-{backend}" if backend else "prophet", fit, predict)
+
+
+def _climatology() -> Engine:
+    def predict(history: pd.DataFrame, periods: int) -> pd.DataFrame:
+        # Starts the day after the last training row, observed or not
+        forecast = generate_climatology_forecast(history, horizon_days=periods)
+        forecast.insert(
+            0,
+            "ds",
+            pd.date_range(
+                history["ds"].iloc[-1] + pd.Timedelta(days=1), periods=len(forecast)
+            ),
+        )
+        return forecast
+
+    return Engine("climatology", lambda history: history, predict)
+
+
+ENGINES: dict[str, Callable[[], Engine]] = {
+    # Prophet on the FIT_BACKEND the server is configured with
+    "prophet": lambda: _prophet(None),
+    "prophet-cmdstan": lambda: _prophet("cmdstan"),
+    "prophet-numpy": lambda: _prophet("numpy"),
+    "climatology": _climatology,
+}
+
+
+def get_engine(name: str) -> Engine:
+    """The engine registered as `name`
+
+    Raises:
+        ValueError: If no engine has that name
+    """
+    try:
+        return ENGINES[name]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown engine {name!r}; choose from {', '.join(ENGINES)}"
+        ) from None
@@ -0,0 +1,258 @@
+"""Runs a rolling-origin backtest across a process pool and summarizes it"""
+
+import datetime as dt
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+
+from ..config import config
+from ..fit_pool import PRELOAD_MODULES
+from .worker import BacktestResult, SiteBacktest, Variant, backtest_site
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class BacktestSettings:
+    """Which sites, engines and origins to backtest, and how wide to run
+
+    Attributes:
+        site_ids: USGS sites to backtest.
+        variants: Engine and training-data combinations to compare.
+        reading_parameter: USGS parameter code backtested at every site.
+        end_date: Last day of history fetched.
+        history_years: Years of history fetched before `end_date`; must
+            cover the longest training window plus the origins' span.
+        horizon_days: Days forecast from each origin.
+        origins: Forecast origins per site.
+        step_days: Days between consecutive origins.
+        workers: Worker processes; 0 runs every site in this process.
+        trace_memory: Record each fit's peak allocations, from a second,
+            traced fit and predict so timings are unaffected.
+        results_file: JSON lines file every individual result is written to.
+    """
+
+    site_ids: list[str]
+    variants: list[Variant]
+    reading_parameter: str = "00060"
+    end_date: dt.date = field(default_factory=dt.date.today)
+    history_years: int = 12
+    horizon_days: int = 30
+    origins: int = 4
+    step_days: int = 91
+    workers: int = field(default_factory=lambda: os.cpu_count() or 1)
+    trace_memory: bool = False
+    results_file: Optional[Path] = None
+
+
+@dataclass
+class VariantSummary:
+    """A variant's accuracy and cost over every site and origin"""
+
+    variant: str
+    forecasts: int
+    failed: int
+    # Mean over forecasts of MAE, and of MAE relative to the observed mean
+    mae: Optional[float]
+    relative_mae: Optional[float]
+    # Share of observed days inside the 50% band; 0.5 is well calibrated
+    coverage: Optional[float]
+    fit_seconds: float
+    predict_seconds: float
+    peak_mb: Optional[float]
+    # No other variant is both cheaper and more accurate
+    frontier: bool = False
+
+
+@dataclass
+class BacktestReport:
+    sites: int
+    failed_sites: int
+    duration_seconds: float
+    variants: list[VariantSummary]
+    site_errors: dict[str, str] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def format(self) -> str:
+        """Human readable table, cheapest variant first"""
+
+        def number(value: Optional[float], spec: str) -> str:
+            return "-" if value is None else format(value, spec)
+
+        lines = [
+            f"sites       {self.sites} ({self.failed_sites} failed) "
+            f"in {self.duration_seconds:.1f}s",
+            "",
+            f"{'variant':<32} {'n':>5} {'fail':>4} {'mae':>10} {'rel mae':>8} "
+            f"{'cover50':>7} {'fit s':>7} {'pred s':>7} {'peak MB':>8}",
+        ]
+        for summary in self.variants:
+            lines.append(
+                f"{('* ' if summary.frontier else '  ') + summary.variant:<32} "
+                f"{summary.forecasts:>5} {summary.failed:>4} "
+                f"{number(summary.mae, '.1f'):>10} "
+                f"{number(summary.relative_mae, '.3f'):>8} "
+                f"{number(summary.coverage, '.2f'):>7} "
+                f"{summary.fit_seconds:>7.3f} {summary.predict_seconds:>7.3f} "
+                f"{number(summary.peak_mb, '.1f'):>8}"
+            )
+        lines.append("")
+        lines.append("* on the cost/accuracy frontier (fit + predict s vs rel mae)")
+        for site_id, error in list(self.site_errors.items())[:10]:
+            lines.append(f"  {site_id}: {error}")
+        return "\n".join(lines)
+
+
+def summarize(
+    variants: list[Variant], results: list[BacktestResult]
+) -> list[VariantSummary]:
+    """Per-variant summaries, cheapest first, with the frontier marked"""
+    by_variant: defaultdict[str, list[BacktestResult]] = defaultdict(list)
+    for result in results:
+        by_variant[result.variant].append(result)
+
+    def mean(values: list) -> Optional[float]:
+        values = [v for v in values if v is not None]
+        return float(np.mean(values)) if values else None
+
+    summaries = []
+    for variant in variants:
+        scored = [r for r in by_variant[variant.label] if r.error is None]
+        observed = sum(r.observed for r in scored)
+        summaries.append(
+            VariantSummary(
+                variant=variant.label,
+                forecasts=len(scored),
+                failed=len(by_variant[variant.label]) - len(scored),
+                mae=mean([r.mae for r in scored]),
+                relative_mae=mean([r.relative_mae for r in scored]),
+                coverage=sum(r.covered for r in scored) / observed
+                if observed
+                else None,
+                fit_seconds=mean([r.fit_seconds for r in scored]) or 0.0,
+                predict_seconds=mean([r.predict_seconds for r in scored]) or 0.0,
+                peak_mb=max(
+                    (r.peak_mb for r in scored if r.peak_mb is not None),
+                    default=None,
+                ),
+            )
+        )
+
+    summaries.sort(key=lambda s: s.fit_seconds + s.predict_seconds)
+    best = None
+    for summary in summaries:
+        # Cheapest first, so a variant is on the frontier when it beats the
+        # accuracy of every cheaper one
+        if summary.relative_mae is not None and (
+            best is None or summary.relative_mae < best
+        ):
+            summary.frontier = True
+            best = summary.relative_mae
+    return summaries
+
+
+def _backtests(settings: BacktestSettings) -> Iterator[SiteBacktest]:
+    """Yields each site's backtest as it completes, two per worker in flight"""
+
+    def arguments(site_id: str) -> tuple:
+        return (
+            site_id,
+            settings.reading_parameter,
+            settings.end_date,
+            settings.history_years,
+            settings.variants,
+            settings.horizon_days,
+            settings.origins,
+            settings.step_days,
+            settings.trace_memory,
+        )
+
+    if settings.workers == 0:
+        for site_id in settings.site_ids:
+            yield backtest_site(*arguments(site_id))
+        return
+
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(PRELOAD_MODULES + ["flow_forecast.backtest.worker"])
+    with ProcessPoolExecutor(
+        max_workers=settings.workers,
+        mp_context=context,
+        max_tasks_per_child=config.fit_pool_max_fits_per_worker,
+    ) as executor:
+        remaining = iter(settings.site_ids)
+        in_flight = set()
+
+        def submit_next() -> None:
+            site_id = next(remaining, None)
+            if site_id is not None:
+                in_flight.add(executor.submit(backtest_site, *arguments(site_id)))
+
+        for _ in range(2 * settings.workers):
+            submit_next()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                in_flight.remove(future)
+                submit_next()
+                yield future.result()
+
+
+def run_backtest(settings: BacktestSettings) -> BacktestReport:
+    """Backtests every variant at every site and summarizes the results
+
+    Raises:
+        ValueError: If the history fetched cannot cover a training window
+            and every origin
+    """
+    longest = max(
+        (v.training_years for v in settings.variants if v.training_years), default=0
+    )
+    span_years = (settings.horizon_days + settings.origins * settings.step_days) / 365
+    if longest + span_years > settings.history_years:
+        raise ValueError(
+            f"history_years {settings.history_years} does not cover {longest} "
+            f"training years plus {span_years:.1f} years of origins"
+        )
+
+    log.info(
+        f"Backtesting {len(settings.variants)} variants from {settings.origins} "
+        f"origins at {len(settings.site_ids)} sites with {settings.workers} workers"
+    )
+    results: list[BacktestResult] = []
+    site_errors: dict[str, str] = {}
+    results_file = (
+        open(settings.results_file, "w") if settings.results_file is not None else None
+    )
+    started = time.perf_counter()
+    try:
+        for completed, backtest in enumerate(_backtests(settings), start=1):
+            if backtest.error is not None:
+                site_errors[backtest.site_id] = backtest.error
+            results.extend(backtest.results)
+            if results_file is not None:
+                for result in backtest.results:
+                    results_file.write(json.dumps(asdict(result)) + "\n")
+                results_file.flush()
+            log.info(f"{completed}/{len(settings.site_ids)} sites backtested")
+    finally:
+        if results_file is not None:
+            results_file.close()
+
+    return BacktestReport(
+        sites=len(settings.site_ids),
+        failed_sites=len(site_errors),
+        duration_seconds=time.perf_counter() - started,
+        variants=summarize(settings.variants, results),
+        site_errors=site_errors,
+    )
@@ -0,0 +1,240 @@
+"""Code that runs inside backtest worker processes
+
+Each task fetches one site's history once and then, for every forecast
+origin, refits every variant on the history up to that day and scores its
+forecast against what was actually observed afterwards.
+"""
+
+import datetime as dt
+import logging
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from ..usgs.service import (
+    get_cleaned_data,
+    get_daily_average_data,
+    limit_training_rows,
+)
+from .engines import Engine, get_engine
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Variant:
+    """An engine and the training data it is given
+
+    Attributes:
+        engine: Name of an engine in `ENGINES`.
+        training_years: Years of history before each origin to train on;
+            None uses all the history fetched.
+        max_rows: Row budget applied with `limit_training_rows`; None fits
+            every row.
+    """
+
+    engine: str
+    training_years: Optional[int] = None
+    max_rows: Optional[int] = None
+
+    @property
+    def label(self) -> str:
+        parts = [self.engine]
+        if self.training_years is not None:
+            parts.append(f"{self.training_years}y")
+        if self.max_rows is not None:
+            parts.append(f"{self.max_rows}rows")
+        return "/".join(parts)
+
+
+@dataclass
+class BacktestResult:
+    """One variant's forecast from one origin at one site"""
+
+    site_id: str
+    variant: str
+    origin: str
+    training_rows: int = 0
+    # Days in the horizon with an observation, and how many of those fell
+    # inside the forecast's 50% band
+    observed: int = 0
+    covered: int = 0
+    mae: Optional[float] = None
+    # MAE over the mean observed value, comparable across sites
+    relative_mae: Optional[float] = None
+    fit_seconds: float = 0.0
+    predict_seconds: float = 0.0
+    # Peak Python and NumPy allocations during a separate, traced fit and
+    # predict; excludes cmdstan's subprocess. None when memory was not traced
+    peak_mb: Optional[float] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class SiteBacktest:
+    site_id: str
+    results: list[BacktestResult] = field(default_factory=list)
+    # Set when the site could not be backtested at all
+    error: Optional[str] = None
+
+
+def forecast_origins(
+    last_day: dt.date, horizon_days: int, origins: int, step_days: int
+) -> list[dt.date]:
+    """Origins spaced `step_days` apart, oldest first, the newest leaving a
+    full horizon of observations before `last_day`"""
+    newest = last_day - dt.timedelta(days=horizon_days)
+    return [newest - dt.timedelta(days=i * step_days) for i in reversed(range(origins))]
+
+
+def score(
+    forecast: pd.DataFrame, actual: pd.Series
+) -> tuple[int, int, Optional[float], Optional[float]]:
+    """Observed days, days inside the band, MAE and relative MAE
+
+    `actual` holds one value per horizon day, indexed by date, and forecast
+    rows are matched to it by their `ds`; days without an observation or
+    without a forecast are skipped.
+    """
+    forecast = forecast.set_index("ds").reindex(actual.index)
+    y = actual.to_numpy(dtype=np.float64)
+    yhat = forecast["yhat"].to_numpy(dtype=np.float64)
+    observed = ~np.isnan(y) & ~np.isnan(yhat)
+    if not observed.any():
+        return 0, 0, None, None
+
+    y = y[observed]
+    yhat = yhat[observed]
+    lower = forecast["yhat_lower"].to_numpy(dtype=np.float64)[observed]
+    upper = forecast["yhat_upper"].to_numpy(dtype=np.float64)[observed]
+
+    mae = float(np.mean(np.abs(yhat - y)))
+    covered = int(np.count_nonzero((y >= lower) & (y <= upper)))
+    mean = float(np.mean(y))
+    return len(y), covered, mae, mae / mean if mean > 0 else None
+
+
+def _peak_mb(engine: Engine, training: pd.DataFrame, periods: int) -> float:
+    """Peak allocations of a fit and predict, in a run of their own
+
+    Tracing slows pure-Python code, so the timed run is never traced.
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        engine.predict(engine.fit(training), periods)
+        return (tracemalloc.get_traced_memory()[1] - baseline) / 2**20
+    finally:
+        if started:
+            tracemalloc.stop()
+
+
+def _run_variant(
+    engine: Engine,
+    variant: Variant,
+    result: BacktestResult,
+    training: pd.DataFrame,
+    actual: pd.Series,
+    trace_memory: bool,
+) -> None:
+    if variant.max_rows is not None:
+        training = limit_training_rows(training, variant.max_rows)
+    result.training_rows = int(training["y"].notna().sum())
+    if result.training_rows < 2:
+        raise ValueError(f"Only {result.training_rows} observations before origin")
+
+    # Forecasts can start before the origin, after the last observed day,
+    # so predict through the horizon's last day from there
+    last_observed = training.loc[training["y"].notna(), "ds"].iloc[-1]
+    periods = (actual.index[-1] - last_observed).days
+
+    started = time.perf_counter()
+    fitted = engine.fit(training)
+    result.fit_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    forecast = engine.predict(fitted, periods)
+    result.predict_seconds = time.perf_counter() - started
+    del fitted
+
+    if trace_memory:
+        result.peak_mb = _peak_mb(engine, training, periods)
+
+    result.observed, result.covered, result.mae, result.relative_mae = score(
+        forecast, actual
+    )
+
+
+def backtest_site(
+    site_id: str,
+    reading_parameter: str,
+    end_date: dt.date,
+    history_years: int,
+    variants: list[Variant],
+    horizon_days: int,
+    origins: int,
+    step_days: int,
+    trace_memory: bool = False,
+) -> SiteBacktest:
+    """Scores every variant from every origin at one site
+
+    Failures are caught: a failed fit is recorded on its result, and a
+    site whose history cannot be fetched is recorded on the SiteBacktest.
+    """
+    backtest = SiteBacktest(site_id=site_id)
+    start_date = end_date - dt.timedelta(days=round(history_years * 365.25))
+    try:
+        rows = get_daily_average_data(site_id, reading_parameter, start_date, end_date)
+        if not rows:
+            raise ValueError(f"No data available for site {site_id}")
+        history = get_cleaned_data(rows)
+        del rows
+        history.columns = ["ds", "y"]
+        engines = {variant.engine: get_engine(variant.engine) for variant in variants}
+    except Exception as e:
+        log.warning(f"Backtest failed for site {site_id}: {e}")
+        backtest.error = str(e) or type(e).__name__
+        return backtest
+
+    days = history["ds"].dt.date
+    last_day = days[history["y"].notna()].iloc[-1]
+    observations = history.set_index("ds")["y"]
+    for origin in forecast_origins(last_day, horizon_days, origins, step_days):
+        # Every horizon day, observed or not, so forecasts are scored by date
+        actual = observations.reindex(
+            pd.date_range(origin + dt.timedelta(days=1), periods=horizon_days)
+        )
+        for variant in variants:
+            earliest = (
+                origin - dt.timedelta(days=round(variant.training_years * 365.25))
+                if variant.training_years is not None
+                else dt.date.min
+            )
+            training = history[(days <= origin) & (days > earliest)]
+            result = BacktestResult(
+                site_id=site_id, variant=variant.label, origin=origin.isoformat()
+            )
+            try:
+                _run_variant(
+                    engines[variant.engine],
+                    variant,
+                    result,
+                    training,
+                    actual,
+                    trace_memory,
+                )
+            except Exception as e:
+                log.warning(
+                    f"{variant.label} failed for site {site_id} from {origin}: {e}"
+                )
+                result.error = str(e) or type(e).__name__
+            backtest.results.append(result)
+
+    return backtest
@@ -0,0 +1,14 @@
+"""Offline batch forecasting into a partitioned Parquet dataset
+
+Run `flow-forecast batch --help` for the command line.
+"""
+
+from .runner import BatchReport, BatchSettings, BatchSite, run_batch, select_sites
+
+__all__ = [
+    "BatchReport",
+    "BatchSettings",
+    "BatchSite",
+    "run_batch",
+    "select_sites",
+]
@@ -0,0 +1,93 @@
+"""Command line for `flow-forecast batch`
+
+# Every USGS gauge in Colorado and Utah, resuming if interrupted
+flow-forecast batch --state CO --state UT --output forecasts/
+
+# Sites from a file of `site_id[,state]` lines, on 8 worker processes
+flow-forecast batch --sites-file sites.txt --workers 8 --output forecasts/
+"""
+
+import argparse
+import datetime as dt
+import json
+import logging
+from pathlib import Path
+
+from .runner import BatchSettings, run_batch, select_sites
+
+log = logging.getLogger(__name__)
+
+
+def add_batch_parser(commands: argparse._SubParsersAction) -> None:
+    batch = commands.add_parser(
+        "batch",
+        help="Forecast many sites into a partitioned Parquet dataset",
+        description=(
+            "Fetch, clean and fit each site on a process pool and write the "
+            "forecasts as Parquet partitioned by state and run date. Rerunning "
+            "with the same output and run date resumes where it stopped."
+        ),
+    )
+    selection = batch.add_argument_group("sites")
+    selection.add_argument("--site", action="append", help="A USGS site id")
+    selection.add_argument(
+        "--sites-file", type=Path, help="File of site_id[,state] lines"
+    )
+    selection.add_argument(
+        "--state",
+        action="append",
+        help="Every USGS catalog gauge in this state, e.g. CO",
+    )
+    selection.add_argument(
+        "--catalog-dir", type=Path, help="Catalog files; defaults to CATALOG_DIR"
+    )
+
+    batch.add_argument("--output", type=Path, required=True, help="Dataset root")
+    batch.add_argument("--workers", type=int, help="Processes; 0 runs in-process")
+    batch.add_argument("--reading-parameter", default="00060")
+    batch.add_argument("--horizon-days", type=int)
+    batch.add_argument("--fit-deadline", type=float, help="Seconds per fit")
+    batch.add_argument(
+        "--run-date",
+        type=dt.date.fromisoformat,
+        default=dt.date.today(),
+        help="Partition date and training window day (YYYY-MM-DD)",
+    )
+    batch.add_argument(
+        "--flush-sites", type=int, default=50, help="Sites per state per file"
+    )
+    batch.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Retry sites an earlier attempt recorded as failed",
+    )
+    batch.add_argument("--json", action="store_true", help="Print the report as JSON")
+    batch.set_defaults(handler=batch_command)
+
+
+def batch_command(args: argparse.Namespace) -> int:
+    try:
+        sites = select_sites(args.site, args.sites_file, args.state, args.catalog_dir)
+    except ValueError as e:
+        log.error(str(e))
+        return 2
+
+    settings = BatchSettings(
+        output_dir=args.output,
+        sites=sites,
+        reading_parameter=args.reading_parameter,
+        horizon_days=args.horizon_days,
+        fit_deadline=args.fit_deadline,
+        flush_sites=args.flush_sites,
+        run_date=args.run_date,
+        retry_failed=args.retry_failed,
+    )
+    if args.workers is not None:
+        settings.workers = args.workers
+
+    report = run_batch(settings)
+    if args.json:
+        print(json.dumps(report.to_dict(), indent=2))
+    else:
+        print(report.format())
+    return 0 if report.failed == 0 else 1
@@ -0,0 +1,177 @@
+"""Parquet output and checkpointing for batch runs
+
+Forecasts are written as a Hive-partitioned Parquet dataset,
+`state=<state>/run_date=<date>/part-*.parquet`, which pandas, pyarrow,
+DuckDB and Spark read back with the partition keys as columns. Every file
+written is recorded in `_checkpoint.jsonl` together with the sites it
+holds, so an interrupted run resumes where it stopped.
+
+Parquet support needs pyarrow, installed with the `batch` extra.
+"""
+
+import datetime as dt
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - exercised when the extra is absent
+    pa = pq = None
+
+from .worker import SiteForecast
+
+log = logging.getLogger(__name__)
+
+CHECKPOINT_FILE = "_checkpoint.jsonl"
+
+# Columns of every partition file; state and run_date are partition keys
+SCHEMA = (
+    pa.schema(
+        [
+            ("site_id", pa.string()),
+            ("reading_parameter", pa.string()),
+            ("ds", pa.date32()),
+            ("yhat", pa.float64()),
+            ("yhat_lower", pa.float64()),
+            ("yhat_upper", pa.float64()),
+        ]
+    )
+    if pa is not None
+    else None
+)
+
+
+def is_available() -> bool:
+    return pa is not None
+
+
+def forecast_table(forecasts: list[SiteForecast], reading_parameter: str):
+    """One row per forecast day of every successful forecast in `forecasts`"""
+    done = [f for f in forecasts if f.error is None]
+    if not done:
+        return SCHEMA.empty_table()
+
+    lengths = [len(f.days) for f in done]
+    return pa.table(
+        {
+            "site_id": np.repeat([f.site_id for f in done], lengths),
+            "reading_parameter": np.full(sum(lengths), reading_parameter),
+            "ds": np.concatenate([f.days for f in done]),
+            "yhat": np.concatenate([f.yhat for f in done]),
+            "yhat_lower": np.concatenate([f.yhat_lower for f in done]),
+            "yhat_upper": np.concatenate([f.yhat_upper for f in done]),
+        },
+        schema=SCHEMA,
+    )
+
+
+@dataclass
+class CheckpointState:
+    """What earlier attempts at a run already finished"""
+
+    done: set[str] = field(default_factory=set)
+    failed: dict[str, str] = field(default_factory=dict)
+    files: set[str] = field(default_factory=set)
+
+
+class BatchOutput:
+    """Writes one run's partitions and its checkpoint under `directory`
+
+    A flush writes the sites' forecasts to a temporary file, renames it into
+    its partition and only then appends the checkpoint record, so a
+    partition file without a checkpoint record is from an interrupted flush;
+    `resume` deletes those before the run continues.
+    """
+
+    def __init__(self, directory: Path, run_date: dt.date, reading_parameter: str):
+        if not is_available():
+            raise RuntimeError(
+                "Batch output needs pyarrow; install the batch extra "
+                "(uv sync --extra batch)"
+            )
+        self.directory = directory
+        self.run_date = run_date
+        self.reading_parameter = reading_parameter
+        self.checkpoint_path = directory / CHECKPOINT_FILE
+
+    def partition(self, state: str) -> Path:
+        return self.directory / f"state={state}" / f"run_date={self.run_date}"
+
+    def resume(self) -> CheckpointState:
+        """Reads this run's checkpoint and removes unrecorded partition files"""
+        state = CheckpointState()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self.checkpoint_path.exists():
+            with self.checkpoint_path.open() as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # The last line is torn if the process died mid-write
+                        continue
+                    if record.get("run_date") != str(self.run_date):
+                        continue
+                    if record.get("reading_parameter") != self.reading_parameter:
+                        continue
+                    state.done.update(record["done"])
+                    state.failed.update(record["failed"])
+                    if record.get("file"):
+                        state.files.add(record["file"])
+
+        for path in self.directory.glob(f"state=*/run_date={self.run_date}/*"):
+            relative = path.relative_to(self.directory).as_posix()
+            if relative not in state.files and self._owns(path):
+                log.info(f"Removing {relative} left by an interrupted flush")
+                path.unlink()
+
+        # A site that failed before may have succeeded when retried
+        for site_id in state.done:
+            state.failed.pop(site_id, None)
+        return state
+
+    def _owns(self, path: Path) -> bool:
+        return path.name.startswith(f"part-{self.reading_parameter}-") and (
+            path.name.endswith((".parquet", ".parquet.tmp"))
+        )
+
+    def flush(self, state: str, forecasts: list[SiteForecast]) -> Optional[str]:
+        """Writes `forecasts` for one state and checkpoints them
+
+        Returns:
+            The file written, relative to the output directory, or None if
+            every forecast in the batch failed
+        """
+        table = forecast_table(forecasts, self.reading_parameter)
+        relative = None
+        if table.num_rows:
+            site_key = ",".join(sorted(f.site_id for f in forecasts))
+            digest = hashlib.sha1(site_key.encode()).hexdigest()[:12]
+            partition = self.partition(state)
+            partition.mkdir(parents=True, exist_ok=True)
+            path = partition / f"part-{self.reading_parameter}-{digest}.parquet"
+            tmp_path = path.with_name(path.name + ".tmp")
+            pq.write_table(table, tmp_path, compression="zstd")
+            os.replace(tmp_path, path)
+            relative = path.relative_to(self.directory).as_posix()
+
+        record = {
+            "run_date": str(self.run_date),
+            "reading_parameter": self.reading_parameter,
+            "state": state,
+            "file": relative,
+            "done": [f.site_id for f in forecasts if f.error is None],
+            "failed": {f.site_id: f.error for f in forecasts if f.error is not None},
+        }
+        with self.checkpoint_path.open("a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return relative
@@ -0,0 +1,275 @@
+"""Forecasts many sites across a process pool without going through the API"""
+
+import datetime as dt
+import logging
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterator, Optional
+
+from ..catalog.service import load_catalog
+from ..config import config
+from ..fit_pool import PRELOAD_MODULES
+from ..model.catalog import GaugeSource
+from ..usgs.service import resolve_training_window
+from .output import BatchOutput
+from .worker import SiteForecast, forecast_site
+
+log = logging.getLogger(__name__)
+
+# Partition for sites the catalog has no state for
+UNKNOWN_STATE = "unknown"
+
+
+@dataclass(frozen=True)
+class BatchSite:
+    site_id: str
+    state: str = UNKNOWN_STATE
+
+
+@dataclass
+class BatchSettings:
+    """What to forecast, where to write it and how wide to run
+
+    Attributes:
+        output_dir: Root of the partitioned Parquet dataset and checkpoint.
+        sites: Sites to forecast, with the state they are partitioned by.
+        reading_parameter: USGS parameter code forecast for every site.
+        horizon_days: Days past each site's latest reading; defaults to the
+            rest of the year.
+        fit_deadline: Seconds each fit may run; None lets fits finish.
+        workers: Worker processes; 0 runs every site in this process.
+        flush_sites: Sites per state collected before a file is written.
+        run_date: Partition date, and the day the training window is
+            resolved for.
+        retry_failed: Retry sites an earlier attempt recorded as failed.
+        progress_seconds: How often progress and throughput are logged.
+    """
+
+    output_dir: Path
+    sites: list[BatchSite]
+    reading_parameter: str = "00060"
+    horizon_days: Optional[int] = None
+    fit_deadline: Optional[float] = None
+    workers: int = field(default_factory=lambda: os.cpu_count() or 1)
+    flush_sites: int = 50
+    run_date: dt.date = field(default_factory=dt.date.today)
+    retry_failed: bool = False
+    progress_seconds: float = 30.0
+
+
+@dataclass
+class BatchReport:
+    sites: int
+    resumed: int
+    succeeded: int
+    failed: int
+    files: int
+    duration_seconds: float
+    sites_per_minute: float
+    errors: dict[str, str] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def format(self) -> str:
+        """Human readable summary"""
+        lines = [
+            f"sites       {self.sites} ({self.resumed} done by an earlier attempt)",
+            f"forecast    {self.succeeded} succeeded, {self.failed} failed",
+            f"files       {self.files}",
+            f"throughput  {self.sites_per_minute:.1f} sites/min over "
+            f"{self.duration_seconds:.1f}s",
+        ]
+        for site_id, error in list(self.errors.items())[:10]:
+            lines.append(f"  {site_id}: {error}")
+        if len(self.errors) > 10:
+            lines.append(f"  ... and {len(self.errors) - 10} more")
+        return "\n".join(lines)
+
+
+def read_sites_file(path: Path) -> list[tuple[str, Optional[str]]]:
+    """Reads `site_id[,state]` lines, ignoring blank lines and # comments"""
+    entries = []
+    for line in path.read_text().splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        site_id, _, state = (part.strip() for part in line.partition(","))
+        entries.append((site_id, state or None))
+    return entries
+
+
+def select_sites(
+    site_ids: Optional[list[str]] = None,
+    sites_file: Optional[Path] = None,
+    states: Optional[list[str]] = None,
+    catalog_dir: Optional[Path] = None,
+) -> list[BatchSite]:
+    """Resolves the sites a batch run covers, in catalog order for states
+
+    Explicitly named sites take their state from the file, else from the USGS
+    catalog, else UNKNOWN_STATE. `states` adds every USGS catalog gauge in
+    those states.
+
+    Raises:
+        ValueError: If no sites are selected
+    """
+    catalog = load_catalog(catalog_dir or Path(config.catalog_dir))
+    catalog_states = {
+        gauge.site_id: gauge.state
+        for gauge in catalog.gauges
+        if gauge.source == GaugeSource.usgs
+    }
+
+    named: list[tuple[str, Optional[str]]] = [(s, None) for s in site_ids or []]
+    if sites_file is not None:
+        named += read_sites_file(sites_file)
+
+    sites: dict[str, BatchSite] = {}
+    for site_id, state in named:
+        state = state or catalog_states.get(site_id, UNKNOWN_STATE)
+        sites.setdefault(site_id, BatchSite(site_id, state.upper()))
+
+    wanted = {state.upper() for state in states or []}
+    for site_id, state in catalog_states.items():
+        if state.upper() in wanted:
+            sites.setdefault(site_id, BatchSite(site_id, state.upper()))
+
+    if not sites:
+        raise ValueError("No sites selected; pass site ids, a sites file or states")
+    return list(sites.values())
+
+
+def _forecasts(
+    settings: BatchSettings,
+    sites: list[BatchSite],
+    start_date: dt.date,
+    end_date: dt.date,
+) -> Iterator[SiteForecast]:
+    """Yields each site's forecast as it completes
+
+    At most two sites per worker are submitted at a time, so a large batch
+    does not queue every task (and its result) in memory up front.
+    """
+
+    def arguments(site: BatchSite) -> tuple:
+        return (
+            site.site_id,
+            site.state,
+            settings.reading_parameter,
+            start_date,
+            end_date,
+            settings.horizon_days,
+            settings.fit_deadline,
+        )
+
+    if settings.workers == 0:
+        for site in sites:
+            yield forecast_site(*arguments(site))
+        return
+
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(PRELOAD_MODULES + ["flow_forecast.batch.worker"])
+    with ProcessPoolExecutor(
+        max_workers=settings.workers,
+        mp_context=context,
+        max_tasks_per_child=config.fit_pool_max_fits_per_worker,
+    ) as executor:
+        remaining = iter(sites)
+        in_flight = set()
+
+        def submit_next() -> None:
+            site = next(remaining, None)
+            if site is not None:
+                in_flight.add(executor.submit(forecast_site, *arguments(site)))
+
+        for _ in range(2 * settings.workers):
+            submit_next()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                in_flight.remove(future)
+                submit_next()
+                yield future.result()
+
+
+def run_batch(settings: BatchSettings) -> BatchReport:
+    """Forecasts every site in `settings`, resuming an interrupted run
+
+    Sites recorded in the output's checkpoint for the same run date and
+    parameter are skipped, as are earlier failures unless `retry_failed`.
+    Results are flushed per state every `flush_sites` sites and when the run
+    stops, including when it is interrupted.
+
+    Raises:
+        RuntimeError: If pyarrow is not installed
+        BrokenProcessPool: If a worker process died; finished sites are
+            checkpointed, so rerunning resumes the batch
+    """
+    output = BatchOutput(
+        settings.output_dir, settings.run_date, settings.reading_parameter
+    )
+    checkpoint = output.resume()
+    skip = (
+        checkpoint.done
+        if settings.retry_failed
+        else (checkpoint.done | checkpoint.failed.keys())
+    )
+    pending = [site for site in settings.sites if site.site_id not in skip]
+    start_date, end_date = resolve_training_window(today=settings.run_date)
+    log.info(
+        f"Forecasting {len(pending)} of {len(settings.sites)} sites "
+        f"with {settings.workers} workers into {settings.output_dir}"
+    )
+
+    buffers: defaultdict[str, list[SiteForecast]] = defaultdict(list)
+    succeeded, files = 0, 0
+    errors: dict[str, str] = {}
+
+    def flush(state: str) -> None:
+        nonlocal files
+        if buffers[state]:
+            files += output.flush(state, buffers.pop(state)) is not None
+
+    started = last_progress = time.perf_counter()
+    try:
+        for completed, result in enumerate(
+            _forecasts(settings, pending, start_date, end_date), start=1
+        ):
+            if result.error is None:
+                succeeded += 1
+            else:
+                errors[result.site_id] = result.error
+
+            buffers[result.state].append(result)
+            if len(buffers[result.state]) >= settings.flush_sites:
+                flush(result.state)
+
+            now = time.perf_counter()
+            if now - last_progress >= settings.progress_seconds:
+                last_progress = now
+                log.info(
+                    f"{completed}/{len(pending)} sites, "
+                    f"{completed / (now - started) * 60:.1f} sites/min"
+                )
+    finally:
+        for state in list(buffers):
+            flush(state)
+
+    elapsed = time.perf_counter() - started
+    completed = succeeded + len(errors)
+    return BatchReport(
+        sites=len(settings.sites),
+        resumed=len(settings.sites) - len(pending),
+        succeeded=succeeded,
+        failed=len(errors),
+        files=files,
+        duration_seconds=elapsed,
+        sites_per_minute=completed / elapsed * 60 if elapsed > 0 else 0.0,
+        errors=errors,
+    )
@@ -0,0 +1,83 @@
+"""Code that runs inside batch worker processes
+
+Batch workers come from the same kind of fork server as the fit pool, with
+`flow_forecast.fit_worker` preloaded so the Stan model is loaded once.
+Each task fetches, cleans and fits one site and returns its forecast as
+plain arrays, which pickle back to the parent far cheaper than a frame.
+"""
+
+import datetime as dt
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from ..config import config
+from ..usgs.service import (
+    FitDeadlineExceeded,
+    generate_forecast,
+    get_cleaned_data,
+    get_daily_average_data,
+    limit_training_rows,
+)
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class SiteForecast:
+    site_id: str
+    state: str
+    # datetime64[D] forecast days and their predictions; None if it failed
+    days: Optional[np.ndarray] = None
+    yhat: Optional[np.ndarray] = None
+    yhat_lower: Optional[np.ndarray] = None
+    yhat_upper: Optional[np.ndarray] = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+
+def forecast_site(
+    site_id: str,
+    state: str,
+    reading_parameter: str,
+    start_date: dt.date,
+    end_date: dt.date,
+    horizon_days: Optional[int] = None,
+    fit_deadline: Optional[float] = None,
+) -> SiteForecast:
+    """Fetches, cleans and fits one site; failures are returned, not raised
+
+    Any error is caught so one bad site cannot take down a worker or the
+    batch, and is reported in `error` for the checkpoint.
+    """
+    started = time.perf_counter()
+    result = SiteForecast(site_id=site_id, state=state)
+    try:
+        rows = get_daily_average_data(site_id, reading_parameter, start_date, end_date)
+        if not rows:
+            raise ValueError(f"No data available for site {site_id}")
+        history = get_cleaned_data(rows)
+        del rows
+        history.columns = ["ds", "y"]
+
+        forecast = generate_forecast(
+            limit_training_rows(history, config.fit_max_rows),
+            fit_deadline=fit_deadline,
+            horizon_days=horizon_days,
+        )
+        last_day = np.datetime64(history["ds"].iloc[-1].date(), "D")
+        result.days = last_day + np.arange(1, len(forecast) + 1)
+        result.yhat = forecast["yhat"].to_numpy(dtype=np.float64)
+        result.yhat_lower = forecast["yhat_lower"].to_numpy(dtype=np.float64)
+        result.yhat_upper = forecast["yhat_upper"].to_numpy(dtype=np.float64)
+    except FitDeadlineExceeded as e:
+        result.error = f"Fit overran its {e.deadline:.0f}s deadline"
+    except Exception as e:
+        log.warning(f"Batch forecast failed for site {site_id}: {e}")
+        result.error = str(e) or type(e).__name__
+
+    result.seconds = time.perf_counter() - started
+    return result
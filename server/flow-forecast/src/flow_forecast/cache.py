@@ -0,0 +1,95 @@
+"""In-memory cache of generated forecasts with stale-while-revalidate support"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable, List, Optional, Tuple
+
+from .config import config
+from .model.forecast_result import ForecastDataPoint
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    value: List[ForecastDataPoint]
+    created_at: float
+    fresh_for: float
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.age < self.fresh_for
+
+
+class ForecastCache:
+    """Bounded LRU cache of forecasts
+
+    Entries younger than `ttl_seconds` are fresh. Older entries are kept as
+    the last good forecast for up to `max_stale_seconds` so they can be
+    served while a refresh runs or the upstream is unavailable.
+    """
+
+    def __init__(self, ttl_seconds: float, max_stale_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, CacheEntry] = OrderedDict()
+        self._refreshing: set[Hashable] = set()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.age >= self.ttl_seconds + self.max_stale_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, value: List[ForecastDataPoint]) -> None:
+        with self._lock:
+            self._entries[key] = CacheEntry(
+                value=value, created_at=time.monotonic(), fresh_for=self.ttl_seconds
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def items(self) -> List[Tuple[Hashable, CacheEntry]]:
+        """Every unexpired entry, least recently used first"""
+        with self._lock:
+            limit = self.ttl_seconds + self.max_stale_seconds
+            return [(k, e) for k, e in self._entries.items() if e.age < limit]
+
+    def begin_refresh(self, key: Hashable) -> bool:
+        """Marks a refresh of `key` as in flight; False if one already is"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key: Hashable) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._refreshing.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+forecast_cache = ForecastCache(
+    ttl_seconds=config.forecast_cache_ttl_seconds,
+    max_stale_seconds=config.forecast_cache_max_stale_seconds,
+    max_entries=config.forecast_cache_max_entries,
+)
@@ -0,0 +1,220 @@
+import logging
+from typing import List, Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+
+from ..cache import forecast_cache
+from ..config import config
+from ..drivers.service import driver_for_gauge
+from ..jobs import forecast_jobs
+from ..model.catalog import (
+    Gauge,
+    GaugeSearchPage,
+    GaugeSource,
+    NearbyForecastStatus,
+    NearbyGauge,
+)
+from ..model.forecast_spec import ForecastSpec
+from ..ratelimit import rate_limit
+from ..usgs.router import refresh_forecast, run_forecast
+from ..usgs.service import resolve_training_window
+from .service import get_catalog
+
+log = logging.getLogger(__name__)
+
+# USGS parameter forecast for each catalog metric
+METRIC_READING_PARAMETERS = {"CFS": "00060", "FT": "00065"}
+
+catalog_router = APIRouter(
+    prefix="/catalog",
+    tags=["catalog"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+def gauge_forecast_spec(
+    gauge: Gauge, horizon_days: Optional[int]
+) -> Optional[ForecastSpec]:
+    """The spec a forecast request for this gauge resolves to, if forecastable"""
+    start_date, end_date = resolve_training_window()
+    if gauge.source != GaugeSource.usgs:
+        driver = driver_for_gauge(gauge.source)
+        if driver is None:
+            return None
+        return ForecastSpec(
+            source=driver.source,
+            site_id=gauge.site_id,
+            reading_parameter=driver.reading_parameter,
+            start_date=start_date,
+            end_date=end_date,
+            horizon_days=horizon_days,
+        )
+
+    reading_parameter = METRIC_READING_PARAMETERS.get(gauge.metric.upper())
+    if reading_parameter is None:
+        return None
+    return ForecastSpec(
+        site_id=gauge.site_id,
+        reading_parameter=reading_parameter,
+        start_date=start_date,
+        end_date=end_date,
+        horizon_days=horizon_days,
+    )
+
+
+def attach_forecasts(
+    matches: list[tuple[Gauge, float]],
+    include_forecast: bool,
+    horizon_days: Optional[int],
+    background_tasks: BackgroundTasks,
+) -> List[NearbyGauge]:
+    """Pairs each gauge with whatever forecast can be had without fitting
+
+    Cached forecasts are included (stale ones are refreshed in the
+    background). For the nearest gauges without one, up to
+    `nearby_max_queued_forecasts` forecast jobs are started; the rest are
+    reported as unavailable so one map query cannot queue a fit per gauge.
+    """
+    queue_budget = config.nearby_max_queued_forecasts
+    results = []
+
+    for gauge, distance in matches:
+        nearby = NearbyGauge(
+            gauge=gauge,
+            distance_km=round(distance, 3),
+            forecast_status=NearbyForecastStatus.unavailable,
+        )
+        results.append(nearby)
+
+        spec = gauge_forecast_spec(gauge, horizon_days)
+        if spec is None:
+            nearby.forecast_status = NearbyForecastStatus.unsupported
+            continue
+        if not include_forecast:
+            continue
+
+        entry = forecast_cache.get(spec)
+        if entry is not None:
+            nearby.forecast = entry.value
+            if entry.is_fresh:
+                nearby.forecast_status = NearbyForecastStatus.hit
+            else:
+                nearby.forecast_status = NearbyForecastStatus.stale
+                if forecast_cache.begin_refresh(spec):
+                    background_tasks.add_task(refresh_forecast, spec)
+            continue
+
+        existing = forecast_jobs.find(spec)
+        if existing is None and queue_budget == 0:
+            continue
+        if existing is None:
+            queue_budget -= 1
+
+        job = existing or forecast_jobs.submit(
+            spec,
+            lambda spec=spec: (
+                run_forecast(spec, fit_deadline=config.fit_deadline_seconds).result
+            ),
+        )
+        nearby.forecast_status = NearbyForecastStatus.queued
+        nearby.job_id = job.job_id
+
+    return results
+
+
+@catalog_router.get(
+    "/nearby",
+    response_model=List[NearbyGauge],
+    dependencies=[Depends(rate_limit)],
+    responses={429: {"description": "Rate limit exceeded"}},
+)
+async def nearby_gauges(
+    background_tasks: BackgroundTasks,
+    latitude: float = Query(ge=-90, le=90),
+    longitude: float = Query(ge=-180, le=180),
+    radius_km: float = Query(default=50, gt=0, le=500),
+    limit: int = Query(default=20, ge=1, le=100),
+    source: Optional[GaugeSource] = Query(default=None),
+    include_forecast: bool = Query(
+        default=True, description="Include cached forecasts and start missing ones"
+    ),
+    horizon_days: Optional[int] = Query(default=None, ge=1, le=366),
+) -> List[NearbyGauge]:
+    """Gauges within a radius of a point, nearest first, with their forecasts
+
+    Forecasts come from the cache; see `forecast_status` on each gauge. Poll
+    `GET /usgs/forecast/jobs/{job_id}` for queued ones.
+    """
+    matches = get_catalog().nearby(latitude, longitude, radius_km, limit, source)
+    return attach_forecasts(matches, include_forecast, horizon_days, background_tasks)
+
+
+@catalog_router.get(
+    "/within",
+    response_model=List[NearbyGauge],
+    dependencies=[Depends(rate_limit)],
+    responses={429: {"description": "Rate limit exceeded"}},
+)
+async def gauges_within(
+    background_tasks: BackgroundTasks,
+    min_latitude: float = Query(ge=-90, le=90),
+    min_longitude: float = Query(ge=-180, le=180),
+    max_latitude: float = Query(ge=-90, le=90),
+    max_longitude: float = Query(ge=-180, le=180),
+    limit: int = Query(default=50, ge=1, le=500),
+    source: Optional[GaugeSource] = Query(default=None),
+    include_forecast: bool = Query(
+        default=True, description="Include cached forecasts and start missing ones"
+    ),
+    horizon_days: Optional[int] = Query(default=None, ge=1, le=366),
+) -> List[NearbyGauge]:
+    """Gauges inside a map region, nearest to its centre first
+
+    A region with min_longitude greater than max_longitude crosses the
+    antimeridian.
+    """
+    if min_latitude > max_latitude:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="min_latitude must not be greater than max_latitude",
+        )
+
+    matches = get_catalog().within(
+        min_latitude, min_longitude, max_latitude, max_longitude, limit, source
+    )
+    return attach_forecasts(matches, include_forecast, horizon_days, background_tasks)
+
+
+@catalog_router.get(
+    "/gauges",
+    response_model=GaugeSearchPage,
+    dependencies=[Depends(rate_limit)],
+    responses={429: {"description": "Rate limit exceeded"}},
+)
+async def search_gauges(
+    q: Optional[str] = Query(
+        default=None,
+        max_length=200,
+        description="Name search; each word matches the start of a word in the name",
+    ),
+    site_id: Optional[str] = Query(default=None, max_length=64),
+    state: Optional[str] = Query(default=None, max_length=16),
+    country: Optional[str] = Query(default=None, max_length=8),
+    source: Optional[GaugeSource] = Query(default=None),
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=50, ge=1, le=500),
+) -> GaugeSearchPage:
+    """Searches the gauge catalog, ordered by name
+
+    Filters combine; with none, every gauge is listed page by page.
+    """
+    total, gauges = get_catalog().search(
+        offset,
+        limit,
+        query=q,
+        site_id=site_id,
+        state=state,
+        country=country,
+        source=source,
+    )
+    return GaugeSearchPage(total=total, offset=offset, limit=limit, gauges=gauges)
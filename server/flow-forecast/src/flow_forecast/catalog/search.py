@@ -0,0 +1,121 @@
+"""Attribute indexes for catalog search
+
+Each index maps a key to the sorted name ranks of its gauges, so filters
+combine by narrowing one sorted array and results come back in name order
+without a sort per query.
+"""
+
+import bisect
+import re
+from collections import defaultdict
+from typing import Iterable, Optional
+
+import numpy as np
+
+from ..model.catalog import Gauge, GaugeSource
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def name_tokens(text: str) -> list[str]:
+    """Lower-cased alphanumeric words of a name or query
+
+    e.g. "Lawrence Brook at Westons Mills NJ" -> ["lawrence", "brook", ...]
+    """
+    return _WORD.findall(text.casefold())
+
+
+def _buckets(keys: Iterable[str]) -> dict[str, np.ndarray]:
+    ranks = defaultdict(list)
+    for rank, key in enumerate(keys):
+        ranks[key].append(rank)
+    return {key: np.array(value, dtype=np.int64) for key, value in ranks.items()}
+
+
+class SearchIndex:
+    """Name prefix, site ID, state, country and source indexes over gauges
+
+    Gauges are numbered by their rank in (name, site_id) order and every
+    index holds sorted rank arrays, so matches need no sorting to come back
+    in name order. The name index is a sorted list of (word, rank) pairs for
+    every word of every name; a prefix matches a contiguous run of it, found
+    with two binary searches. Site IDs, states, countries and sources are
+    hashed to rank arrays.
+    """
+
+    def __init__(self, gauges: list[Gauge]):
+        self._by_name = np.array(
+            sorted(
+                range(len(gauges)),
+                key=lambda i: (gauges[i].name.casefold(), gauges[i].site_id),
+            ),
+            dtype=np.int64,
+        )
+        ranked = [gauges[i] for i in self._by_name.tolist()]
+
+        pairs = sorted(
+            {
+                (token, rank)
+                for rank, gauge in enumerate(ranked)
+                for token in name_tokens(gauge.name)
+            }
+        )
+        self._tokens = [token for token, _ in pairs]
+        self._token_ranks = np.array([rank for _, rank in pairs], dtype=np.int64)
+
+        self._site_ids = _buckets(gauge.site_id.casefold() for gauge in ranked)
+        self._states = _buckets(gauge.state.upper() for gauge in ranked)
+        self._countries = _buckets(gauge.country.upper() for gauge in ranked)
+        self._sources = _buckets(gauge.source.value for gauge in ranked)
+
+    def _member_mask(self, ranks: np.ndarray) -> np.ndarray:
+        mask = np.zeros(len(self._by_name), dtype=bool)
+        mask[ranks] = True
+        return mask
+
+    def _prefix(self, prefix: str) -> np.ndarray:
+        low = bisect.bisect_left(self._tokens, prefix)
+        high = bisect.bisect_left(self._tokens, prefix + "\uffff", lo=low)
+        # A name can hold several words with the prefix; a mask dedupes and
+        # orders the ranks in linear time
+        return np.flatnonzero(self._member_mask(self._token_ranks[low:high]))
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        site_id: Optional[str] = None,
+        state: Optional[str] = None,
+        country: Optional[str] = None,
+        source: Optional[GaugeSource] = None,
+    ) -> np.ndarray:
+        """Catalog positions of gauges matching every given filter, in name order
+
+        Each word of `query` must be a prefix of a word in the gauge's name,
+        so "potomac lit" matches "POTOMAC RIVER AT LITTLE FALLS". Site IDs
+        match exactly; states and countries ignore case.
+        """
+        filters = []
+        if site_id is not None:
+            filters.append(self._site_ids.get(site_id.strip().casefold()))
+        if state is not None:
+            filters.append(self._states.get(state.strip().upper()))
+        if country is not None:
+            filters.append(self._countries.get(country.strip().upper()))
+        if source is not None:
+            filters.append(self._sources.get(source.value))
+        if query is not None:
+            filters.extend(self._prefix(token) for token in name_tokens(query))
+
+        if any(ranks is None for ranks in filters):
+            return np.empty(0, dtype=np.int64)
+        if not filters:
+            return self._by_name
+
+        # Narrow the smallest set by each of the others; it stays sorted
+        filters.sort(key=len)
+        matches = filters[0]
+        for ranks in filters[1:]:
+            if len(matches) == 0:
+                break
+            matches = matches[self._member_mask(ranks)[matches]]
+        return self._by_name[matches]
@@ -0,0 +1,226 @@
+"""Gauge catalog loaded from the GaugeSources resource files
+
+The iOS app bundles the same files and scans them on device; the server
+loads them once into indexed structures so clients can query them instead.
+"""
+
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from ..config import config
+from ..model.catalog import Gauge, GaugeSource
+from .search import SearchIndex
+from .spatial import GridIndex, haversine_km
+
+log = logging.getLogger(__name__)
+
+# File name prefix -> source, matching GaugeSourceFile in the Swift package
+SOURCE_FILE_PREFIXES = {
+    "usgs-gages": GaugeSource.usgs,
+    "dwr-gauges": GaugeSource.dwr,
+    "canada-": GaugeSource.environment_canada,
+    "nz-": GaugeSource.lawa,
+}
+
+
+def source_for_file(path: Path) -> Optional[GaugeSource]:
+    for prefix, source in SOURCE_FILE_PREFIXES.items():
+        if path.stem.startswith(prefix):
+            return source
+    return None
+
+
+def parse_gauge(item: dict, source: GaugeSource) -> Optional[Gauge]:
+    """Builds a Gauge from a catalog record, or None if it is incomplete
+
+    Follows GaugeSourceItem's decoding: records with an empty name, state or
+    siteId are dropped, and the metric defaults to CMS in Canada and CFS
+    elsewhere.
+    """
+    try:
+        site_id = str(item["siteId"]).strip()
+        name = str(item["name"]).strip()
+        state = str(item["state"]).strip()
+        country = str(item["country"]).strip()
+        latitude = float(item["latitude"])
+        longitude = float(item["longitude"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    if not site_id or not name or not state:
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+
+    return Gauge(
+        site_id=site_id,
+        name=name,
+        state=state,
+        country=country,
+        source=source,
+        latitude=latitude,
+        longitude=longitude,
+        metric=item.get("metric") or ("CMS" if country == "CA" else "CFS"),
+        zone=item.get("zone"),
+    )
+
+
+class GaugeCatalog:
+    """All known gauges with spatial and search indexes over them"""
+
+    def __init__(self, gauges: list[Gauge], cell_degrees: float = 1.0):
+        self.gauges = gauges
+        self.spatial = GridIndex(
+            np.fromiter((g.latitude for g in gauges), np.float64, len(gauges)),
+            np.fromiter((g.longitude for g in gauges), np.float64, len(gauges)),
+            cell_degrees=cell_degrees,
+        )
+        self.search_index = SearchIndex(gauges)
+
+    def __len__(self) -> int:
+        return len(self.gauges)
+
+    def nearby(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        limit: int,
+        source: Optional[GaugeSource] = None,
+    ) -> list[tuple[Gauge, float]]:
+        """Gauges within `radius_km` of a point, nearest first, with distances"""
+        positions, distances = self.spatial.nearby(latitude, longitude, radius_km)
+        return self._take(positions, distances, limit, source)
+
+    def within(
+        self,
+        min_latitude: float,
+        min_longitude: float,
+        max_latitude: float,
+        max_longitude: float,
+        limit: int,
+        source: Optional[GaugeSource] = None,
+    ) -> list[tuple[Gauge, float]]:
+        """Gauges inside a box, nearest to its centre first, with distances
+
+        A box with min_longitude greater than max_longitude crosses the
+        antimeridian.
+        """
+        positions = self.spatial.within(
+            min_latitude, min_longitude, max_latitude, max_longitude
+        )
+        center_lat = (min_latitude + max_latitude) / 2
+        center_lon = (min_longitude + max_longitude) / 2
+        if min_longitude > max_longitude:
+            center_lon = (center_lon + 360) % 360 - 180
+
+        distances = self._distances(center_lat, center_lon, positions)
+        order = np.argsort(distances, kind="stable")
+        return self._take(positions[order], distances[order], limit, source)
+
+    def search(
+        self,
+        offset: int,
+        limit: int,
+        query: Optional[str] = None,
+        site_id: Optional[str] = None,
+        state: Optional[str] = None,
+        country: Optional[str] = None,
+        source: Optional[GaugeSource] = None,
+    ) -> tuple[int, list[Gauge]]:
+        """One page of gauges matching the filters, in name order
+
+        Returns:
+            The total number of matches and the gauges on the page
+        """
+        positions = self.search_index.search(query, site_id, state, country, source)
+        page = positions[offset : offset + limit]
+        return len(positions), [self.gauges[position] for position in page.tolist()]
+
+    def _distances(
+        self, latitude: float, longitude: float, positions: np.ndarray
+    ) -> np.ndarray:
+        return haversine_km(
+            latitude,
+            longitude,
+            self.spatial.latitudes[positions],
+            self.spatial.longitudes[positions],
+        )
+
+    def _take(
+        self,
+        positions: np.ndarray,
+        distances: np.ndarray,
+        limit: int,
+        source: Optional[GaugeSource],
+    ) -> list[tuple[Gauge, float]]:
+        results = []
+        for position, distance in zip(positions.tolist(), distances.tolist()):
+            gauge = self.gauges[position]
+            if source is not None and gauge.source != source:
+                continue
+            results.append((gauge, distance))
+            if len(results) == limit:
+                break
+        return results
+
+
+def load_catalog(directory: Path, cell_degrees: float = 1.0) -> GaugeCatalog:
+    """Loads every recognised catalog file in `directory`
+
+    Duplicate (source, siteId) pairs keep the first record. A missing
+    directory gives an empty catalog rather than an error, so the API can
+    run without the resource files.
+    """
+    gauges: list[Gauge] = []
+    seen: set[tuple[GaugeSource, str]] = set()
+
+    paths = sorted(directory.glob("*.json")) if directory.is_dir() else []
+    if not paths:
+        log.warning(f"No gauge catalog files found in {directory}")
+
+    for path in paths:
+        source = source_for_file(path)
+        if source is None:
+            log.debug(f"Skipping unrecognised catalog file {path.name}")
+            continue
+
+        with path.open("rb") as f:
+            items = json.load(f)
+
+        skipped = 0
+        for item in items:
+            gauge = parse_gauge(item, source)
+            if gauge is None or (source, gauge.site_id) in seen:
+                skipped += 1
+                continue
+            seen.add((source, gauge.site_id))
+            gauges.append(gauge)
+
+        log.info(
+            f"Loaded {len(items) - skipped} gauges from {path.name}, skipped {skipped}"
+        )
+
+    return GaugeCatalog(gauges, cell_degrees=cell_degrees)
+
+
+_catalog: Optional[GaugeCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> GaugeCatalog:
+    """Returns the process-wide catalog, loading it on first use"""
+    global _catalog
+
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = load_catalog(
+                    Path(config.catalog_dir), cell_degrees=config.catalog_grid_degrees
+                )
+    return _catalog
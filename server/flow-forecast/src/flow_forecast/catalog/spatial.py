@@ -0,0 +1,142 @@
+"""Uniform latitude/longitude grid index over point locations"""
+
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(
+    latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray
+) -> np.ndarray:
+    """Great-circle distances from one point to many, in kilometres"""
+    lat1 = math.radians(latitude)
+    lat2 = np.radians(latitudes)
+    dlat = lat2 - lat1
+    dlon = np.radians(longitudes - longitude)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class GridIndex:
+    """Buckets points into fixed-size grid cells for box and radius queries
+
+    Points are sorted by cell key (row-major, row = latitude band), so the
+    cells of one latitude band that a query overlaps are a contiguous run of
+    keys and each band costs one pair of binary searches. Exact filtering is
+    then vectorised over the candidates.
+    """
+
+    def __init__(
+        self, latitudes: np.ndarray, longitudes: np.ndarray, cell_degrees: float = 1.0
+    ):
+        if cell_degrees <= 0:
+            raise ValueError("cell_degrees must be positive")
+
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.cell_degrees = cell_degrees
+        self._rows = math.ceil(180 / cell_degrees)
+        self._columns = math.ceil(360 / cell_degrees)
+
+        keys = self._row(self.latitudes) * self._columns + self._column(self.longitudes)
+        self._order = np.argsort(keys, kind="stable")
+        self._sorted_keys = keys[self._order]
+
+    def __len__(self) -> int:
+        return len(self.latitudes)
+
+    def _row(self, latitude):
+        row = np.floor((np.asarray(latitude) + 90) / self.cell_degrees).astype(np.int64)
+        return np.clip(row, 0, self._rows - 1)
+
+    def _column(self, longitude):
+        column = np.floor((np.asarray(longitude) + 180) / self.cell_degrees)
+        return column.astype(np.int64) % self._columns
+
+    def _candidates(
+        self, min_lat: float, max_lat: float, column_ranges: list[tuple[int, int]]
+    ) -> np.ndarray:
+        """Positions of points in the given rows and inclusive column ranges"""
+        parts = []
+        for row in range(int(self._row(min_lat)), int(self._row(max_lat)) + 1):
+            for first, last in column_ranges:
+                low = self._sorted_keys.searchsorted(
+                    row * self._columns + first, side="left"
+                )
+                high = self._sorted_keys.searchsorted(
+                    row * self._columns + last, side="right"
+                )
+                if high > low:
+                    parts.append(self._order[low:high])
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(parts)
+
+    def _column_ranges(self, min_lon: float, max_lon: float) -> list[tuple[int, int]]:
+        if max_lon - min_lon >= 360:
+            return [(0, self._columns - 1)]
+        first, last = int(self._column(min_lon)), int(self._column(max_lon))
+        if first <= last and min_lon <= max_lon:
+            return [(first, last)]
+        # Crosses the antimeridian
+        return [(first, self._columns - 1), (0, last)]
+
+    def within(
+        self, min_lat: float, min_lon: float, max_lat: float, max_lon: float
+    ) -> np.ndarray:
+        """Positions of points inside a box
+
+        A box with min_lon greater than max_lon crosses the antimeridian.
+        """
+        candidates = self._candidates(
+            min_lat, max_lat, self._column_ranges(min_lon, max_lon)
+        )
+        lat = self.latitudes[candidates]
+        lon = self.longitudes[candidates]
+        inside = (lat >= min_lat) & (lat <= max_lat)
+        if min_lon <= max_lon:
+            inside &= (lon >= min_lon) & (lon <= max_lon)
+        else:
+            inside &= (lon >= min_lon) | (lon <= max_lon)
+        return candidates[inside]
+
+    def nearby(
+        self, latitude: float, longitude: float, radius_km: float
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Positions of points within `radius_km`, nearest first
+
+        Returns:
+            The positions and their distances in kilometres
+        """
+        angular = radius_km / EARTH_RADIUS_KM
+        dlat = math.degrees(angular)
+        min_lat, max_lat = latitude - dlat, latitude + dlat
+
+        if min_lat <= -90 or max_lat >= 90 or angular >= math.pi / 2:
+            # The circle reaches a pole, so it spans every longitude
+            column_ranges = [(0, self._columns - 1)]
+        else:
+            dlon = math.degrees(
+                math.asin(
+                    min(1.0, math.sin(angular) / math.cos(math.radians(latitude)))
+                )
+            )
+            lon_min = (longitude - dlon + 180) % 360 - 180
+            lon_max = (longitude + dlon + 180) % 360 - 180
+            column_ranges = self._column_ranges(lon_min, lon_max)
+
+        candidates = self._candidates(
+            max(min_lat, -90.0), min(max_lat, 90.0), column_ranges
+        )
+        distances = haversine_km(
+            latitude,
+            longitude,
+            self.latitudes[candidates],
+            self.longitudes[candidates],
+        )
+        close = distances <= radius_km
+        candidates, distances = candidates[close], distances[close]
+        order = np.argsort(distances, kind="stable")
+        return candidates[order], distances[order]
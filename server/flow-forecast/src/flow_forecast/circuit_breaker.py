@@ -0,0 +1,95 @@
+"""Circuit breaker for calls to upstream data providers"""
+
+import logging
+import threading
+import time
+from enum import Enum
+
+log = logging.getLogger(__name__)
+
+
+class CircuitState(str, Enum):
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Fails fast after repeated upstream failures
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    `check()` raises CircuitOpenError without touching the network. Once
+    `reset_timeout` seconds have passed a single trial call is let through
+    (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CircuitState.closed
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            if (
+                self._state == CircuitState.open
+                and time.monotonic() - self._opened_at >= self.reset_timeout
+            ):
+                return CircuitState.half_open
+            return self._state
+
+    def check(self) -> None:
+        """Raises CircuitOpenError if a call should not be attempted now"""
+        with self._lock:
+            if self._state == CircuitState.closed:
+                return
+
+            elapsed = time.monotonic() - self._opened_at
+            if self._state == CircuitState.open and elapsed >= self.reset_timeout:
+                self._state = CircuitState.half_open
+                self._trial_in_flight = False
+
+            if self._state == CircuitState.half_open and not self._trial_in_flight:
+                self._trial_in_flight = True
+                log.info(f"Circuit {self.name} half-open, allowing a trial call")
+                return
+
+            retry_in = max(self.reset_timeout - elapsed, 0.0)
+            raise CircuitOpenError(
+                f"{self.name} circuit is open, retrying in {retry_in:.0f}s"
+            )
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CircuitState.closed:
+                log.info(f"Circuit {self.name} closed")
+            self._state = CircuitState.closed
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if (
+                self._state == CircuitState.half_open
+                or self._failures >= self.failure_threshold
+            ):
+                if self._state != CircuitState.open:
+                    log.warning(
+                        f"Circuit {self.name} opened after {self._failures} failures"
+                    )
+                self._state = CircuitState.open
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def reset(self) -> None:
+        self.record_success()
@@ -1,13 +1,154 @@
 # pydantic settings to load .env file
+from pathlib import Path
+from typing import Literal
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+# Gauge catalog files shipped with the app's GaugeSources package
+_REPO_CATALOG_DIR = (
+    Path(__file__).resolve().parents[4] / "GaugeSources/Sources/GaugeSources/Resources"
+)
+
+
 class Config(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env")
 
     log_level: str = Field(default="INFO")
+    # "json" writes one object per line with structured request fields
+    log_format: Literal["text", "json"] = Field(default="text")
     port: int = Field(default=8000)
     host: str = Field(default="0.0.0.0")
     server_url: str = Field(default="http://localhost:8000")
 
-config = Config()
\ No newline at end of file
+    # Background forecast jobs; a finished job is reused for a repeat
+    # submission only while its result is within the forecast cache TTL
+    forecast_job_workers: int = Field(default=2, ge=1)
+    forecast_job_retention_seconds: int = Field(default=3600, ge=0)
+
+    # Forecast cache; stale entries are served while refreshing or during outages
+    forecast_cache_ttl_seconds: int = Field(default=3600, ge=0)
+    forecast_cache_max_stale_seconds: int = Field(default=7 * 24 * 3600, ge=0)
+    forecast_cache_max_entries: int = Field(default=1024, ge=1)
+    # Earlier versions of each forecast kept to send deltas against, as row
+    # hashes, for the most recently served forecast_versions_max_specs specs
+    forecast_versions_per_spec: int = Field(default=8, ge=1)
+    forecast_versions_max_specs: int = Field(default=256, ge=1)
+
+    # Snapshot of pre-serialized forecasts served through mmap, loaded at
+    # startup and reloaded when the file is replaced; empty disables it.
+    # The export and reload routes need snapshot_admin_key in X-Admin-Key
+    # and are disabled while it is empty
+    snapshot_path: str = Field(default="")
+    snapshot_reload_seconds: float = Field(default=60.0, ge=0)
+    snapshot_admin_key: str = Field(default="")
+
+    # Training window: whole years of history before the current year, and the
+    # most observations a fit may use before older history is downsampled
+    training_window_years: int = Field(default=5, ge=1)
+    fit_max_rows: int = Field(default=2200, ge=30)
+
+    # Longest a single model fit may run; clients can only request less
+    fit_deadline_seconds: float = Field(default=60.0, gt=0)
+
+    # Optimizer for Prophet fits: "cmdstan" runs the Stan model as a
+    # subprocess, "numpy" computes the same MAP estimate in-process
+    fit_backend: Literal["cmdstan", "numpy"] = Field(default="cmdstan")
+
+    # Fork-server worker processes for model fits; 0 fits in the request process
+    fit_pool_workers: int = Field(default=2, ge=0)
+    fit_pool_max_fits_per_worker: int = Field(default=50, ge=1)
+    # Fits that may run at once across all clients; 0 uses one per pool
+    # worker, or one per CPU when fits run in the request process
+    fit_slots: int = Field(default=0, ge=0)
+
+    # USGS daily values endpoint; point at a local stand-in for load tests
+    usgs_base_url: str = Field(default="http://waterservices.usgs.gov/nwis/dv/")
+
+    # Record USGS responses to a directory, or replay them from it instead of
+    # calling USGS, with an optional delay per replayed response
+    usgs_record_mode: Literal["off", "record", "replay"] = Field(default="off")
+    usgs_record_dir: str = Field(default="usgs-recordings")
+    usgs_replay_latency_ms: float = Field(default=0.0, ge=0)
+
+    # OpenTelemetry span export for offline analysis; needs the opentelemetry
+    # packages. "none" leaves export to any externally configured SDK
+    tracing_exporter: Literal["none", "console", "file"] = Field(default="none")
+    tracing_file: str = Field(default="traces.jsonl")
+
+    # Gauge catalog: resource files to load, grid cell size of the spatial
+    # index, and how many forecast jobs one nearby query may start
+    catalog_dir: str = Field(default=str(_REPO_CATALOG_DIR))
+    catalog_grid_degrees: float = Field(default=1.0, gt=0)
+    nearby_max_queued_forecasts: int = Field(default=5, ge=0)
+
+    # Daily flow percentiles: years of history to rank against, how long a
+    # site's latest reading is trusted before USGS is asked for newer days,
+    # and how many sites' histories are kept in memory
+    percentile_history_years: int = Field(default=30, ge=1)
+    percentile_refresh_seconds: int = Field(default=3600, ge=0)
+    percentile_max_sites: int = Field(default=1024, ge=1)
+
+    # Forecast subscriptions: how often watched sites are checked for a new
+    # daily value (0 disables polling), the idle keepalive interval of the
+    # event stream, the most sites one subscription may watch, and how many
+    # forecast jobs one subscription may start
+    subscription_poll_seconds: float = Field(default=900.0, ge=0)
+    subscription_keepalive_seconds: float = Field(default=15.0, gt=0)
+    subscription_max_sites: int = Field(default=50, ge=1)
+    subscription_max_queued_forecasts: int = Field(default=5, ge=0)
+
+    # Hot site prefetch: requests per site are counted in a sketch of
+    # `prefetch_sketch_capacity` sites, and each day at `prefetch_hour_utc`,
+    # once USGS has published the previous day's values, the top
+    # `prefetch_top_k` are re-forecast (0 disables) and counts are scaled by
+    # `prefetch_decay`
+    prefetch_top_k: int = Field(default=20, ge=0)
+    prefetch_sketch_capacity: int = Field(default=1000, ge=1)
+    prefetch_hour_utc: int = Field(default=12, ge=0, le=23)
+    prefetch_decay: float = Field(default=0.5, gt=0, le=1)
+
+    # Per-client limits: a token bucket of forecast requests per API key or
+    # address, and the most fits one client may have running or queued.
+    # Only trust X-Forwarded-For behind a proxy that sets it
+    rate_limit_enabled: bool = Field(default=True)
+    rate_limit_capacity: int = Field(default=60, ge=1)
+    rate_limit_refill_per_second: float = Field(default=1.0, gt=0)
+    rate_limit_max_clients: int = Field(default=10000, ge=1)
+    fit_max_in_flight_per_client: int = Field(default=4, ge=1)
+    trust_forwarded_for: bool = Field(default=False)
+
+    # Gauge drivers for Environment Canada, LAWA and Colorado DWR: upstream
+    # endpoints, the HTTP connection pool they share, and the most stations
+    # one batch of forecast jobs may name
+    canada_base_url: str = Field(default="https://api.weather.gc.ca")
+    lawa_base_url: str = Field(
+        default="https://www.lawa.org.nz/umbraco/api/sensorservice"
+    )
+    dwr_base_url: str = Field(default="https://dwr.state.co.us/Rest/GET/api/v2")
+    driver_max_connections: int = Field(default=20, ge=1)
+    driver_timeout_seconds: float = Field(default=30.0, gt=0)
+    driver_max_job_sites: int = Field(default=50, ge=1)
+
+    # Site affinity across replicas: "forward" proxies requests for a site
+    # another replica owns to it and "redirect" sends the client there with
+    # a 307. Peers are every replica's base URL, comma-separated, including
+    # this one's, which defaults to server_url. Peers are health-checked
+    # every affinity_health_seconds. Forwarded requests carry affinity_secret,
+    # and the receiving replica only trusts them as a peer's if it matches;
+    # "forward" stays off until it is set
+    affinity_mode: Literal["off", "forward", "redirect"] = Field(default="off")
+    affinity_self_url: str = Field(default="")
+    affinity_peers: str = Field(default="")
+    affinity_virtual_nodes: int = Field(default=128, ge=1)
+    affinity_max_connections: int = Field(default=20, ge=1)
+    affinity_timeout_seconds: float = Field(default=120.0, gt=0)
+    affinity_health_seconds: float = Field(default=10.0, gt=0)
+    affinity_secret: str = Field(default="")
+
+    # USGS circuit breaker; the gauge drivers' breakers use the same settings
+    usgs_breaker_failure_threshold: int = Field(default=5, ge=1)
+    usgs_breaker_reset_seconds: float = Field(default=30.0, gt=0)
+
+
+config = Config()
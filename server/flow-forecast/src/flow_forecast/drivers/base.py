@@ -0,0 +1,195 @@
+"""Gauge drivers for the upstream sources other than USGS
+
+Each driver fetches daily history for its source's stations over HTTP and
+normalizes it to the daily frame the forecast pipeline fits, the same frame
+`get_cleaned_data` builds from USGS records. Drivers are async and share
+one pooled client; see `session.py`.
+"""
+
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from .. import tracing
+from ..circuit_breaker import CircuitBreaker
+from ..config import config
+
+log = logging.getLogger(__name__)
+
+# (days as datetime64[D], values) for one station
+DailySeries = tuple[np.ndarray, np.ndarray]
+
+
+def daily_frame(days: np.ndarray, values: np.ndarray) -> pd.DataFrame:
+    """Scatters readings into a gap-filled daily frame
+
+    Returns a frame with 'dateTime' and 'value' columns and one row per day
+    from the first reading to the last. Days without a reading, and
+    non-positive readings, are NaN. Where a day is repeated the last
+    reading wins.
+
+    Raises:
+        ValueError: If there are no readings
+    """
+    if len(days) == 0:
+        raise ValueError("Cannot clean empty data")
+
+    days = np.asarray(days, dtype="datetime64[D]")
+    first_day = days.min()
+    offsets = (days - first_day).view(np.int64)
+    value = np.full(int(offsets.max()) + 1, np.nan)
+    value[offsets] = values
+    value[value <= 0] = np.nan
+
+    return pd.DataFrame(
+        {
+            "dateTime": pd.date_range(first_day, periods=len(value), freq="D"),
+            "value": value,
+        },
+        copy=False,
+    )
+
+
+def daily_means(timestamps: np.ndarray, values: np.ndarray) -> DailySeries:
+    """Averages sub-daily readings into one value per calendar day
+
+    Days follow the timestamps as given, so pass them in the zone whose
+    days should be used.
+    """
+    days = np.asarray(timestamps, dtype="datetime64[s]").astype("datetime64[D]")
+    if len(days) == 0:
+        return days, np.asarray(values, dtype=np.float64)
+
+    order = np.argsort(days, kind="stable")
+    days = days[order]
+    values = np.asarray(values, dtype=np.float64)[order]
+    unique, starts, counts = np.unique(days, return_index=True, return_counts=True)
+    return unique, np.add.reduceat(values, starts) / counts
+
+
+def merge_series(primary: DailySeries, secondary: DailySeries) -> DailySeries:
+    """Combines two series, keeping `primary` where both have a day"""
+    days = np.concatenate([secondary[0], primary[0]])
+    values = np.concatenate([secondary[1], primary[1]])
+    # Later entries win in daily_frame, so sort stably with primary last
+    order = np.argsort(days, kind="stable")
+    return days[order], values[order]
+
+
+class GaugeDriver(ABC):
+    """Fetches daily history for one upstream source
+
+    Subclasses implement `fetch_batch` for up to `batch_size` stations; a
+    source that can only be asked about one station at a time keeps the
+    default of 1 and its stations are fetched concurrently instead.
+    Upstream failures are counted by a circuit breaker per source.
+    """
+
+    # Forecast spec source and route prefix
+    source: str
+    # The agency's name, for logs and error messages
+    title: str
+    # Spec reading_parameter; these sources forecast discharge only
+    reading_parameter: str = "discharge"
+    batch_size: int = 1
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self.breaker = CircuitBreaker(
+            name=self.source,
+            failure_threshold=config.usgs_breaker_failure_threshold,
+            reset_timeout=config.usgs_breaker_reset_seconds,
+        )
+
+    @abstractmethod
+    async def fetch_batch(
+        self,
+        client: httpx.AsyncClient,
+        site_ids: list[str],
+        start_date,
+        end_date,
+    ) -> dict[str, DailySeries]:
+        """Daily readings for each of `site_ids` that has any"""
+
+    async def fetch_daily(
+        self,
+        client: httpx.AsyncClient,
+        site_ids: list[str],
+        start_date,
+        end_date,
+    ) -> dict[str, DailySeries]:
+        """Daily readings for each site that has any, one request per batch
+
+        Raises:
+            ConnectionError: If the source is unreachable, answers with an
+                error status or its circuit is open
+            ValueError: If the source's response cannot be parsed
+        """
+        site_ids = list(dict.fromkeys(site_ids))
+        batches = [
+            site_ids[i : i + self.batch_size]
+            for i in range(0, len(site_ids), self.batch_size)
+        ]
+        with tracing.span(
+            f"{self.source}.fetch",
+            sites=len(site_ids),
+            batches=len(batches),
+            start_date=str(start_date),
+            end_date=str(end_date),
+        ) as span:
+            results = await asyncio.gather(
+                *(
+                    self.fetch_batch(client, batch, start_date, end_date)
+                    for batch in batches
+                )
+            )
+            series = {site: s for result in results for site, s in result.items()}
+            span.set_attribute("rows", sum(len(days) for days, _ in series.values()))
+
+        log.info(
+            f"Fetched {self.title} history for {len(series)}/{len(site_ids)} sites"
+        )
+        return series
+
+    async def get_json(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        params: Optional[dict[str, Any]] = None,
+    ) -> Any:
+        """GETs a JSON document, counting transport errors and 5xx as failures
+
+        Raises:
+            ConnectionError: On transport errors, non-200 statuses or an
+                open circuit
+            ValueError: If the body is not JSON
+        """
+        self.breaker.check()
+        try:
+            response = await client.get(url, params=params)
+        except httpx.HTTPError as e:
+            self.breaker.record_failure()
+            log.error(f"HTTP error connecting to {self.title}: {e}")
+            raise ConnectionError(f"Failed to connect to {self.title}: {e}")
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+        if response.status_code != 200:
+            log.error(f"{self.title} returned status {response.status_code}")
+            raise ConnectionError(
+                f"{self.title} request failed with status {response.status_code}"
+            )
+
+        try:
+            return response.json()
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON response from {self.title}: {e}")
@@ -0,0 +1,119 @@
+"""Environment and Climate Change Canada hydrometric driver
+
+History comes from the MSC GeoMet OGC API: approved daily means from the
+`hydrometric-daily-mean` collection (HYDAT), topped up with the provisional
+readings of the last 30 days from `hydrometric-realtime`, averaged per day.
+HYDAT lags real time by months, so the realtime days fill the gap up to
+today; where both have a day the approved mean wins. The collections are
+queried one station at a time.
+"""
+
+import datetime as dt
+import logging
+from typing import Any
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from .base import DailySeries, GaugeDriver, daily_means, merge_series
+
+log = logging.getLogger(__name__)
+
+# Features per page; the API caps limit at 10000
+_PAGE_SIZE = 10000
+# How far back the realtime collection keeps readings
+_REALTIME_DAYS = 30
+
+
+class EnvironmentCanadaDriver(GaugeDriver):
+    source = "canada"
+    title = "Environment Canada"
+
+    async def features(
+        self,
+        client: httpx.AsyncClient,
+        collection: str,
+        site_id: str,
+        start: str,
+        end: str,
+        properties: str,
+    ) -> list[dict[str, Any]]:
+        """Every feature of a station in [start, end], following pages"""
+        url = f"{self.base_url}/collections/{collection}/items"
+        features: list[dict[str, Any]] = []
+        while True:
+            page = await self.get_json(
+                client,
+                url,
+                {
+                    "f": "json",
+                    "STATION_NUMBER": site_id,
+                    "datetime": f"{start}/{end}",
+                    "properties": properties,
+                    "limit": _PAGE_SIZE,
+                    "offset": len(features),
+                },
+            )
+            try:
+                batch = page["features"]
+            except (KeyError, TypeError):
+                raise ValueError(f"{self.title} response missing 'features'")
+            features.extend(batch)
+            if len(batch) < _PAGE_SIZE:
+                return features
+
+    async def fetch_batch(
+        self,
+        client: httpx.AsyncClient,
+        site_ids: list[str],
+        start_date: dt.date,
+        end_date: dt.date,
+    ) -> dict[str, DailySeries]:
+        (site_id,) = site_ids
+        daily = await self.features(
+            client,
+            "hydrometric-daily-mean",
+            site_id,
+            start_date.isoformat(),
+            end_date.isoformat(),
+            "DATE,DISCHARGE",
+        )
+        rows = [
+            (f["properties"]["DATE"], f["properties"]["DISCHARGE"])
+            for f in daily
+            if f["properties"].get("DISCHARGE") is not None
+        ]
+        approved = (
+            np.array([day for day, _ in rows], dtype="datetime64[D]"),
+            np.array([value for _, value in rows], dtype=np.float64),
+        )
+
+        series = approved
+        realtime_start = max(start_date, dt.date.today() - dt.timedelta(_REALTIME_DAYS))
+        if realtime_start <= end_date:
+            readings = await self.features(
+                client,
+                "hydrometric-realtime",
+                site_id,
+                f"{realtime_start.isoformat()}T00:00:00Z",
+                f"{end_date.isoformat()}T23:59:59Z",
+                "DATETIME,DISCHARGE",
+            )
+            rows = [
+                (f["properties"]["DATETIME"], f["properties"]["DISCHARGE"])
+                for f in readings
+                if f["properties"].get("DISCHARGE") is not None
+            ]
+            provisional = daily_means(
+                pd.to_datetime([ts for ts, _ in rows], utc=True)
+                .tz_localize(None)
+                .to_numpy(),
+                np.array([value for _, value in rows], dtype=np.float64),
+            )
+            series = merge_series(approved, provisional)
+
+        if len(series[0]) == 0:
+            log.warning(f"No {self.title} discharge found for station {site_id}")
+            return {}
+        return {site_id: series}
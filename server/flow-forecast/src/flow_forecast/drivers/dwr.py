@@ -0,0 +1,76 @@
+"""Colorado Division of Water Resources telemetry driver
+
+Daily discharge comes from the CDSS REST API's
+`telemetrystations/telemetrytimeseriesday` resource, which takes a comma
+separated list of station abbreviations, so up to `batch_size` stations
+are fetched per request and the result is split by station.
+"""
+
+import datetime as dt
+import logging
+from collections import defaultdict
+
+import httpx
+import numpy as np
+
+from .base import DailySeries, GaugeDriver
+
+log = logging.getLogger(__name__)
+
+# Rows per page; the API allows up to 50000
+_PAGE_SIZE = 50000
+
+
+class ColoradoDwrDriver(GaugeDriver):
+    source = "dwr"
+    title = "Colorado DWR"
+    batch_size = 20
+
+    async def fetch_batch(
+        self,
+        client: httpx.AsyncClient,
+        site_ids: list[str],
+        start_date: dt.date,
+        end_date: dt.date,
+    ) -> dict[str, DailySeries]:
+        url = f"{self.base_url}/telemetrystations/telemetrytimeseriesday/"
+        # Station abbreviations are case-insensitive upstream
+        requested = {site_id.upper(): site_id for site_id in site_ids}
+        rows: dict[str, list[tuple[str, float]]] = defaultdict(list)
+
+        page_index, page_count = 1, 1
+        while page_index <= page_count:
+            page = await self.get_json(
+                client,
+                url,
+                {
+                    "format": "json",
+                    "abbrev": ",".join(site_ids),
+                    "parameter": "DISCHRG",
+                    "startDate": start_date.strftime("%m/%d/%Y"),
+                    "endDate": end_date.strftime("%m/%d/%Y"),
+                    "pageSize": _PAGE_SIZE,
+                    "pageIndex": page_index,
+                },
+            )
+            try:
+                page_count = int(page.get("PageCount", 1))
+                results = page["ResultList"]
+            except (AttributeError, KeyError, TypeError, ValueError):
+                raise ValueError(f"{self.title} response missing 'ResultList'")
+
+            for result in results:
+                site_id = requested.get(str(result.get("abbrev", "")).upper())
+                value = result.get("measValue")
+                if site_id is None or value is None:
+                    continue
+                rows[site_id].append((str(result["measDate"])[:10], value))
+            page_index += 1
+
+        return {
+            site_id: (
+                np.array([day for day, _ in site_rows], dtype="datetime64[D]"),
+                np.array([value for _, value in site_rows], dtype=np.float64),
+            )
+            for site_id, site_rows in rows.items()
+        }
@@ -0,0 +1,201 @@
+"""Forecast routes for each gauge driver's source
+
+Every source gets the same routes as USGS under its own prefix, backed by
+the same forecast cache, job queue, fit scheduling and deadlines; only the
+history fetch differs.
+"""
+
+import logging
+import re
+from typing import List, Optional
+
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Header,
+    HTTPException,
+    Request,
+    Response,
+    status,
+)
+
+from ..affinity import site_affinity
+from ..config import config
+from ..jobs import forecast_jobs
+from ..model.forecast_result import ForecastDataPoint
+from ..model.forecast_spec import ForecastSpec
+from ..model.jobs import ForecastJob
+from ..model.sources import (
+    SITE_ID_PATTERN,
+    SourceForecastJobsRequest,
+    SourceForecastRequest,
+)
+from ..ratelimit import rate_limit
+from ..usgs.router import (
+    FIT_DEADLINE_HEADER,
+    forecast_http_exception,
+    run_forecast,
+    serve_forecast,
+)
+from ..usgs.service import resolve_training_window
+from .base import GaugeDriver
+from .service import DRIVERS, load_histories
+
+log = logging.getLogger(__name__)
+
+_SITE_ID = re.compile(SITE_ID_PATTERN)
+
+
+def source_forecast_spec(
+    driver: GaugeDriver,
+    site_id: str,
+    end_date=None,
+    horizon_days: Optional[int] = None,
+    only_future: bool = False,
+) -> ForecastSpec:
+    """Resolves a request for one of the driver's stations to its spec
+
+    Raises:
+        HTTPException: 400 if end_date precedes the training window
+    """
+    try:
+        start_date, end_date = resolve_training_window(end_date)
+    except ValueError as e:
+        raise forecast_http_exception(e)
+
+    return ForecastSpec(
+        source=driver.source,
+        site_id=site_id,
+        reading_parameter=driver.reading_parameter,
+        start_date=start_date,
+        end_date=end_date,
+        horizon_days=horizon_days,
+        only_future=only_future,
+    )
+
+
+def source_router(driver: GaugeDriver) -> APIRouter:
+    """Builds the forecast routes for one driver's source"""
+    router = APIRouter(
+        prefix=f"/{driver.source}",
+        tags=[driver.source],
+        responses={404: {"description": "Not found"}},
+    )
+
+    @router.post(
+        "/forecast",
+        response_model=List[ForecastDataPoint],
+        dependencies=[Depends(rate_limit)],
+        responses={
+            400: {"description": "Invalid request parameters"},
+            429: {"description": "Rate limit or fit quota exceeded"},
+            502: {"description": f"Error communicating with {driver.title}"},
+        },
+        summary=f"Generate flow forecast for a {driver.title} station",
+    )
+    async def forecast(
+        request: SourceForecastRequest,
+        http_request: Request,
+        response: Response,
+        background_tasks: BackgroundTasks,
+        fit_deadline: Optional[float] = Header(
+            default=None,
+            alias=FIT_DEADLINE_HEADER,
+            gt=0,
+            description="Seconds the model fit may take; can only lower the server default",
+        ),
+    ) -> List[ForecastDataPoint]:
+        """Forecast daily discharge for a station, cached like USGS forecasts"""
+        spec = source_forecast_spec(
+            driver,
+            request.site_id,
+            request.end_date,
+            request.horizon_days,
+            request.only_future,
+        )
+        routed = await site_affinity.route(spec.site_id, http_request)
+        if routed is not None:
+            return routed
+        return await serve_forecast(
+            spec, response, background_tasks, fit_deadline, raw_snapshot=True
+        )
+
+    @router.post(
+        "/forecast/jobs",
+        response_model=List[ForecastJob],
+        status_code=status.HTTP_202_ACCEPTED,
+        dependencies=[Depends(rate_limit)],
+        responses={
+            400: {"description": "Invalid request parameters"},
+            429: {"description": "Rate limit exceeded"},
+            502: {"description": f"Error communicating with {driver.title}"},
+        },
+        summary=f"Queue forecasts for several {driver.title} stations",
+    )
+    async def submit_forecast_jobs(
+        request: SourceForecastJobsRequest,
+    ) -> List[ForecastJob]:
+        """Queue forecasts for several stations, fetching their history together
+
+        Stations without a live job have their history fetched up front in
+        as few upstream requests as the source allows, then each is fitted
+        as its own job. Poll `GET /usgs/forecast/jobs/{job_id}` for results.
+        """
+        site_ids = list(dict.fromkeys(request.site_ids))
+        if len(site_ids) > config.driver_max_job_sites:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {config.driver_max_job_sites} sites per request",
+            )
+        invalid = [s for s in site_ids if not _SITE_ID.fullmatch(s)]
+        if invalid:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid site_id: {', '.join(invalid)}",
+            )
+
+        specs = [
+            source_forecast_spec(
+                driver, site_id, None, request.horizon_days, request.only_future
+            )
+            for site_id in site_ids
+        ]
+        pending = [spec for spec in specs if not has_live_job(spec)]
+
+        histories = {}
+        if pending:
+            try:
+                histories = await load_histories(
+                    driver,
+                    [spec.site_id for spec in pending],
+                    pending[0].start_date,
+                    pending[0].end_date,
+                )
+            except Exception as e:
+                raise forecast_http_exception(e)
+
+        # Sites the batch had no data for fetch again in their job, which
+        # then fails with the site's own error
+        return [
+            forecast_jobs.submit(
+                spec,
+                lambda spec=spec: (
+                    run_forecast(
+                        spec,
+                        fit_deadline=config.fit_deadline_seconds,
+                        history=histories.get(spec.site_id),
+                    ).result
+                ),
+            )
+            for spec in specs
+        ]
+
+    return router
+
+
+def has_live_job(spec: ForecastSpec) -> bool:
+    return forecast_jobs.find(spec) is not None
+
+
+source_routers = [source_router(driver) for driver in DRIVERS.values()]
@@ -0,0 +1,86 @@
+"""Driver lookup and history loading for the non-USGS sources"""
+
+import datetime as dt
+import logging
+from typing import Optional
+
+import pandas as pd
+
+from .. import tracing
+from ..config import config
+from ..model.catalog import GaugeSource
+from .base import GaugeDriver, daily_frame
+from .canada import EnvironmentCanadaDriver
+from .dwr import ColoradoDwrDriver
+from .lawa import LawaDriver
+from .session import driver_session
+
+log = logging.getLogger(__name__)
+
+DRIVERS: dict[str, GaugeDriver] = {
+    driver.source: driver
+    for driver in (
+        EnvironmentCanadaDriver(config.canada_base_url),
+        LawaDriver(config.lawa_base_url),
+        ColoradoDwrDriver(config.dwr_base_url),
+    )
+}
+
+# Catalog source -> driver that can forecast its gauges
+CATALOG_DRIVERS: dict[GaugeSource, GaugeDriver] = {
+    GaugeSource.environment_canada: DRIVERS["canada"],
+    GaugeSource.lawa: DRIVERS["lawa"],
+    GaugeSource.dwr: DRIVERS["dwr"],
+}
+
+
+def get_driver(source: str) -> GaugeDriver:
+    """Raises ValueError for a source without a driver"""
+    try:
+        return DRIVERS[source]
+    except KeyError:
+        raise ValueError(f"Unknown gauge source: {source}")
+
+
+def driver_for_gauge(source: GaugeSource) -> Optional[GaugeDriver]:
+    return CATALOG_DRIVERS.get(source)
+
+
+def load_history(
+    source: str, site_id: str, start_date: dt.date, end_date: dt.date
+) -> pd.DataFrame:
+    """Fetches one site's daily history as a cleaned daily frame
+
+    Blocks on the driver session, so call it from a worker thread.
+
+    Raises:
+        ValueError: If the source is unknown or the site has no data
+        ConnectionError: If the source is unreachable or its circuit is open
+    """
+    driver = get_driver(source)
+    series = driver_session.fetch_daily(driver, [site_id], start_date, end_date)
+    if site_id not in series:
+        raise ValueError(f"No data available for site {site_id}")
+    return history_frame(site_id, *series[site_id])
+
+
+async def load_histories(
+    driver: GaugeDriver, site_ids: list[str], start_date: dt.date, end_date: dt.date
+) -> dict[str, pd.DataFrame]:
+    """Fetches several sites' histories with the driver's batched requests
+
+    Sites without data are left out.
+    """
+    series = await driver_session.afetch_daily(driver, site_ids, start_date, end_date)
+    return {site_id: history_frame(site_id, *s) for site_id, s in series.items()}
+
+
+def history_frame(site_id: str, days, values) -> pd.DataFrame:
+    with tracing.span("forecast.clean", input_rows=len(days)) as span:
+        frame = daily_frame(days, values)
+        valid_rows = int(frame["value"].notna().sum())
+        tracing.set_attributes(span, rows=len(frame), valid_rows=valid_rows)
+    log.info(
+        f"Cleaned data for {site_id}: {len(frame)} rows, {valid_rows} valid values"
+    )
+    return frame
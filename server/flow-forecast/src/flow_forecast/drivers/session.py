@@ -0,0 +1,121 @@
+"""One event loop and HTTP connection pool shared by every gauge driver
+
+The forecast pipeline runs in worker threads (request handlers hand it to
+`asyncio.to_thread`, jobs run on their own pool), while the drivers are
+async. Driver calls are therefore run on a dedicated loop thread that owns
+a single pooled `httpx.AsyncClient`, so connections to each upstream are
+reused by every request, job and refresh whichever thread starts them.
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import httpx
+
+from ..config import config
+from .base import DailySeries, GaugeDriver
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class DriverSession:
+    """Runs driver coroutines on a background loop with a shared client
+
+    The loop thread and client are created on first use. `transport`
+    replaces the network, for tests. `name` labels the loop thread and logs,
+    for sessions used by something other than the drivers.
+    """
+
+    def __init__(
+        self,
+        max_connections: int,
+        timeout_seconds: float,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        name: str = "gauge-drivers",
+    ):
+        self.name = name
+        self.max_connections = max_connections
+        self.timeout_seconds = timeout_seconds
+        self._transport = transport
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is not None:
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout_seconds, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                transport=self._transport,
+                follow_redirects=True,
+            )
+            self._thread = threading.Thread(
+                target=loop.run_forever, name=self.name, daemon=True
+            )
+            self._thread.start()
+            self._loop = loop
+            log.info(
+                f"Started {self.name} HTTP session ({self.max_connections} connections)"
+            )
+            return loop
+
+    def submit(self, call: Callable[[httpx.AsyncClient], Awaitable[T]]) -> "Future[T]":
+        """Schedules `call(client)` on the session loop"""
+        loop = self._start()
+
+        async def run() -> T:
+            return await call(self._client)
+
+        return asyncio.run_coroutine_threadsafe(run(), loop)
+
+    def fetch_daily(
+        self, driver: GaugeDriver, site_ids: list[str], start_date, end_date
+    ) -> dict[str, DailySeries]:
+        """Blocking GaugeDriver.fetch_daily, for worker threads"""
+        return self.submit(
+            lambda client: driver.fetch_daily(client, site_ids, start_date, end_date)
+        ).result()
+
+    async def afetch_daily(
+        self, driver: GaugeDriver, site_ids: list[str], start_date, end_date
+    ) -> dict[str, DailySeries]:
+        """GaugeDriver.fetch_daily awaited from another event loop"""
+        return await asyncio.wrap_future(
+            self.submit(
+                lambda client: driver.fetch_daily(
+                    client, site_ids, start_date, end_date
+                )
+            )
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            loop, self._loop = self._loop, None
+            client, self._client = self._client, None
+            thread, self._thread = self._thread, None
+        if loop is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+
+
+driver_session = DriverSession(
+    max_connections=config.driver_max_connections,
+    timeout_seconds=config.driver_timeout_seconds,
+)
@@ -0,0 +1,165 @@
+"""Pool of fork-server worker processes for Prophet fits
+
+Fitting in the request process grows its memory with every model; starting
+a fresh interpreter per fit re-imports pandas, Prophet and cmdstanpy. This
+pool uses multiprocessing's fork server with `flow_forecast.fit_worker`
+preloaded, so each worker is forked from a parent that already has those
+imported and the Stan model loaded, and workers are recycled after a fixed
+number of fits to return their memory to the OS.
+"""
+
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+import pandas as pd
+
+from . import tracing
+from .config import config
+from .metrics import metrics
+
+log = logging.getLogger(__name__)
+
+PRELOAD_MODULES = ["flow_forecast.fit_worker"]
+
+
+class FitPool:
+    def __init__(self, workers: int, max_fits_per_worker: int):
+        self.workers = workers
+        self.max_fits_per_worker = max_fits_per_worker
+        self.spawn_seconds: Optional[float] = None
+        self._worker_rss: dict[int, int] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Held across a restart so only one caller replaces a broken pool
+        self._restart_lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def start(self) -> None:
+        """Starts the fork server and warms one worker per slot"""
+        from . import fit_worker
+
+        with self._lock:
+            if self._executor is not None:
+                return
+
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(PRELOAD_MODULES)
+
+            started = time.perf_counter()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                max_tasks_per_child=self.max_fits_per_worker,
+            )
+            warm = [
+                self._executor.submit(fit_worker.worker_info)
+                for _ in range(self.workers)
+            ]
+            for future in warm:
+                info = future.result()
+                self._worker_rss[info["pid"]] = info["rss_bytes"]
+            self.spawn_seconds = time.perf_counter() - started
+
+        log.info(
+            f"Started fit pool with {self.workers} workers in {self.spawn_seconds:.2f}s"
+        )
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._worker_rss.clear()
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _restart(self, broken: ProcessPoolExecutor) -> bool:
+        """Replaces `broken` with a new pool unless it was already replaced
+
+        Every fit in flight on a pool whose worker died fails; only the first
+        to get here restarts it, so later ones do not shut down, and cancel
+        the fits on, the pool it started.
+        """
+        with self._restart_lock:
+            if self._executor is not broken:
+                return False
+            self.shutdown()
+            self.start()
+            return True
+
+    def generate_forecast(
+        self,
+        historic_data: pd.DataFrame,
+        fit_deadline: float | None = None,
+        horizon_days: int | None = None,
+    ) -> pd.DataFrame:
+        """Runs `generate_forecast` on a pool worker and waits for the result
+
+        Raises:
+            FitDeadlineExceeded: If the worker's fit ran past `fit_deadline`
+            RuntimeError: If the pool is not running or a worker died
+        """
+        from . import fit_worker
+
+        started = time.perf_counter()
+        with tracing.span("fit_pool.fit", rows=len(historic_data)) as span:
+            # A fit on a pool another caller restarted is retried once on
+            # the new pool
+            for attempt in range(2):
+                executor = self._executor
+                if executor is None:
+                    raise RuntimeError("Fit pool is not running")
+                try:
+                    forecast, info = executor.submit(
+                        fit_worker.fit,
+                        historic_data,
+                        fit_deadline,
+                        horizon_days,
+                        tracing.inject_context(),
+                    ).result()
+                    break
+                except BrokenProcessPool as e:
+                    if self._restart(executor):
+                        log.error(f"Fit pool worker died, restarted pool: {e}")
+                        metrics.increment("fit_pool_restarts")
+                    elif attempt == 0:
+                        continue
+                    raise RuntimeError("Fit worker exited unexpectedly") from e
+            span.set_attribute("worker.pid", info["pid"])
+
+        with self._lock:
+            self._worker_rss.pop(info["pid"], None)
+            self._worker_rss[info["pid"]] = info["rss_bytes"]
+            # Recycled workers never report again; keep only the live set
+            while len(self._worker_rss) > self.workers:
+                self._worker_rss.pop(next(iter(self._worker_rss)))
+
+        metrics.increment("fit_pool_fits")
+        log.debug(
+            f"Fit on worker {info['pid']} took {time.perf_counter() - started:.2f}s, "
+            f"rss {info['rss_bytes'] / 2**20:.0f} MiB"
+        )
+        return forecast
+
+    def stats(self) -> dict:
+        with self._lock:
+            rss = dict(self._worker_rss)
+        return {
+            "running": self.running,
+            "workers": self.workers,
+            "spawn_seconds": self.spawn_seconds,
+            "worker_rss_bytes": rss,
+        }
+
+
+fit_pool = FitPool(
+    workers=config.fit_pool_workers,
+    max_fits_per_worker=config.fit_pool_max_fits_per_worker,
+)
+metrics.register_gauge("fit_pool", fit_pool.stats)
@@ -0,0 +1,70 @@
+"""Code that runs inside fit pool worker processes
+
+The fork server imports this module once, which pulls in pandas, Prophet
+and cmdstanpy and loads the Stan model. Workers forked from it share those
+pages copy-on-write instead of paying the import cost per process.
+"""
+
+import logging
+import os
+import resource
+import sys
+import time
+
+import pandas as pd
+from prophet import Prophet
+
+from . import tracing
+from .config import config
+from .usgs.service import generate_forecast
+
+log = logging.getLogger(__name__)
+
+
+def _warm_up() -> None:
+    """Constructs a model once so the Stan backend is loaded before forking"""
+    Prophet()
+
+
+_warm_up()
+tracing.configure_tracing(config.tracing_exporter, config.tracing_file)
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process, falling back to peak RSS off Linux"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux but bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def worker_info() -> dict:
+    """Identifies the worker; used to warm the pool and measure spawn time"""
+    return {"pid": os.getpid(), "rss_bytes": rss_bytes(), "ready_at": time.time()}
+
+
+def fit(
+    historic_data: pd.DataFrame,
+    fit_deadline: float | None = None,
+    horizon_days: int | None = None,
+    trace_context: dict[str, str] | None = None,
+) -> tuple[pd.DataFrame, dict]:
+    """Runs generate_forecast in this worker
+
+    Spans recorded here join the trace that `trace_context` was injected
+    from in the submitting process.
+
+    Returns:
+        The forecast and this worker's info after the fit
+    """
+    try:
+        with tracing.attached_context(trace_context):
+            forecast = generate_forecast(
+                historic_data, fit_deadline=fit_deadline, horizon_days=horizon_days
+            )
+    finally:
+        tracing.flush()
+    return forecast, worker_info()
@@ -0,0 +1,172 @@
+"""Bounded tracking of the most-requested forecast sites
+
+Request counts per (site_id, reading_parameter) are kept in a Space-Saving
+sketch: at most `capacity` keys are counted, and a new key replaces the
+least-counted one, inheriting its count as the error bound. Any key asked
+for more than 1/capacity of the time is guaranteed to be tracked, and the
+top of the sketch is the hot set the prefetcher keeps fresh.
+"""
+
+import heapq
+import itertools
+import threading
+from dataclasses import dataclass
+from typing import Any, Hashable, Optional
+
+from .config import config
+from .metrics import metrics
+from .model.forecast_spec import ForecastSpec
+
+
+@dataclass(frozen=True)
+class HeavyHitter:
+    key: Hashable
+    # Overestimates the true count by at most `error`
+    count: float
+    error: float
+    payload: Any = None
+
+
+class SpaceSaving:
+    """Space-Saving heavy-hitters sketch over at most `capacity` keys
+
+    The least-counted key is found through a min-heap with lazy deletion:
+    every increment pushes the key's new count, and heap entries whose count
+    no longer matches are skipped when popped. The heap is rebuilt once it
+    holds several entries per key.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        # key -> [count, error, payload]
+        self._entries: dict[Hashable, list] = {}
+        self._heap: list[tuple[float, int, Hashable]] = []
+        self._order = itertools.count()
+
+    def add(self, key: Hashable, payload: Any = None, count: float = 1) -> None:
+        """Counts `key`, keeping `payload` as the key's latest value"""
+        entry = self._entries.get(key)
+        if entry is None:
+            error = 0.0
+            if len(self._entries) >= self.capacity:
+                error = self._evict_min()
+            entry = self._entries[key] = [error, error, payload]
+        entry[0] += count
+        entry[2] = payload
+        self._push(key, entry[0])
+
+    def _push(self, key: Hashable, count: float) -> None:
+        heapq.heappush(self._heap, (count, next(self._order), key))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def _evict_min(self) -> float:
+        while True:
+            count, _, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == count:
+                del self._entries[key]
+                return count
+
+    def _rebuild_heap(self) -> None:
+        self._heap = [
+            (entry[0], next(self._order), key) for key, entry in self._entries.items()
+        ]
+        heapq.heapify(self._heap)
+
+    def top(self, k: int) -> list[HeavyHitter]:
+        """The `k` most-counted keys, most-counted first"""
+        ranked = sorted(self._entries.items(), key=lambda item: -item[1][0])[:k]
+        return [
+            HeavyHitter(key, count, error, payload)
+            for key, (count, error, payload) in ranked
+        ]
+
+    def decay(self, factor: float) -> None:
+        """Scales every count and error by `factor` so old demand fades"""
+        for entry in self._entries.values():
+            entry[0] *= factor
+            entry[1] *= factor
+        self._rebuild_heap()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._heap.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SiteDemand:
+    """Forecast request counts per site, and whether prefetches were used
+
+    Each recorded request keeps its spec as the key's payload, so the
+    prefetcher refreshes the latest way each hot site was asked for. A
+    prefetched spec counts as a hit the first time its cached forecast is
+    served fresh; the prefetcher counts the rest as unused when it next runs.
+    """
+
+    def __init__(self, capacity: int):
+        self._sketch = SpaceSaving(capacity)
+        self._prefetched: set[ForecastSpec] = set()
+        self._lock = threading.Lock()
+
+    def record(self, spec: ForecastSpec) -> None:
+        with self._lock:
+            self._sketch.add((spec.site_id, spec.reading_parameter), spec)
+
+    def hottest(self, k: int) -> list[HeavyHitter]:
+        with self._lock:
+            return self._sketch.top(k)
+
+    def decay(self, factor: float) -> None:
+        with self._lock:
+            self._sketch.decay(factor)
+
+    def mark_prefetched(self, spec: ForecastSpec) -> None:
+        with self._lock:
+            self._prefetched.add(spec)
+
+    def record_hit(self, spec: ForecastSpec) -> None:
+        """Counts a fresh cache hit that a prefetch made possible"""
+        with self._lock:
+            if spec not in self._prefetched:
+                return
+            self._prefetched.discard(spec)
+        metrics.increment("prefetch", "hit")
+
+    def take_unused(self) -> int:
+        """Forgets the prefetches never hit, returning how many there were"""
+        with self._lock:
+            unused = len(self._prefetched)
+            self._prefetched.clear()
+        return unused
+
+    def stats(self, top: Optional[int] = None) -> dict:
+        hottest = self.hottest(top or config.prefetch_top_k)
+        with self._lock:
+            tracked = len(self._sketch)
+            awaiting_hit = len(self._prefetched)
+        return {
+            "tracked": tracked,
+            "capacity": self._sketch.capacity,
+            "awaiting_hit": awaiting_hit,
+            "hottest": [
+                {
+                    "site_id": hitter.key[0],
+                    "reading_parameter": hitter.key[1],
+                    "count": round(hitter.count, 3),
+                    "error": round(hitter.error, 3),
+                }
+                for hitter in hottest
+            ],
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sketch.clear()
+            self._prefetched.clear()
+
+
+site_demand = SiteDemand(capacity=config.prefetch_sketch_capacity)
+metrics.register_gauge("site_demand", site_demand.stats)
@@ -0,0 +1,173 @@
+"""Local work queue for running forecasts as background jobs"""
+
+import contextvars
+import datetime as dt
+import logging
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Hashable, List, Optional
+
+from .config import config
+from .model.forecast_result import ForecastDataPoint
+from .model.jobs import ForecastJob, ForecastJobStatus
+
+log = logging.getLogger(__name__)
+
+_FINISHED = (ForecastJobStatus.succeeded, ForecastJobStatus.failed)
+
+
+class ForecastJobQueue:
+    """Runs forecast work on a fixed pool of worker threads
+
+    Jobs are keyed by their inputs: submitting a key that is already queued,
+    running or finished successfully returns the existing job instead of
+    starting a new one, unless its result is older than the result TTL.
+    Job ids are random, so a job can only be polled by whoever was given its
+    id. Finished jobs are dropped once they are older than the retention
+    window.
+    """
+
+    def __init__(self, workers: int, retention_seconds: int, result_ttl_seconds: int):
+        self.workers = workers
+        self.retention = dt.timedelta(seconds=retention_seconds)
+        self.result_ttl = dt.timedelta(seconds=result_ttl_seconds)
+        self._jobs: dict[str, ForecastJob] = {}
+        self._job_ids: dict[Hashable, str] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def submit(
+        self, key: Hashable, work: Callable[[], List[ForecastDataPoint]]
+    ) -> ForecastJob:
+        """Queues `work` under `key`, or returns the live job for that key"""
+        with self._lock:
+            self._purge_expired()
+
+            existing = self._live_job(key)
+            if existing is not None:
+                log.debug(f"Deduplicated submission for job {existing.job_id}")
+                return existing.model_copy()
+
+            job_id = secrets.token_hex(16)
+            job = ForecastJob(
+                job_id=job_id,
+                status=ForecastJobStatus.queued,
+                submitted_at=_now(),
+            )
+            self._jobs[job_id] = job
+            self._job_ids[key] = job_id
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="forecast-job"
+                )
+            # Run in the submitter's context so the fit is scheduled and
+            # traced as the client that asked for it
+            context = contextvars.copy_context()
+            self._executor.submit(context.run, self._run, job_id, work)
+
+            log.info(f"Queued forecast job {job_id}")
+            return job.model_copy()
+
+    def get(self, job_id: str) -> Optional[ForecastJob]:
+        """Returns a snapshot of the job, or None if unknown or expired"""
+        with self._lock:
+            self._purge_expired()
+            job = self._jobs.get(job_id)
+            return job.model_copy() if job is not None else None
+
+    def find(self, key: Hashable) -> Optional[ForecastJob]:
+        """Returns a snapshot of the job `submit` would reuse for `key`
+
+        Returns:
+            The queued, running or still fresh succeeded job for the key, or
+            None if submitting it would start a new job
+        """
+        with self._lock:
+            self._purge_expired()
+            job = self._live_job(key)
+            return job.model_copy() if job is not None else None
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stops the worker threads; queued jobs that have not started are dropped"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, job_id: str, work: Callable[[], List[ForecastDataPoint]]) -> None:
+        self._update(job_id, status=ForecastJobStatus.running)
+
+        try:
+            result = work()
+        except Exception as e:
+            # HTTPException carries the status and detail the synchronous
+            # endpoint would have used; anything else is an internal error
+            status_code = getattr(e, "status_code", 500)
+            detail = getattr(e, "detail", None) or str(e)
+            log.warning(f"Forecast job {job_id} failed: {detail}")
+            self._update(
+                job_id,
+                status=ForecastJobStatus.failed,
+                finished_at=_now(),
+                error=str(detail),
+                error_status_code=status_code,
+            )
+            return
+
+        log.info(f"Forecast job {job_id} finished with {len(result)} data points")
+        self._update(
+            job_id,
+            status=ForecastJobStatus.succeeded,
+            finished_at=_now(),
+            result=result,
+        )
+
+    def _update(self, job_id: str, **changes) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._jobs[job_id] = job.model_copy(update=changes)
+
+    def _live_job(self, key: Hashable) -> Optional[ForecastJob]:
+        """The job to reuse for `key`, if any. Caller holds the lock."""
+        job_id = self._job_ids.get(key)
+        job = self._jobs.get(job_id) if job_id is not None else None
+        if job is None or job.status == ForecastJobStatus.failed:
+            return None
+        # The cache has moved on from an old result, so fit again
+        if (
+            job.status == ForecastJobStatus.succeeded
+            and job.finished_at < _now() - self.result_ttl
+        ):
+            return None
+        return job
+
+    def _purge_expired(self) -> None:
+        """Drops finished jobs past the retention window. Caller holds the lock."""
+        cutoff = _now() - self.retention
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.status in _FINISHED and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        if expired:
+            self._job_ids = {
+                key: job_id
+                for key, job_id in self._job_ids.items()
+                if job_id in self._jobs
+            }
+
+
+def _now() -> dt.datetime:
+    return dt.datetime.now(dt.timezone.utc)
+
+
+forecast_jobs = ForecastJobQueue(
+    workers=config.forecast_job_workers,
+    retention_seconds=config.forecast_job_retention_seconds,
+    result_ttl_seconds=config.forecast_cache_ttl_seconds,
+)
@@ -0,0 +1,15 @@
+"""Load-testing harness: a local USGS stand-in and a load generator
+
+Run `python -m flow_forecast.loadtest --help` for the command line.
+"""
+
+from .fake_usgs import FakeUsgsServer, FakeUsgsSettings
+from .generator import LoadReport, LoadTestSettings, run_load
+
+__all__ = [
+    "FakeUsgsServer",
+    "FakeUsgsSettings",
+    "LoadReport",
+    "LoadTestSettings",
+    "run_load",
+]
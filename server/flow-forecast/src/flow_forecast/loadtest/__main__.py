@@ -0,0 +1,235 @@
+"""Command line for the load-testing harness
+
+Examples:
+    # Fake USGS service only, for pointing a separately started API at
+    python -m flow_forecast.loadtest fake-usgs --port 8100 --latency-ms 200
+
+    # Start the fake service and an API server wired to it, then drive it
+    python -m flow_forecast.loadtest run --rps 10 --duration 60
+
+    # Drive an API that is already running
+    python -m flow_forecast.loadtest run --target http://127.0.0.1:8000
+
+    # Start an API that replays recorded USGS responses, with 200ms per fetch
+    python -m flow_forecast.loadtest run --replay usgs-recordings --latency-ms 200
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from contextlib import ExitStack
+from typing import Optional
+
+import httpx
+
+from .fake_usgs import FakeUsgsServer, FakeUsgsSettings
+from .generator import LoadTestSettings, run_load, synthetic_site_ids
+
+log = logging.getLogger(__name__)
+
+
+def _add_fake_usgs_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("fake USGS service")
+    group.add_argument("--history-years", type=int, default=30)
+    group.add_argument("--latency-ms", type=float, default=0.0)
+    group.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    group.add_argument("--error-rate", type=float, default=0.0)
+    group.add_argument("--error-status", type=int, default=503)
+    group.add_argument("--missing-rate", type=float, default=0.02)
+    group.add_argument("--seed", type=int, default=0)
+
+
+def _fake_usgs_settings(args: argparse.Namespace) -> FakeUsgsSettings:
+    return FakeUsgsSettings(
+        history_years=args.history_years,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        missing_rate=args.missing_rate,
+        seed=args.seed,
+    )
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_ready(url: str, process: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API server exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"API server was not ready after {timeout:.0f}s")
+
+
+def _start_api_server(
+    usgs_base_url: str, startup_timeout: float, **settings: str
+) -> tuple[subprocess.Popen, str]:
+    """Starts `python -m flow_forecast` on a free port against `usgs_base_url`
+
+    `settings` are passed to the server as further environment variables.
+    """
+    port = _free_port()
+    env = dict(
+        os.environ,
+        HOST="127.0.0.1",
+        PORT=str(port),
+        USGS_BASE_URL=usgs_base_url,
+        # Every request comes from this one client
+        RATE_LIMIT_ENABLED=os.environ.get("RATE_LIMIT_ENABLED", "false"),
+        LOG_LEVEL=os.environ.get("LOG_LEVEL", "WARNING"),
+        **settings,
+    )
+    process = subprocess.Popen([sys.executable, "-m", "flow_forecast"], env=env)
+    target = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_ready(f"{target}/", process, startup_timeout)
+    except Exception:
+        _stop_api_server(process)
+        raise
+    log.info(f"API server {process.pid} listening on {target}")
+    return process, target
+
+
+def _stop_api_server(process: subprocess.Popen) -> None:
+    if process.poll() is None:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def fake_usgs(args: argparse.Namespace) -> int:
+    server = FakeUsgsServer(_fake_usgs_settings(args), host=args.host, port=args.port)
+    print(f"USGS_BASE_URL={server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def run(args: argparse.Namespace) -> int:
+    settings = LoadTestSettings(
+        rps=args.rps,
+        duration_seconds=args.duration,
+        sites=args.sites or synthetic_site_ids(args.site_count),
+        reading_parameter=args.reading_parameter,
+        horizon_days=args.horizon_days,
+        timeout_seconds=args.timeout,
+        server_pid=args.server_pid,
+    )
+
+    with ExitStack() as stack:
+        if args.target:
+            settings.target = args.target
+        else:
+            usgs_base_url: Optional[str] = args.usgs_url
+            replay = {}
+            if args.replay is not None:
+                replay = dict(
+                    USGS_RECORD_MODE="replay",
+                    USGS_RECORD_DIR=str(args.replay),
+                    USGS_REPLAY_LATENCY_MS=str(args.latency_ms),
+                )
+                usgs_base_url = usgs_base_url or "http://usgs.invalid/nwis/dv/"
+            if usgs_base_url is None:
+                fake = stack.enter_context(FakeUsgsServer(_fake_usgs_settings(args)))
+                usgs_base_url = fake.base_url
+            process, settings.target = _start_api_server(
+                usgs_base_url, args.startup_timeout, **replay
+            )
+            stack.callback(_stop_api_server, process)
+            settings.server_pid = process.pid
+
+        report = asyncio.run(run_load(settings))
+
+    if args.json:
+        print(json.dumps(report.to_dict(), indent=2))
+    else:
+        print(report.format())
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m flow_forecast.loadtest",
+        description="Load-test the forecast API against a local USGS stand-in",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("fake-usgs", help="Serve the fake USGS dv API")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8100)
+    _add_fake_usgs_arguments(serve)
+    serve.set_defaults(handler=fake_usgs)
+
+    load = commands.add_parser("run", help="Drive POST /usgs/forecast")
+    load.add_argument(
+        "--target",
+        help="Base URL of a running API; by default one is started for the run",
+    )
+    load.add_argument(
+        "--usgs-url",
+        help="USGS base URL for the started API; by default a fake is started",
+    )
+    load.add_argument(
+        "--replay",
+        metavar="DIR",
+        help=(
+            "Serve the started API's USGS fetches from responses recorded with "
+            "USGS_RECORD_MODE=record, delayed by --latency-ms, instead of a fake"
+        ),
+    )
+    load.add_argument("--server-pid", type=int, help="Sample this process's RSS")
+    load.add_argument("--rps", type=float, default=5.0)
+    load.add_argument("--duration", type=float, default=30.0, help="Seconds")
+    load.add_argument(
+        "--site-count",
+        type=int,
+        default=20,
+        help="Distinct synthetic sites to cycle through",
+    )
+    load.add_argument("--sites", nargs="+", help="Explicit site ids")
+    load.add_argument("--reading-parameter", default="00060")
+    load.add_argument("--horizon-days", type=int)
+    load.add_argument("--timeout", type=float, default=120.0, help="Per request")
+    load.add_argument("--startup-timeout", type=float, default=120.0)
+    load.add_argument("--json", action="store_true", help="Print the report as JSON")
+    _add_fake_usgs_arguments(load)
+    load.set_defaults(handler=run)
+
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    logging.basicConfig(
+        level=os.environ.get("LOG_LEVEL", "INFO"),
+        format="%(asctime)s [%(name)s] %(levelname)s: %(message)s",
+    )
+    # One log line per request would drown the report
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""Local stand-in for the USGS daily values (`dv`) service
+
+Serves synthetic seasonal series in the same JSON shape as
+waterservices.usgs.gov so the API can be driven without network access.
+Latency, error rate and the amount of history per site are configurable.
+"""
+
+import datetime as dt
+import json
+import logging
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class FakeUsgsSettings:
+    """Behaviour of the fake service
+
+    Attributes:
+        history_years: Years of daily history available before the request's
+            end date; controls payload size.
+        latency_ms: Fixed delay added to every response.
+        latency_jitter_ms: Extra uniformly distributed delay.
+        error_rate: Fraction of requests answered with `error_status`.
+        error_status: HTTP status used for injected errors.
+        missing_rate: Fraction of days dropped from each series.
+        seed: Seed for error injection and latency jitter.
+    """
+
+    history_years: int = 30
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    missing_rate: float = 0.02
+    seed: int = 0
+
+
+def synthetic_series(
+    site_id: str,
+    reading_parameter: str,
+    start_date: dt.date,
+    end_date: dt.date,
+    missing_rate: float = 0.0,
+) -> list[dict]:
+    """Builds a deterministic seasonal daily series for a site and parameter
+
+    The same site, parameter and dates always give the same values, so
+    repeated requests exercise the same fits.
+    """
+    if end_date < start_date:
+        return []
+
+    seed = zlib.crc32(f"{site_id}:{reading_parameter}".encode("utf-8"))
+    rng = np.random.default_rng(seed)
+
+    epoch = dt.date(1900, 1, 1)
+    first = (start_date - epoch).days
+    length = (end_date - start_date).days + 1
+    days = np.arange(first, first + length)
+
+    base = 50 + rng.random() * 950
+    phase = rng.random() * 2 * np.pi
+    day_noise = np.random.default_rng([seed, first]).normal(0, 0.08, length)
+    values = base * (1 + 0.6 * np.sin(days * 2 * np.pi / 365.25 + phase) + day_noise)
+    values = np.round(np.clip(values, 0.01, None), 2)
+
+    keep = np.random.default_rng([seed, first, 1]).random(length) >= missing_rate
+    dates = np.datetime64(start_date, "D") + np.arange(length)
+
+    return [
+        {
+            "value": f"{value:g}",
+            "qualifiers": ["A"],
+            "dateTime": f"{date}T00:00:00.000",
+        }
+        for date, value, kept in zip(dates.astype(str), values, keep)
+        if kept
+    ]
+
+
+def dv_payload(site_id: str, series: dict[str, list[dict]]) -> dict:
+    """Wraps each parameter's series in the USGS WaterML JSON envelope"""
+    return {
+        "name": "ns1:timeSeriesResponseType",
+        "value": {
+            "timeSeries": [
+                {
+                    "sourceInfo": {"siteCode": [{"value": site_id}]},
+                    "variable": {
+                        "variableCode": [{"value": reading_parameter}],
+                    },
+                    "values": [{"value": values}],
+                    "name": f"USGS:{site_id}:{reading_parameter}:00003",
+                }
+                for reading_parameter, values in series.items()
+            ]
+        },
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_FakeUsgsHTTPServer"
+
+    def do_GET(self):
+        settings = self.server.settings
+        url = urlparse(self.path)
+
+        delay = settings.latency_ms + self.server.uniform(settings.latency_jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        if url.path.rstrip("/") != "/nwis/dv":
+            self._send(404, {"error": f"unknown path {url.path}"})
+            return
+
+        if self.server.should_fail():
+            self._send(settings.error_status, {"error": "injected failure"})
+            return
+
+        query = parse_qs(url.query)
+        try:
+            site_id = query["site"][0]
+            reading_parameters = query["parameterCd"][0].split(",")
+            end_date = dt.date.fromisoformat(query["endDT"][0])
+            start_date = dt.date.fromisoformat(query["startDT"][0])
+        except (KeyError, IndexError, ValueError) as e:
+            self._send(400, {"error": f"bad query: {e}"})
+            return
+
+        earliest = end_date - dt.timedelta(days=round(settings.history_years * 365.25))
+        series = {
+            reading_parameter: synthetic_series(
+                site_id,
+                reading_parameter,
+                max(start_date, earliest),
+                end_date,
+                settings.missing_rate,
+            )
+            for reading_parameter in reading_parameters
+        }
+        self._send(200, dv_payload(site_id, series))
+
+    def _send(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        log.debug(f"{self.address_string()} {format % args}")
+
+
+class _FakeUsgsHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, settings: FakeUsgsSettings):
+        super().__init__(address, _Handler)
+        self.settings = settings
+        self._random = random.Random(settings.seed)
+        self._random_lock = threading.Lock()
+
+    def should_fail(self) -> bool:
+        with self._random_lock:
+            return self._random.random() < self.settings.error_rate
+
+    def uniform(self, upper: float) -> float:
+        with self._random_lock:
+            return self._random.uniform(0, upper) if upper > 0 else 0.0
+
+
+class FakeUsgsServer:
+    """Runs the fake USGS service on a background thread
+
+    Usable as a context manager; `base_url` is suitable for the
+    `USGS_BASE_URL` setting.
+    """
+
+    def __init__(
+        self,
+        settings: Optional[FakeUsgsSettings] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.settings = settings or FakeUsgsSettings()
+        self._httpd = _FakeUsgsHTTPServer((host, port), self.settings)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/nwis/dv/"
+
+    def start(self) -> "FakeUsgsServer":
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="fake-usgs", daemon=True
+        )
+        self._thread.start()
+        log.info(f"Fake USGS service listening on {self.base_url}")
+        return self
+
+    def serve_forever(self) -> None:
+        log.info(f"Fake USGS service listening on {self.base_url}")
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "FakeUsgsServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,252 @@
+"""Open-loop load generator for the forecast API
+
+Requests are started on a fixed schedule at the target rate whether or not
+earlier ones have finished, so a slow server shows up as rising latency
+instead of a silently reduced request rate.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+import httpx
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+def synthetic_site_ids(count: int) -> list[str]:
+    """Valid-looking site ids; the fake USGS service accepts any digits"""
+    return [f"{1646500 + i:08d}" for i in range(count)]
+
+
+@dataclass
+class LoadTestSettings:
+    """What to send and how fast
+
+    Attributes:
+        target: Base URL of the forecast API.
+        rps: Requests started per second.
+        duration_seconds: How long to keep starting requests.
+        sites: Site ids to cycle through; fewer sites means more cache hits.
+        reading_parameter: USGS parameter code sent with every request.
+        horizon_days: Optional horizon sent with every request.
+        timeout_seconds: Per-request client timeout.
+        server_pid: Process id of the API server, to sample its RSS.
+    """
+
+    target: str = "http://127.0.0.1:8000"
+    rps: float = 5.0
+    duration_seconds: float = 30.0
+    sites: list[str] = field(default_factory=lambda: synthetic_site_ids(20))
+    reading_parameter: str = "00060"
+    horizon_days: Optional[int] = None
+    timeout_seconds: float = 120.0
+    server_pid: Optional[int] = None
+
+
+@dataclass
+class LoadReport:
+    requests: int
+    errors: int
+    duration_seconds: float
+    throughput_rps: float
+    error_rate: float
+    latency_p50_ms: Optional[float]
+    latency_p95_ms: Optional[float]
+    latency_p99_ms: Optional[float]
+    latency_max_ms: Optional[float]
+    status_counts: dict[str, int]
+    cache_counts: dict[str, int]
+    server_rss_start_bytes: Optional[int] = None
+    server_rss_peak_bytes: Optional[int] = None
+    server_rss_end_bytes: Optional[int] = None
+    fit_worker_rss_bytes: dict[str, int] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def format(self) -> str:
+        """Human readable summary"""
+
+        def ms(value: Optional[float]) -> str:
+            return "-" if value is None else f"{value:.0f} ms"
+
+        def mib(value: Optional[int]) -> str:
+            return "-" if value is None else f"{value / 2**20:.1f} MiB"
+
+        lines = [
+            f"requests    {self.requests} in {self.duration_seconds:.1f}s "
+            f"({self.throughput_rps:.2f} req/s)",
+            f"errors      {self.errors} ({self.error_rate:.1%})",
+            f"latency     p50 {ms(self.latency_p50_ms)}  p95 {ms(self.latency_p95_ms)}"
+            f"  p99 {ms(self.latency_p99_ms)}  max {ms(self.latency_max_ms)}",
+            f"status      {dict(sorted(self.status_counts.items()))}",
+            f"cache       {dict(sorted(self.cache_counts.items()))}",
+            f"server rss  start {mib(self.server_rss_start_bytes)}"
+            f"  peak {mib(self.server_rss_peak_bytes)}"
+            f"  end {mib(self.server_rss_end_bytes)}",
+        ]
+        if self.fit_worker_rss_bytes:
+            workers = ", ".join(mib(rss) for rss in self.fit_worker_rss_bytes.values())
+            lines.append(f"fit workers {workers}")
+        return "\n".join(lines)
+
+
+@dataclass
+class _Sample:
+    latency: float
+    status: str
+    cache: Optional[str]
+
+
+def process_rss_bytes(pid: int) -> Optional[int]:
+    """Resident set size of another process, or None if it cannot be read"""
+    try:
+        with open(f"/proc/{pid}/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def summarize(samples: list[_Sample], elapsed: float) -> LoadReport:
+    """Reduces raw samples to a report; transport failures count as errors"""
+    statuses = Counter(sample.status for sample in samples)
+    caches = Counter(sample.cache for sample in samples if sample.cache)
+    errors = sum(
+        count
+        for status, count in statuses.items()
+        if not status.isdigit() or int(status) >= 400
+    )
+
+    latencies = np.array([sample.latency for sample in samples]) * 1000
+    if len(latencies):
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]).tolist()
+        slowest = float(latencies.max())
+    else:
+        p50 = p95 = p99 = slowest = None
+
+    return LoadReport(
+        requests=len(samples),
+        errors=errors,
+        duration_seconds=elapsed,
+        throughput_rps=len(samples) / elapsed if elapsed > 0 else 0.0,
+        error_rate=errors / len(samples) if samples else 0.0,
+        latency_p50_ms=p50,
+        latency_p95_ms=p95,
+        latency_p99_ms=p99,
+        latency_max_ms=slowest,
+        status_counts=dict(statuses),
+        cache_counts=dict(caches),
+    )
+
+
+async def _send(
+    client: httpx.AsyncClient, settings: LoadTestSettings, site_id: str
+) -> _Sample:
+    body = {"site_id": site_id, "reading_parameter": settings.reading_parameter}
+    if settings.horizon_days is not None:
+        body["horizon_days"] = settings.horizon_days
+
+    started = time.perf_counter()
+    try:
+        response = await client.post("/usgs/forecast", json=body)
+    except httpx.HTTPError as e:
+        log.debug(f"Request for {site_id} failed: {e!r}")
+        return _Sample(time.perf_counter() - started, type(e).__name__, None)
+
+    return _Sample(
+        time.perf_counter() - started,
+        str(response.status_code),
+        response.headers.get("X-Forecast-Cache"),
+    )
+
+
+async def _sample_rss(pid: int, readings: list[int], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        rss = process_rss_bytes(pid)
+        if rss is not None:
+            readings.append(rss)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=0.5)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _fit_worker_rss(client: httpx.AsyncClient) -> dict[str, int]:
+    try:
+        response = await client.get("/metrics")
+        response.raise_for_status()
+        pool = response.json()["gauges"].get("fit_pool", {})
+        return {str(pid): rss for pid, rss in pool.get("worker_rss_bytes", {}).items()}
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        log.debug(f"Could not read fit pool metrics: {e!r}")
+        return {}
+
+
+async def run_load(
+    settings: LoadTestSettings,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> LoadReport:
+    """Drives POST /usgs/forecast at `settings.rps` and reports the results
+
+    Args:
+        settings: Rate, duration and request parameters
+        transport: Optional httpx transport, e.g. an ASGI transport in tests
+
+    Returns:
+        Latency percentiles, throughput, error rate and server memory
+    """
+    if settings.rps <= 0:
+        raise ValueError("rps must be positive")
+    if not settings.sites:
+        raise ValueError("at least one site is required")
+
+    total = max(1, round(settings.rps * settings.duration_seconds))
+    interval = 1 / settings.rps
+
+    rss_readings: list[int] = []
+    stop_sampling = asyncio.Event()
+    sampler = None
+    if settings.server_pid is not None:
+        sampler = asyncio.create_task(
+            _sample_rss(settings.server_pid, rss_readings, stop_sampling)
+        )
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    async with httpx.AsyncClient(
+        base_url=settings.target,
+        timeout=settings.timeout_seconds,
+        limits=limits,
+        transport=transport,
+    ) as client:
+        log.info(f"Sending {total} requests at {settings.rps:g} req/s")
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        tasks = []
+        for i in range(total):
+            delay = started + i * interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            site_id = settings.sites[i % len(settings.sites)]
+            tasks.append(asyncio.create_task(_send(client, settings, site_id)))
+
+        samples = await asyncio.gather(*tasks)
+        elapsed = loop.time() - started
+        worker_rss = await _fit_worker_rss(client)
+
+    if sampler is not None:
+        stop_sampling.set()
+        await sampler
+
+    report = summarize(list(samples), elapsed)
+    report.fit_worker_rss_bytes = worker_rss
+    if rss_readings:
+        report.server_rss_start_bytes = rss_readings[0]
+        report.server_rss_peak_bytes = max(rss_readings)
+        report.server_rss_end_bytes = rss_readings[-1]
+    return report
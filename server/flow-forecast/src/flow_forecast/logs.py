@@ -0,0 +1,90 @@
+"""Process logging set up to keep formatting and I/O off the event loop
+
+Records are put on an in-memory queue by the logging call and formatted
+and written by a QueueListener thread. `log_format="json"` writes one JSON
+object per line, including structured fields passed via `extra`.
+"""
+
+import atexit
+import datetime as dt
+import json
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+TEXT_FORMAT = "%(asctime)s [%(name)s] %(levelname)s: %(message)s"
+
+# Attributes every LogRecord has; anything else came from `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Queues records as they are
+
+    QueueHandler.prepare formats the message in the logging thread so the
+    record can be pickled. This queue never leaves the process, so
+    formatting is left to the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects with their extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": dt.datetime.fromtimestamp(
+                record.created, dt.timezone.utc
+            ).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(
+            (key, value)
+            for key, value in vars(record).items()
+            if key not in _RECORD_ATTRIBUTES
+        )
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: str, log_format: str = "text") -> None:
+    """Routes root logging through a queue drained by a listener thread
+
+    Like logging.basicConfig, this leaves handlers that are already
+    installed on the root logger alone.
+    """
+    global _listener
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _listener is not None or root.handlers:
+        return
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(
+        JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
+    )
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    root.addHandler(_DeferredQueueHandler(records))
+
+    _listener = QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Writes out queued records and stops the listener thread"""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,43 @@
+"""Process-wide operational counters exposed at /metrics"""
+
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Callable
+
+
+class MetricsRegistry:
+    """Thread-safe labelled counters plus gauges computed on read"""
+
+    def __init__(self):
+        self._counters: defaultdict[str, Counter] = defaultdict(Counter)
+        self._gauges: dict[str, Callable[[], Any]] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, label: str = "total", amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name][label] += amount
+
+    def counter(self, name: str) -> dict[str, int]:
+        with self._lock:
+            return dict(self._counters.get(name, {}))
+
+    def register_gauge(self, name: str, read: Callable[[], Any]) -> None:
+        """Registers a callable whose value is reported under `name`"""
+        with self._lock:
+            self._gauges[name] = read
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            counters = {name: dict(values) for name, values in self._counters.items()}
+            gauges = dict(self._gauges)
+        return {
+            "counters": counters,
+            "gauges": {name: read() for name, read in gauges.items()},
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,88 @@
+"""ASGI middleware for request timing"""
+
+import logging
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import server_timing
+
+log = logging.getLogger(__name__)
+
+
+class RequestTimingMiddleware:
+    """Logs each HTTP request and reports its stage timings
+
+    A plain ASGI middleware rather than BaseHTTPMiddleware, so responses
+    stream straight through without an extra task and body copy. The
+    response gets a Server-Timing header listing the stages recorded while
+    handling it (see `server_timing`) plus `app`, the time until the
+    response started.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        logged = False
+
+        def log_request(timings: list[tuple[str, float]]) -> None:
+            nonlocal logged
+            logged = True
+            duration = time.perf_counter() - started
+            stages_ms: dict[str, float] = {}
+            for stage, seconds in timings:
+                stages_ms[stage] = stages_ms.get(stage, 0.0) + seconds * 1000
+            # %-style arguments: the message is only built on the logging
+            # thread, and only if the record is emitted
+            log.info(
+                "%s %s %s %.3fs",
+                scope["method"],
+                scope["path"],
+                status_code,
+                duration,
+                extra={
+                    "http_method": scope["method"],
+                    "http_path": scope["path"],
+                    "http_status": status_code,
+                    "duration_ms": round(duration * 1000, 1),
+                    "stages_ms": {
+                        stage: round(ms, 1) for stage, ms in stages_ms.items()
+                    },
+                },
+            )
+
+        with server_timing.collect() as timings:
+
+            async def send_with_timing(message: Message) -> None:
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    stages = [*timings, ("app", time.perf_counter() - started)]
+                    headers = MutableHeaders(scope=message)
+                    headers.append(
+                        server_timing.SERVER_TIMING_HEADER,
+                        server_timing.header_value(stages),
+                    )
+                await send(message)
+                # The request ends with its last body message; background
+                # tasks run after it and are not part of its latency
+                if (
+                    message["type"] == "http.response.body"
+                    and not message.get("more_body", False)
+                    and not logged
+                ):
+                    log_request(timings)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                if not logged:
+                    log_request(timings)
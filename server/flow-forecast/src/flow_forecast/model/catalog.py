@@ -0,0 +1,63 @@
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from .forecast_result import ForecastDataPoint
+
+
+class GaugeSource(str, Enum):
+    usgs = "USGS"
+    environment_canada = "ENVIRONMENT_CANADA"
+    lawa = "LAWA"
+    dwr = "DWR"
+
+
+class Gauge(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    site_id: str = Field(description="The gauge's identifier at its source.")
+    name: str = Field(description="The gauge's display name.")
+    state: str = Field(description="State, province or region.")
+    country: str = Field(description="ISO country code.")
+    source: GaugeSource = Field(description="The agency publishing the readings.")
+    latitude: float
+    longitude: float
+    metric: str = Field(description="Unit of the primary reading, e.g. CFS or CMS.")
+    zone: Optional[str] = Field(default=None, description="Catchment zone, if any.")
+
+
+class NearbyForecastStatus(str, Enum):
+    hit = "hit"
+    stale = "stale"
+    queued = "queued"
+    unavailable = "unavailable"
+    unsupported = "unsupported"
+
+
+class NearbyGauge(BaseModel):
+    gauge: Gauge
+    distance_km: float = Field(
+        description="Great-circle distance from the query point or box centre."
+    )
+    forecast_status: NearbyForecastStatus = Field(
+        description=(
+            "hit or stale when a cached forecast is included; queued when a "
+            "forecast job is pending or retained (poll job_id); unavailable "
+            "when none was started for this request; unsupported for sources "
+            "the server cannot forecast."
+        )
+    )
+    forecast: Optional[List[ForecastDataPoint]] = Field(
+        default=None, description="The cached forecast, if any."
+    )
+    job_id: Optional[str] = Field(
+        default=None, description="The forecast job to poll when status is queued."
+    )
+
+
+class GaugeSearchPage(BaseModel):
+    total: int = Field(description="Number of gauges matching the search.")
+    offset: int
+    limit: int
+    gauges: List[Gauge]
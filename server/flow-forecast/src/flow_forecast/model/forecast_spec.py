@@ -0,0 +1,21 @@
+import datetime as dt
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict
+
+
+class ForecastSpec(BaseModel):
+    """Everything that determines a forecast's output
+
+    Requests that resolve to equal specs share cache entries and jobs.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    source: str = "usgs"
+    site_id: str
+    reading_parameter: str
+    start_date: dt.date
+    end_date: dt.date
+    horizon_days: Optional[int] = None
+    only_future: bool = False
@@ -0,0 +1,33 @@
+import datetime as dt
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from .forecast_result import ForecastDataPoint
+
+
+class ForecastJobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+class ForecastJob(BaseModel):
+    job_id: str = Field(description="The identifier used to poll for the job.")
+    status: ForecastJobStatus = Field(description="The current state of the job.")
+    submitted_at: dt.datetime = Field(description="When the job was first submitted.")
+    finished_at: Optional[dt.datetime] = Field(
+        default=None, description="When the job succeeded or failed."
+    )
+    result: Optional[List[ForecastDataPoint]] = Field(
+        default=None, description="The forecast, once the job has succeeded."
+    )
+    error: Optional[str] = Field(
+        default=None, description="The failure reason, if the job has failed."
+    )
+    error_status_code: Optional[int] = Field(
+        default=None,
+        description="The HTTP status the synchronous endpoint would have returned.",
+    )
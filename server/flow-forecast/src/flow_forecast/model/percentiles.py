@@ -0,0 +1,41 @@
+import datetime as dt
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class FlowClass(str, Enum):
+    """USGS WaterWatch flow classes by percentile for the day of year"""
+
+    much_below_normal = "much_below_normal"
+    below_normal = "below_normal"
+    normal = "normal"
+    above_normal = "above_normal"
+    much_above_normal = "much_above_normal"
+
+
+class FlowPercentile(BaseModel):
+    site_id: str
+    reading_parameter: str
+    date: Optional[dt.date] = Field(
+        default=None, description="Day of the latest reading."
+    )
+    value: Optional[float] = Field(default=None, description="The latest reading.")
+    percentile: Optional[float] = Field(
+        default=None,
+        description=(
+            "Percentile of the latest reading among readings on the same day of "
+            "year in earlier years; ties count half."
+        ),
+    )
+    years: int = Field(
+        default=0, description="Number of earlier readings ranked against."
+    )
+    median: Optional[float] = Field(
+        default=None, description="Median of the earlier readings for the day."
+    )
+    flow_class: Optional[FlowClass] = None
+    error: Optional[str] = Field(
+        default=None, description="Why the site could not be ranked, if it failed."
+    )
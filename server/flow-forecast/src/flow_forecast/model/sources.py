@@ -0,0 +1,43 @@
+from datetime import date
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+# Station ids across the non-USGS sources: "08MH103", "30180", "0101794A"
+SITE_ID_PATTERN = r"^[A-Za-z0-9_-]{1,32}$"
+
+
+class SourceForecastRequest(BaseModel):
+    site_id: str = Field(
+        description="The station's identifier at its source",
+        json_schema_extra={"example": "08MH103"},
+        pattern=SITE_ID_PATTERN,
+    )
+    end_date: Optional[date] = Field(
+        default=None,
+        description="The end date of the forecast",
+        json_schema_extra={"example": "2024-12-31"},
+    )
+    horizon_days: Optional[int] = Field(
+        default=None,
+        ge=1,
+        le=366,
+        description=(
+            "Number of days to forecast past the latest reading. "
+            "Defaults to the rest of the current year."
+        ),
+    )
+    only_future: bool = Field(
+        default=False,
+        description="Omit this year's past readings and return only forecast days",
+    )
+
+
+class SourceForecastJobsRequest(BaseModel):
+    site_ids: List[str] = Field(
+        min_length=1,
+        description="Stations to forecast; their history is fetched in batches",
+        json_schema_extra={"example": ["08MH103", "08GA010"]},
+    )
+    horizon_days: Optional[int] = Field(default=None, ge=1, le=366)
+    only_future: bool = False
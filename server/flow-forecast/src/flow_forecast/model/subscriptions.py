@@ -0,0 +1,17 @@
+import datetime as dt
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from .forecast_result import ForecastDataPoint
+
+
+class ForecastUpdate(BaseModel):
+    site_id: str
+    reading_parameter: str
+    horizon_days: Optional[int] = None
+    only_future: bool = False
+    updated_at: dt.datetime = Field(
+        description="When the server generated this forecast (UTC)."
+    )
+    forecast: List[ForecastDataPoint]
@@ -1,9 +1,45 @@
 from datetime import date
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, Field, field_validator
 
 
+def check_site_id(v: str) -> str:
+    """Validate that site_id is not empty and contains only valid characters"""
+    if not v or not v.strip():
+        raise ValueError("site_id cannot be empty")
+
+    # USGS site IDs are typically 8-15 digits
+    if not v.isdigit():
+        raise ValueError("site_id must contain only digits")
+
+    if len(v) < 8 or len(v) > 15:
+        raise ValueError("site_id must be 8-15 digits long")
+
+    return v
+
+
+def check_reading_parameter(v: str) -> str:
+    """Validate that reading_parameter is not empty"""
+    if not v or not v.strip():
+        raise ValueError("reading_parameter cannot be empty")
+
+    # USGS parameter codes are typically 5 digits
+    if not v.isdigit():
+        raise ValueError("reading_parameter must contain only digits")
+
+    if len(v) != 5:
+        raise ValueError(
+            "reading_parameter must be 5 digits (e.g., 00060 for discharge)"
+        )
+
+    return v
+
+
+# Most parameters one multi-parameter forecast request may ask for
+MAX_FORECAST_PARAMETERS = 5
+
+
 class USGSFlowForecastRequest(BaseModel):
     site_id: str = Field(
         description="The USGS site ID",
@@ -17,7 +53,10 @@ class USGSFlowForecastRequest(BaseModel):
     )
     start_date: Optional[date] = Field(
         default=None,
-        description="The start date of the forecast",
+        description=(
+            "The start date of the forecast. The history window used for "
+            "training is set by the server, so this no longer affects the result."
+        ),
         json_schema_extra={"example": "2023-01-01"},
     )
     end_date: Optional[date] = Field(
@@ -26,39 +65,32 @@ class USGSFlowForecastRequest(BaseModel):
         json_schema_extra={"example": "2024-12-31"},
     )
 
+    horizon_days: Optional[int] = Field(
+        default=None,
+        ge=1,
+        le=366,
+        description=(
+            "Number of days to forecast past the latest reading. "
+            "Defaults to the rest of the current year."
+        ),
+        json_schema_extra={"example": 14},
+    )
+    only_future: bool = Field(
+        default=False,
+        description="Omit this year's past readings and return only forecast days",
+    )
+
     @field_validator("site_id")
     @classmethod
     def validate_site_id(cls, v: str) -> str:
         """Validate that site_id is not empty and contains only valid characters"""
-        if not v or not v.strip():
-            raise ValueError("site_id cannot be empty")
-
-        # USGS site IDs are typically 8-15 digits
-        if not v.isdigit():
-            raise ValueError("site_id must contain only digits")
-
-        if len(v) < 8 or len(v) > 15:
-            raise ValueError("site_id must be 8-15 digits long")
-
-        return v
+        return check_site_id(v)
 
     @field_validator("reading_parameter")
     @classmethod
     def validate_reading_parameter(cls, v: str) -> str:
         """Validate that reading_parameter is not empty"""
-        if not v or not v.strip():
-            raise ValueError("reading_parameter cannot be empty")
-
-        # USGS parameter codes are typically 5 digits
-        if not v.isdigit():
-            raise ValueError("reading_parameter must contain only digits")
-
-        if len(v) != 5:
-            raise ValueError(
-                "reading_parameter must be 5 digits (e.g., 00060 for discharge)"
-            )
-
-        return v
+        return check_reading_parameter(v)
 
     @field_validator("end_date")
     @classmethod
@@ -70,3 +102,60 @@ class USGSFlowForecastRequest(BaseModel):
                 raise ValueError("end_date must be after start_date")
 
         return v
+
+
+class USGSMultiParameterForecastRequest(BaseModel):
+    site_id: str = Field(
+        description="The USGS site ID",
+        json_schema_extra={"example": "01646500"},
+        min_length=1,
+    )
+    reading_parameters: List[str] = Field(
+        description=(
+            "USGS reading parameter codes to forecast, fetched together in "
+            "one USGS request"
+        ),
+        json_schema_extra={"example": ["00060", "00065"]},
+        min_length=1,
+        max_length=MAX_FORECAST_PARAMETERS,
+    )
+    end_date: Optional[date] = Field(
+        default=None,
+        description="The end date of the forecast",
+        json_schema_extra={"example": "2024-12-31"},
+    )
+    horizon_days: Optional[int] = Field(
+        default=None,
+        ge=1,
+        le=366,
+        description=(
+            "Number of days to forecast past the latest reading. "
+            "Defaults to the rest of the current year."
+        ),
+        json_schema_extra={"example": 14},
+    )
+    only_future: bool = Field(
+        default=False,
+        description="Omit this year's past readings and return only forecast days",
+    )
+
+    @field_validator("site_id")
+    @classmethod
+    def validate_site_id(cls, v: str) -> str:
+        return check_site_id(v)
+
+    @field_validator("reading_parameters")
+    @classmethod
+    def validate_reading_parameters(cls, v: List[str]) -> List[str]:
+        """Validate each code, dropping repeats"""
+        return list(dict.fromkeys(check_reading_parameter(p) for p in v))
+
+    def parameter_request(self, reading_parameter: str) -> USGSFlowForecastRequest:
+        """The single-parameter request for one of the codes"""
+        return USGSFlowForecastRequest(
+            site_id=self.site_id,
+            reading_parameter=reading_parameter,
+            end_date=self.end_date,
+            horizon_days=self.horizon_days,
+            only_future=self.only_future,
+        )
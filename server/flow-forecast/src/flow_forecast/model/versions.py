@@ -0,0 +1,45 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from .forecast_result import ForecastDataPoint
+from .usgs import USGSFlowForecastRequest
+
+
+class USGSForecastDeltaRequest(USGSFlowForecastRequest):
+    base_version: Optional[str] = Field(
+        default=None,
+        description=(
+            "The X-Forecast-Version of the forecast the client holds. "
+            "Omit it to get the full forecast."
+        ),
+        json_schema_extra={"example": "9c1185a5c5e9fc54"},
+    )
+
+
+class ForecastRowChange(ForecastDataPoint):
+    position: int = Field(
+        description="The row's position in the new version, for placing new rows."
+    )
+
+
+class ForecastDelta(BaseModel):
+    version: str = Field(description="Version of the forecast after the changes.")
+    base_version: Optional[str] = Field(
+        description="The version the changes apply to; null when `full` is set."
+    )
+    full: bool = Field(
+        description=(
+            "True when the base version is unknown, too old or not worth "
+            "diffing: `changes` then holds every row."
+        )
+    )
+    removed: List[str] = Field(
+        description="Indices of held rows that are not in the new version."
+    )
+    changes: List[ForecastRowChange] = Field(
+        description=(
+            "Rows that are new or differ from the base version, matched by "
+            "index, in forecast order."
+        )
+    )
@@ -0,0 +1,221 @@
+"""Per-site daily flow percentiles, updated incrementally
+
+Each site keeps every earlier reading in one flat array sorted by
+(day-of-year slot, value), with an offset table per slot. Ranking the latest
+reading is a binary search within its slot, and a new day's reading moves
+the previous latest reading into the history with a single sorted insert,
+so the multi-decade history is only ever fetched and sorted once.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable, Optional
+
+import numpy as np
+
+from .config import config
+from .model.percentiles import FlowClass
+
+# Slots follow a leap year so Feb 29 gets its own and later days line up
+# across years
+DAY_SLOTS = 366
+_LEAP_MONTH_OFFSETS = np.cumsum([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+
+
+def day_slots(days: np.ndarray) -> np.ndarray:
+    """Day-of-year slot (0-365, leap-year numbering) of each datetime64[D]"""
+    days = np.asarray(days, dtype="datetime64[D]")
+    month_start = days.astype("datetime64[M]")
+    months = (month_start - days.astype("datetime64[Y]")).astype(np.int64)
+    return _LEAP_MONTH_OFFSETS[months] + (days - month_start).astype(np.int64)
+
+
+def flow_class(percentile: float) -> FlowClass:
+    """WaterWatch class: <10, 10-24, 25-75, 76-90 and >90th percentile"""
+    if percentile < 10:
+        return FlowClass.much_below_normal
+    if percentile < 25:
+        return FlowClass.below_normal
+    if percentile <= 75:
+        return FlowClass.normal
+    if percentile <= 90:
+        return FlowClass.above_normal
+    return FlowClass.much_above_normal
+
+
+@dataclass(frozen=True)
+class Ranking:
+    day: np.datetime64
+    value: float
+    percentile: Optional[float]
+    years: int
+    median: Optional[float]
+
+
+class SitePercentiles:
+    """Day-of-year history for one site and parameter plus its latest reading"""
+
+    def __init__(self, days: np.ndarray, values: np.ndarray):
+        days = np.asarray(days, dtype="datetime64[D]")
+        values = np.asarray(values, dtype=np.float64)
+        # Zero and negative readings are USGS sentinels, as in cleaning
+        valid = np.isfinite(values) & (values > 0)
+        days, values = days[valid], values[valid]
+
+        # (latest day, latest value, history values, slot offsets), replaced
+        # as a whole so readers never see a half-applied update
+        self._state = (
+            None,
+            None,
+            np.empty(0, dtype=np.float64),
+            np.zeros(DAY_SLOTS + 1, dtype=np.int64),
+        )
+        if len(days) == 0:
+            return
+
+        last = int(np.argmax(days))
+        latest_day, latest_value = days[last], float(values[last])
+
+        # Every reading before the latest day; a repeated day keeps its last
+        history = days < latest_day
+        days, values = days[history], values[history]
+        _, keep = np.unique(days[::-1], return_index=True)
+        keep = len(days) - 1 - keep
+        days, values = days[keep], values[keep]
+
+        slots = day_slots(days)
+        order = np.lexsort((values, slots))
+        self._state = (
+            latest_day,
+            latest_value,
+            values[order],
+            np.searchsorted(slots[order], np.arange(DAY_SLOTS + 1)),
+        )
+
+    def __len__(self) -> int:
+        return len(self._state[2])
+
+    @property
+    def latest_day(self) -> Optional[np.datetime64]:
+        return self._state[0]
+
+    @property
+    def latest_value(self) -> Optional[float]:
+        return self._state[1]
+
+    def observe(self, day: np.datetime64, value: float) -> bool:
+        """Folds in one reading; returns False if it was ignored
+
+        Readings for the latest day replace it (provisional values get
+        revised); readings for earlier days are already in the history and
+        are ignored. A later day moves the current latest reading into the
+        history.
+        """
+        day = np.datetime64(day, "D")
+        latest_day, latest_value, values, starts = self._state
+        if not (np.isfinite(value) and value > 0):
+            return False
+        if latest_day is not None and day < latest_day:
+            return False
+
+        if latest_day is not None and day > latest_day:
+            slot = int(day_slots(latest_day))
+            start, end = starts[slot], starts[slot + 1]
+            position = start + np.searchsorted(values[start:end], latest_value)
+            values = np.insert(values, position, latest_value)
+            starts = starts.copy()
+            starts[slot + 1 :] += 1
+
+        self._state = (day, float(value), values, starts)
+        return True
+
+    def rank(self) -> Optional[Ranking]:
+        """Ranks the latest reading among earlier readings for its day of year"""
+        latest_day, latest_value, values, starts = self._state
+        if latest_day is None:
+            return None
+
+        slot = int(day_slots(latest_day))
+        earlier = values[starts[slot] : starts[slot + 1]]
+        if len(earlier) == 0:
+            return Ranking(latest_day, latest_value, None, 0, None)
+
+        below = np.searchsorted(earlier, latest_value, side="left")
+        through = np.searchsorted(earlier, latest_value, side="right")
+        percentile = 100 * (below + through) / (2 * len(earlier))
+        return Ranking(
+            latest_day,
+            latest_value,
+            round(float(percentile), 2),
+            len(earlier),
+            # earlier is sorted, so the median is its middle
+            float(earlier[(len(earlier) - 1) // 2] + earlier[len(earlier) // 2]) / 2,
+        )
+
+
+@dataclass
+class _Entry:
+    site: SitePercentiles
+    checked_at: float
+
+
+class PercentileStore:
+    """Bounded LRU of site percentile histories
+
+    `lock_for` serialises loading and refreshing one site so concurrent
+    requests for it fetch its history once.
+    """
+
+    def __init__(self, max_sites: int, refresh_seconds: float):
+        self.max_sites = max_sites
+        self.refresh_seconds = refresh_seconds
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._site_locks: dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[SitePercentiles]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry.site
+
+    def needs_refresh(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return (
+                entry is None
+                or time.monotonic() - entry.checked_at >= self.refresh_seconds
+            )
+
+    def put(self, key: Hashable, site: SitePercentiles) -> None:
+        with self._lock:
+            self._entries[key] = _Entry(site, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_sites:
+                evicted, _ = self._entries.popitem(last=False)
+                self._site_locks.pop(evicted, None)
+
+    def mark_checked(self, key: Hashable) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.checked_at = time.monotonic()
+
+    def lock_for(self, key: Hashable) -> threading.Lock:
+        with self._lock:
+            return self._site_locks.setdefault(key, threading.Lock())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._site_locks.clear()
+
+
+percentile_store = PercentileStore(
+    max_sites=config.percentile_max_sites,
+    refresh_seconds=config.percentile_refresh_seconds,
+)
@@ -0,0 +1,302 @@
+"""Per-client request rate limits and fair scheduling of model fits
+
+Clients are identified by API key, or by address when they send none. Each
+client has a token bucket for forecast requests, and fits wait for a slot
+in a scheduler that serves waiting clients round-robin, so one client
+looping over the catalog cannot take every fit slot.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from fastapi import HTTPException, Request, Response, status
+
+from .affinity import site_affinity
+from .config import config
+from .metrics import metrics
+
+log = logging.getLogger(__name__)
+
+API_KEY_HEADER = "X-API-Key"
+RATE_LIMIT_LIMIT_HEADER = "X-RateLimit-Limit"
+RATE_LIMIT_REMAINING_HEADER = "X-RateLimit-Remaining"
+# Seconds until the bucket is full again
+RATE_LIMIT_RESET_HEADER = "X-RateLimit-Reset"
+FIT_QUOTA_LIMIT_HEADER = "X-Fit-Quota-Limit"
+# Fits the client has running or waiting for a slot
+FIT_QUOTA_USED_HEADER = "X-Fit-Quota-Used"
+
+# The client a request is served for; fits started from it, including jobs
+# and background refreshes, are scheduled under this id
+current_client: ContextVar[str] = ContextVar("current_client", default="anonymous")
+# Client id for work the server starts itself, such as update polls
+SERVER_CLIENT = "server"
+
+
+class FitQuotaExceeded(Exception):
+    """Raised when a client already has its maximum number of fits in flight"""
+
+    def __init__(self, client: str, limit: int):
+        super().__init__(f"Client already has {limit} forecast fits in progress")
+        self.client = client
+        self.limit = limit
+
+
+@dataclass
+class RateLimitStatus:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_seconds: float
+    retry_after_seconds: float
+
+    def headers(self) -> dict[str, str]:
+        return {
+            RATE_LIMIT_LIMIT_HEADER: str(self.limit),
+            RATE_LIMIT_REMAINING_HEADER: str(self.remaining),
+            RATE_LIMIT_RESET_HEADER: str(math.ceil(self.reset_seconds)),
+        }
+
+
+@dataclass
+class _Bucket:
+    tokens: float
+    updated: float
+
+
+class RateLimiter:
+    """Token buckets per client, refilled continuously
+
+    A bucket holds up to `capacity` tokens and gains `refill_per_second`;
+    each request takes one. Idle clients' buckets are dropped least recently
+    used first once more than `max_clients` are tracked, which only ever
+    resets a client to a full bucket.
+    """
+
+    def __init__(self, capacity: int, refill_per_second: float, max_clients: int):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.max_clients = max_clients
+        self._buckets: OrderedDict[str, _Bucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, client: str, cost: float = 1.0) -> RateLimitStatus:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = _Bucket(tokens=self.capacity, updated=now)
+                self._buckets[client] = bucket
+                while len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            self._buckets.move_to_end(client)
+
+            bucket.tokens = min(
+                self.capacity,
+                bucket.tokens + (now - bucket.updated) * self.refill_per_second,
+            )
+            bucket.updated = now
+
+            allowed = bucket.tokens >= cost
+            if allowed:
+                bucket.tokens -= cost
+            tokens = bucket.tokens
+
+        shortfall = 0.0 if allowed else cost - tokens
+        return RateLimitStatus(
+            allowed=allowed,
+            limit=self.capacity,
+            remaining=int(tokens),
+            reset_seconds=(self.capacity - tokens) / self.refill_per_second,
+            retry_after_seconds=shortfall / self.refill_per_second,
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class _Waiter:
+    __slots__ = ("granted",)
+
+    def __init__(self):
+        self.granted = False
+
+
+class FairFitScheduler:
+    """Grants a fixed number of fit slots round-robin across clients
+
+    A fit takes a free slot at once when no one is waiting. Otherwise it
+    joins its client's queue, and each released slot goes to the next
+    client in rotation that has a waiting fit, so a client with many queued
+    fits gets one slot per turn like everyone else. Each client may have at
+    most `max_per_client` fits running or waiting.
+    """
+
+    def __init__(self, slots: int, max_per_client: int):
+        self.slots = slots
+        self.max_per_client = max_per_client
+        self._free = slots
+        self._in_flight: dict[str, int] = {}
+        self._waiting: OrderedDict[str, deque[_Waiter]] = OrderedDict()
+        self._condition = threading.Condition()
+
+    def usage(self, client: str) -> int:
+        """Fits the client has running or waiting"""
+        with self._condition:
+            return self._in_flight.get(client, 0)
+
+    def acquire(self, client: str) -> None:
+        """Blocks until the client is granted a slot
+
+        Raises:
+            FitQuotaExceeded: If the client already has `max_per_client` fits
+        """
+        with self._condition:
+            in_flight = self._in_flight.get(client, 0)
+            if in_flight >= self.max_per_client:
+                raise FitQuotaExceeded(client, self.max_per_client)
+            self._in_flight[client] = in_flight + 1
+
+            if self._free > 0 and not self._waiting:
+                self._free -= 1
+                return
+
+            waiter = _Waiter()
+            self._waiting.setdefault(client, deque()).append(waiter)
+            metrics.increment("fit_slot_waits")
+            while not waiter.granted:
+                self._condition.wait()
+
+    def release(self, client: str) -> None:
+        with self._condition:
+            remaining = self._in_flight.get(client, 0) - 1
+            if remaining > 0:
+                self._in_flight[client] = remaining
+            else:
+                self._in_flight.pop(client, None)
+
+            if not self._waiting:
+                self._free += 1
+                return
+
+            next_client, queue = next(iter(self._waiting.items()))
+            queue.popleft().granted = True
+            if queue:
+                self._waiting.move_to_end(next_client)
+            else:
+                del self._waiting[next_client]
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, client: Optional[str] = None) -> Iterator[None]:
+        """Holds a fit slot for `client`, the current request's by default"""
+        client = client or current_client.get()
+        self.acquire(client)
+        try:
+            yield
+        finally:
+            self.release(client)
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "slots": self.slots,
+                "free": self._free,
+                "waiting": sum(len(queue) for queue in self._waiting.values()),
+                "clients": len(self._in_flight),
+            }
+
+
+def client_id_for(request: Request) -> str:
+    """Identifies the caller by API key, else by address
+
+    Keys are hashed so they never appear in logs or metrics. The first
+    X-Forwarded-For address is used only when `trust_forwarded_for` is set,
+    since clients can send any value.
+    """
+    api_key = request.headers.get(API_KEY_HEADER)
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+    if config.trust_forwarded_for:
+        forwarded = request.headers.get("X-Forwarded-For", "")
+        first = forwarded.split(",")[0].strip()
+        if first:
+            return f"ip:{first}"
+
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+async def rate_limit(request: Request, response: Response) -> str:
+    """Dependency for routes that can start forecasts
+
+    Takes a token from the client's bucket and tags the request with the
+    client id for fit scheduling. Quota and usage are reported in the
+    X-RateLimit-* and X-Fit-Quota-* headers; an empty bucket is a 429 with
+    Retry-After. A request forwarded by a peer replica was already charged
+    there, so it keeps the client id the peer sent and takes no token.
+    """
+    forwarded_client = site_affinity.forwarded_client(request)
+    client = forwarded_client or client_id_for(request)
+    current_client.set(client)
+    request.state.client_id = client
+    if not config.rate_limit_enabled:
+        return client
+
+    fit_quota = {
+        FIT_QUOTA_LIMIT_HEADER: str(fit_scheduler.max_per_client),
+        FIT_QUOTA_USED_HEADER: str(fit_scheduler.usage(client)),
+    }
+    if forwarded_client is not None:
+        response.headers.update(fit_quota)
+        return client
+
+    limit = rate_limiter.take(client)
+    headers = limit.headers()
+    request.state.rate_limit_headers = headers.copy()
+    headers.update(fit_quota)
+
+    if not limit.allowed:
+        metrics.increment("rate_limited", client)
+        log.info(f"Rate limited client {client}")
+        headers["Retry-After"] = str(max(1, math.ceil(limit.retry_after_seconds)))
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many forecast requests; retry later",
+            headers=headers,
+        )
+
+    response.headers.update(headers)
+    return client
+
+
+def fit_slot_count() -> int:
+    """Fits allowed to run at once; see `fit_slots` in the config"""
+    if config.fit_slots:
+        return config.fit_slots
+    if config.fit_pool_workers:
+        return config.fit_pool_workers
+    # In-process fits run in request threads, as many as there are cores
+    return os.cpu_count() or 1
+
+
+rate_limiter = RateLimiter(
+    capacity=config.rate_limit_capacity,
+    refill_per_second=config.rate_limit_refill_per_second,
+    max_clients=config.rate_limit_max_clients,
+)
+fit_scheduler = FairFitScheduler(
+    slots=fit_slot_count(),
+    max_per_client=config.fit_max_in_flight_per_client,
+)
+metrics.register_gauge("fit_scheduler", fit_scheduler.stats)
@@ -1,10 +1,17 @@
+import asyncio
 import datetime as dt
-from typing import List
+import hmac
+from typing import List, Optional
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 
+from ..cache import forecast_cache
+from ..config import config
+from ..metrics import metrics
 from ..model.forecast_result import ForecastDataPoint
-from ..usgs.service import generate_prophet_forecast
+from ..ratelimit import FitQuotaExceeded, rate_limit
+from ..snapshot import forecast_snapshot
+from ..usgs.service import generate_prophet_forecast, resolve_training_window
 from ..utils import format_output
 
 app_router = APIRouter(
@@ -13,18 +20,106 @@ app_router = APIRouter(
 )
 
 
-@app_router.get("/forecast", deprecated=True)
+@app_router.get(
+    "/forecast",
+    deprecated=True,
+    dependencies=[Depends(rate_limit)],
+    responses={429: {"description": "Rate limit or fit quota exceeded"}},
+)
 async def forecast(
     site_id: str,
     reading_parameter: str = Query(default="00060"),
     start_date: dt.date = None,
     end_date: dt.date = None,
 ) -> List[ForecastDataPoint]:
-    start_date = start_date if start_date else dt.date(dt.date.today().year, 1, 1)
-    end_date = end_date if end_date else dt.date(dt.date.today().year, 12, 31)
+    start_date, end_date = resolve_training_window(end_date)
 
-    forecast_result = format_output(
-        generate_prophet_forecast(site_id, reading_parameter, start_date, end_date)
-    )
+    try:
+        forecast_result = format_output(
+            await asyncio.to_thread(
+                generate_prophet_forecast,
+                site_id,
+                reading_parameter,
+                start_date,
+                end_date,
+            )
+        )
+    except FitQuotaExceeded as e:
+        # Same answer as /usgs/forecast gives a client with too many fits
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": "5"},
+        ) from e
 
     return forecast_result
+
+
+@app_router.get("/metrics", tags=["metrics"])
+async def get_metrics() -> dict:
+    """Operational counters and gauges for this server process"""
+    return metrics.snapshot()
+
+
+ADMIN_KEY_HEADER = "X-Admin-Key"
+
+
+async def snapshot_admin(
+    admin_key: Optional[str] = Header(default=None, alias=ADMIN_KEY_HEADER),
+) -> None:
+    """Dependency for the snapshot routes, which rewrite what every replica serves
+
+    Raises:
+        HTTPException: 403 unless SNAPSHOT_ADMIN_KEY is set and sent in
+            X-Admin-Key
+    """
+    if not config.snapshot_admin_key:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Snapshot routes are disabled; SNAPSHOT_ADMIN_KEY is not set",
+        )
+    if not hmac.compare_digest(
+        (admin_key or "").encode("utf-8"), config.snapshot_admin_key.encode("utf-8")
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin key"
+        )
+
+
+@app_router.post(
+    "/snapshot/export",
+    tags=["snapshot"],
+    dependencies=[Depends(rate_limit), Depends(snapshot_admin)],
+    responses={
+        403: {"description": "Admin key missing, wrong or not configured"},
+        409: {"description": "SNAPSHOT_PATH is not set"},
+        429: {"description": "Rate limit exceeded"},
+    },
+)
+async def export_snapshot() -> dict:
+    """Write this server's cached forecasts as the snapshot and serve it
+
+    Other replicas reading the same SNAPSHOT_PATH swap to it on their next
+    check.
+    """
+    if not forecast_snapshot.enabled:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="SNAPSHOT_PATH is not set"
+        )
+    written = await asyncio.to_thread(forecast_snapshot.export, forecast_cache)
+    return {"forecasts": written, **forecast_snapshot.stats()}
+
+
+@app_router.post(
+    "/snapshot/reload",
+    tags=["snapshot"],
+    dependencies=[Depends(rate_limit), Depends(snapshot_admin)],
+    responses={
+        403: {"description": "Admin key missing, wrong or not configured"},
+        429: {"description": "Rate limit exceeded"},
+    },
+)
+async def reload_snapshot() -> dict:
+    """Swap to the snapshot file now if it was replaced since it was loaded"""
+    loaded = await asyncio.to_thread(forecast_snapshot.load)
+    return {"loaded": loaded, **forecast_snapshot.stats()}
@@ -0,0 +1,44 @@
+"""Per-request stage durations, reported in the Server-Timing header
+
+`tracing.span()` records each stage's duration here. The request timing
+middleware opens a collection per request, so only stages that run in the
+request's own context (the event loop or threads it hands work to) are
+reported; background jobs and refreshes are not.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+SERVER_TIMING_HEADER = "Server-Timing"
+
+_timings: ContextVar[Optional[list[tuple[str, float]]]] = ContextVar(
+    "server_timings", default=None
+)
+
+
+@contextmanager
+def collect() -> Iterator[list[tuple[str, float]]]:
+    """Collects (stage, seconds) pairs recorded in this context"""
+    timings: list[tuple[str, float]] = []
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def record(stage: str, seconds: float) -> None:
+    """Adds a stage duration to the current collection, if there is one"""
+    timings = _timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+def header_value(timings: list[tuple[str, float]]) -> str:
+    """Formats durations as Server-Timing metrics, in milliseconds
+
+    Stage names are span names such as `usgs.fetch`, which are valid
+    header tokens as they are.
+    """
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings)
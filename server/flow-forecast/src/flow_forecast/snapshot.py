@@ -0,0 +1,276 @@
+"""Memory-mapped snapshot of pre-serialized forecast responses
+
+A snapshot file holds the JSON response body of each forecast, exactly as
+`POST /usgs/forecast` would send it, behind an index from the forecast's
+spec to the body's offset. The file is mapped with mmap, so a hit is
+answered by copying its bytes out of the page cache: nothing is decoded,
+validated or re-encoded, and a new replica pointed at the same file
+starts warm.
+
+Layout: the 8-byte magic, the index length as a little-endian uint64, the
+index as JSON, then the bodies back to back. Index offsets count from the
+first body.
+
+Snapshots are written to a temporary file and renamed into place. A
+server notices the new file on its next check and swaps to it; requests
+already reading the old mapping keep it alive until they finish.
+"""
+
+import asyncio
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from .cache import ForecastCache
+from .config import config
+from .metrics import metrics
+from .model.forecast_result import ForecastDataPoint
+from .model.forecast_spec import ForecastSpec
+from .versions import forecast_version
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"FFSNAP01"
+_HEADER = struct.Struct("<Q")
+
+
+def snapshot_key(spec: ForecastSpec) -> str:
+    return json.dumps(spec.model_dump(mode="json"), sort_keys=True)
+
+
+def forecast_body(forecast: List[ForecastDataPoint]) -> bytes:
+    """The response body FastAPI renders for a list of data points"""
+    return json.dumps(
+        [point.model_dump(mode="json") for point in forecast],
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+@dataclass(frozen=True)
+class SnapshotEntry:
+    offset: int
+    length: int
+    # Wall-clock time the forecast was generated
+    created_at: float
+    version: str
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+
+class ForecastSnapshot:
+    """One opened snapshot file"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a forecast snapshot")
+        start = len(MAGIC) + _HEADER.size
+        (index_length,) = _HEADER.unpack_from(self._mmap, len(MAGIC))
+        index = json.loads(self._mmap[start : start + index_length])
+        self._bodies = start + index_length
+        self.created_at: float = index["created_at"]
+        self.entries = {
+            entry["key"]: SnapshotEntry(
+                offset=entry["offset"],
+                length=entry["length"],
+                created_at=entry["created_at"],
+                version=entry["version"],
+            )
+            for entry in index["entries"]
+        }
+
+    def get(self, spec: ForecastSpec) -> Optional[SnapshotEntry]:
+        return self.entries.get(snapshot_key(spec))
+
+    def body(self, entry: SnapshotEntry) -> memoryview:
+        """The entry's bytes, as a view into the mapping"""
+        start = self._bodies + entry.offset
+        return memoryview(self._mmap)[start : start + entry.length]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def write_snapshot(
+    path: Path,
+    forecasts: Iterable[Tuple[ForecastSpec, List[ForecastDataPoint], float]],
+) -> int:
+    """Writes `(spec, forecast, created_at)` entries to a snapshot at `path`
+
+    The file is written beside `path`, flushed to disk and renamed over it,
+    so readers see either the old snapshot or the complete new one.
+
+    Returns:
+        The number of forecasts written
+    """
+    path = Path(path)
+    bodies: list[bytes] = []
+    entries: list[dict] = []
+    offset = 0
+    for spec, forecast, created_at in forecasts:
+        body = forecast_body(forecast)
+        entries.append(
+            {
+                "key": snapshot_key(spec),
+                "offset": offset,
+                "length": len(body),
+                "created_at": created_at,
+                "version": forecast_version(forecast),
+            }
+        )
+        bodies.append(body)
+        offset += len(body)
+
+    index = json.dumps(
+        {"created_at": time.time(), "entries": entries}, separators=(",", ":")
+    ).encode("utf-8")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(_HEADER.pack(len(index)))
+            f.write(index)
+            for body in bodies:
+                f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return len(entries)
+
+
+class SnapshotStore:
+    """The snapshot currently served, swapped when its file is replaced
+
+    Entries are fresh for `ttl_seconds` after they were generated and may be
+    served stale, while a refresh runs, for `max_stale_seconds` more, the
+    same as forecast cache entries.
+    """
+
+    def __init__(
+        self, path: Optional[Path], ttl_seconds: float, max_stale_seconds: float
+    ):
+        self.path = Path(path) if path else None
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self._current: Optional[ForecastSnapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def load(self) -> bool:
+        """Opens the snapshot file if it changed since it was last opened
+
+        Returns:
+            True if a new snapshot is now being served
+        """
+        if self.path is None:
+            return False
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return False
+            current = self._current
+            if current is not None and current.identity == (
+                stat.st_dev,
+                stat.st_ino,
+                stat.st_mtime_ns,
+            ):
+                return False
+
+            try:
+                snapshot = ForecastSnapshot(self.path)
+            except (OSError, ValueError, KeyError) as e:
+                log.error(f"Could not load forecast snapshot {self.path}: {e}")
+                return False
+            # Requests holding the old snapshot keep its mapping open until
+            # they are done with it
+            self._current = snapshot
+
+        metrics.increment("snapshot", "loaded")
+        log.info(f"Loaded forecast snapshot {self.path} with {len(snapshot)} forecasts")
+        return True
+
+    def get(self, spec: ForecastSpec) -> Optional[Tuple[SnapshotEntry, memoryview]]:
+        """The entry for `spec` and its body, unless missing or too old"""
+        snapshot = self._current
+        if snapshot is None:
+            return None
+        entry = snapshot.get(spec)
+        if entry is None or entry.age >= self.ttl_seconds + self.max_stale_seconds:
+            return None
+        return entry, snapshot.body(entry)
+
+    def is_fresh(self, entry: SnapshotEntry) -> bool:
+        return entry.age < self.ttl_seconds
+
+    def export(self, forecast_cache: ForecastCache) -> int:
+        """Writes the cache's current forecasts as the snapshot and serves it
+
+        Raises:
+            RuntimeError: If no snapshot path is configured
+        """
+        if self.path is None:
+            raise RuntimeError("SNAPSHOT_PATH is not set")
+        now, wall = time.monotonic(), time.time()
+        written = write_snapshot(
+            self.path,
+            (
+                (spec, entry.value, wall - (now - entry.created_at))
+                for spec, entry in forecast_cache.items()
+                if isinstance(spec, ForecastSpec)
+            ),
+        )
+        metrics.increment("snapshot", "exported")
+        log.info(f"Exported {written} forecasts to snapshot {self.path}")
+        self.load()
+        return written
+
+    async def run(self, interval_seconds: float) -> None:
+        """Checks for a replaced snapshot file every `interval_seconds`"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            await asyncio.to_thread(self.load)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._current = None
+
+    def stats(self) -> dict:
+        snapshot = self._current
+        return {
+            "path": str(self.path) if self.path else None,
+            "forecasts": len(snapshot) if snapshot else 0,
+            "created_at": snapshot.created_at if snapshot else None,
+        }
+
+
+forecast_snapshot = SnapshotStore(
+    path=config.snapshot_path or None,
+    ttl_seconds=config.forecast_cache_ttl_seconds,
+    max_stale_seconds=config.forecast_cache_max_stale_seconds,
+)
+metrics.register_gauge("snapshot", forecast_snapshot.stats)
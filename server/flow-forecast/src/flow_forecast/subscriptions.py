@@ -0,0 +1,127 @@
+"""Fan-out of refreshed forecasts to streaming subscribers
+
+Subscribers register the forecast specs they watch. Whenever a forecast for
+one of those specs is generated, from any request, job or poll, it is pushed
+to every subscriber of that spec, so one refresh serves all watchers.
+"""
+
+import asyncio
+import datetime as dt
+import logging
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+from .model.forecast_result import ForecastDataPoint
+from .model.forecast_spec import ForecastSpec
+from .model.subscriptions import ForecastUpdate
+
+log = logging.getLogger(__name__)
+
+
+def forecast_update(
+    spec: ForecastSpec, forecast: List[ForecastDataPoint]
+) -> ForecastUpdate:
+    return ForecastUpdate(
+        site_id=spec.site_id,
+        reading_parameter=spec.reading_parameter,
+        horizon_days=spec.horizon_days,
+        only_future=spec.only_future,
+        updated_at=dt.datetime.now(dt.timezone.utc),
+        forecast=forecast,
+    )
+
+
+class Subscription:
+    """One subscriber's pending updates, bound to its event loop
+
+    Updates are coalesced per spec: a subscriber that falls behind gets the
+    newest forecast for each spec rather than a growing backlog.
+    """
+
+    def __init__(self, specs: Iterable[ForecastSpec], loop: asyncio.AbstractEventLoop):
+        self.specs = frozenset(specs)
+        self._loop = loop
+        self._pending: OrderedDict[ForecastSpec, ForecastUpdate] = OrderedDict()
+        self._ready = asyncio.Event()
+
+    def deliver(self, spec: ForecastSpec, update: ForecastUpdate) -> None:
+        """Queues an update; must run on the subscription's loop"""
+        self._pending.pop(spec, None)
+        self._pending[spec] = update
+        self._ready.set()
+
+    def deliver_threadsafe(self, spec: ForecastSpec, update: ForecastUpdate) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self.deliver, spec, update)
+        except RuntimeError:
+            # The loop has closed; the subscriber is gone
+            pass
+
+    async def next(self, timeout: Optional[float] = None) -> List[ForecastUpdate]:
+        """Waits for pending updates; returns [] if `timeout` passes first"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+
+        updates = list(self._pending.values())
+        self._pending.clear()
+        self._ready.clear()
+        return updates
+
+
+class ForecastBroker:
+    """Tracks subscriptions by spec and publishes forecasts to them"""
+
+    def __init__(self):
+        self._subscribers: dict[ForecastSpec, set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, specs: Iterable[ForecastSpec]) -> Subscription:
+        """Registers a subscription; call from the event loop that will read it"""
+        subscription = Subscription(specs, asyncio.get_running_loop())
+        with self._lock:
+            for spec in subscription.specs:
+                self._subscribers.setdefault(spec, set()).add(subscription)
+        log.info(f"Subscribed to forecasts for {len(subscription.specs)} specs")
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for spec in subscription.specs:
+                subscribers = self._subscribers.get(spec)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[spec]
+
+    def publish(self, spec: ForecastSpec, forecast: List[ForecastDataPoint]) -> int:
+        """Pushes a forecast to the spec's subscribers; safe from any thread
+
+        Returns:
+            The number of subscribers notified
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.get(spec, ()))
+        if not subscribers:
+            return 0
+
+        update = forecast_update(spec, forecast)
+        for subscription in subscribers:
+            subscription.deliver_threadsafe(spec, update)
+        log.debug(f"Published forecast for {spec.site_id} to {len(subscribers)}")
+        return len(subscribers)
+
+    def watched(self) -> List[ForecastSpec]:
+        """Specs with at least one subscriber"""
+        with self._lock:
+            return list(self._subscribers)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(set().union(*self._subscribers.values()))
+
+
+forecast_broker = ForecastBroker()
@@ -0,0 +1,182 @@
+"""OpenTelemetry tracing for the forecast pipeline
+
+OpenTelemetry is optional. With `opentelemetry-api` installed, `span()`
+records spans on the global tracer provider, which is either configured here
+from `TRACING_EXPORTER` or left to an external SDK setup such as
+`opentelemetry-instrument`. Without it every helper is a no-op, so the
+pipeline can call them unconditionally.
+
+Fits run in fit pool worker processes; `inject_context()` and
+`attached_context()` carry the trace context across that boundary so
+worker spans join the request's trace.
+"""
+
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+try:
+    from opentelemetry import context as otel_context
+    from opentelemetry import propagate, trace
+except ImportError:  # pragma: no cover - exercised when the extra is absent
+    otel_context = propagate = trace = None
+
+from . import server_timing
+
+log = logging.getLogger(__name__)
+
+TRACER_NAME = "flow_forecast"
+SERVICE_NAME = "flow-forecast"
+
+_configured_provider = None
+
+
+class _NoopSpan:
+    """Stands in for a span when OpenTelemetry is not installed"""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: dict[str, Any]) -> None:
+        pass
+
+    def record_exception(self, exception: BaseException, **kwargs) -> None:
+        pass
+
+    def is_recording(self) -> bool:
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def is_available() -> bool:
+    return trace is not None
+
+
+def _attributes(attributes: dict[str, Any]) -> dict[str, Any]:
+    # OpenTelemetry rejects None and only accepts primitive values
+    return {
+        key: value if isinstance(value, (bool, int, float, str)) else str(value)
+        for key, value in attributes.items()
+        if value is not None
+    }
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Records a span around the block, as a child of the current span
+
+    Keyword arguments become span attributes; None values are skipped.
+    Exceptions raised in the block are recorded on the span and re-raised.
+    The block's duration is also reported in the request's Server-Timing
+    header, whether or not OpenTelemetry is installed.
+    """
+    started = time.perf_counter()
+    try:
+        if trace is None:
+            yield _NOOP_SPAN
+            return
+
+        tracer = trace.get_tracer(TRACER_NAME)
+        with tracer.start_as_current_span(
+            name, attributes=_attributes(attributes)
+        ) as s:
+            yield s
+    finally:
+        server_timing.record(name, time.perf_counter() - started)
+
+
+def set_attributes(current: Any, **attributes: Any) -> None:
+    """Sets attributes on a span from `span()`, skipping None values"""
+    current.set_attributes(_attributes(attributes))
+
+
+def inject_context() -> dict[str, str]:
+    """Serializes the current trace context into a picklable carrier"""
+    carrier: dict[str, str] = {}
+    if propagate is not None:
+        propagate.inject(carrier)
+    return carrier
+
+
+@contextmanager
+def attached_context(carrier: Optional[dict[str, str]]) -> Iterator[None]:
+    """Makes the trace context from `inject_context()` current for the block"""
+    if propagate is None or not carrier:
+        yield
+        return
+
+    token = otel_context.attach(propagate.extract(carrier))
+    try:
+        yield
+    finally:
+        otel_context.detach(token)
+
+
+def configure_tracing(exporter: str, path: str) -> bool:
+    """Installs a tracer provider exporting to the console or a file
+
+    Spans are written one JSON object per line, to stdout for "console" or
+    appended to `path` for "file", for offline analysis. "none" leaves the
+    global provider alone.
+
+    Returns:
+        Whether a provider was installed
+    """
+    global _configured_provider
+
+    if exporter == "none" or _configured_provider is not None:
+        return False
+    if trace is None:
+        log.warning(
+            f"Tracing exporter '{exporter}' requested but OpenTelemetry is not installed"
+        )
+        return False
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import (
+            BatchSpanProcessor,
+            ConsoleSpanExporter,
+        )
+    except ImportError:
+        log.warning("Tracing exporter requested but opentelemetry-sdk is not installed")
+        return False
+
+    out = sys.stdout if exporter == "console" else open(path, "a", buffering=1)
+    provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+    provider.add_span_processor(
+        BatchSpanProcessor(
+            ConsoleSpanExporter(
+                out=out, formatter=lambda s: s.to_json(indent=None) + os.linesep
+            )
+        )
+    )
+    trace.set_tracer_provider(provider)
+    _configured_provider = provider
+
+    log.info(f"Exporting traces to {'stdout' if exporter == 'console' else path}")
+    return True
+
+
+def flush() -> None:
+    """Exports buffered spans now
+
+    Fit pool workers exit without running atexit handlers, so they flush
+    after each fit rather than relying on provider shutdown.
+    """
+    if _configured_provider is not None:
+        _configured_provider.force_flush()
+
+
+def shutdown() -> None:
+    global _configured_provider
+
+    if _configured_provider is not None:
+        _configured_provider.shutdown()
+        _configured_provider = None
@@ -0,0 +1,97 @@
+"""Refreshes the most-requested sites' forecasts once USGS has new daily values"""
+
+import asyncio
+import datetime as dt
+import logging
+
+from fastapi import HTTPException
+
+from ..config import config
+from ..heavy_hitters import site_demand
+from ..metrics import metrics
+from ..model.forecast_spec import ForecastSpec
+from ..ratelimit import SERVER_CLIENT, current_client
+from .router import run_forecast
+
+log = logging.getLogger(__name__)
+
+
+class HotSitePrefetcher:
+    """Re-forecasts the top `top_k` sites by demand every day at `hour_utc`
+
+    USGS publishes the previous day's provisional daily values overnight, so
+    a run after that hour replaces the hot sites' cached forecasts with ones
+    that include the new day before their next request arrives. Sites are
+    refreshed one at a time, hottest first, as the server's own client so
+    the fits queue fairly behind user requests. After each run the demand
+    counts are scaled by `decay`, so sites fall out of the hot set once
+    their traffic stops.
+    """
+
+    def __init__(self, top_k: int, hour_utc: int, decay: float):
+        self.top_k = top_k
+        self.hour_utc = hour_utc
+        self.decay = decay
+
+    def next_run(self, now: dt.datetime) -> dt.datetime:
+        """The first `hour_utc` strictly after `now`"""
+        run = now.astimezone(dt.timezone.utc).replace(
+            hour=self.hour_utc, minute=0, second=0, microsecond=0
+        )
+        if run <= now:
+            run += dt.timedelta(days=1)
+        return run
+
+    def refresh(self, spec: ForecastSpec) -> bool:
+        # Runs in a copied context, so this only tags this refresh's fit
+        current_client.set(SERVER_CLIENT)
+        try:
+            run = run_forecast(spec, fit_deadline=config.fit_deadline_seconds)
+        except HTTPException as e:
+            log.warning(f"Prefetch failed for site {spec.site_id}: {e.detail}")
+            metrics.increment("prefetch", "failed")
+            return False
+
+        if run.fallback is not None:
+            # Fallbacks are not cached, so there is nothing for requests to hit
+            metrics.increment("prefetch", "failed")
+            return False
+        site_demand.mark_prefetched(spec)
+        metrics.increment("prefetch", "refreshed")
+        return True
+
+    async def prefetch_once(self) -> int:
+        """Refreshes the current hot set
+
+        Returns:
+            The number of forecasts refreshed
+        """
+        unused = site_demand.take_unused()
+        if unused:
+            metrics.increment("prefetch", "unused", unused)
+
+        hottest = site_demand.hottest(self.top_k)
+        refreshed = 0
+        for hitter in hottest:
+            refreshed += await asyncio.to_thread(self.refresh, hitter.payload)
+        site_demand.decay(self.decay)
+
+        log.info(f"Prefetched {refreshed}/{len(hottest)} hot site forecasts")
+        return refreshed
+
+    async def run(self) -> None:
+        """Prefetches once a day until cancelled"""
+        while True:
+            now = dt.datetime.now(dt.timezone.utc)
+            await asyncio.sleep((self.next_run(now) - now).total_seconds())
+            try:
+                await self.prefetch_once()
+            except Exception:
+                log.exception("Hot site prefetch failed")
+
+
+hot_site_prefetcher = HotSitePrefetcher(
+    top_k=config.prefetch_top_k,
+    hour_utc=config.prefetch_hour_utc,
+    decay=config.prefetch_decay,
+)
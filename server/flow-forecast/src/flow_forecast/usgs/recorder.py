@@ -0,0 +1,163 @@
+"""Record and replay of USGS responses
+
+In "record" mode every successful USGS response is saved, gzip-compressed,
+under a name derived from its normalized URL. In "replay" mode requests are
+answered from those files instead of the network, optionally after an
+injected delay, so real multi-year payloads can drive benchmarks, profiling
+and development without network access and with the same data every run.
+
+URLs are normalized by dropping the scheme and host and sorting the query,
+so recordings taken against the live service replay whatever
+`USGS_BASE_URL` points at, and requests that differ only in parameter order
+share a file. The training window moves with the calendar, so a request
+with no recording for its exact dates is answered with the latest recording
+for the same site and parameters instead.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from ..config import config
+from ..metrics import metrics
+
+log = logging.getLogger(__name__)
+
+# Lists each recording's normalized URL, for finding what a directory holds
+INDEX_FILE = "index.jsonl"
+# Query parameters ignored when falling back to an earlier day's recording
+_DATE_PARAMETERS = {"startDT", "endDT", "period"}
+
+
+@dataclass
+class RecordedResponse:
+    """The parts of a urllib3 response the USGS client reads"""
+
+    status: int
+    data: bytes
+
+
+def normalize_url(url: str, dated: bool = True) -> str:
+    """Path and sorted query of `url`, ignoring scheme, host and trailing /
+
+    With `dated` False the date range parameters are dropped too.
+    """
+    parts = urlsplit(url)
+    query = sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if dated or name not in _DATE_PARAMETERS
+    )
+    return f"{parts.path.rstrip('/')}?{urlencode(query)}"
+
+
+def recording_key(url: str, dated: bool = True) -> str:
+    return hashlib.sha256(normalize_url(url, dated).encode("utf-8")).hexdigest()
+
+
+class ResponseRecorder:
+    """Saves USGS responses to `directory` or serves them back from it
+
+    Attributes:
+        mode: "off", "record" or "replay"
+        latency_ms: Delay added before each replayed response
+    """
+
+    def __init__(self, mode: str, directory: Path, latency_ms: float = 0.0):
+        self.mode = mode
+        self.directory = Path(directory)
+        self.latency_ms = latency_ms
+        self._index_lock = threading.Lock()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def path(self, url: str, dated: bool = True) -> Path:
+        key = recording_key(url, dated)
+        return self.directory / key[:2] / f"{key}.json.gz"
+
+    def record(self, url: str, status: int, data: bytes) -> None:
+        """Saves a successful response when recording; otherwise does nothing
+
+        Files are written under a temporary name and renamed into place, so
+        a concurrent replay never reads a partial recording. The undated
+        fallback is a hard link to the newest recording, where the
+        filesystem allows it.
+        """
+        if self.mode != "record" or status != 200:
+            return
+
+        path = self.path(url)
+        compressed = gzip.compress(data, mtime=0)
+        new = not path.exists()
+        self._write(path, compressed)
+        self._write(self.path(url, dated=False), compressed, link_to=path)
+
+        if new:
+            entry = {"key": path.name.split(".")[0], "url": normalize_url(url)}
+            with self._index_lock:
+                with open(self.directory / INDEX_FILE, "a") as index:
+                    index.write(json.dumps(entry) + "\n")
+        metrics.increment("usgs_recordings", "recorded")
+        log.debug(f"Recorded {len(data)} bytes for {normalize_url(url)}")
+
+    def _write(self, path: Path, data: bytes, link_to: Optional[Path] = None) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            os.close(fd)
+            if link_to is None:
+                Path(tmp).write_bytes(data)
+            else:
+                try:
+                    os.unlink(tmp)
+                    os.link(link_to, tmp)
+                except OSError:
+                    Path(tmp).write_bytes(data)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def replay(self, url: str) -> RecordedResponse:
+        """The recorded response for `url`, or for its latest dates
+
+        Raises:
+            ConnectionError: If nothing was recorded for the site and
+                parameters in `url`
+        """
+        try:
+            data = self.path(url).read_bytes()
+        except FileNotFoundError:
+            try:
+                data = self.path(url, dated=False).read_bytes()
+            except FileNotFoundError:
+                metrics.increment("usgs_recordings", "missing")
+                raise ConnectionError(
+                    f"No recorded USGS response for {normalize_url(url)} in "
+                    f"{self.directory}"
+                )
+            metrics.increment("usgs_recordings", "undated")
+        data = gzip.decompress(data)
+
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000)
+        metrics.increment("usgs_recordings", "replayed")
+        return RecordedResponse(status=200, data=data)
+
+
+usgs_recorder = ResponseRecorder(
+    mode=config.usgs_record_mode,
+    directory=Path(config.usgs_record_dir),
+    latency_ms=config.usgs_replay_latency_ms,
+)
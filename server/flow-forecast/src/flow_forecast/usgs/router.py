@@ -1,16 +1,70 @@
-import datetime as dt
+import asyncio
+import json
 import logging
-from typing import List
+import re
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union
 
-from fastapi import APIRouter, HTTPException, status
+import pandas as pd
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
 
+from .. import tracing
+from ..affinity import site_affinity
+from ..cache import forecast_cache
+from ..config import config
+from ..heavy_hitters import site_demand
+from ..jobs import forecast_jobs
+from ..metrics import metrics
+from ..percentiles import SitePercentiles, flow_class, percentile_store
+from ..ratelimit import FitQuotaExceeded, fit_scheduler, rate_limit
+from ..snapshot import SnapshotEntry, forecast_snapshot
+from ..subscriptions import Subscription, forecast_broker, forecast_update
 from ..model.forecast_result import ForecastDataPoint
-from ..model.usgs import USGSFlowForecastRequest
+from ..model.forecast_spec import ForecastSpec
+from ..model.jobs import ForecastJob, ForecastJobStatus
+from ..model.percentiles import FlowPercentile
+from ..model.usgs import USGSFlowForecastRequest, USGSMultiParameterForecastRequest
+from ..model.versions import ForecastDelta, USGSForecastDeltaRequest
 from ..utils import format_output
-from .service import generate_prophet_forecast
+from ..versions import forecast_versions
+from .service import (
+    FitDeadlineExceeded,
+    generate_fallback_forecast,
+    generate_prophet_forecast,
+    get_cleaned_histories,
+    resolve_training_window,
+    site_percentiles,
+)
 
 log = logging.getLogger(__name__)
 
+# Response header telling clients whether the forecast came from the cache:
+# "hit" (fresh), "stale" (last good forecast, refresh pending) or "miss"
+CACHE_STATUS_HEADER = "X-Forecast-Cache"
+# Request header a client can use to lower the server's fit deadline (seconds)
+FIT_DEADLINE_HEADER = "X-Fit-Deadline"
+# Response header naming the fallback used when the fit overran its deadline
+FALLBACK_HEADER = "X-Forecast-Fallback"
+# Response header identifying the forecast's content; send it back as a
+# delta request's base_version to get only the rows changed since
+VERSION_HEADER = "X-Forecast-Version"
+
+# Most sites one percentile request may rank
+MAX_PERCENTILE_SITES = 100
+_SITE_ID = re.compile(r"\d{8,15}")
+
 usgs_router = APIRouter(
     prefix="/usgs",
     tags=["usgs"],
@@ -18,22 +72,204 @@ usgs_router = APIRouter(
 )
 
 
+def forecast_spec(request: USGSFlowForecastRequest) -> ForecastSpec:
+    """Resolves a request to the spec used for fitting, caching and jobs
+
+    The server's training-window policy decides the start date; see
+    `resolve_training_window`.
+
+    Raises:
+        HTTPException: 400 if the request's end_date precedes the window
+    """
+    try:
+        start_date, end_date = resolve_training_window(request.end_date)
+    except ValueError as e:
+        raise forecast_http_exception(e)
+
+    return ForecastSpec(
+        site_id=request.site_id,
+        reading_parameter=request.reading_parameter,
+        start_date=start_date,
+        end_date=end_date,
+        horizon_days=request.horizon_days,
+        only_future=request.only_future,
+    )
+
+
+def resolve_fit_deadline(requested: Optional[float]) -> float:
+    """Returns the fit deadline, letting clients lower but not raise the default"""
+    if requested is None:
+        return config.fit_deadline_seconds
+    return min(requested, config.fit_deadline_seconds)
+
+
+def forecast_http_exception(e: Exception) -> HTTPException:
+    """Maps a forecast pipeline error to the HTTP error returned to clients"""
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, FitQuotaExceeded):
+        log.info(f"Fit quota exceeded for client {e.client}")
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": "5"},
+        )
+    if isinstance(e, ValueError):
+        log.warning(f"Invalid request parameters: {e}")
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid request: {str(e)}",
+        )
+    if isinstance(e, ConnectionError):
+        log.error(f"Failed to fetch gauge data: {e}")
+        return HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Failed to fetch gauge data: {str(e)}",
+        )
+    if isinstance(e, KeyError):
+        log.error(f"Unexpected USGS API response structure: {e}")
+        return HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Received unexpected response from USGS API",
+        )
+    log.error(f"Unexpected error generating forecast: {e}", exc_info=True)
+    return HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail="An unexpected error occurred while generating the forecast",
+    )
+
+
+@dataclass
+class ForecastRun:
+    result: List[ForecastDataPoint]
+    # "climatology" when the fit overran its deadline
+    fallback: Optional[str] = None
+
+
+def run_forecast(
+    spec: ForecastSpec,
+    fit_deadline: Optional[float] = None,
+    history: Optional[pd.DataFrame] = None,
+) -> ForecastRun:
+    """Runs the forecast pipeline, caches the result and publishes it
+
+    History is fetched from the spec's source unless already-fetched
+    `history` is given. If the fit overruns `fit_deadline` the overrun is
+    counted against the site and a climatology forecast is returned instead.
+    Fallbacks are not cached.
+
+    Raises:
+        HTTPException: If any stage of the pipeline fails
+    """
+    with tracing.span(
+        "forecast.run",
+        source=spec.source,
+        site_id=spec.site_id,
+        reading_parameter=spec.reading_parameter,
+        horizon_days=spec.horizon_days,
+        fit_deadline=fit_deadline,
+    ) as span:
+        try:
+            result = format_output(
+                generate_prophet_forecast(
+                    spec.site_id,
+                    spec.reading_parameter,
+                    spec.start_date,
+                    spec.end_date,
+                    fit_deadline=fit_deadline,
+                    horizon_days=spec.horizon_days,
+                    only_future=spec.only_future,
+                    source=spec.source,
+                    history=history,
+                )
+            )
+        except FitDeadlineExceeded as e:
+            run = run_fallback_forecast(spec, e)
+            span.set_attribute("fallback", run.fallback)
+            return run
+        except Exception as e:
+            raise forecast_http_exception(e)
+
+        forecast_cache.put(spec, result)
+        forecast_broker.publish(spec, result)
+        span.set_attribute("rows", len(result))
+        return ForecastRun(result)
+
+
+def run_fallback_forecast(
+    spec: ForecastSpec, overrun: FitDeadlineExceeded
+) -> ForecastRun:
+    """Answers a request whose fit overran its deadline
+
+    Only reached when nothing was cached for the spec, since cached entries
+    are served before a fit starts, so the answer is built from the history
+    already fetched.
+    """
+    metrics.increment("fit_deadline_overruns", spec.site_id)
+    log.warning(f"Fit for site {spec.site_id} overran {overrun.deadline:.1f}s deadline")
+
+    try:
+        result = format_output(
+            generate_fallback_forecast(
+                overrun.history,
+                horizon_days=spec.horizon_days,
+                only_future=spec.only_future,
+            )
+        )
+    except Exception as e:
+        raise forecast_http_exception(e)
+    return ForecastRun(result, fallback="climatology")
+
+
+def refresh_forecast(spec: ForecastSpec) -> None:
+    """Background task that replaces a stale cache entry with a new forecast"""
+    try:
+        run_forecast(spec, fit_deadline=config.fit_deadline_seconds)
+        log.info(f"Refreshed stale forecast for site {spec.site_id}")
+    except HTTPException as e:
+        log.warning(f"Background refresh failed for site {spec.site_id}: {e.detail}")
+    finally:
+        forecast_cache.end_refresh(spec)
+
+
 @usgs_router.post(
     "/forecast",
     response_model=List[ForecastDataPoint],
+    dependencies=[Depends(rate_limit)],
     responses={
         400: {"description": "Invalid request parameters"},
+        429: {"description": "Rate limit or fit quota exceeded"},
         500: {"description": "Internal server error"},
         502: {"description": "Error communicating with USGS API"},
     },
 )
 async def forecast(
     request: USGSFlowForecastRequest,
+    http_request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    fit_deadline: Optional[float] = Header(
+        default=None,
+        alias=FIT_DEADLINE_HEADER,
+        gt=0,
+        description="Seconds the model fit may take; can only lower the server default",
+    ),
 ) -> List[ForecastDataPoint]:
     """Generate flow forecast for a USGS site
 
+    Fresh cached forecasts are returned directly. Once an entry goes stale it
+    is still served, marked `X-Forecast-Cache: stale`, while a background task
+    refreshes it; this keeps latency bounded when USGS is slow or unavailable.
+
+    A fit that overruns its deadline is cancelled and the response is built
+    from a climatology forecast, named in `X-Forecast-Fallback`.
+
+    With site affinity enabled, a site another replica owns is forwarded or
+    redirected there unless that replica is unreachable.
+
     Args:
         request: Forecast request with site_id, reading_parameter, and optional date range
+        fit_deadline: Optional client-requested fit deadline in seconds
 
     Returns:
         List of forecast data points with historical and predicted values
@@ -45,44 +281,491 @@ async def forecast(
         f"Forecast request for site {request.site_id}, parameter {request.reading_parameter}"
     )
 
-    # Set default dates to current year if not provided
-    today = dt.date.today()
-    start_date = request.start_date if request.start_date else dt.date(today.year, 1, 1)
-    end_date = request.end_date if request.end_date else dt.date(today.year, 12, 31)
+    spec = forecast_spec(request)
+    routed = await site_affinity.route(spec.site_id, http_request)
+    if routed is not None:
+        return routed
 
-    try:
-        forecast_result = format_output(
-            generate_prophet_forecast(
-                request.site_id, request.reading_parameter, start_date, end_date
+    site_demand.record(spec)
+    return await serve_forecast(
+        spec, response, background_tasks, fit_deadline, raw_snapshot=True
+    )
+
+
+async def serve_forecast(
+    spec: ForecastSpec,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    fit_deadline: Optional[float],
+    raw_snapshot: bool = False,
+) -> Union[List[ForecastDataPoint], Response]:
+    """Answers a forecast request from the cache or snapshot, or by running
+    the pipeline
+
+    Shared by every source's forecast route; sets the cache status, Age and
+    fallback headers on `response`. With `raw_snapshot` a snapshot hit is
+    returned as a Response holding the snapshot's stored body; otherwise it
+    is decoded to data points.
+
+    Raises:
+        HTTPException: If the pipeline fails
+    """
+    with tracing.span(
+        f"{spec.source}.forecast",
+        site_id=spec.site_id,
+        reading_parameter=spec.reading_parameter,
+        horizon_days=spec.horizon_days,
+    ) as span:
+        entry = forecast_cache.get(spec)
+        if entry is not None:
+            response.headers["Age"] = str(int(entry.age))
+            if entry.is_fresh:
+                site_demand.record_hit(spec)
+                response.headers[CACHE_STATUS_HEADER] = "hit"
+                span.set_attribute("cache_status", "hit")
+                return versioned(spec, entry.value, response)
+
+            if forecast_cache.begin_refresh(spec):
+                background_tasks.add_task(refresh_forecast, spec)
+            log.info(f"Serving stale forecast for site {spec.site_id}")
+            response.headers[CACHE_STATUS_HEADER] = "stale"
+            span.set_attribute("cache_status", "stale")
+            return versioned(spec, entry.value, response)
+
+        snapshot = forecast_snapshot.get(spec)
+        if snapshot is not None:
+            span.set_attribute("cache_status", "snapshot")
+            return serve_snapshot(
+                spec, *snapshot, response, background_tasks, raw_snapshot
             )
+
+        span.set_attribute("cache_status", "miss")
+        # Off the event loop, so fits waiting for a slot don't block it
+        run = await asyncio.to_thread(
+            run_forecast, spec, fit_deadline=resolve_fit_deadline(fit_deadline)
         )
+        forecast_result = run.result
+        response.headers[CACHE_STATUS_HEADER] = "miss"
+        if run.fallback is not None:
+            response.headers[FALLBACK_HEADER] = run.fallback
 
         log.info(
             f"Successfully generated forecast with {len(forecast_result)} data points"
         )
-        return forecast_result
+        return versioned(spec, forecast_result, response)
 
-    except ValueError as e:
-        log.warning(f"Invalid request parameters: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid request: {str(e)}",
+
+def serve_snapshot(
+    spec: ForecastSpec,
+    entry: SnapshotEntry,
+    body: memoryview,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    raw: bool,
+) -> Union[List[ForecastDataPoint], Response]:
+    """Answers from a snapshot entry, refreshing it into the cache if stale"""
+    if forecast_snapshot.is_fresh(entry):
+        site_demand.record_hit(spec)
+        status_value = "hit"
+    else:
+        if forecast_cache.begin_refresh(spec):
+            background_tasks.add_task(refresh_forecast, spec)
+        log.info(f"Serving stale snapshot forecast for site {spec.site_id}")
+        status_value = "stale"
+    metrics.increment("snapshot", status_value)
+    response.headers["Age"] = str(int(entry.age))
+    response.headers[CACHE_STATUS_HEADER] = status_value
+    response.headers[VERSION_HEADER] = entry.version
+
+    if not raw:
+        return [
+            ForecastDataPoint.model_validate(row) for row in json.loads(bytes(body))
+        ]
+
+    # The stored bytes are the body; headers set on `response` by
+    # dependencies are not applied to a returned Response, so copy them
+    stored = Response(content=bytes(body), media_type="application/json")
+    for name, value in response.headers.items():
+        if name != "content-length":
+            stored.headers[name] = value
+    return stored
+
+
+def versioned(
+    spec: ForecastSpec, forecast: List[ForecastDataPoint], response: Response
+) -> List[ForecastDataPoint]:
+    """Records the forecast's version and names it in the response headers"""
+    response.headers[VERSION_HEADER] = forecast_versions.record(spec, forecast)
+    return forecast
+
+
+@usgs_router.post(
+    "/forecast/delta",
+    response_model=ForecastDelta,
+    dependencies=[Depends(rate_limit)],
+    responses={
+        400: {"description": "Invalid request parameters"},
+        429: {"description": "Rate limit or fit quota exceeded"},
+        502: {"description": "Error communicating with USGS API"},
+    },
+)
+async def forecast_delta(
+    request: USGSForecastDeltaRequest,
+    http_request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    fit_deadline: Optional[float] = Header(
+        default=None,
+        alias=FIT_DEADLINE_HEADER,
+        gt=0,
+        description="Seconds the model fit may take; can only lower the server default",
+    ),
+) -> ForecastDelta:
+    """Get only the forecast rows that changed since a version the client holds
+
+    Served exactly like `POST /usgs/forecast`, then diffed by row index
+    against `base_version`. If that version is no longer held, or most rows
+    changed, every row is returned with `full` set. Apply a delta by
+    dropping the `removed` indices, replacing held rows with the same index
+    as a change and inserting the other changes at their position.
+    """
+    spec = forecast_spec(request)
+    routed = await site_affinity.route(spec.site_id, http_request)
+    if routed is not None:
+        return routed
+
+    site_demand.record(spec)
+    forecast_result = await serve_forecast(
+        spec, response, background_tasks, fit_deadline
+    )
+    delta = forecast_versions.delta(spec, forecast_result, request.base_version)
+    if request.base_version and delta.full:
+        log.info(
+            f"Sending full forecast for site {spec.site_id} "
+            f"instead of a delta from {request.base_version}"
         )
-    except ConnectionError as e:
-        log.error(f"Failed to connect to USGS API: {e}")
+    return delta
+
+
+@usgs_router.post(
+    "/forecast/parameters",
+    response_model=Dict[str, List[ForecastDataPoint]],
+    dependencies=[Depends(rate_limit)],
+    responses={
+        400: {"description": "Invalid request parameters"},
+        429: {"description": "Rate limit or fit quota exceeded"},
+        500: {"description": "Internal server error"},
+        502: {"description": "Error communicating with USGS API"},
+    },
+)
+async def forecast_parameters(
+    request: USGSMultiParameterForecastRequest,
+    http_request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    fit_deadline: Optional[float] = Header(
+        default=None,
+        alias=FIT_DEADLINE_HEADER,
+        gt=0,
+        description="Seconds the model fit may take; can only lower the server default",
+    ),
+) -> Dict[str, List[ForecastDataPoint]]:
+    """Generate forecasts for several parameters of one USGS site
+
+    Each parameter is cached like a `POST /usgs/forecast` request for it.
+    Parameters without a cached forecast have their history fetched in one
+    USGS request and are fitted in parallel, at most as many at once as the
+    client's fit quota allows. `X-Forecast-Fallback` lists any parameter
+    whose fit overran its deadline, as `code=fallback`.
+
+    Returns:
+        Each parameter's forecast, keyed by its code
+    """
+    log.info(
+        f"Forecast request for site {request.site_id}, "
+        f"parameters {','.join(request.reading_parameters)}"
+    )
+
+    specs = {
+        reading_parameter: forecast_spec(request.parameter_request(reading_parameter))
+        for reading_parameter in request.reading_parameters
+    }
+    routed = await site_affinity.route(request.site_id, http_request)
+    if routed is not None:
+        return routed
+
+    results: Dict[str, List[ForecastDataPoint]] = {}
+    missing: Dict[str, ForecastSpec] = {}
+    for reading_parameter, spec in specs.items():
+        site_demand.record(spec)
+        entry = forecast_cache.get(spec)
+        if entry is None:
+            missing[reading_parameter] = spec
+            continue
+        if entry.is_fresh:
+            site_demand.record_hit(spec)
+        elif forecast_cache.begin_refresh(spec):
+            background_tasks.add_task(refresh_forecast, spec)
+        results[reading_parameter] = entry.value
+
+    if missing:
+        window = next(iter(missing.values()))
+        try:
+            histories = await asyncio.to_thread(
+                get_cleaned_histories,
+                request.site_id,
+                list(missing),
+                window.start_date,
+                window.end_date,
+            )
+        except Exception as e:
+            raise forecast_http_exception(e)
+
+        deadline = resolve_fit_deadline(fit_deadline)
+        # Start no more fits at once than the client may have in flight, so
+        # asking for more parameters than that does not trip its own quota
+        fits = asyncio.Semaphore(fit_scheduler.max_per_client)
+
+        async def fit(reading_parameter: str, spec: ForecastSpec) -> ForecastRun:
+            async with fits:
+                return await asyncio.to_thread(
+                    run_forecast,
+                    spec,
+                    fit_deadline=deadline,
+                    history=histories[reading_parameter],
+                )
+
+        runs = await asyncio.gather(
+            *(
+                fit(reading_parameter, spec)
+                for reading_parameter, spec in missing.items()
+            )
+        )
+        fallbacks = []
+        for reading_parameter, run in zip(missing, runs):
+            results[reading_parameter] = run.result
+            if run.fallback is not None:
+                fallbacks.append(f"{reading_parameter}={run.fallback}")
+        if fallbacks:
+            response.headers[FALLBACK_HEADER] = ", ".join(fallbacks)
+
+    return {p: results[p] for p in request.reading_parameters}
+
+
+@usgs_router.post(
+    "/forecast/jobs",
+    response_model=ForecastJob,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(rate_limit)],
+    responses={429: {"description": "Rate limit exceeded"}},
+)
+async def submit_forecast_job(request: USGSFlowForecastRequest) -> ForecastJob:
+    """Queue a flow forecast to run in the background
+
+    Submitting a request that resolves to the same forecast while a matching job
+    is queued, running or finished within the cache TTL returns that job
+    instead of a new one.
+
+    Args:
+        request: Forecast request with site_id, reading_parameter, and optional date range
+
+    Returns:
+        The queued (or existing) job; poll `GET /usgs/forecast/jobs/{job_id}` for the result
+    """
+    spec = forecast_spec(request)
+    site_demand.record(spec)
+
+    return forecast_jobs.submit(
+        spec,
+        lambda: run_forecast(spec, fit_deadline=config.fit_deadline_seconds).result,
+    )
+
+
+@usgs_router.get(
+    "/forecast/jobs/{job_id}",
+    response_model=ForecastJob,
+    responses={404: {"description": "Job not found or expired"}},
+)
+async def get_forecast_job(job_id: str) -> ForecastJob:
+    """Get the status, and once finished the result, of a forecast job"""
+    job = forecast_jobs.get(job_id)
+    if job is None:
         raise HTTPException(
-            status_code=status.HTTP_502_BAD_GATEWAY,
-            detail=f"Failed to fetch data from USGS API: {str(e)}",
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Forecast job {job_id} not found or expired",
         )
-    except KeyError as e:
-        log.error(f"Unexpected USGS API response structure: {e}")
+    return job
+
+
+def validate_site_ids(site_ids: List[str], limit: int) -> List[str]:
+    """Dedupes a list of site IDs, preserving order
+
+    Raises:
+        HTTPException: 400 if there are more than `limit` or any is malformed
+    """
+    site_ids = list(dict.fromkeys(site_ids))
+    if len(site_ids) > limit:
         raise HTTPException(
-            status_code=status.HTTP_502_BAD_GATEWAY,
-            detail="Received unexpected response from USGS API",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {limit} sites per request",
         )
-    except Exception as e:
-        log.error(f"Unexpected error generating forecast: {e}", exc_info=True)
+    invalid = [s for s in site_ids if not _SITE_ID.fullmatch(s)]
+    if invalid:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="An unexpected error occurred while generating the forecast",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"site_id must be 8-15 digits: {', '.join(invalid)}",
+        )
+    return site_ids
+
+
+def flow_percentile(
+    site_id: str, reading_parameter: str, site: SitePercentiles
+) -> FlowPercentile:
+    ranking = site.rank()
+    if ranking is None:
+        return FlowPercentile(
+            site_id=site_id,
+            reading_parameter=reading_parameter,
+            error="No readings available for this site",
+        )
+    return FlowPercentile(
+        site_id=site_id,
+        reading_parameter=reading_parameter,
+        date=ranking.day.astype(object),
+        value=ranking.value,
+        percentile=ranking.percentile,
+        years=ranking.years,
+        median=ranking.median,
+        flow_class=(
+            flow_class(ranking.percentile) if ranking.percentile is not None else None
+        ),
+    )
+
+
+@usgs_router.get(
+    "/percentiles",
+    response_model=List[FlowPercentile],
+    dependencies=[Depends(rate_limit)],
+    responses={
+        400: {"description": "Invalid request parameters"},
+        429: {"description": "Rate limit exceeded"},
+    },
+)
+async def flow_percentiles(
+    site_id: List[str] = Query(description="One or more USGS site IDs"),
+    reading_parameter: str = Query(default="00060", pattern=r"^\d{5}$"),
+) -> List[FlowPercentile]:
+    """How each site's latest reading ranks against the same day in earlier years
+
+    Sites already loaded are answered from memory; others have their history
+    fetched once, concurrently. A site that cannot be loaded is returned with
+    `error` set rather than failing the whole request.
+    """
+    site_ids = validate_site_ids(site_id, MAX_PERCENTILE_SITES)
+
+    async def rank(site_id: str) -> FlowPercentile:
+        key = (site_id, reading_parameter)
+        site = percentile_store.get(key)
+        if site is not None and not percentile_store.needs_refresh(key):
+            return flow_percentile(site_id, reading_parameter, site)
+
+        try:
+            site = await asyncio.to_thread(site_percentiles, site_id, reading_parameter)
+        except Exception as e:
+            return FlowPercentile(
+                site_id=site_id,
+                reading_parameter=reading_parameter,
+                error=forecast_http_exception(e).detail,
+            )
+        return flow_percentile(site_id, reading_parameter, site)
+
+    return list(await asyncio.gather(*(rank(s) for s in site_ids)))
+
+
+async def forecast_events(
+    request: Request, subscription: Subscription
+) -> AsyncIterator[str]:
+    """Server-Sent Events stream of a subscription's updates
+
+    Each update is a `forecast` event whose data is a ForecastUpdate; a
+    comment line is sent when idle so proxies keep the connection open.
+    """
+    try:
+        while not await request.is_disconnected():
+            updates = await subscription.next(config.subscription_keepalive_seconds)
+            if not updates:
+                yield ": keepalive\n\n"
+            for update in updates:
+                yield f"event: forecast\ndata: {update.model_dump_json()}\n\n"
+    finally:
+        forecast_broker.unsubscribe(subscription)
+
+
+@usgs_router.get(
+    "/forecast/subscribe",
+    response_class=StreamingResponse,
+    dependencies=[Depends(rate_limit)],
+    responses={
+        200: {"content": {"text/event-stream": {}}},
+        400: {"description": "Invalid request parameters"},
+        429: {"description": "Rate limit exceeded"},
+    },
+)
+async def subscribe_forecasts(
+    request: Request,
+    site_id: List[str] = Query(description="One or more USGS site IDs"),
+    reading_parameter: str = Query(default="00060", pattern=r"^\d{5}$"),
+    horizon_days: Optional[int] = Query(default=None, ge=1, le=366),
+    only_future: bool = Query(default=False),
+) -> StreamingResponse:
+    """Stream forecast updates for a set of sites as Server-Sent Events
+
+    Cached forecasts are sent straight away and up to
+    `subscription_max_queued_forecasts` missing ones are queued as jobs;
+    the rest wait for another request or the update poller to produce
+    them. After that an event is sent whenever any request, job or the
+    update poller produces a new forecast for a watched site, so clients no
+    longer need to poll `/usgs/forecast`.
+    """
+    site_ids = validate_site_ids(site_id, config.subscription_max_sites)
+    specs = [
+        forecast_spec(
+            USGSFlowForecastRequest(
+                site_id=s,
+                reading_parameter=reading_parameter,
+                horizon_days=horizon_days,
+                only_future=only_future,
+            )
         )
+        for s in site_ids
+    ]
+
+    # One request takes one rate-limit token, so it may only queue a few fits
+    queue_budget = config.subscription_max_queued_forecasts
+    subscription = forecast_broker.subscribe(specs)
+    for spec in specs:
+        entry = forecast_cache.get(spec)
+        if entry is not None:
+            subscription.deliver(spec, forecast_update(spec, entry.value))
+            continue
+
+        job = forecast_jobs.find(spec)
+        if job is None:
+            if queue_budget == 0:
+                continue
+            queue_budget -= 1
+            job = forecast_jobs.submit(
+                spec,
+                lambda spec=spec: (
+                    run_forecast(spec, fit_deadline=config.fit_deadline_seconds).result
+                ),
+            )
+        # A job that already succeeded is not rerun, so send its result
+        if job.status == ForecastJobStatus.succeeded and job.result is not None:
+            subscription.deliver(spec, forecast_update(spec, job.result))
+
+    return StreamingResponse(
+        forecast_events(request, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
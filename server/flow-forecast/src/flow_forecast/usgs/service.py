@@ -9,12 +9,47 @@ import pandas as pd
 import urllib3
 from prophet import Prophet
 
-base_usgs_url = "http://waterservices.usgs.gov/nwis/dv/?format=json"
+from .. import tracing
+from ..circuit_breaker import CircuitBreaker
+from ..config import config
+from ..drivers.base import daily_frame
+from ..drivers.service import load_history
+from ..fit_pool import fit_pool
+from ..numpy_backend import NumpyProphet
+from ..percentiles import SitePercentiles, percentile_store
+from ..ratelimit import fit_scheduler
+from .recorder import usgs_recorder
+
+base_usgs_url = f"{config.usgs_base_url}?format=json"
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
 
+class FitDeadlineExceeded(Exception):
+    """Raised when a Prophet fit runs past its deadline
+
+    Carries the cleaned training data so callers can build a cheaper
+    fallback forecast without refetching it.
+    """
+
+    def __init__(self, deadline: float, history: pd.DataFrame):
+        super().__init__(f"Forecast fit exceeded its {deadline:.1f}s deadline")
+        self.deadline = deadline
+        self.history = history
+
+    def __reduce__(self):
+        # Lets the exception cross the fit pool's process boundary
+        return (self.__class__, (self.deadline, self.history))
+
+
+usgs_breaker = CircuitBreaker(
+    name="usgs",
+    failure_threshold=config.usgs_breaker_failure_threshold,
+    reset_timeout=config.usgs_breaker_reset_seconds,
+)
+
+
 def get_daily_average_data(
     site_id: str,
     reading_parameter: str,
@@ -23,61 +58,147 @@ def get_daily_average_data(
 ) -> list[dict]:
     """Calls USGS api to get daily average values in the given date range
 
+    Upstream failures (transport errors and 5xx responses) are counted by
+    `usgs_breaker`; once it opens, calls fail fast until it resets.
+
     Raises:
         ValueError: If site_id or reading_parameter are invalid
-        ConnectionError: If USGS API is unreachable
+        ConnectionError: If USGS API is unreachable or the circuit is open
         KeyError: If API response structure is unexpected
     """
-    if not site_id or not site_id.strip():
-        raise ValueError("site_id cannot be empty")
+    return get_daily_average_data_by_parameter(
+        site_id, [reading_parameter], start_date, end_date
+    )[reading_parameter]
 
-    if not reading_parameter or not reading_parameter.strip():
-        raise ValueError("reading_parameter cannot be empty")
 
-    url = f"{base_usgs_url}&site={site_id}&startDT={start_date}&endDT={end_date}&parameterCd={reading_parameter}"  # noqa: E501
-
-    log.info(f"Fetching USGS data for site {site_id}, parameter {reading_parameter}")
+def get_daily_average_data_by_parameter(
+    site_id: str,
+    reading_parameters: list[str],
+    start_date: datetime.date,
+    end_date: datetime.date,
+) -> dict[str, list[dict]]:
+    """Fetches daily average values for several parameters in one USGS call
 
-    try:
-        http = urllib3.PoolManager(timeout=urllib3.Timeout(connect=10.0, read=30.0))
-        response = http.request("GET", url)
+    Each time series in the response is matched to its parameter by its
+    variable code, so the order USGS returns them in does not matter.
 
-        if response.status != 200:
-            log.error(f"USGS API returned status {response.status}")
-            raise ConnectionError(
-                f"USGS API request failed with status {response.status}"
-            )
+    Returns:
+        Each requested parameter's values; empty for a parameter USGS has
+        no series for
 
-        response_json = json.loads(response.data.decode("utf-8"))
+    Raises:
+        ValueError: If site_id or a reading_parameter is invalid
+        ConnectionError: If USGS API is unreachable or the circuit is open
+        KeyError: If API response structure is unexpected
+    """
+    if not site_id or not site_id.strip():
+        raise ValueError("site_id cannot be empty")
 
-        # Validate response structure
-        if "value" not in response_json:
-            log.error("Unexpected API response structure: missing 'value' key")
-            raise KeyError("API response missing 'value' field")
+    if not reading_parameters or not all(p and p.strip() for p in reading_parameters):
+        raise ValueError("reading_parameter cannot be empty")
 
-        time_series = response_json["value"].get("timeSeries", [])
-        if not time_series or len(time_series) == 0:
-            log.warning(f"No time series data found for site {site_id}")
-            return []
+    parameters = ",".join(reading_parameters)
+    url = f"{base_usgs_url}&site={site_id}&startDT={start_date}&endDT={end_date}&parameterCd={parameters}"  # noqa: E501
 
-        values = time_series[0].get("values", [])
-        if not values or len(values) == 0:
-            log.warning(f"No values found in time series for site {site_id}")
-            return []
+    log.info(f"Fetching USGS data for site {site_id}, parameter {parameters}")
 
-        data = values[0].get("value", [])
-        log.info(f"Successfully fetched {len(data)} data points")
-        return data
+    with tracing.span(
+        "usgs.fetch",
+        site_id=site_id,
+        reading_parameter=parameters,
+        start_date=str(start_date),
+        end_date=str(end_date),
+    ) as span:
+        usgs_breaker.check()
+
+        try:
+            if usgs_recorder.replaying:
+                response = usgs_recorder.replay(url)
+            else:
+                http = urllib3.PoolManager(
+                    timeout=urllib3.Timeout(connect=10.0, read=30.0)
+                )
+                try:
+                    response = http.request("GET", url)
+                except urllib3.exceptions.HTTPError:
+                    usgs_breaker.record_failure()
+                    raise
+                usgs_recorder.record(url, response.status, response.data)
+            span.set_attribute("http.status_code", response.status)
+
+            if response.status >= 500:
+                usgs_breaker.record_failure()
+            else:
+                usgs_breaker.record_success()
+
+            if response.status != 200:
+                log.error(f"USGS API returned status {response.status}")
+                raise ConnectionError(
+                    f"USGS API request failed with status {response.status}"
+                )
+
+            response_json = json.loads(response.data.decode("utf-8"))
+
+            # Validate response structure
+            if "value" not in response_json:
+                log.error("Unexpected API response structure: missing 'value' key")
+                raise KeyError("API response missing 'value' field")
+
+            time_series = response_json["value"].get("timeSeries", [])
+            if not time_series or len(time_series) == 0:
+                log.warning(f"No time series data found for site {site_id}")
+
+            data = split_time_series(time_series, reading_parameters)
+            for reading_parameter, values in data.items():
+                if time_series and not values:
+                    log.warning(
+                        f"No values found in time series for site {site_id}, "
+                        f"parameter {reading_parameter}"
+                    )
+            total = sum(len(values) for values in data.values())
+            span.set_attribute("rows", total)
+            log.info(f"Successfully fetched {total} data points")
+            return data
+
+        except json.JSONDecodeError as e:
+            log.error(f"Failed to parse USGS API response as JSON: {e}")
+            raise ValueError(f"Invalid JSON response from USGS API: {e}")
+        except urllib3.exceptions.HTTPError as e:
+            log.error(f"HTTP error connecting to USGS API: {e}")
+            raise ConnectionError(f"Failed to connect to USGS API: {e}")
+        except Exception as e:
+            log.error(f"Unexpected error fetching USGS data: {e}")
+            raise
+
+
+def split_time_series(
+    time_series: list[dict], reading_parameters: list[str]
+) -> dict[str, list[dict]]:
+    """Picks each parameter's values out of a response's time series
+
+    Series are keyed by their variable code. A series without one is taken
+    as the parameter's only when a single parameter was requested. If a
+    parameter has several series (e.g. more than one sensor) the first is
+    used.
+    """
+    data: dict[str, list[dict]] = {p: [] for p in reading_parameters}
+    matched: set[str] = set()
+    for series in time_series:
+        codes = series.get("variable", {}).get("variableCode", [])
+        if codes:
+            reading_parameter = codes[0].get("value")
+        elif len(reading_parameters) == 1:
+            reading_parameter = reading_parameters[0]
+        else:
+            continue
+        if reading_parameter not in data or reading_parameter in matched:
+            continue
 
-    except json.JSONDecodeError as e:
-        log.error(f"Failed to parse USGS API response as JSON: {e}")
-        raise ValueError(f"Invalid JSON response from USGS API: {e}")
-    except urllib3.exceptions.HTTPError as e:
-        log.error(f"HTTP error connecting to USGS API: {e}")
-        raise ConnectionError(f"Failed to connect to USGS API: {e}")
-    except Exception as e:
-        log.error(f"Unexpected error fetching USGS data: {e}")
-        raise
+        matched.add(reading_parameter)
+        values = series.get("values", [])
+        if values:
+            data[reading_parameter] = values[0].get("value", [])
+    return data
 
 
 # DELETED: clean_data() was identical to get_cleaned_data() below
@@ -104,103 +225,399 @@ def format_season_average_data(json_data: dict) -> pd.DataFrame:
     return data_frame
 
 
-current_year = dt.date.today().year
-# Only train forecast from data from the last x years.
-# This *should* be a parameter that can be set by the user, but for now we'll hardcode it.
-x_years_ago = current_year - 5
+def parse_daily_values(json_data: list[dict]) -> tuple[np.ndarray, np.ndarray]:
+    """Days (datetime64[D]) and float values of USGS daily value records
+
+    Parses straight into typed arrays; dateTime is ISO 8601, so the first ten
+    characters are the day.
+    """
+    days = np.fromiter(
+        (row["dateTime"][:10] for row in json_data),
+        dtype="datetime64[D]",
+        count=len(json_data),
+    )
+    values = np.fromiter(
+        (row["value"] for row in json_data), dtype=np.float64, count=len(json_data)
+    )
+    return days, values
+
 
-start_date = dt.date(x_years_ago, 1, 1)
+def site_percentiles(
+    site_id: str, reading_parameter: str, today: dt.date | None = None
+) -> SitePercentiles:
+    """Returns a site's day-of-year history, loading or topping it up from USGS
+
+    The first request for a site fetches `percentile_history_years` of
+    history. After that, once the site is older than
+    `percentile_refresh_seconds`, only the days from its latest reading on
+    are fetched and folded in. If that top-up fails the existing history is
+    served and the next request retries.
+
+    Raises:
+        ValueError, ConnectionError, KeyError: As get_daily_average_data, when
+            the site has no history loaded yet
+    """
+    key = (site_id, reading_parameter)
+    site = percentile_store.get(key)
+    if site is not None and not percentile_store.needs_refresh(key):
+        return site
+
+    with percentile_store.lock_for(key):
+        site = percentile_store.get(key)
+        if site is not None and not percentile_store.needs_refresh(key):
+            return site
+
+        today = today or dt.date.today()
+        if site is None or site.latest_day is None:
+            start = dt.date(today.year - config.percentile_history_years, 1, 1)
+            with tracing.span("percentiles.load", site_id=site_id) as span:
+                days, values = parse_daily_values(
+                    get_daily_average_data(site_id, reading_parameter, start, today)
+                )
+                site = SitePercentiles(days, values)
+                span.set_attribute("rows", len(site))
+            percentile_store.put(key, site)
+            log.info(f"Loaded {len(site)} days of percentile history for {site_id}")
+            return site
+
+        start = site.latest_day.astype(dt.date)
+        with tracing.span("percentiles.refresh", site_id=site_id) as span:
+            try:
+                days, values = parse_daily_values(
+                    get_daily_average_data(site_id, reading_parameter, start, today)
+                )
+            except (ValueError, ConnectionError, KeyError) as e:
+                log.warning(f"Keeping percentile history for {site_id}: {e}")
+                return site
+
+            order = np.argsort(days, kind="stable")
+            added = sum(
+                site.observe(day, value)
+                for day, value in zip(days[order], values[order].tolist())
+            )
+            span.set_attribute("rows", added)
+        percentile_store.mark_checked(key)
+        return site
+
+
+def resolve_training_window(
+    end_date: dt.date | None = None, today: dt.date | None = None
+) -> tuple[dt.date, dt.date]:
+    """Returns the canonical (start, end) history window for a forecast
+
+    Recomputed on every call so the window follows the calendar across year
+    rollover. The start is always January 1st `training_window_years` before
+    the current year; client start dates are deliberately not part of the
+    window so requests share fits and cache entries. The end is the client's
+    end date, capped to the end of the current year.
+
+    Raises:
+        ValueError: If end_date falls before the training window
+    """
+    today = today or dt.date.today()
+    start = dt.date(today.year - config.training_window_years, 1, 1)
+    year_end = dt.date(today.year, 12, 31)
+    end = min(end_date, year_end) if end_date else year_end
+
+    if end < start:
+        raise ValueError(f"end_date must be on or after {start}")
+
+    return start, end
+
+
+def limit_training_rows(historic_data: pd.DataFrame, max_rows: int) -> pd.DataFrame:
+    """Thins older history so a Prophet fit stays within the row budget
+
+    Fit time grows with the number of observations, so the most recent year
+    is kept at daily resolution and older observations are subsampled at an
+    even stride to fill the rest of the budget.
+
+    Args:
+        historic_data: Training data with 'ds' and 'y' columns
+        max_rows: Maximum number of observations to fit
+
+    Returns:
+        The training data, unchanged if already within budget. Its last row
+        is always kept, observed or not, since the forecast starts the day
+        after it
+    """
+    observed = historic_data.dropna(subset=["y"])
+    if len(observed) <= max_rows:
+        return historic_data
+
+    recent_rows = min(366, max_rows)
+    recent = observed.iloc[-recent_rows:]
+    older = observed.iloc[:-recent_rows]
+    # An unobserved last day, such as an ice-affected reading cleaned to NaN
+    last_row = historic_data.iloc[-1:]
+    unobserved_tail = last_row.iloc[:0] if last_row["y"].notna().all() else last_row
+
+    budget = max_rows - recent_rows
+    if budget <= 0 or older.empty:
+        return pd.concat([recent, unobserved_tail])
+
+    stride = -(-len(older) // budget)  # ceiling division
+    log.info(
+        f"Downsampling {len(older)} older observations by {stride} "
+        f"to fit budget of {max_rows} rows"
+    )
+    return pd.concat([older.iloc[::stride], recent, unobserved_tail])
+
+
+def get_cleaned_histories(
+    site_id: str,
+    reading_parameters: list[str],
+    start_date: dt.date,
+    end_date: dt.date,
+) -> dict[str, pd.DataFrame]:
+    """Fetches several parameters for a site in one call and cleans each
+
+    Returns:
+        Each parameter's history in the shape get_cleaned_data returns, ready
+        to pass to generate_prophet_forecast as `history`
+
+    Raises:
+        ValueError: If USGS has no data for one of the parameters
+        ConnectionError: If USGS API is unreachable or the circuit is open
+    """
+    site_data = get_daily_average_data_by_parameter(
+        site_id, reading_parameters, start_date, end_date
+    )
+    histories = {}
+    for reading_parameter, rows in site_data.items():
+        if not rows:
+            raise ValueError(
+                f"No data available for site {site_id}, parameter {reading_parameter}"
+            )
+        histories[reading_parameter] = get_cleaned_data(rows)
+    return histories
 
 
 def generate_prophet_forecast(
-    site_id: str, reading_parameter: str, start_date: dt.date, end_date: dt.date
+    site_id: str,
+    reading_parameter: str,
+    start_date: dt.date,
+    end_date: dt.date,
+    fit_deadline: float | None = None,
+    horizon_days: int | None = None,
+    only_future: bool = False,
+    source: str = "usgs",
+    history: pd.DataFrame | None = None,
 ) -> pd.DataFrame:
     """Given a site, model, and length, returns a forecast DataFrame using fbprophet
 
     Args:
-        site_id: USGS site identifier
-        reading_parameter: USGS parameter code (e.g., '00060' for discharge)
+        site_id: Site identifier at `source`
+        reading_parameter: USGS parameter code (e.g., '00060' for discharge);
+            other sources forecast their driver's reading_parameter
         start_date: Start date for historical data
         end_date: End date for forecast
+        fit_deadline: Seconds the Prophet fit may run before it is cancelled
+        horizon_days: Days to forecast past the last reading; defaults to the
+            rest of the year
+        only_future: Omit this year's past readings from the output
+        source: "usgs", or the source of a gauge driver to fetch history with
+        history: Cleaned history already fetched for this site, in the
+            shape get_cleaned_data returns; skips the fetch
 
     Returns:
         DataFrame with past_value, forecast, and error bounds indexed by date (M/D format)
 
     Raises:
         ValueError: If no data available or date range is invalid
+        FitDeadlineExceeded: If the fit ran past `fit_deadline`
+        FitQuotaExceeded: If the current client already has its maximum
+            number of fits running or waiting
     """
     log.info(f"Generating forecast for site {site_id} from {start_date} to {end_date}")
 
     # Fetch and clean data
-    site_data = get_daily_average_data(
-        site_id=site_id,
-        reading_parameter=reading_parameter,
-        start_date=start_date,
-        end_date=end_date,
-    )
+    if history is not None:
+        clean_data = history.copy()
+    elif source == "usgs":
+        site_data = get_daily_average_data(
+            site_id=site_id,
+            reading_parameter=reading_parameter,
+            start_date=start_date,
+            end_date=end_date,
+        )
 
-    if not site_data:
-        raise ValueError(f"No data available for site {site_id}")
+        if not site_data:
+            raise ValueError(f"No data available for site {site_id}")
 
-    clean_data = get_cleaned_data(site_data)
+        clean_data = get_cleaned_data(site_data)
+        del site_data
+    else:
+        clean_data = load_history(source, site_id, start_date, end_date)
 
     if clean_data.empty:
         raise ValueError(f"No valid data after cleaning for site {site_id}")
 
     clean_data.columns = ["ds", "y"]
 
-    # Generate forecast for remaining days in current year
-    forecast_df = generate_forecast(clean_data)
+    # Generate forecast for the requested horizon (default: rest of the year),
+    # on a fit pool worker when the pool is running. Fits wait for a slot
+    # granted round-robin across clients
+    fit = fit_pool.generate_forecast if fit_pool.running else generate_forecast
+    with fit_scheduler.slot():
+        forecast_df = fit(
+            limit_training_rows(clean_data, config.fit_max_rows),
+            fit_deadline=fit_deadline,
+            horizon_days=horizon_days,
+        )
 
-    # Filter historic data to current year only
-    today = dt.date.today()
-    current_year_start = dt.datetime(today.year, 1, 1)
-    historic_df = clean_data[clean_data["ds"] >= current_year_start].copy()
-    historic_df = historic_df.drop("ds", axis=1)
-    historic_df.columns = ["past_value"]
+    final_df = build_forecast_output(
+        clean_data, forecast_df, horizon_days=horizon_days, only_future=only_future
+    )
 
-    forecast_df.columns = ["forecast", "lower_error_bound", "upper_error_bound"]
+    # Clean up intermediate DataFrames to prevent memory leaks in long-running server
+    # These can be substantial in size and Python's GC won't necessarily clean them
+    # up promptly between requests in resource-constrained environments
+    del clean_data, forecast_df
+    gc.collect()
 
-    # Concatenate historic and forecast data
-    final_df = pd.concat([historic_df, forecast_df], ignore_index=True)
+    return final_df
 
-    # Create date range for current year
-    year_start = dt.date(today.year, 1, 1)
-    year_end = dt.date(today.year, 12, 31)
-    dates = pd.date_range(start=year_start, end=year_end)
 
-    # Validate that we have the right amount of data
-    if len(final_df) != len(dates):
-        log.warning(
-            f"Data length mismatch: {len(final_df)} rows but {len(dates)} days in year. "
-            f"Historic: {len(historic_df)}, Forecast: {len(forecast_df)}"
-        )
+def generate_fallback_forecast(
+    historic_data: pd.DataFrame,
+    horizon_days: int | None = None,
+    only_future: bool = False,
+) -> pd.DataFrame:
+    """Builds the forecast output from a climatology forecast instead of Prophet
 
-        # Pad or trim to match year length
-        if len(final_df) < len(dates):
-            # Pad with NaN rows
-            padding_needed = len(dates) - len(final_df)
-            padding_df = pd.DataFrame(
-                {col: [np.nan] * padding_needed for col in final_df.columns}
-            )
-            final_df = pd.concat([final_df, padding_df], ignore_index=True)
-        else:
-            # Trim excess rows
-            final_df = final_df.iloc[: len(dates)]
+    Used when a Prophet fit overruns its deadline.
 
-    final_df.index = [date.strftime("%-m/%-d") for date in dates]
+    Args:
+        historic_data: Cleaned training data with 'ds' and 'y' columns
+        horizon_days: Days to forecast past the last reading
+        only_future: Omit this year's past readings from the output
 
-    log.info(f"Generated forecast with {len(final_df)} data points")
+    Returns:
+        DataFrame in the same shape as generate_prophet_forecast
+    """
+    return build_forecast_output(
+        historic_data,
+        generate_climatology_forecast(historic_data, horizon_days=horizon_days),
+        horizon_days=horizon_days,
+        only_future=only_future,
+    )
 
-    # Clean up intermediate DataFrames to prevent memory leaks in long-running server
-    # These can be substantial in size and Python's GC won't necessarily clean them
-    # up promptly between requests in resource-constrained environments
-    del site_data, clean_data, forecast_df, historic_df
-    gc.collect()
+
+def build_forecast_output(
+    clean_data: pd.DataFrame,
+    forecast_df: pd.DataFrame,
+    horizon_days: int | None = None,
+    only_future: bool = False,
+) -> pd.DataFrame:
+    """Joins this year's history with the forecast, indexed by date (M/D)
+
+    Without a horizon the output covers every day of the current year, with
+    NaN where there is neither a reading nor a forecast. With a horizon it
+    covers only this year's readings followed by the forecast days. Either
+    way `only_future` drops the readings. When the output runs into another
+    year, such as a horizon past December 31, every label carries its year
+    (M/D/YYYY) so no two rows share an index.
+
+    The output is a single preallocated float64 array filled in place from
+    the history and forecast.
+
+    Args:
+        clean_data: Cleaned history with 'ds' and 'y' columns
+        forecast_df: Forecast with 'yhat', 'yhat_lower' and 'yhat_upper'
+            columns, one row per day following the last reading
+        horizon_days: The horizon the forecast was generated for
+        only_future: Omit this year's past readings
+
+    Returns:
+        DataFrame with past_value, forecast, and error bounds indexed by date
+        (M/D format, or M/D/YYYY when spanning years)
+    """
+    today = dt.date.today()
+    year_start = np.datetime64(today.replace(month=1, day=1), "D")
+    year_end = np.datetime64(today.replace(month=12, day=31), "D")
+
+    # History is sorted by day, so this year's readings are a tail slice;
+    # slicing the column arrays avoids touching the decades before it
+    all_days = clean_data["ds"].to_numpy()
+    first_this_year = all_days.searchsorted(year_start.astype(all_days.dtype))
+    history_days = all_days[first_this_year:].astype("datetime64[D]")
+    history_values = clean_data["y"].to_numpy(np.float64)[first_this_year:]
+
+    forecast_start = all_days[-1].astype("datetime64[D]") + np.timedelta64(1, "D")
+    forecast_end = forecast_start + np.timedelta64(len(forecast_df) - 1, "D")
+
+    # Output covers [start, end]; see the docstring for the cases
+    if horizon_days is None:
+        start = max(year_start, forecast_start) if only_future else year_start
+        end = year_end
+    elif only_future:
+        start, end = forecast_start, forecast_end
+    else:
+        start = history_days[0] if len(history_days) else forecast_start
+        end = forecast_end
+
+    length = max(int((end - start).astype(np.int64)) + 1, 0)
+    output = np.full((length, 4), np.nan)
+
+    if not only_future:
+        offsets = (history_days - start).astype(np.int64)
+        in_range = (offsets >= 0) & (offsets < length)
+        output[offsets[in_range], 0] = history_values[in_range]
+
+    offsets = int((forecast_start - start).astype(np.int64)) + np.arange(
+        len(forecast_df)
+    )
+    in_range = (offsets >= 0) & (offsets < length)
+    output[offsets[in_range], 1:] = forecast_df[
+        ["yhat", "yhat_lower", "yhat_upper"]
+    ].to_numpy(np.float64)[in_range]
+
+    final_df = pd.DataFrame(
+        output,
+        index=date_labels(start, length),
+        columns=["past_value", "forecast", "lower_error_bound", "upper_error_bound"],
+        copy=False,
+    )
+
+    log.info(f"Generated forecast with {len(final_df)} data points")
 
     return final_df
 
 
+# 'M/D' label for every day of a leap year, and the offset of each month's
+# first day into it; labels for any date range are gathered from these
+_MONTH_DAY_LABELS = np.array(
+    [f"{day.month}/{day.day}" for day in pd.date_range("2000-01-01", "2000-12-31")],
+    dtype=object,
+)
+_LEAP_MONTH_OFFSETS = np.cumsum([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+
+
+def month_day_labels(start: np.datetime64, length: int) -> np.ndarray:
+    """Returns 'M/D' labels for `length` consecutive days from `start`"""
+    days = start + np.arange(length).astype("timedelta64[D]")
+    month_start = days.astype("datetime64[M]")
+    months = (month_start - days.astype("datetime64[Y]")).astype(np.int64)
+    day_of_month = (days - month_start).astype(np.int64)
+    return _MONTH_DAY_LABELS[_LEAP_MONTH_OFFSETS[months] + day_of_month]
+
+
+def date_labels(start: np.datetime64, length: int) -> np.ndarray:
+    """Returns index labels for `length` consecutive days from `start`
+
+    'M/D' while the days fall in one calendar year; otherwise 'M/D/YYYY',
+    since 'M/D' alone would repeat.
+    """
+    labels = month_day_labels(start, length)
+    end = start + np.timedelta64(max(length - 1, 0), "D")
+    if start.astype("datetime64[Y]") == end.astype("datetime64[Y]"):
+        return labels
+    days = start + np.arange(length).astype("timedelta64[D]")
+    years = days.astype("datetime64[Y]").astype(np.int64) + 1970
+    return labels + "/" + years.astype(str).astype(object)
+
+
 def get_cleaned_data(json_data: list[dict]) -> pd.DataFrame:
     """Given usgs json data, cleans the data and returns a DataFrame
 
@@ -217,54 +634,79 @@ def get_cleaned_data(json_data: list[dict]) -> pd.DataFrame:
         log.warning("Received empty data for cleaning")
         raise ValueError("Cannot clean empty data")
 
-    try:
-        data_frame = pd.DataFrame(json_data)
-
-        # Validate required columns exist
-        required_cols = ["dateTime", "value", "qualifiers"]
-        missing_cols = [col for col in required_cols if col not in data_frame.columns]
-        if missing_cols:
-            raise ValueError(f"Missing required columns: {missing_cols}")
-
-        data_frame = data_frame.drop("qualifiers", axis=1)
-        data_frame["value"] = data_frame["value"].astype(float)
-        data_frame["dateTime"] = pd.to_datetime(data_frame["dateTime"])
-        data_frame.set_index("dateTime", inplace=True)
-        data_frame = data_frame.asfreq("d")  # adds missing day data
-        data_frame.loc[data_frame["value"] <= 0, "value"] = np.nan
-        data_frame = data_frame.reset_index()
-        data_frame = data_frame[["dateTime", "value"]]
-
-        log.info(
-            f"Cleaned data: {len(data_frame)} rows, {data_frame['value'].notna().sum()} valid values"
-        )
-        return data_frame
-
-    except (ValueError, TypeError) as e:
-        log.error(f"Failed to clean data: {e}")
-        raise ValueError(f"Data cleaning failed: {e}")
-    except Exception as e:
-        log.error(f"Unexpected error during data cleaning: {e}")
-        raise
-
-
-def generate_forecast(historic_data: pd.DataFrame) -> pd.DataFrame:
+    with tracing.span("forecast.clean", input_rows=len(json_data)) as span:
+        try:
+            # Validate required columns exist; USGS records share one shape, so
+            # checking the first saves building a frame with the qualifiers lists
+            required_cols = ["dateTime", "value", "qualifiers"]
+            missing_cols = [col for col in required_cols if col not in json_data[0]]
+            if missing_cols:
+                raise ValueError(f"Missing required columns: {missing_cols}")
+
+            # Scatter readings into a preallocated daily array; days with no
+            # reading stay NaN
+            data_frame = daily_frame(*parse_daily_values(json_data))
+
+            valid_rows = int(data_frame["value"].notna().sum())
+            tracing.set_attributes(span, rows=len(data_frame), valid_rows=valid_rows)
+            log.info(f"Cleaned data: {len(data_frame)} rows, {valid_rows} valid values")
+            return data_frame
+
+        except (ValueError, TypeError) as e:
+            log.error(f"Failed to clean data: {e}")
+            raise ValueError(f"Data cleaning failed: {e}")
+        except Exception as e:
+            log.error(f"Unexpected error during data cleaning: {e}")
+            raise
+
+
+def prophet_model(backend: str | None = None) -> Prophet:
+    """An unfitted model with the service's 50% band, on `backend` or the default"""
+    backend = backend or config.fit_backend
+    model_class = NumpyProphet if backend == "numpy" else Prophet
+    return model_class(interval_width=0.50)
+
+
+def generate_forecast(
+    historic_data: pd.DataFrame,
+    fit_deadline: float | None = None,
+    horizon_days: int | None = None,
+) -> pd.DataFrame:
     """Takes in a training set (data - value) and a length to
-    return a forecast DataFrame"""
+    return a forecast DataFrame
+
+    Only `horizon_days` days are predicted when given, otherwise the rest of
+    the year. The model is fit with the `fit_backend` optimizer. When
+    `fit_deadline` is set the optimizer is given that many seconds; past it
+    the fit is stopped and FitDeadlineExceeded is raised.
+    """
 
     # historic_data = historic_data.ffill()  # Fill missing values for a better forecast
     # historic_data = historic_data.bfill()
 
-    model = Prophet(interval_width=0.50)
+    model = prophet_model()
 
     try:
-        model.fit(historic_data)
-        forecast = model.predict(
-            model.make_future_dataframe(
-                periods=get_forecast_length(historic_data.iloc[-1]["ds"].date()),
-                include_history=False,
+        with tracing.span(
+            "forecast.fit",
+            rows=len(historic_data),
+            fit_deadline=fit_deadline,
+            backend=config.fit_backend,
+        ):
+            if fit_deadline is None:
+                model.fit(historic_data)
+            else:
+                try:
+                    model.fit(historic_data, timeout=fit_deadline)
+                except TimeoutError:
+                    log.warning(f"Prophet fit cancelled after {fit_deadline:.1f}s")
+                    raise FitDeadlineExceeded(fit_deadline, historic_data)
+
+        periods = get_forecast_length(historic_data.iloc[-1]["ds"].date(), horizon_days)
+        with tracing.span("forecast.predict", periods=periods):
+            forecast = model.predict(
+                model.make_future_dataframe(periods=periods, include_history=False)
             )
-        )
         forecast = forecast.round()
 
         # Create a copy of just the columns we need to ensure we don't keep
@@ -280,7 +722,45 @@ def generate_forecast(historic_data: pd.DataFrame) -> pd.DataFrame:
         gc.collect()
 
 
-def get_forecast_length(last_data_day: dt.date) -> int:
+def generate_climatology_forecast(
+    historic_data: pd.DataFrame, horizon_days: int | None = None
+) -> pd.DataFrame:
+    """Forecasts each remaining day as the historic median for that day of year
+
+    The 25th and 75th percentiles give the same 50% band Prophet is configured
+    with. This is orders of magnitude cheaper than a Prophet fit.
+
+    Args:
+        historic_data: Training data with 'ds' and 'y' columns
+        horizon_days: Days to forecast; defaults to the rest of the year
+
+    Returns:
+        DataFrame with 'yhat', 'yhat_lower' and 'yhat_upper' columns
+    """
+    last_day = historic_data["ds"].iloc[-1].date()
+    future = pd.date_range(
+        start=last_day + dt.timedelta(days=1),
+        periods=get_forecast_length(last_day, horizon_days),
+    )
+
+    history = historic_data.dropna(subset=["y"])
+    quantiles = (
+        history.groupby(history["ds"].dt.dayofyear)["y"]
+        .quantile([0.25, 0.5, 0.75])
+        .unstack()
+    )
+    quantiles.columns = ["yhat_lower", "yhat", "yhat_upper"]
+
+    # Days never observed (e.g. Feb 29 in a short history) borrow a neighbour
+    result = quantiles.reindex(range(1, 367)).ffill().bfill()
+    result = result.loc[future.dayofyear, ["yhat", "yhat_lower", "yhat_upper"]]
+    return result.reset_index(drop=True).round()
+
+
+def get_forecast_length(last_data_day: dt.date, horizon_days: int | None = None) -> int:
+    if horizon_days is not None:
+        return horizon_days
+
     first_forecast_date = last_data_day + dt.timedelta(days=1)
     return pd.date_range(
         start=first_forecast_date, end=dt.date(first_forecast_date.year, 12, 31)
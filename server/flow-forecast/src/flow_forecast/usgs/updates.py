@@ -0,0 +1,111 @@
+"""Detects new USGS daily values for watched sites and refreshes their forecasts"""
+
+import asyncio
+import datetime as dt
+import logging
+from collections import defaultdict
+from typing import Optional
+
+from fastapi import HTTPException
+
+from ..config import config
+from ..model.forecast_spec import ForecastSpec
+from ..ratelimit import SERVER_CLIENT, current_client
+from ..subscriptions import forecast_broker
+from .router import run_forecast
+from .service import get_daily_average_data
+
+log = logging.getLogger(__name__)
+
+
+class UpdatePoller:
+    """Polls USGS for the latest daily value of every subscribed site
+
+    Only the last `lookback_days` are requested, and each site is fetched
+    once however many specs and subscribers watch it. When a site's latest
+    (day, value) changes, every watched spec for it is re-forecast; the
+    forecast run publishes the result to subscribers. The first poll of a
+    site only records its baseline.
+    """
+
+    def __init__(self, interval_seconds: float, lookback_days: int, concurrency: int):
+        self.interval_seconds = interval_seconds
+        self.lookback_days = lookback_days
+        self._concurrency = concurrency
+        self._last_seen: dict[tuple[str, str], tuple[str, str]] = {}
+
+    def latest_reading(
+        self, site_id: str, reading_parameter: str, today: dt.date
+    ) -> Optional[tuple[str, str]]:
+        rows = get_daily_average_data(
+            site_id,
+            reading_parameter,
+            today - dt.timedelta(days=self.lookback_days),
+            today,
+        )
+        if not rows:
+            return None
+        return rows[-1]["dateTime"][:10], rows[-1]["value"]
+
+    def refresh(self, spec: ForecastSpec) -> None:
+        # Runs in a copied context, so this only tags this refresh's fit
+        current_client.set(SERVER_CLIENT)
+        try:
+            run_forecast(spec, fit_deadline=config.fit_deadline_seconds)
+        except HTTPException as e:
+            log.warning(f"Update refresh failed for site {spec.site_id}: {e.detail}")
+
+    async def poll_once(self, today: Optional[dt.date] = None) -> int:
+        """Checks every watched site once
+
+        Returns:
+            The number of specs re-forecast
+        """
+        today = today or dt.date.today()
+        sites: dict[tuple[str, str], list[ForecastSpec]] = defaultdict(list)
+        for spec in forecast_broker.watched():
+            sites[(spec.site_id, spec.reading_parameter)].append(spec)
+
+        for key in self._last_seen.keys() - sites.keys():
+            del self._last_seen[key]
+
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def check(key: tuple[str, str], specs: list[ForecastSpec]) -> int:
+            async with semaphore:
+                try:
+                    latest = await asyncio.to_thread(self.latest_reading, *key, today)
+                except Exception as e:
+                    log.warning(f"Update poll failed for site {key[0]}: {e}")
+                    return 0
+
+                previous = self._last_seen.get(key)
+                if latest is None or latest == previous:
+                    return 0
+                self._last_seen[key] = latest
+                if previous is None:
+                    return 0
+
+                log.info(f"New reading {latest} for site {key[0]}; refreshing")
+                for spec in specs:
+                    await asyncio.to_thread(self.refresh, spec)
+                return len(specs)
+
+        refreshed = await asyncio.gather(*(check(k, v) for k, v in sites.items()))
+        return sum(refreshed)
+
+    async def run(self) -> None:
+        """Polls every `interval_seconds` until cancelled"""
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.poll_once()
+            except Exception:
+                log.exception("Update poll failed")
+
+
+update_poller = UpdatePoller(
+    interval_seconds=config.subscription_poll_seconds,
+    lookback_days=7,
+    concurrency=4,
+)
@@ -3,6 +3,7 @@ from typing import List
 
 import pandas as pd
 
+from . import tracing
 from .model.forecast_result import ForecastDataPoint, ForecastResult
 
 
@@ -11,13 +12,18 @@ def format_output(data: pd.DataFrame = None) -> List[ForecastDataPoint]:
 
     error_message = {"error": "No data found for this site"}
 
-    body = (
-        error_message if data is None else data.reset_index().to_json(orient="records")
-    )
+    with tracing.span(
+        "forecast.format_output", rows=None if data is None else len(data)
+    ):
+        body = (
+            error_message
+            if data is None
+            else data.reset_index().to_json(orient="records")
+        )
 
-    result = ForecastResult(data=[])
+        result = ForecastResult(data=[])
 
-    for item in json.loads(body):
-        result.data.append(ForecastDataPoint(**item))
+        for item in json.loads(body):
+            result.data.append(ForecastDataPoint(**item))
 
-    return result.data
+        return result.data
@@ -0,0 +1,187 @@
+"""Forecast versions, and deltas between them for clients holding an old one
+
+A version is a hash of a forecast's rows, so the same forecast has the same
+version however it was produced and on whichever replica. For the last few
+versions served for each spec, the index and a short hash of every row are
+kept, and a client that sends the version it holds gets back only the rows
+that are new or changed since then, matched by index, and the indices it
+should drop: typically the newest past value and the revised forecast tail.
+"""
+
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, NamedTuple, Optional
+
+from .config import config
+from .model.forecast_result import ForecastDataPoint
+from .model.forecast_spec import ForecastSpec
+from .model.versions import ForecastDelta, ForecastRowChange
+
+# Bytes of each row's hash
+_ROW_DIGEST_SIZE = 8
+
+
+class RowDigests(NamedTuple):
+    """A forecast version's row indices and the hash of each row
+
+    Indices are interned, so versions and specs share them, and the hashes
+    are packed into one bytes object; a version costs about 16 bytes a row.
+    """
+
+    indices: tuple[str, ...]
+    digests: bytes
+
+    def by_index(self) -> dict[str, bytes]:
+        size = _ROW_DIGEST_SIZE
+        return {
+            index: self.digests[i * size : (i + 1) * size]
+            for i, index in enumerate(self.indices)
+        }
+
+
+def row_digests(forecast: List[ForecastDataPoint]) -> RowDigests:
+    """Hashes each row of `forecast`"""
+    return RowDigests(
+        indices=tuple(sys.intern(point.index) for point in forecast),
+        digests=b"".join(
+            hashlib.blake2b(
+                json.dumps(point.model_dump(), separators=(",", ":")).encode(),
+                digest_size=_ROW_DIGEST_SIZE,
+            ).digest()
+            for point in forecast
+        ),
+    )
+
+
+def forecast_version(
+    forecast: List[ForecastDataPoint], rows: Optional[RowDigests] = None
+) -> str:
+    """A short content hash identifying a forecast's rows"""
+    rows = rows or row_digests(forecast)
+    return hashlib.blake2b(rows.digests, digest_size=8).hexdigest()
+
+
+def forecast_delta(
+    version: str,
+    forecast: List[ForecastDataPoint],
+    base_version: Optional[str] = None,
+    base: Optional[RowDigests] = None,
+    rows: Optional[RowDigests] = None,
+) -> ForecastDelta:
+    """The changes that turn the rows hashed in `base` into `forecast`
+
+    Rows are matched by index, so rows that shift position as the window
+    moves are not resent. Without a base, or when at least half of the rows
+    changed anyway, every row is returned with `full` set.
+    """
+    if base is not None:
+        rows = rows or row_digests(forecast)
+        held = base.by_index()
+        current = rows.by_index()
+        changes = [
+            ForecastRowChange(position=i, **point.model_dump())
+            for i, point in enumerate(forecast)
+            if held.get(point.index) != current[point.index]
+        ]
+        if 2 * len(changes) < len(forecast) or not forecast:
+            return ForecastDelta(
+                version=version,
+                base_version=base_version,
+                full=False,
+                removed=[index for index in base.indices if index not in current],
+                changes=changes,
+            )
+
+    return ForecastDelta(
+        version=version,
+        base_version=None,
+        full=True,
+        removed=[],
+        changes=[
+            ForecastRowChange(position=i, **point.model_dump())
+            for i, point in enumerate(forecast)
+        ],
+    )
+
+
+@dataclass
+class _SpecVersions:
+    # The newest forecast served, kept only to skip rehashing it
+    newest: List[ForecastDataPoint]
+    rows: OrderedDict[str, RowDigests]
+
+
+class ForecastVersions:
+    """Row hashes of the last `versions_per_spec` forecasts served per spec
+
+    At most `max_specs` specs are tracked, least recently served evicted
+    first. Versions are recorded as forecasts are served, and the newest is
+    remembered by identity so repeated cache hits are not rehashed; older
+    versions keep only their row hashes, which is all a delta needs.
+    """
+
+    def __init__(self, versions_per_spec: int, max_specs: int):
+        self.versions_per_spec = versions_per_spec
+        self.max_specs = max_specs
+        self._specs: OrderedDict[ForecastSpec, _SpecVersions] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _record(
+        self, spec: ForecastSpec, forecast: List[ForecastDataPoint]
+    ) -> tuple[str, RowDigests]:
+        with self._lock:
+            versions = self._specs.get(spec)
+            if versions is not None and versions.newest is forecast:
+                self._specs.move_to_end(spec)
+                return next(reversed(versions.rows.items()))
+
+        rows = row_digests(forecast)
+        version = forecast_version(forecast, rows)
+        with self._lock:
+            versions = self._specs.get(spec)
+            if versions is None:
+                versions = self._specs[spec] = _SpecVersions(forecast, OrderedDict())
+            versions.newest = forecast
+            versions.rows[version] = rows
+            versions.rows.move_to_end(version)
+            while len(versions.rows) > self.versions_per_spec:
+                versions.rows.popitem(last=False)
+            self._specs.move_to_end(spec)
+            while len(self._specs) > self.max_specs:
+                self._specs.popitem(last=False)
+        return version, rows
+
+    def record(self, spec: ForecastSpec, forecast: List[ForecastDataPoint]) -> str:
+        """Remembers `forecast` as the spec's newest version and returns it"""
+        version, _ = self._record(spec, forecast)
+        return version
+
+    def get(self, spec: ForecastSpec, version: str) -> Optional[RowDigests]:
+        with self._lock:
+            versions = self._specs.get(spec)
+            return versions.rows.get(version) if versions is not None else None
+
+    def delta(
+        self,
+        spec: ForecastSpec,
+        forecast: List[ForecastDataPoint],
+        base_version: Optional[str],
+    ) -> ForecastDelta:
+        """Records `forecast` and diffs it against `base_version` if still held"""
+        version, rows = self._record(spec, forecast)
+        base = self.get(spec, base_version) if base_version else None
+        return forecast_delta(version, forecast, base_version, base, rows)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._specs.clear()
+
+
+forecast_versions = ForecastVersions(
+    versions_per_spec=config.forecast_versions_per_spec,
+    max_specs=config.forecast_versions_max_specs,
+)
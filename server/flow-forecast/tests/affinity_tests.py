@@ -0,0 +1,285 @@
+from collections import Counter
+from unittest.mock import patch
+
+import httpx
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from flow_forecast.affinity import (
+    CLIENT_HEADER,
+    HOP_HEADER,
+    SECRET_HEADER,
+    HashRing,
+    SiteAffinity,
+    parse_peers,
+)
+from flow_forecast.app import app
+from flow_forecast.drivers.session import DriverSession
+from flow_forecast.ratelimit import RateLimiter, client_id_for
+
+client = TestClient(app)
+
+SELF = "http://testserver"
+PEER = "http://replica-b:8000"
+SECRET = "s3cret"
+# What a peer forwarding a request sends
+PEER_HOP = {HOP_HEADER: PEER, SECRET_HEADER: SECRET}
+
+
+def forecast_frame(*args, **kwargs) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "past_value": [1000.0],
+            "forecast": [1100.0],
+            "lower_error_bound": [1000.0],
+            "upper_error_bound": [1200.0],
+        },
+        index=["1/1"],
+    )
+
+
+def site_owned_by(affinity: SiteAffinity, owner: str) -> str:
+    return next(
+        site_id
+        for site_id in (f"{1646500 + i:08d}" for i in range(1000))
+        if affinity.owner(site_id) == owner
+    )
+
+
+@pytest.fixture
+def peer():
+    """A two-replica ring whose other replica is `peer.handler`"""
+
+    class Peer:
+        requests: list[httpx.Request] = []
+
+        def handler(self, request: httpx.Request) -> httpx.Response:
+            return httpx.Response(
+                200,
+                json=[],
+                headers={"X-Forecast-Cache": "hit", "X-Internal": "1"},
+            )
+
+        def __call__(self, request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            return self.handler(request)
+
+    fake = Peer()
+    fake.requests = []
+    affinity = SiteAffinity(
+        mode="forward",
+        self_url=SELF,
+        peers=[SELF, PEER],
+        virtual_nodes=64,
+        session=DriverSession(
+            max_connections=2,
+            timeout_seconds=5,
+            transport=httpx.MockTransport(fake),
+            name="test-peers",
+        ),
+        health_seconds=60,
+        secret=SECRET,
+    )
+    fake.affinity = affinity
+    with (
+        patch("flow_forecast.usgs.router.site_affinity", affinity),
+        patch("flow_forecast.ratelimit.site_affinity", affinity),
+        patch(
+            "flow_forecast.usgs.router.generate_prophet_forecast",
+            side_effect=forecast_frame,
+        ) as fit,
+    ):
+        fake.fit = fit
+        yield fake
+    affinity.session.close()
+
+
+class TestHashRing:
+    """Tests for the consistent-hash ring"""
+
+    def test_spreads_sites_and_moves_few_when_a_node_joins(self):
+        nodes = ["http://a", "http://b", "http://c"]
+        sites = [f"{1646500 + i:08d}" for i in range(3000)]
+        ring = HashRing(nodes, virtual_nodes=128)
+        grown = HashRing(nodes + ["http://d"], virtual_nodes=128)
+
+        shares = Counter(ring.owner(site) for site in sites)
+        moved = [site for site in sites if ring.owner(site) != grown.owner(site)]
+
+        assert all(800 < shares[node] < 1200 for node in nodes)
+        assert {grown.owner(site) for site in moved} == {"http://d"}
+        assert len(moved) < 3000 / 3
+
+    def test_replicas_agree_whatever_the_peer_order(self):
+        forward = HashRing(["http://a", "http://b"], virtual_nodes=16)
+        backward = HashRing(["http://b", "http://a"], virtual_nodes=16)
+
+        assert all(forward.owner(str(i)) == backward.owner(str(i)) for i in range(500))
+
+    def test_parse_peers(self):
+        assert parse_peers(" http://a/, http://b,,http://a ") == [
+            "http://a",
+            "http://b",
+        ]
+
+
+class TestSiteAffinity:
+    """Tests for routing forecast requests to the owning replica"""
+
+    def test_forwards_sites_owned_by_a_peer(self, peer):
+        site_id = site_owned_by(peer.affinity, PEER)
+
+        response = client.post(
+            "/usgs/forecast",
+            json={"site_id": site_id, "reading_parameter": "00060"},
+            headers={"X-API-Key": "secret"},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["X-Served-By"] == PEER
+        assert response.headers["X-Forecast-Cache"] == "hit"
+        assert "X-Internal" not in response.headers
+        (forwarded,) = peer.requests
+        assert forwarded.headers[HOP_HEADER] == SELF
+        assert forwarded.headers["X-API-Key"] == "secret"
+        assert forwarded.headers[CLIENT_HEADER].startswith("key:")
+        assert forwarded.headers[SECRET_HEADER] == SECRET
+        assert site_id in forwarded.content.decode()
+        peer.fit.assert_not_called()
+
+    def test_serves_owned_and_forwarded_sites_locally(self, peer):
+        owned = site_owned_by(peer.affinity, SELF)
+        remote = site_owned_by(peer.affinity, PEER)
+
+        client.post(
+            "/usgs/forecast", json={"site_id": owned, "reading_parameter": "00060"}
+        )
+        client.post(
+            "/usgs/forecast",
+            json={"site_id": remote, "reading_parameter": "00060"},
+            headers=PEER_HOP,
+        )
+
+        assert peer.requests == []
+        assert peer.fit.call_count == 2
+
+    def test_falls_back_to_local_when_the_owner_is_down(self, peer):
+        def unreachable(request):
+            raise httpx.ConnectError("connection refused")
+
+        peer.handler = unreachable
+        request = {
+            "site_id": site_owned_by(peer.affinity, PEER),
+            "reading_parameter": "00060",
+            "horizon_days": 1,
+        }
+
+        responses = [
+            client.post("/usgs/forecast", json={**request, "horizon_days": days})
+            for days in (1, 2, 3)
+        ]
+
+        assert [r.status_code for r in responses] == [200] * 3
+        assert all("X-Served-By" not in r.headers for r in responses)
+        # The breaker opens after two failed forwards; the third skips the peer
+        assert len(peer.requests) == 2
+        assert peer.fit.call_count == 3
+
+    def test_redirects_to_the_owner(self, peer):
+        peer.affinity.mode = "redirect"
+        site_id = site_owned_by(peer.affinity, PEER)
+
+        response = client.post(
+            "/usgs/forecast",
+            json={"site_id": site_id, "reading_parameter": "00060"},
+            follow_redirects=False,
+        )
+
+        assert response.status_code == 307
+        assert response.headers["Location"] == f"{PEER}/usgs/forecast"
+        assert peer.requests == []
+
+    def test_ignores_hops_from_unknown_replicas(self, peer):
+        site_id = site_owned_by(peer.affinity, PEER)
+
+        for hop in ("http://elsewhere:8000", SELF):
+            client.post(
+                "/usgs/forecast",
+                json={"site_id": site_id, "reading_parameter": "00060"},
+                headers={HOP_HEADER: hop, SECRET_HEADER: SECRET},
+            )
+
+        assert len(peer.requests) == 2
+        peer.fit.assert_not_called()
+
+    def test_hops_need_the_shared_secret(self, peer):
+        site_id = site_owned_by(peer.affinity, PEER)
+        request = {"site_id": site_id, "reading_parameter": "00060"}
+
+        for headers in ({HOP_HEADER: PEER}, {**PEER_HOP, SECRET_HEADER: "guess"}):
+            client.post("/usgs/forecast", json=request, headers=headers)
+        assert len(peer.requests) == 2
+        peer.fit.assert_not_called()
+
+        client.post("/usgs/forecast", json=request, headers=PEER_HOP)
+        assert len(peer.requests) == 2
+        peer.fit.assert_called_once()
+
+    def test_forward_mode_needs_a_secret(self, peer):
+        """Should serve locally and trust no hop until the secret is set"""
+        peer.affinity.secret = ""
+        limiter = RateLimiter(capacity=1, refill_per_second=0.01, max_clients=100)
+        request = {"site_id": site_owned_by(peer.affinity, PEER)}
+        spoofed = {HOP_HEADER: PEER, CLIENT_HEADER: "ip:203.0.113.7"}
+
+        with patch("flow_forecast.ratelimit.rate_limiter", limiter):
+            responses = [
+                client.post(
+                    "/usgs/forecast",
+                    json={**request, "reading_parameter": "00060"},
+                    headers=spoofed,
+                )
+                for _ in range(2)
+            ]
+
+        assert not peer.affinity.enabled
+        assert [r.status_code for r in responses] == [200, 429]
+        assert peer.requests == []
+
+    def test_forwarded_requests_keep_the_client_and_skip_the_bucket(self, peer):
+        limiter = RateLimiter(capacity=1, refill_per_second=0.01, max_clients=100)
+        site_id = site_owned_by(peer.affinity, PEER)
+        request = {"site_id": site_id, "reading_parameter": "00060"}
+        forwarded = {**PEER_HOP, CLIENT_HEADER: "ip:203.0.113.7"}
+
+        with (
+            patch("flow_forecast.ratelimit.rate_limiter", limiter),
+            patch(
+                "flow_forecast.ratelimit.client_id_for", wraps=client_id_for
+            ) as identify,
+        ):
+            responses = [
+                client.post(
+                    "/usgs/forecast",
+                    json={**request, "horizon_days": days},
+                    headers=forwarded,
+                )
+                for days in (1, 2)
+            ]
+
+        assert [r.status_code for r in responses] == [200, 200]
+        assert "X-RateLimit-Remaining" not in responses[0].headers
+        assert responses[0].headers["X-Fit-Quota-Used"] == "0"
+        identify.assert_not_called()
+        assert peer.requests == []
+
+    def test_forwarded_responses_report_the_forwarders_bucket(self, peer):
+        site_id = site_owned_by(peer.affinity, PEER)
+
+        response = client.post(
+            "/usgs/forecast", json={"site_id": site_id, "reading_parameter": "00060"}
+        )
+
+        assert response.headers["X-Served-By"] == PEER
+        assert response.headers["X-RateLimit-Remaining"] == "59"
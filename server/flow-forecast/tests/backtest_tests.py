@@ -0,0 +1,197 @@
+import datetime as dt
+import json
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from flow_forecast.backtest import (
+    BacktestResult,
+    BacktestSettings,
+    Variant,
+    get_engine,
+    run_backtest,
+)
+from flow_forecast.backtest.engines import Engine
+from flow_forecast.backtest.runner import summarize
+from flow_forecast.backtest.worker import backtest_site, forecast_origins, score
+from flow_forecast.usgs.service import get_daily_average_data
+
+SITES = ["01646500", "01646501"]
+
+
+def result(variant: str, relative_mae: float, seconds: float) -> BacktestResult:
+    return BacktestResult(
+        site_id="01646500",
+        variant=variant,
+        origin="2024-01-01",
+        observed=10,
+        covered=5,
+        mae=relative_mae * 100,
+        relative_mae=relative_mae,
+        fit_seconds=seconds,
+    )
+
+
+class TestScoring:
+    """Tests for origins and forecast scores"""
+
+    def test_origins_leave_a_full_horizon(self):
+        origins = forecast_origins(dt.date(2024, 6, 30), 30, origins=3, step_days=7)
+
+        assert origins == [
+            dt.date(2024, 5, 17),
+            dt.date(2024, 5, 24),
+            dt.date(2024, 5, 31),
+        ]
+
+    def test_skips_unobserved_days(self):
+        days = pd.date_range("2024-01-01", periods=4)
+        forecast = pd.DataFrame(
+            {
+                "ds": days,
+                "yhat": [10.0, 20.0, 30.0, 40.0],
+                "yhat_lower": [5.0, 15.0, 25.0, 35.0],
+                "yhat_upper": [15.0, 25.0, 35.0, 45.0],
+            }
+        )
+
+        observed, covered, mae, relative_mae = score(
+            forecast, pd.Series([12.0, np.nan, 50.0, 40.0], index=days)
+        )
+
+        assert (observed, covered) == (3, 2)
+        assert mae == pytest.approx(22 / 3)
+        assert relative_mae == pytest.approx((22 / 3) / (102 / 3))
+
+    def test_matches_forecast_and_actual_by_date(self):
+        """A forecast starting before the horizon is not scored a day off"""
+        forecast = pd.DataFrame(
+            {
+                "ds": pd.date_range("2024-01-01", periods=4),
+                "yhat": [10.0, 20.0, 30.0, 40.0],
+                "yhat_lower": [5.0, 15.0, 25.0, 35.0],
+                "yhat_upper": [15.0, 25.0, 35.0, 45.0],
+            }
+        )
+        actual = pd.Series(
+            [20.0, 30.0, 40.0, 50.0], index=pd.date_range("2024-01-02", periods=4)
+        )
+
+        assert score(forecast, actual) == (3, 3, 0.0, 0.0)
+
+    def test_origin_without_an_observation(self):
+        """Should score a forecast from the last observed day by date"""
+        days = pd.date_range("2023-01-01", "2024-06-30")
+        truth = pd.Series(np.arange(len(days), dtype=float) + 100, index=days)
+        history = truth.rename("y").rename_axis("ds").reset_index()
+        # The newest origin, and the days just before it, were not observed
+        origin = dt.date(2024, 6, 16)
+        history.loc[
+            history["ds"].dt.date.between(dt.date(2024, 6, 14), origin), "y"
+        ] = np.nan
+        periods = []
+
+        def predict(training: pd.DataFrame, days_ahead: int) -> pd.DataFrame:
+            periods.append(days_ahead)
+            last = training.loc[training["y"].notna(), "ds"].iloc[-1]
+            ds = pd.date_range(last + pd.Timedelta(days=1), periods=days_ahead)
+            values = truth.reindex(ds).to_numpy()
+            return pd.DataFrame(
+                {"ds": ds, "yhat": values, "yhat_lower": values, "yhat_upper": values}
+            )
+
+        with (
+            patch(
+                "flow_forecast.backtest.worker.get_daily_average_data",
+                return_value=[{}],
+            ),
+            patch(
+                "flow_forecast.backtest.worker.get_cleaned_data", return_value=history
+            ),
+            patch(
+                "flow_forecast.backtest.worker.get_engine",
+                return_value=Engine("perfect", lambda training: training, predict),
+            ),
+        ):
+            backtest = backtest_site(
+                "01646500",
+                "00060",
+                dt.date(2024, 6, 30),
+                history_years=2,
+                variants=[Variant("perfect")],
+                horizon_days=14,
+                origins=1,
+                step_days=7,
+            )
+
+        (result,) = backtest.results
+        assert result.origin == origin.isoformat()
+        assert periods == [17]
+        assert (result.observed, result.covered, result.mae) == (14, 14, 0.0)
+        assert result.peak_mb is None
+
+    def test_frontier_keeps_variants_cheaper_or_more_accurate(self):
+        variants = [Variant("a"), Variant("b"), Variant("c")]
+        results = [result("a", 0.2, 1.0), result("b", 0.3, 2.0), result("c", 0.1, 3.0)]
+
+        summaries = summarize(variants, results)
+
+        assert [(s.variant, s.frontier) for s in summaries] == [
+            ("a", True),
+            ("b", False),
+            ("c", True),
+        ]
+        assert summaries[0].coverage == 0.5
+
+    def test_unknown_engine(self):
+        with pytest.raises(ValueError, match="Unknown engine"):
+            get_engine("arima")
+
+
+class TestRunBacktest:
+    """Tests for running a backtest against the fake USGS service"""
+
+    def test_scores_every_variant_origin_and_site(self, fake_usgs, tmp_path):
+        settings = BacktestSettings(
+            site_ids=SITES + ["bad"],
+            variants=[Variant("climatology", 1), Variant("climatology", None, 200)],
+            end_date=dt.date(2024, 6, 30),
+            history_years=2,
+            horizon_days=14,
+            origins=3,
+            step_days=30,
+            workers=0,
+            trace_memory=True,
+            results_file=tmp_path / "results.jsonl",
+        )
+
+        def fetch(site_id, *args):
+            if site_id == "bad":
+                raise ConnectionError("USGS API request failed with status 400")
+            return get_daily_average_data(site_id, *args)
+
+        with patch("flow_forecast.backtest.worker.get_daily_average_data", fetch):
+            report = run_backtest(settings)
+
+        assert report.failed_sites == 1 and "bad" in report.site_errors
+        assert [s.forecasts for s in report.variants] == [6, 6]
+        assert {s.variant for s in report.variants} == {
+            "climatology/1y",
+            "climatology/200rows",
+        }
+        assert all(0 <= s.coverage <= 1 and s.mae > 0 for s in report.variants)
+        lines = (tmp_path / "results.jsonl").read_text().splitlines()
+        assert len(lines) == 12
+        assert json.loads(lines[0])["observed"] > 10
+        assert all(json.loads(line)["peak_mb"] is not None for line in lines)
+        assert "frontier" in report.format()
+
+    def test_rejects_history_too_short_for_training(self):
+        settings = BacktestSettings(
+            site_ids=SITES, variants=[Variant("climatology", 5)], history_years=5
+        )
+
+        with pytest.raises(ValueError, match="does not cover"):
+            run_backtest(settings)
@@ -0,0 +1,137 @@
+import datetime as dt
+import json
+from unittest.mock import patch
+
+import pytest
+
+from flow_forecast.__main__ import main
+from flow_forecast.batch import BatchSettings, BatchSite, run_batch, select_sites
+from flow_forecast.batch.output import CHECKPOINT_FILE
+from flow_forecast.usgs.service import generate_climatology_forecast
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+RUN_DATE = dt.date(2024, 6, 30)
+
+
+def climatology_fit(historic_data, fit_deadline=None, horizon_days=None):
+    return generate_climatology_forecast(historic_data, horizon_days)
+
+
+@pytest.fixture
+def fits():
+    with patch(
+        "flow_forecast.batch.worker.generate_forecast", side_effect=climatology_fit
+    ) as fit:
+        yield fit
+
+
+def settings(tmp_path, sites, **kwargs) -> BatchSettings:
+    return BatchSettings(
+        output_dir=tmp_path,
+        sites=sites,
+        horizon_days=7,
+        workers=0,
+        flush_sites=2,
+        run_date=RUN_DATE,
+        **kwargs,
+    )
+
+
+class TestSelectSites:
+    """Tests for resolving the sites a batch covers"""
+
+    def test_states_come_from_the_catalog(self, tmp_path):
+        sites_file = tmp_path / "sites.txt"
+        sites_file.write_text("# reservoirs\n09380000\n12345678, wa\n")
+
+        sites = select_sites(["08252500"], sites_file, ["nm"])
+
+        assert sites[:3] == [
+            BatchSite("08252500", "NM"),
+            BatchSite("09380000", "AZ"),
+            BatchSite("12345678", "WA"),
+        ]
+        assert len(sites) > 10
+        assert {site.state for site in sites[3:]} == {"NM"}
+
+    def test_requires_some_sites(self):
+        with pytest.raises(ValueError, match="No sites selected"):
+            select_sites()
+
+
+class TestRunBatch:
+    """Tests for batch runs, their output and resuming them"""
+
+    def test_writes_partitioned_parquet(self, tmp_path, fake_usgs, fits):
+        sites = [BatchSite("01646500", "MD"), BatchSite("01646501", "MD")]
+        sites.append(BatchSite("09380000", "AZ"))
+
+        report = run_batch(settings(tmp_path, sites))
+
+        assert (report.succeeded, report.failed, report.files) == (3, 0, 2)
+        assert report.sites_per_minute > 0
+        table = pq.read_table(tmp_path, partitioning="hive").to_pandas()
+        assert len(table) == 3 * 7
+        assert set(table["state"]) == {"MD", "AZ"}
+        assert set(table["run_date"].astype(str)) == {str(RUN_DATE)}
+        assert table.groupby("site_id")["ds"].min().nunique() == 1
+
+    def test_resumes_after_interruption(self, tmp_path, fake_usgs, fits):
+        sites = [BatchSite(f"0164650{i}", "MD") for i in range(5)]
+
+        def interrupted_on_fourth_fit(*args, **kwargs):
+            if fits.call_count > 3:
+                raise KeyboardInterrupt
+            return climatology_fit(*args, **kwargs)
+
+        fits.side_effect = interrupted_on_fourth_fit
+
+        with pytest.raises(KeyboardInterrupt):
+            run_batch(settings(tmp_path, sites))
+        # An unrecorded file from a flush that died before its checkpoint
+        orphan = tmp_path / "state=MD" / f"run_date={RUN_DATE}" / "part-00060-x.parquet"
+        orphan.write_bytes(b"")
+
+        fits.side_effect = climatology_fit
+        fits.reset_mock()
+        report = run_batch(settings(tmp_path, sites))
+
+        assert fits.call_count == 2
+        assert report.resumed == 3
+        assert not orphan.exists()
+        table = pq.read_table(tmp_path, partitioning="hive").to_pandas()
+        assert sorted(table["site_id"].unique()) == [s.site_id for s in sites]
+
+    def test_failures_are_checkpointed_and_skipped(self, tmp_path, fake_usgs, fits):
+        sites = [BatchSite("01646500", "MD")]
+        fits.side_effect = ValueError("singular matrix")
+
+        first = run_batch(settings(tmp_path, sites))
+        second = run_batch(settings(tmp_path, sites))
+        fits.side_effect = climatology_fit
+        retried = run_batch(settings(tmp_path, sites, retry_failed=True))
+
+        assert first.errors == {"01646500": "singular matrix"}
+        assert (second.resumed, retried.succeeded) == (1, 1)
+        records = [json.loads(line) for line in (tmp_path / CHECKPOINT_FILE).open()]
+        assert [bool(r["failed"]) for r in records] == [True, False]
+
+    def test_cli(self, tmp_path, fake_usgs, fits, capsys):
+        code = main(
+            [
+                "batch",
+                "--site",
+                "01646500",
+                "--output",
+                str(tmp_path),
+                "--workers",
+                "0",
+                "--horizon-days",
+                "3",
+                "--json",
+            ]
+        )
+
+        assert code == 0
+        assert json.loads(capsys.readouterr().out)["succeeded"] == 1
@@ -0,0 +1,341 @@
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from flow_forecast.app import app
+from flow_forecast.cache import forecast_cache
+from flow_forecast.catalog import service as catalog_service
+from flow_forecast.catalog.router import gauge_forecast_spec
+from flow_forecast.catalog.service import GaugeCatalog, load_catalog, parse_gauge
+from flow_forecast.catalog.spatial import GridIndex, haversine_km
+from flow_forecast.config import config
+from flow_forecast.jobs import ForecastJobQueue
+from flow_forecast.model.catalog import Gauge, GaugeSource
+from flow_forecast.model.forecast_result import ForecastDataPoint
+
+client = TestClient(app)
+
+
+def gauge(site_id, latitude, longitude, source=GaugeSource.usgs, **fields):
+    return Gauge(
+        site_id=site_id,
+        name=fields.pop("name", f"Gauge {site_id}"),
+        state=fields.pop("state", "MD"),
+        country=fields.pop("country", "US"),
+        source=source,
+        latitude=latitude,
+        longitude=longitude,
+        metric=fields.pop("metric", "CFS"),
+        **fields,
+    )
+
+
+@pytest.fixture
+def small_catalog():
+    catalog = GaugeCatalog(
+        [
+            gauge("01646500", 38.9495, -77.1276),
+            gauge("01646305", 38.9571, -77.1773),
+            gauge("01647600", 38.9301, -77.1170),
+            gauge("02OH001", 38.95, -77.13, source=GaugeSource.environment_canada),
+            gauge("09380000", 36.8647, -111.5878),
+        ]
+    )
+    with patch.object(catalog_service, "_catalog", catalog):
+        yield catalog
+
+
+@pytest.fixture
+def jobs():
+    queue = ForecastJobQueue(workers=1, retention_seconds=3600, result_ttl_seconds=3600)
+    with (
+        patch("flow_forecast.catalog.router.forecast_jobs", queue),
+        patch("flow_forecast.catalog.router.run_forecast"),
+    ):
+        yield queue
+    queue.shutdown()
+
+
+class TestGridIndex:
+    """Tests for the grid spatial index"""
+
+    @pytest.fixture
+    def points(self):
+        rng = np.random.default_rng(7)
+        return rng.uniform(-80, 80, 5000), rng.uniform(-180, 180, 5000)
+
+    @pytest.mark.parametrize(
+        "latitude,longitude,radius_km",
+        [(38.9, -77.1, 300), (-41.0, 179.5, 800), (79.0, 10.0, 2000), (0, 0, 1)],
+    )
+    def test_nearby_matches_brute_force(self, points, latitude, longitude, radius_km):
+        lat, lon = points
+        index = GridIndex(lat, lon, cell_degrees=2.0)
+
+        positions, distances = index.nearby(latitude, longitude, radius_km)
+
+        expected = np.flatnonzero(
+            haversine_km(latitude, longitude, lat, lon) <= radius_km
+        )
+        assert sorted(positions.tolist()) == sorted(expected.tolist())
+        assert np.all(np.diff(distances) >= 0)
+
+    def test_within_crosses_antimeridian(self, points):
+        lat, lon = points
+        index = GridIndex(lat, lon)
+
+        positions = index.within(-50, 170, -30, -170)
+
+        expected = np.flatnonzero(
+            (lat >= -50) & (lat <= -30) & ((lon >= 170) | (lon <= -170))
+        )
+        assert sorted(positions.tolist()) == sorted(expected.tolist())
+
+
+class TestCatalogLoading:
+    """Tests for loading the GaugeSources catalog files"""
+
+    def test_parses_records_like_the_app(self, tmp_path):
+        records = [
+            {
+                "id": 1,
+                "siteId": "04ME003",
+                "name": "ABITIBI",
+                "state": "ON",
+                "country": "CA",
+                "latitude": 50.6,
+                "longitude": -81.4,
+            },
+            {
+                "siteId": "04ME003",
+                "name": "DUPLICATE",
+                "state": "ON",
+                "country": "CA",
+                "latitude": 50.6,
+                "longitude": -81.4,
+            },
+            {
+                "siteId": "",
+                "name": "NO SITE",
+                "state": "ON",
+                "country": "CA",
+                "latitude": 50.6,
+                "longitude": -81.4,
+            },
+            {
+                "siteId": "02OH001",
+                "name": "CHAMPLAIN",
+                "state": "",
+                "country": "CA",
+                "latitude": 45.0,
+                "longitude": -73.1,
+            },
+        ]
+        (tmp_path / "canada-on.json").write_text(json.dumps(records))
+        (tmp_path / "unrelated.json").write_text("[]")
+
+        catalog = load_catalog(tmp_path)
+
+        assert len(catalog) == 1
+        (only,) = catalog.gauges
+        assert only.source == GaugeSource.environment_canada
+        assert only.metric == "CMS"
+
+    def test_missing_directory_gives_empty_catalog(self, tmp_path):
+        catalog = load_catalog(tmp_path / "missing")
+
+        assert len(catalog) == 0
+        assert catalog.nearby(0, 0, 100, 10) == []
+
+    def test_rejects_out_of_range_coordinates(self):
+        record = {
+            "siteId": "1",
+            "name": "X",
+            "state": "CO",
+            "country": "US",
+            "latitude": 140.0,
+            "longitude": -105.0,
+        }
+
+        assert parse_gauge(record, GaugeSource.dwr) is None
+
+    @pytest.mark.skipif(
+        not Path(config.catalog_dir).is_dir(), reason="catalog files not present"
+    )
+    def test_loads_bundled_catalog(self):
+        catalog = load_catalog(Path(config.catalog_dir))
+
+        assert len(catalog) > 8000
+        (nearest, distance), *_ = catalog.nearby(38.9495, -77.1276, 10, 5)
+        assert nearest.site_id == "01646500"
+        assert distance < 1
+
+
+class TestNearbyEndpoint:
+    """Tests for the forecast-near-me endpoints"""
+
+    def test_returns_nearest_gauges_with_cached_forecasts(self, small_catalog, jobs):
+        cached = [
+            ForecastDataPoint(
+                index="1/1",
+                past_value=1.0,
+                forecast=None,
+                lower_error_bound=None,
+                upper_error_bound=None,
+            )
+        ]
+        forecast_cache.put(gauge_forecast_spec(small_catalog.gauges[0], None), cached)
+
+        response = client.get(
+            "/catalog/nearby",
+            params={"latitude": 38.9495, "longitude": -77.1276, "radius_km": 10},
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert [item["gauge"]["site_id"] for item in body] == [
+            "01646500",
+            "02OH001",
+            "01647600",
+            "01646305",
+        ]
+        assert body[0]["forecast_status"] == "hit"
+        assert body[0]["forecast"][0]["past_value"] == 1.0
+        assert body[1]["forecast_status"] == "queued"
+        assert body[2]["forecast_status"] == "queued"
+        assert body[2]["job_id"]
+
+    def test_limits_queued_forecasts(self, small_catalog, jobs):
+        with patch.object(config, "nearby_max_queued_forecasts", 1):
+            body = client.get(
+                "/catalog/nearby",
+                params={"latitude": 38.95, "longitude": -77.13, "source": "USGS"},
+            ).json()
+
+        assert [item["forecast_status"] for item in body] == [
+            "queued",
+            "unavailable",
+            "unavailable",
+        ]
+
+    def test_without_forecasts(self, small_catalog, jobs):
+        body = client.get(
+            "/catalog/nearby",
+            params={"latitude": 38.95, "longitude": -77.13, "include_forecast": False},
+        ).json()
+
+        assert {item["forecast_status"] for item in body} == {"unavailable"}
+
+    def test_within_box(self, small_catalog, jobs):
+        body = client.get(
+            "/catalog/within",
+            params={
+                "min_latitude": 36,
+                "min_longitude": -112,
+                "max_latitude": 37,
+                "max_longitude": -111,
+                "include_forecast": False,
+            },
+        ).json()
+
+        assert [item["gauge"]["site_id"] for item in body] == ["09380000"]
+
+    def test_within_rejects_inverted_latitudes(self, small_catalog):
+        response = client.get(
+            "/catalog/within",
+            params={
+                "min_latitude": 40,
+                "min_longitude": -112,
+                "max_latitude": 37,
+                "max_longitude": -111,
+            },
+        )
+
+        assert response.status_code == 400
+
+
+class TestCatalogSearch:
+    """Tests for the catalog search indexes and endpoint"""
+
+    @pytest.fixture
+    def search_catalog(self):
+        catalog = GaugeCatalog(
+            [
+                gauge("01646500", 38.9, -77.1, name="POTOMAC RIVER NEAR WASH, DC"),
+                gauge("01638500", 39.2, -77.5, name="POTOMAC RIVER AT POINT OF ROCKS"),
+                gauge(
+                    "09380000",
+                    36.8,
+                    -111.5,
+                    name="COLORADO RIVER AT LEES FERRY",
+                    state="AZ",
+                ),
+                gauge(
+                    "07094500",
+                    38.5,
+                    -106.0,
+                    name="Arkansas River at Parkdale",
+                    state="co",
+                ),
+                gauge(
+                    "02OH001",
+                    45.0,
+                    -73.1,
+                    source=GaugeSource.environment_canada,
+                    name="RIVIÈRE RICHELIEU AUX RAPIDES FRASER",
+                    state="QC",
+                    country="CA",
+                ),
+            ]
+        )
+        with patch.object(catalog_service, "_catalog", catalog):
+            yield catalog
+
+    def names(self, gauges):
+        return [g.name for g in gauges]
+
+    def test_name_prefixes_match_any_word(self, search_catalog):
+        total, gauges = search_catalog.search(0, 10, query="riv")
+
+        assert total == 5
+        assert self.names(gauges) == sorted(self.names(gauges), key=str.casefold)
+
+        _, gauges = search_catalog.search(0, 10, query="potomac poi")
+        assert [g.site_id for g in gauges] == ["01638500"]
+
+        _, gauges = search_catalog.search(0, 10, query="rivière rich")
+        assert [g.site_id for g in gauges] == ["02OH001"]
+
+    def test_filters_combine(self, search_catalog):
+        _, gauges = search_catalog.search(0, 10, query="river", state="CO")
+        assert [g.site_id for g in gauges] == ["07094500"]
+
+        _, gauges = search_catalog.search(0, 10, site_id="01646500", state="AZ")
+        assert gauges == []
+
+        total, _ = search_catalog.search(0, 10, country="us", source=GaugeSource.usgs)
+        assert total == 4
+
+    def test_unknown_keys_match_nothing(self, search_catalog):
+        assert search_catalog.search(0, 10, query="xyz") == (0, [])
+        assert search_catalog.search(0, 10, state="ZZ") == (0, [])
+
+    def test_endpoint_paginates_in_name_order(self, search_catalog):
+        first = client.get("/catalog/gauges", params={"limit": 2}).json()
+        second = client.get("/catalog/gauges", params={"limit": 2, "offset": 2}).json()
+        _, everything = search_catalog.search(0, 10)
+
+        assert first["total"] == second["total"] == 5
+        assert [g["site_id"] for g in first["gauges"] + second["gauges"]] == [
+            g.site_id for g in everything[:4]
+        ]
+
+    def test_endpoint_looks_up_site_id(self, search_catalog):
+        body = client.get("/catalog/gauges", params={"site_id": "02oh001"}).json()
+
+        assert body["total"] == 1
+        assert body["gauges"][0]["source"] == "ENVIRONMENT_CANADA"
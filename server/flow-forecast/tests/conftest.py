@@ -0,0 +1,43 @@
+from unittest.mock import patch
+
+import pytest
+
+from flow_forecast.cache import forecast_cache
+from flow_forecast.heavy_hitters import site_demand
+from flow_forecast.loadtest import FakeUsgsServer, FakeUsgsSettings
+from flow_forecast.percentiles import percentile_store
+from flow_forecast.ratelimit import rate_limiter
+from flow_forecast.snapshot import forecast_snapshot
+from flow_forecast.usgs.service import usgs_breaker
+from flow_forecast.versions import forecast_versions
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_state():
+    """Keeps process-wide caches and breakers from leaking between tests"""
+    forecast_cache.clear()
+    percentile_store.clear()
+    rate_limiter.clear()
+    site_demand.clear()
+    forecast_versions.clear()
+    forecast_snapshot.clear()
+    usgs_breaker.reset()
+    yield
+    forecast_cache.clear()
+    percentile_store.clear()
+    usgs_breaker.reset()
+
+
+@pytest.fixture
+def fake_usgs(request):
+    """Points the USGS client at a local stand-in with two years of history
+
+    Parametrize it indirectly with a number of years to serve more or less.
+    """
+    history_years = getattr(request, "param", 2)
+    with FakeUsgsServer(FakeUsgsSettings(history_years=history_years)) as server:
+        with patch(
+            "flow_forecast.usgs.service.base_usgs_url",
+            f"{server.base_url}?format=json",
+        ):
+            yield server
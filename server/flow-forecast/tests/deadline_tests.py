@@ -0,0 +1,150 @@
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from flow_forecast.app import app
+from flow_forecast.config import config
+from flow_forecast.metrics import metrics
+from flow_forecast.usgs.router import resolve_fit_deadline
+from flow_forecast.usgs.service import (
+    FitDeadlineExceeded,
+    generate_climatology_forecast,
+    generate_forecast,
+)
+
+client = TestClient(app)
+
+REQUEST = {
+    "site_id": "01646500",
+    "reading_parameter": "00060",
+    "start_date": "2023-01-01",
+    "end_date": "2023-12-31",
+}
+
+
+@pytest.fixture
+def two_year_history():
+    ds = pd.date_range("2022-01-01", "2023-06-30")
+    return pd.DataFrame({"ds": ds, "y": np.arange(len(ds), dtype=float) % 365 + 1})
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+class TestResolveFitDeadline:
+    """Tests for client-lowered fit deadlines"""
+
+    def test_defaults_to_server_deadline(self):
+        assert resolve_fit_deadline(None) == config.fit_deadline_seconds
+
+    def test_client_can_lower_deadline(self):
+        assert resolve_fit_deadline(1.5) == 1.5
+
+    def test_client_cannot_raise_deadline(self):
+        assert resolve_fit_deadline(1e9) == config.fit_deadline_seconds
+
+
+class TestGenerateForecastDeadline:
+    """Tests for cancelling overrunning fits"""
+
+    @patch("flow_forecast.usgs.service.Prophet")
+    def test_passes_deadline_to_optimizer(self, mock_prophet_class):
+        """Should hand the deadline to cmdstan as its timeout"""
+        mock_model = MagicMock()
+        mock_prophet_class.return_value = mock_model
+        mock_model.predict.return_value = pd.DataFrame(
+            {"yhat": [100], "yhat_lower": [90], "yhat_upper": [110]}
+        )
+
+        historic_data = pd.DataFrame(
+            {"ds": pd.to_datetime(["2023-12-30"]), "y": [1000.0]}
+        )
+        generate_forecast(historic_data, fit_deadline=2.0)
+
+        assert mock_model.fit.call_args[1]["timeout"] == 2.0
+
+    @patch("flow_forecast.usgs.service.Prophet")
+    def test_timeout_raises_fit_deadline_exceeded(self, mock_prophet_class):
+        """Should raise FitDeadlineExceeded carrying the training data"""
+        mock_prophet_class.return_value.fit.side_effect = TimeoutError()
+
+        historic_data = pd.DataFrame(
+            {"ds": pd.to_datetime(["2023-12-30"]), "y": [1000.0]}
+        )
+        with pytest.raises(FitDeadlineExceeded) as exc_info:
+            generate_forecast(historic_data, fit_deadline=2.0)
+
+        assert exc_info.value.history is historic_data
+
+
+class TestClimatologyForecast:
+    """Tests for the cheap fallback forecast"""
+
+    def test_covers_rest_of_year(self, two_year_history):
+        """Should forecast every remaining day of the last history year"""
+        result = generate_climatology_forecast(two_year_history)
+
+        assert list(result.columns) == ["yhat", "yhat_lower", "yhat_upper"]
+        assert len(result) == 184  # July 1 through Dec 31
+        assert not result.isna().any().any()
+
+    def test_band_brackets_median(self, two_year_history):
+        """Should produce lower <= median <= upper for every day"""
+        result = generate_climatology_forecast(two_year_history)
+
+        assert (result["yhat_lower"] <= result["yhat"]).all()
+        assert (result["yhat"] <= result["yhat_upper"]).all()
+
+
+class TestDeadlineFallbackEndpoint:
+    """Tests for fallback responses from /usgs/forecast"""
+
+    @patch("flow_forecast.usgs.router.generate_prophet_forecast")
+    def test_overrun_returns_climatology_fallback(
+        self, mock_forecast, two_year_history
+    ):
+        """Should answer from a climatology forecast and count the overrun"""
+        mock_forecast.side_effect = FitDeadlineExceeded(0.5, two_year_history)
+
+        response = client.post(
+            "/usgs/forecast", json=REQUEST, headers={"X-Fit-Deadline": "0.5"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["X-Forecast-Fallback"] == "climatology"
+        assert len(response.json()) > 0
+        assert mock_forecast.call_args[1]["fit_deadline"] == 0.5
+        assert metrics.counter("fit_deadline_overruns") == {"01646500": 1}
+
+    @patch("flow_forecast.usgs.router.generate_prophet_forecast")
+    def test_fallback_is_not_cached(self, mock_forecast, two_year_history):
+        """Should retry the fit on the next request after a fallback"""
+        mock_forecast.side_effect = FitDeadlineExceeded(0.5, two_year_history)
+
+        client.post("/usgs/forecast", json=REQUEST)
+        response = client.post("/usgs/forecast", json=REQUEST)
+
+        assert response.headers["X-Forecast-Cache"] == "miss"
+        assert mock_forecast.call_count == 2
+
+    def test_rejects_non_positive_deadline(self):
+        """Should reject a zero or negative deadline header"""
+        response = client.post(
+            "/usgs/forecast", json=REQUEST, headers={"X-Fit-Deadline": "0"}
+        )
+        assert response.status_code == 422
+
+    def test_metrics_endpoint_reports_overruns(self):
+        """Should expose overrun counts at /metrics"""
+        metrics.increment("fit_deadline_overruns", "01646500")
+
+        response = client.get("/metrics")
+
+        assert response.json()["counters"]["fit_deadline_overruns"] == {"01646500": 1}
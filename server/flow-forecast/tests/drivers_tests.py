@@ -0,0 +1,284 @@
+import datetime as dt
+import time
+from unittest.mock import patch
+
+import httpx
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from flow_forecast.app import app
+from flow_forecast.drivers.base import daily_frame, daily_means, merge_series
+from flow_forecast.drivers.canada import EnvironmentCanadaDriver
+from flow_forecast.drivers.dwr import ColoradoDwrDriver
+from flow_forecast.drivers.lawa import LawaDriver
+from flow_forecast.drivers.service import DRIVERS
+from flow_forecast.drivers.session import DriverSession
+from flow_forecast.jobs import ForecastJobQueue
+from flow_forecast.loadtest.fake_usgs import synthetic_series
+from flow_forecast.model.jobs import ForecastJobStatus
+
+client = TestClient(app)
+
+START = dt.date(2023, 1, 1)
+END = dt.date(2024, 6, 30)
+
+
+def days(*dates: str) -> np.ndarray:
+    return np.array(dates, dtype="datetime64[D]")
+
+
+def wait_for_jobs(queue: ForecastJobQueue, job_ids: list[str], timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    finished = (ForecastJobStatus.succeeded, ForecastJobStatus.failed)
+    while time.monotonic() < deadline:
+        if all(queue.get(job_id).status in finished for job_id in job_ids):
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"Jobs {job_ids} did not finish")
+
+
+@pytest.fixture
+def upstream():
+    """Routes every driver request to `upstream.handler`, recording requests"""
+
+    class Upstream:
+        requests: list[httpx.Request] = []
+
+        def handler(self, request: httpx.Request) -> httpx.Response:
+            raise AssertionError(f"Unexpected request {request.url}")
+
+        def __call__(self, request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            return self.handler(request)
+
+    fake = Upstream()
+    fake.requests = []
+    session = DriverSession(
+        max_connections=4, timeout_seconds=5, transport=httpx.MockTransport(fake)
+    )
+    with patch("flow_forecast.drivers.service.driver_session", session):
+        yield fake
+    session.close()
+    for driver in DRIVERS.values():
+        driver.breaker.reset()
+
+
+def fetch(driver, site_ids, start=START, end=END):
+    session = DriverSession(max_connections=2, timeout_seconds=5)
+    try:
+        return session.fetch_daily(driver, site_ids, start, end)
+    finally:
+        session.close()
+
+
+def dwr_rows(site_id: str) -> list[dict]:
+    return [
+        {
+            "abbrev": site_id,
+            "parameter": "DISCHRG",
+            "measDate": f"{row['dateTime'][:10]} 00:00:00",
+            "measValue": float(row["value"]),
+            "measUnit": "cfs",
+        }
+        for row in synthetic_series(site_id, "DISCHRG", START, END)
+    ]
+
+
+class TestDailySeries:
+    """Tests for normalizing source readings to daily frames"""
+
+    def test_daily_frame_matches_cleaned_usgs_shape(self):
+        frame = daily_frame(
+            days("2024-01-03", "2024-01-01", "2024-01-04"), np.array([3.0, 1.0, -1])
+        )
+
+        assert list(frame.columns) == ["dateTime", "value"]
+        assert frame["dateTime"].tolist() == list(
+            pd.date_range("2024-01-01", "2024-01-04")
+        )
+        np.testing.assert_array_equal(frame["value"], [1.0, np.nan, 3.0, np.nan])
+
+    def test_daily_means_and_merge(self):
+        readings = np.array(
+            ["2024-01-01T01:00", "2024-01-01T13:00", "2024-01-02T00:00"],
+            dtype="datetime64[s]",
+        )
+        provisional = daily_means(readings, np.array([1.0, 3.0, 5.0]))
+        approved = (days("2024-01-01"), np.array([10.0]))
+
+        frame = daily_frame(*merge_series(approved, provisional))
+
+        np.testing.assert_array_equal(provisional[1], [2.0, 5.0])
+        np.testing.assert_array_equal(frame["value"], [10.0, 5.0])
+
+
+class TestDrivers:
+    """Tests for each source's history requests and parsing"""
+
+    def test_canada_pages_daily_means_and_tops_up_with_realtime(self):
+        today = dt.date.today()
+        pages = {
+            ("hydrometric-daily-mean", 0): [
+                {"properties": {"DATE": "2024-01-01", "DISCHARGE": 1.5}}
+            ]
+            * 10000,
+            ("hydrometric-daily-mean", 10000): [
+                {"properties": {"DATE": str(today - dt.timedelta(2)), "DISCHARGE": 4}},
+                {"properties": {"DATE": "2024-01-02", "DISCHARGE": None}},
+            ],
+            ("hydrometric-realtime", 0): [
+                {
+                    "properties": {
+                        "DATETIME": f"{today - dt.timedelta(2)}T06:00:00Z",
+                        "DISCHARGE": 9.0,
+                    }
+                },
+                {
+                    "properties": {
+                        "DATETIME": f"{today - dt.timedelta(1)}T06:00:00Z",
+                        "DISCHARGE": 6.0,
+                    }
+                },
+            ],
+        }
+
+        def handler(request):
+            assert request.url.params["STATION_NUMBER"] == "08MH103"
+            collection = request.url.path.split("/")[2]
+            offset = int(request.url.params["offset"])
+            return httpx.Response(200, json={"features": pages[(collection, offset)]})
+
+        driver = EnvironmentCanadaDriver("https://canada.test")
+        with patch.object(httpx.AsyncClient, "get", mock_get(handler)):
+            series = fetch(driver, ["08MH103"], START, today)
+
+        frame = daily_frame(*series["08MH103"])
+        assert frame["value"].iloc[0] == 1.5
+        assert frame["value"].iloc[-2:].tolist() == [4.0, 6.0]
+
+    def test_dwr_fetches_a_batch_in_one_request(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            rows = dwr_rows("PLACHECO") + dwr_rows("ARKCANCO")
+            return httpx.Response(
+                200, json={"PageCount": 1, "ResultCount": len(rows), "ResultList": rows}
+            )
+
+        with patch.object(httpx.AsyncClient, "get", mock_get(handler)):
+            series = fetch(
+                ColoradoDwrDriver("https://dwr.test"), ["PLACHECO", "ARKCANCO"]
+            )
+
+        assert len(requests) == 1
+        assert requests[0].url.params["abbrev"] == "PLACHECO,ARKCANCO"
+        assert requests[0].url.params["startDate"] == "01/01/2023"
+        assert set(series) == {"PLACHECO", "ARKCANCO"}
+        assert len(series["PLACHECO"][0]) == (END - START).days + 1
+
+    def test_lawa_averages_samples_per_day(self):
+        samples = [
+            {"Date": "11 Jul 2024", "Time": "6:10 PM", "Value": "2.0"},
+            {"DateTime": "2024-07-11T06:00:00", "NumericValue": "4.0"},
+            {"Date": "12 Jul 2024", "Time": "1:00 AM", "Value": ""},
+        ]
+
+        def handler(request):
+            assert request.url.params["pageId"] == "30180"
+            return httpx.Response(200, json=samples)
+
+        with patch.object(httpx.AsyncClient, "get", mock_get(handler)):
+            series = fetch(LawaDriver("https://lawa.test"), ["30180"])
+
+        np.testing.assert_array_equal(series["30180"][0], days("2024-07-11"))
+        np.testing.assert_array_equal(series["30180"][1], [3.0])
+
+    def test_upstream_errors_open_the_sources_circuit(self):
+        driver = LawaDriver("https://lawa.test")
+
+        with patch.object(
+            httpx.AsyncClient,
+            "get",
+            mock_get(lambda request: httpx.Response(503)),
+        ):
+            for _ in range(driver.breaker.failure_threshold):
+                with pytest.raises(ConnectionError, match="503"):
+                    fetch(driver, ["30180"])
+            with pytest.raises(ConnectionError, match="open"):
+                fetch(driver, ["30180"])
+
+
+def mock_get(handler):
+    async def get(self, url, params=None):
+        request = httpx.Request("GET", url, params=params)
+        response = handler(request)
+        response.request = request
+        return response
+
+    return get
+
+
+class TestSourceRoutes:
+    """Tests for the per-source forecast routes"""
+
+    def test_forecasts_a_station_through_the_shared_cache(self, upstream):
+        upstream.handler = lambda request: httpx.Response(
+            200,
+            json={"PageCount": 1, "ResultList": dwr_rows("PLACHECO")},
+        )
+        forecast = pd.DataFrame(
+            {"yhat": [10.0] * 3, "yhat_lower": [5.0] * 3, "yhat_upper": [15.0] * 3}
+        )
+        request = {"site_id": "PLACHECO", "horizon_days": 3}
+
+        with patch(
+            "flow_forecast.usgs.service.generate_forecast", return_value=forecast
+        ):
+            first = client.post("/dwr/forecast", json=request)
+            second = client.post("/dwr/forecast", json=request)
+
+        assert first.status_code == 200
+        assert first.headers["X-Forecast-Cache"] == "miss"
+        assert second.headers["X-Forecast-Cache"] == "hit"
+        assert [p["forecast"] for p in first.json()[-3:]] == [10.0] * 3
+        assert len(upstream.requests) == 1
+
+    def test_batch_jobs_share_one_history_request(self, upstream):
+        sites = ["PLACHECO", "ARKCANCO", "NOTASITE"]
+        upstream.handler = lambda request: httpx.Response(
+            200,
+            json={
+                "PageCount": 1,
+                "ResultList": dwr_rows("PLACHECO") + dwr_rows("ARKCANCO"),
+            },
+        )
+        queue = ForecastJobQueue(
+            workers=1, retention_seconds=3600, result_ttl_seconds=3600
+        )
+
+        with (
+            patch("flow_forecast.drivers.router.forecast_jobs", queue),
+            patch("flow_forecast.drivers.router.run_forecast") as run,
+        ):
+            response = client.post("/dwr/forecast/jobs", json={"site_ids": sites})
+            job_ids = [job["job_id"] for job in response.json()]
+            # Shutting down would drop jobs still queued behind the one worker
+            wait_for_jobs(queue, job_ids)
+        queue.shutdown(wait=True)
+
+        assert response.status_code == 202
+        assert len(set(job_ids)) == 3
+        assert len(upstream.requests) == 1
+        histories = {
+            call.args[0].site_id: call.kwargs["history"] for call in run.call_args_list
+        }
+        assert histories["NOTASITE"] is None
+        assert list(histories["PLACHECO"].columns) == ["dateTime", "value"]
+
+    def test_rejects_malformed_site_ids(self):
+        response = client.post("/canada/forecast", json={"site_id": "08MH 103"})
+
+        assert response.status_code == 422
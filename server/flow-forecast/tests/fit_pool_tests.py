@@ -0,0 +1,160 @@
+import pickle
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from flow_forecast.fit_pool import FitPool
+from flow_forecast.usgs.service import FitDeadlineExceeded, generate_prophet_forecast
+
+
+@pytest.fixture
+def seasonal_history():
+    ds = pd.date_range("2021-01-01", "2023-06-30")
+    y = 100 + 50 * np.sin(np.arange(len(ds)) * 2 * np.pi / 365.25)
+    return pd.DataFrame({"ds": ds, "y": y})
+
+
+class FakeExecutor:
+    """Stands in for a ProcessPoolExecutor, broken or not"""
+
+    def __init__(self, broken: bool = False, on_submit=None):
+        self.broken = broken
+        self.on_submit = on_submit
+        self.shut_down = False
+
+    def submit(self, *args) -> Future:
+        if self.on_submit is not None:
+            self.on_submit()
+        future = Future()
+        if self.broken:
+            future.set_exception(BrokenProcessPool("worker died"))
+        else:
+            future.set_result(
+                (pd.DataFrame({"yhat": [1.0]}), {"pid": 1, "rss_bytes": 1})
+            )
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False) -> None:
+        self.shut_down = True
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = FitPool(workers=1, max_fits_per_worker=2)
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+class TestFitPool:
+    """Tests for the fork-server fit pool"""
+
+    def test_reports_spawn_time_and_worker_memory(self, pool):
+        stats = pool.stats()
+
+        assert stats["running"]
+        assert stats["spawn_seconds"] > 0
+        assert len(stats["worker_rss_bytes"]) == 1
+        assert all(rss > 0 for rss in stats["worker_rss_bytes"].values())
+
+    def test_fits_in_worker(self, pool, seasonal_history):
+        """Should return the same shape of forecast as an in-process fit"""
+        result = pool.generate_forecast(seasonal_history, horizon_days=10)
+
+        assert list(result.columns) == ["yhat", "yhat_lower", "yhat_upper"]
+        assert len(result) == 10
+
+    def test_recycles_workers(self, pool, seasonal_history):
+        """Should replace a worker after max_fits_per_worker fits"""
+        pids = set()
+        for _ in range(3):
+            pool.generate_forecast(seasonal_history, horizon_days=1)
+            pids.update(pool.stats()["worker_rss_bytes"])
+
+        assert len(pids) >= 2
+        assert len(pool.stats()["worker_rss_bytes"]) == 1
+
+    def test_not_running_raises(self, seasonal_history):
+        with pytest.raises(RuntimeError, match="not running"):
+            FitPool(workers=1, max_fits_per_worker=1).generate_forecast(
+                seasonal_history
+            )
+
+
+class TestFitPoolRestart:
+    """Tests for replacing a pool whose worker died"""
+
+    def test_first_failed_fit_restarts_the_pool(self, seasonal_history):
+        pool = FitPool(workers=1, max_fits_per_worker=1)
+        broken, fresh = FakeExecutor(broken=True), FakeExecutor()
+        pool._executor = broken
+
+        def start():
+            pool._executor = fresh
+
+        with (
+            patch.object(pool, "start", side_effect=start) as started,
+            pytest.raises(RuntimeError, match="exited unexpectedly"),
+        ):
+            pool.generate_forecast(seasonal_history)
+
+        started.assert_called_once()
+        assert broken.shut_down and not fresh.shut_down
+        assert pool._executor is fresh
+
+    def test_later_failed_fits_retry_on_the_restarted_pool(self, seasonal_history):
+        pool = FitPool(workers=1, max_fits_per_worker=1)
+        fresh = FakeExecutor()
+
+        def restarted_by_another_caller():
+            pool._executor = fresh
+
+        pool._executor = FakeExecutor(
+            broken=True, on_submit=restarted_by_another_caller
+        )
+        pool.start = MagicMock()
+
+        result = pool.generate_forecast(seasonal_history)
+
+        assert list(result["yhat"]) == [1.0]
+        pool.start.assert_not_called()
+        assert not fresh.shut_down
+
+
+class TestFitPoolIntegration:
+    """Tests for how the pipeline uses the pool"""
+
+    def test_deadline_exception_survives_pickling(self, seasonal_history):
+        """Should cross the process boundary with its training data intact"""
+        restored = pickle.loads(
+            pickle.dumps(FitDeadlineExceeded(1.5, seasonal_history))
+        )
+
+        assert restored.deadline == 1.5
+        pd.testing.assert_frame_equal(restored.history, seasonal_history)
+
+    @patch("flow_forecast.usgs.service.get_daily_average_data")
+    @patch("flow_forecast.usgs.service.generate_forecast")
+    @patch("flow_forecast.usgs.service.fit_pool")
+    def test_pipeline_uses_running_pool(
+        self, mock_pool, mock_generate_forecast, mock_get_daily
+    ):
+        """Should send the fit to the pool instead of fitting in-process"""
+        mock_get_daily.return_value = [
+            {"dateTime": "2023-01-01", "value": "1000", "qualifiers": ["A"]}
+        ]
+        mock_pool.running = True
+        mock_pool.generate_forecast.return_value = pd.DataFrame(
+            {"yhat": [1.0], "yhat_lower": [0.0], "yhat_upper": [2.0]}
+        )
+
+        generate_prophet_forecast(
+            "01646500", "00060", pd.Timestamp("2023-01-01"), pd.Timestamp("2023-12-31")
+        )
+
+        mock_pool.generate_forecast.assert_called_once()
+        mock_generate_forecast.assert_not_called()
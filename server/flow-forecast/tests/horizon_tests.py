@@ -0,0 +1,192 @@
+import datetime as dt
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from flow_forecast.app import app
+from flow_forecast.usgs.service import (
+    build_forecast_output,
+    generate_forecast,
+    get_forecast_length,
+)
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def this_year_history():
+    """Readings from Jan 1 through 10 days ago"""
+    today = dt.date.today()
+    ds = pd.date_range(
+        dt.date(today.year, 1, 1), periods=max(today.timetuple().tm_yday - 10, 1)
+    )
+    return pd.DataFrame({"ds": ds, "y": np.full(len(ds), 100.0)})
+
+
+def forecast_rows(n: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "yhat": np.full(n, 5.0),
+            "yhat_lower": np.full(n, 4.0),
+            "yhat_upper": np.full(n, 6.0),
+        }
+    )
+
+
+@pytest.fixture
+def sample_forecast_df():
+    return pd.DataFrame(
+        {
+            "past_value": [1000.0],
+            "forecast": [1100.0],
+            "lower_error_bound": [1000.0],
+            "upper_error_bound": [1200.0],
+        },
+        index=["1/1"],
+    )
+
+
+class TestForecastHorizon:
+    """Tests for horizon-limited forecasts"""
+
+    def test_forecast_length_uses_horizon(self):
+        assert get_forecast_length(dt.date(2023, 1, 10), horizon_days=7) == 7
+
+    @patch("flow_forecast.usgs.service.Prophet")
+    def test_predicts_only_horizon(self, mock_prophet_class):
+        """Should ask Prophet for exactly horizon_days future rows"""
+        mock_model = MagicMock()
+        mock_prophet_class.return_value = mock_model
+        mock_model.predict.return_value = pd.DataFrame(
+            {"yhat": [100], "yhat_lower": [90], "yhat_upper": [110]}
+        )
+
+        historic_data = pd.DataFrame(
+            {"ds": pd.to_datetime(["2023-01-10"]), "y": [1000.0]}
+        )
+        generate_forecast(historic_data, horizon_days=14)
+
+        assert mock_model.make_future_dataframe.call_args[1]["periods"] == 14
+
+
+class TestBuildForecastOutput:
+    """Tests for sizing the forecast output"""
+
+    def test_default_covers_whole_year(self, this_year_history):
+        last_day = this_year_history["ds"].iloc[-1].date()
+        result = build_forecast_output(
+            this_year_history, forecast_rows(get_forecast_length(last_day))
+        )
+
+        year = dt.date.today().year
+        assert len(result) == len(pd.date_range(f"{year}-01-01", f"{year}-12-31"))
+        assert result.index[0] == "1/1"
+        assert result.index[-1] == "12/31"
+        assert result["past_value"].iloc[0] == 100.0
+        assert result["forecast"].iloc[-1] == 5.0
+
+    def test_horizon_sizes_output(self, this_year_history):
+        """Should return this year's readings followed by horizon days only"""
+        result = build_forecast_output(
+            this_year_history, forecast_rows(7), horizon_days=7
+        )
+
+        assert len(result) == len(this_year_history) + 7
+        assert result["forecast"].iloc[-7:].eq(5.0).all()
+        assert result["past_value"].iloc[-7:].isna().all()
+
+    def test_only_future_with_horizon(self, this_year_history):
+        """Should return just the forecast days"""
+        result = build_forecast_output(
+            this_year_history, forecast_rows(7), horizon_days=7, only_future=True
+        )
+
+        first_forecast = this_year_history["ds"].iloc[-1] + pd.Timedelta(days=1)
+        assert len(result) == 7
+        assert result.index[0] == first_forecast.strftime("%-m/%-d")
+        assert result["past_value"].isna().all()
+
+    def test_only_future_without_horizon(self, this_year_history):
+        """Should return the days from the first forecast day to year end"""
+        last_day = this_year_history["ds"].iloc[-1].date()
+        n = get_forecast_length(last_day)
+
+        result = build_forecast_output(
+            this_year_history, forecast_rows(n), only_future=True
+        )
+
+        assert len(result) == n
+        assert result.index[-1] == "12/31"
+
+    def test_horizon_past_year_end_labels_years(self):
+        """Should label every row with its year when the horizon wraps"""
+        year = dt.date.today().year
+        ds = pd.date_range(f"{year}-01-01", f"{year}-12-25")
+        history = pd.DataFrame({"ds": ds, "y": np.full(len(ds), 100.0)})
+
+        result = build_forecast_output(history, forecast_rows(14), horizon_days=14)
+
+        assert len(result) == len(ds) + 14
+        assert result.index.is_unique
+        assert result.index[0] == f"1/1/{year}"
+        assert result.index[-1] == f"1/8/{year + 1}"
+        assert result.loc[f"1/5/{year + 1}", "forecast"] == 5.0
+        assert result.loc[f"1/5/{year}", "past_value"] == 100.0
+
+    def test_only_future_within_year_keeps_month_day_labels(self):
+        year = dt.date.today().year
+        ds = pd.date_range(f"{year}-01-01", f"{year}-12-20")
+        history = pd.DataFrame({"ds": ds, "y": np.full(len(ds), 100.0)})
+
+        result = build_forecast_output(
+            history, forecast_rows(7), horizon_days=7, only_future=True
+        )
+
+        assert list(result.index) == [f"12/{day}" for day in range(21, 28)]
+
+
+class TestHorizonEndpoint:
+    """Tests for horizon options on /usgs/forecast"""
+
+    @patch("flow_forecast.usgs.router.generate_prophet_forecast")
+    def test_passes_horizon_options(self, mock_forecast, sample_forecast_df):
+        mock_forecast.return_value = sample_forecast_df
+
+        response = client.post(
+            "/usgs/forecast",
+            json={
+                "site_id": "01646500",
+                "reading_parameter": "00060",
+                "horizon_days": 14,
+                "only_future": True,
+            },
+        )
+
+        assert response.status_code == 200
+        assert mock_forecast.call_args[1]["horizon_days"] == 14
+        assert mock_forecast.call_args[1]["only_future"] is True
+
+    @patch("flow_forecast.usgs.router.generate_prophet_forecast")
+    def test_horizons_are_cached_separately(self, mock_forecast, sample_forecast_df):
+        mock_forecast.return_value = sample_forecast_df
+        base = {"site_id": "01646500", "reading_parameter": "00060"}
+
+        client.post("/usgs/forecast", json={**base, "horizon_days": 7})
+        response = client.post("/usgs/forecast", json={**base, "horizon_days": 30})
+
+        assert response.headers["X-Forecast-Cache"] == "miss"
+        assert mock_forecast.call_count == 2
+
+    def test_rejects_out_of_range_horizon(self):
+        response = client.post(
+            "/usgs/forecast",
+            json={
+                "site_id": "01646500",
+                "reading_parameter": "00060",
+                "horizon_days": 0,
+            },
+        )
+        assert response.status_code == 422
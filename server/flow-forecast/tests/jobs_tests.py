@@ -0,0 +1,191 @@
+import datetime as dt
+import time
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from flow_forecast.app import app
+from flow_forecast.jobs import ForecastJobQueue, forecast_jobs
+from flow_forecast.model.forecast_result import ForecastDataPoint
+from flow_forecast.model.jobs import ForecastJobStatus
+
+client = TestClient(app)
+
+REQUEST = {
+    "site_id": "01646500",
+    "reading_parameter": "00060",
+    "start_date": "2023-01-01",
+    "end_date": "2023-12-31",
+}
+
+
+def wait_for(queue: ForecastJobQueue, job_id: str, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job.status in (ForecastJobStatus.succeeded, ForecastJobStatus.failed):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+@pytest.fixture
+def sample_forecast_df():
+    return pd.DataFrame(
+        {
+            "past_value": [1000.0],
+            "forecast": [1100.0],
+            "lower_error_bound": [1000.0],
+            "upper_error_bound": [1200.0],
+        },
+        index=["1/1"],
+    )
+
+
+class TestForecastJobQueue:
+    """Tests for the background job queue"""
+
+    def test_runs_work_and_stores_result(self):
+        """Should run submitted work and expose its result"""
+        queue = ForecastJobQueue(workers=1, retention_seconds=60, result_ttl_seconds=30)
+        point = ForecastDataPoint(
+            index="1/1",
+            past_value=1.0,
+            forecast=None,
+            lower_error_bound=None,
+            upper_error_bound=None,
+        )
+
+        job = queue.submit(("a",), lambda: [point])
+        finished = wait_for(queue, job.job_id)
+
+        assert finished.status == ForecastJobStatus.succeeded
+        assert finished.result == [point]
+        queue.shutdown()
+
+    def test_deduplicates_same_key(self):
+        """Should return the existing job for a repeated key"""
+        queue = ForecastJobQueue(workers=1, retention_seconds=60, result_ttl_seconds=30)
+        calls = []
+
+        def work():
+            calls.append(1)
+            return []
+
+        first = queue.submit(("a",), work)
+        wait_for(queue, first.job_id)
+        second = queue.submit(("a",), work)
+
+        assert first.job_id == second.job_id
+        assert second.status == ForecastJobStatus.succeeded
+        assert len(calls) == 1
+        queue.shutdown()
+
+    def test_failed_jobs_record_error_and_can_be_retried(self):
+        """Should record the failure and rerun a failed key on resubmission"""
+        queue = ForecastJobQueue(workers=1, retention_seconds=60, result_ttl_seconds=30)
+
+        def fail():
+            raise RuntimeError("boom")
+
+        job = queue.submit(("a",), fail)
+        failed = wait_for(queue, job.job_id)
+        assert failed.status == ForecastJobStatus.failed
+        assert failed.error == "boom"
+        assert failed.error_status_code == 500
+
+        retried = queue.submit(("a",), lambda: [])
+        assert retried.status == ForecastJobStatus.queued
+        assert retried.job_id != job.job_id
+        assert wait_for(queue, retried.job_id).status == ForecastJobStatus.succeeded
+        queue.shutdown()
+
+    def test_reruns_results_older_than_the_ttl(self):
+        """Should start a new job once the finished result is past its TTL"""
+        queue = ForecastJobQueue(workers=1, retention_seconds=60, result_ttl_seconds=30)
+        calls = []
+
+        def work():
+            calls.append(1)
+            return []
+
+        first = queue.submit(("a",), work)
+        finished = wait_for(queue, first.job_id)
+
+        later = finished.finished_at + dt.timedelta(seconds=31)
+        with patch("flow_forecast.jobs._now", return_value=later):
+            assert queue.find(("a",)) is None
+            second = queue.submit(("a",), work)
+        wait_for(queue, second.job_id)
+
+        assert second.job_id != first.job_id
+        assert len(calls) == 2
+        queue.shutdown()
+
+    def test_job_ids_are_not_derived_from_the_key(self):
+        """Should give each new job an unpredictable id"""
+        first = ForecastJobQueue(workers=1, retention_seconds=60, result_ttl_seconds=30)
+        second = ForecastJobQueue(
+            workers=1, retention_seconds=60, result_ttl_seconds=30
+        )
+
+        assert first.submit(("a",), lambda: []).job_id != (
+            second.submit(("a",), lambda: []).job_id
+        )
+        first.shutdown()
+        second.shutdown()
+
+    def test_expires_finished_jobs(self):
+        """Should forget finished jobs past the retention window"""
+        queue = ForecastJobQueue(workers=1, retention_seconds=60, result_ttl_seconds=30)
+
+        job = queue.submit(("a",), lambda: [])
+        finished = wait_for(queue, job.job_id)
+
+        later = finished.finished_at + dt.timedelta(seconds=61)
+        with patch("flow_forecast.jobs._now", return_value=later):
+            assert queue.get(job.job_id) is None
+            assert queue.find(("a",)) is None
+        queue.shutdown()
+
+
+class TestForecastJobEndpoints:
+    """Tests for /usgs/forecast/jobs endpoints"""
+
+    @patch("flow_forecast.usgs.router.generate_prophet_forecast")
+    def test_submit_and_poll(self, mock_forecast, sample_forecast_df):
+        """Should accept a job and later return its result"""
+        mock_forecast.return_value = sample_forecast_df
+
+        response = client.post("/usgs/forecast/jobs", json=REQUEST)
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        wait_for(forecast_jobs, job_id)
+        response = client.get(f"/usgs/forecast/jobs/{job_id}")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == "succeeded"
+        assert body["result"][0]["past_value"] == 1000.0
+
+    @patch("flow_forecast.usgs.router.generate_prophet_forecast")
+    def test_failed_job_reports_http_error(self, mock_forecast):
+        """Should report the status the synchronous endpoint would have used"""
+        mock_forecast.side_effect = ConnectionError("USGS API unreachable")
+
+        response = client.post(
+            "/usgs/forecast/jobs", json={**REQUEST, "site_id": "01646501"}
+        )
+        job = wait_for(forecast_jobs, response.json()["job_id"])
+
+        assert job.status == ForecastJobStatus.failed
+        assert job.error_status_code == 502
+        assert "USGS API" in job.error
+
+    def test_unknown_job_returns_404(self):
+        """Should return 404 for unknown job ids"""
+        response = client.get("/usgs/forecast/jobs/does-not-exist")
+        assert response.status_code == 404
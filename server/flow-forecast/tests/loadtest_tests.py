@@ -0,0 +1,92 @@
+import asyncio
+import datetime as dt
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from flow_forecast.app import app
+from flow_forecast.loadtest import LoadTestSettings, run_load
+from flow_forecast.loadtest.fake_usgs import synthetic_series
+from flow_forecast.loadtest.generator import _Sample, summarize
+from flow_forecast.usgs.service import (
+    generate_climatology_forecast,
+    get_daily_average_data,
+)
+
+
+def climatology_fit(historic_data, fit_deadline=None, horizon_days=None):
+    return generate_climatology_forecast(historic_data, horizon_days)
+
+
+class TestFakeUsgs:
+    """Tests for the local USGS stand-in"""
+
+    @pytest.mark.parametrize("fake_usgs", [3], indirect=True)
+    def test_serves_usgs_shaped_payload(self, fake_usgs):
+        data = get_daily_average_data(
+            "01646500", "00060", dt.date(2020, 1, 1), dt.date(2023, 12, 31)
+        )
+
+        # Only history_years of the requested range is available
+        assert 3 * 365 * 0.95 < len(data) <= 3 * 366
+        assert data[-1]["dateTime"].startswith("2023-12-31")
+        assert float(data[0]["value"]) > 0
+
+    def test_series_is_deterministic_per_site(self):
+        start, end = dt.date(2023, 1, 1), dt.date(2023, 3, 1)
+
+        assert synthetic_series("01646500", "00060", start, end) == synthetic_series(
+            "01646500", "00060", start, end
+        )
+        assert synthetic_series("01646500", "00060", start, end) != synthetic_series(
+            "01646501", "00060", start, end
+        )
+
+    def test_injects_errors(self, fake_usgs):
+        fake_usgs.settings.error_rate = 1.0
+
+        with pytest.raises(ConnectionError, match="503"):
+            get_daily_average_data(
+                "01646500", "00060", dt.date(2023, 1, 1), dt.date(2023, 12, 31)
+            )
+
+
+class TestLoadGenerator:
+    """Tests for the load generator and its report"""
+
+    def test_summarize(self):
+        samples = [_Sample(i / 1000, "200", "miss") for i in range(1, 100)]
+        samples.append(_Sample(1.0, "502", None))
+        samples.append(_Sample(2.0, "ReadTimeout", None))
+
+        report = summarize(samples, elapsed=10.0)
+
+        assert report.requests == 101
+        assert report.errors == 2
+        assert report.error_rate == pytest.approx(2 / 101)
+        assert report.throughput_rps == pytest.approx(10.1)
+        assert report.latency_p50_ms == pytest.approx(51.0)
+        assert report.latency_max_ms == pytest.approx(2000.0)
+        assert report.cache_counts == {"miss": 99}
+
+    def test_drives_forecast_endpoint(self, fake_usgs):
+        """Should exercise the full request path against the fake service"""
+        settings = LoadTestSettings(
+            target="http://flow-forecast",
+            rps=50,
+            duration_seconds=0.2,
+            sites=["01646500", "01646501"],
+        )
+        transport = httpx.ASGITransport(app=app)
+
+        with patch(
+            "flow_forecast.usgs.service.generate_forecast", side_effect=climatology_fit
+        ):
+            report = asyncio.run(run_load(settings, transport=transport))
+
+        assert report.requests == 10
+        assert report.errors == 0
+        assert report.status_counts == {"200": 10}
+        assert report.cache_counts["miss"] >= 2
+        assert report.latency_p99_ms is not None
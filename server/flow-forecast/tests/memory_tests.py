@@ -0,0 +1,81 @@
+import datetime as dt
+import tracemalloc
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from flow_forecast.usgs import service
+from flow_forecast.usgs.service import (
+    generate_prophet_forecast,
+    get_forecast_length,
+    month_day_labels,
+)
+
+# Peak traced allocation allowed for cleaning and assembling a 30-year site,
+# excluding the fit itself. The previous frame-copying pipeline peaked at
+# roughly 0.95 MiB for the same input.
+PIPELINE_PEAK_BUDGET_BYTES = int(0.75 * 2**20)
+
+
+@pytest.fixture
+def thirty_year_records():
+    """Daily USGS values from 30 years ago through yesterday"""
+    today = dt.date.today()
+    days = pd.date_range(
+        dt.date(today.year - 30, 1, 1), today - dt.timedelta(days=1)
+    ).strftime("%Y-%m-%dT00:00:00.000")
+    return [
+        {"dateTime": day, "value": str(100 + i % 365), "qualifiers": ["A"]}
+        for i, day in enumerate(days)
+    ]
+
+
+def fake_generate_forecast(historic_data, fit_deadline=None, horizon_days=None):
+    n = get_forecast_length(historic_data["ds"].iloc[-1].date(), horizon_days)
+    return pd.DataFrame(
+        {"yhat": np.ones(n), "yhat_lower": np.zeros(n), "yhat_upper": np.ones(n) * 2}
+    )
+
+
+class TestPipelineMemory:
+    """Tests for the memory footprint of generate_prophet_forecast"""
+
+    @patch.object(service, "generate_forecast", side_effect=fake_generate_forecast)
+    @patch.object(service, "get_daily_average_data")
+    def test_thirty_year_site_within_budget(
+        self, mock_get_daily, mock_generate_forecast, thirty_year_records
+    ):
+        """Should clean and assemble 30 years of history within the budget"""
+        mock_get_daily.return_value = thirty_year_records
+
+        def run():
+            return generate_prophet_forecast(
+                "01646500", "00060", dt.date(1990, 1, 1), dt.date.today()
+            )
+
+        run()  # warm one-time caches so they are not counted
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            result = run()
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+        finally:
+            tracemalloc.stop()
+
+        year = dt.date.today().year
+        assert len(result) == len(pd.date_range(f"{year}-01-01", f"{year}-12-31"))
+        assert peak < PIPELINE_PEAK_BUDGET_BYTES, f"peak {peak / 2**20:.2f} MiB"
+
+
+class TestMonthDayLabels:
+    """Tests for vectorised index labels"""
+
+    @pytest.mark.parametrize("year", [2023, 2024])
+    def test_matches_strftime(self, year):
+        dates = pd.date_range(f"{year}-01-01", f"{year + 1}-01-05")
+
+        labels = month_day_labels(np.datetime64(f"{year}-01-01", "D"), len(dates))
+
+        assert list(labels) == [date.strftime("%-m/%-d") for date in dates]
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import logging
+import time
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from flow_forecast import server_timing
+from flow_forecast.app import app
+from flow_forecast.cache import forecast_cache
+from flow_forecast.logs import JsonFormatter, _DeferredQueueHandler
+from flow_forecast.middleware import RequestTimingMiddleware
+from flow_forecast.model.usgs import USGSFlowForecastRequest
+from flow_forecast.server_timing import header_value
+from flow_forecast.usgs.router import forecast_spec
+
+client = TestClient(app)
+
+
+def request_records(caplog) -> list[logging.LogRecord]:
+    return [r for r in caplog.records if r.name == "flow_forecast.middleware"]
+
+
+def server_timing_stages(response) -> dict[str, float]:
+    stages = {}
+    for metric in response.headers["Server-Timing"].split(", "):
+        name, duration = metric.split(";dur=")
+        stages[name] = float(duration)
+    return stages
+
+
+@pytest.fixture
+def mock_prophet():
+    with patch("flow_forecast.usgs.service.Prophet") as mock_prophet_class:
+        mock_model = MagicMock()
+        mock_prophet_class.return_value = mock_model
+        mock_model.predict.return_value = pd.DataFrame(
+            {"yhat": np.ones(5), "yhat_lower": np.ones(5), "yhat_upper": np.ones(5)}
+        )
+        yield mock_model
+
+
+class TestServerTiming:
+    """Tests for the Server-Timing response header"""
+
+    def test_header_value(self):
+        assert header_value([("usgs.fetch", 0.01234), ("app", 0.5)]) == (
+            "usgs.fetch;dur=12.3, app;dur=500.0"
+        )
+
+    def test_reports_pipeline_stages(self, fake_usgs, mock_prophet):
+        response = client.post(
+            "/usgs/forecast",
+            json={"site_id": "01646500", "reading_parameter": "00060"},
+        )
+
+        assert response.status_code == 200
+        stages = server_timing_stages(response)
+        assert {
+            "usgs.fetch",
+            "forecast.clean",
+            "forecast.fit",
+            "forecast.predict",
+            "forecast.format_output",
+            "forecast.run",
+            "usgs.forecast",
+            "app",
+        } <= set(stages)
+        assert stages["app"] >= stages["usgs.forecast"] >= stages["usgs.fetch"]
+
+    def test_cache_hit_reports_only_lookup(self, fake_usgs, mock_prophet):
+        body = {"site_id": "01646500", "reading_parameter": "00060"}
+        client.post("/usgs/forecast", json=body)
+        response = client.post("/usgs/forecast", json=body)
+
+        assert response.headers["X-Forecast-Cache"] == "hit"
+        assert set(server_timing_stages(response)) == {"usgs.forecast", "app"}
+
+    def test_reported_on_errors(self):
+        response = client.post("/usgs/forecast", json={"site_id": "abc"})
+
+        assert response.status_code == 422
+        assert set(server_timing_stages(response)) == {"app"}
+
+
+class TestRequestLogging:
+    """Tests for structured, queued request logging"""
+
+    def test_logs_structured_fields(self, caplog):
+        with caplog.at_level(logging.INFO, logger="flow_forecast.middleware"):
+            client.get("/")
+
+        (record,) = request_records(caplog)
+        assert record.getMessage().startswith("GET / 200 ")
+        assert record.http_method == "GET"
+        assert record.http_path == "/"
+        assert record.http_status == 200
+        assert record.duration_ms >= 0
+        assert record.stages_ms == {}
+
+    def test_background_refresh_is_not_timed(self, caplog):
+        """Should log a stale hit's time without its refit after the response"""
+        body = {"site_id": "01646500", "reading_parameter": "00060"}
+        spec = forecast_spec(USGSFlowForecastRequest(**body))
+
+        def slow_refresh(spec):
+            time.sleep(0.5)
+            forecast_cache.put(spec, [])
+
+        with (
+            patch.object(forecast_cache, "ttl_seconds", 0),
+            patch("flow_forecast.usgs.router.refresh_forecast", slow_refresh),
+            caplog.at_level(logging.INFO, logger="flow_forecast.middleware"),
+        ):
+            forecast_cache.put(spec, [])
+            started = time.perf_counter()
+            response = client.post("/usgs/forecast", json=body)
+            elapsed = time.perf_counter() - started
+
+        assert response.headers["X-Forecast-Cache"] == "stale"
+        assert elapsed >= 0.5
+        (record,) = request_records(caplog)
+        assert record.duration_ms < 400
+
+    def test_repeated_stages_are_summed(self, caplog):
+        async def endpoint(scope, receive, send):
+            server_timing.record("forecast.fetch", 0.002)
+            server_timing.record("forecast.fetch", 0.003)
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+        async def call():
+            async def receive():
+                return {"type": "http.request", "body": b""}
+
+            async def send(message):
+                pass
+
+            scope = {"type": "http", "method": "GET", "path": "/x", "headers": []}
+            await RequestTimingMiddleware(endpoint)(scope, receive, send)
+
+        with caplog.at_level(logging.INFO, logger="flow_forecast.middleware"):
+            asyncio.run(call())
+
+        (record,) = request_records(caplog)
+        assert record.stages_ms == {"forecast.fetch": 5.0}
+
+    def test_json_formatter_includes_extra_fields(self):
+        record = logging.makeLogRecord(
+            {
+                "name": "flow_forecast.middleware",
+                "levelname": "INFO",
+                "msg": "%s %s",
+                "args": ("GET", "/"),
+                "http_status": 200,
+                "stages_ms": {"usgs.fetch": 1.5},
+            }
+        )
+
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert entry["message"] == "GET /"
+        assert entry["http_status"] == 200
+        assert entry["stages_ms"] == {"usgs.fetch": 1.5}
+
+    def test_queue_handler_defers_formatting(self):
+        queued = MagicMock()
+        handler = _DeferredQueueHandler(queued)
+        record = logging.makeLogRecord({"msg": "%s took %.3fs", "args": ("x", 1.0)})
+
+        handler.emit(record)
+
+        queued.put_nowait.assert_called_once_with(record)
+        assert record.args == ("x", 1.0)
+        assert not hasattr(record, "message")
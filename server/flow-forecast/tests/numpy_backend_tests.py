@@ -0,0 +1,170 @@
+import dataclasses
+import datetime as dt
+import logging
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+from prophet import Prophet
+from prophet.models import CmdStanPyBackend
+
+from flow_forecast.loadtest.fake_usgs import synthetic_series
+from flow_forecast.numpy_backend import NumpyProphet, _MapProblem
+from flow_forecast.usgs.recorder import ResponseRecorder
+from flow_forecast.usgs.service import (
+    FitDeadlineExceeded,
+    generate_forecast,
+    get_cleaned_data,
+    get_daily_average_data,
+)
+
+check_grad = pytest.importorskip("scipy.optimize").check_grad
+logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+
+# Real daily discharge recorded from USGS, replayed from tests/fixtures/usgs:
+# site id and the dates recorded
+RECORDED_SITES = {
+    "01632000": (dt.date(2008, 1, 1), dt.date(2018, 1, 1)),
+    "01634000": (dt.date(2008, 1, 1), dt.date(2018, 1, 1)),
+    "01581830": (dt.date(2002, 1, 1), dt.date(2005, 1, 1)),
+    "01589330": (dt.date(2002, 1, 1), dt.date(2005, 1, 1)),
+}
+RECORDINGS = Path(__file__).parent / "fixtures" / "usgs"
+
+
+def recorded_history(site_id: str) -> pd.DataFrame:
+    """The site's recorded history, cleaned as the forecast pipeline cleans it"""
+    recorder = ResponseRecorder("replay", RECORDINGS)
+    with patch("flow_forecast.usgs.service.usgs_recorder", recorder):
+        rows = get_daily_average_data(site_id, "00060", *RECORDED_SITES[site_id])
+    history = get_cleaned_data(rows)
+    history.columns = ["ds", "y"]
+    return history
+
+
+def site_history(site_id: str) -> pd.DataFrame:
+    rows = synthetic_series(
+        site_id, "00060", dt.date(2019, 1, 1), dt.date(2024, 6, 30), missing_rate=0.02
+    )
+    return pd.DataFrame(
+        {
+            "ds": pd.to_datetime([row["dateTime"][:10] for row in rows]),
+            "y": [float(row["value"]) for row in rows],
+        }
+    )
+
+
+def map_problem(history: pd.DataFrame, **prophet_args) -> tuple[_MapProblem, dict]:
+    model = NumpyProphet(**prophet_args)
+    inputs = model.preprocess(history)
+    init = dataclasses.asdict(model.calculate_initial_params(inputs.K))
+    return _MapProblem(dataclasses.asdict(inputs)), init
+
+
+def posterior_cost(problem: _MapProblem, params: dict) -> float:
+    flat = {name: value.reshape(-1) for name, value in params.items()}
+    x = problem.pack(
+        {
+            "k": flat["k"][0],
+            "m": flat["m"][0],
+            "delta": flat["delta"],
+            "beta": flat["beta"],
+            "sigma_obs": flat["sigma_obs"][0],
+        }
+    )
+    return problem.scaled_objective(x)[0]
+
+
+def stan_log_density(stan: Prophet, history: pd.DataFrame, params: dict) -> float:
+    """Stan's own log density at `params`, without the Jacobian adjustment,
+    which is what cmdstan's optimizer maximizes"""
+    flat = {name: value.reshape(-1) for name, value in params.items()}
+    init, data = CmdStanPyBackend.prepare_data(
+        {
+            "k": float(flat["k"][0]),
+            "m": float(flat["m"][0]),
+            "delta": flat["delta"],
+            "beta": flat["beta"],
+            "sigma_obs": float(flat["sigma_obs"][0]),
+        },
+        dataclasses.asdict(stan.preprocess(history)),
+    )
+    density = stan.stan_backend.model.log_prob(init, data, jacobian=False)
+    return float(density["lp__"].iloc[0])
+
+
+class TestMapProblem:
+    """Tests for the negative log posterior"""
+
+    @pytest.mark.parametrize("seasonality_mode", ["additive", "multiplicative"])
+    def test_gradient_matches_finite_differences(self, seasonality_mode):
+        problem, init = map_problem(
+            site_history("01646500").tail(400), seasonality_mode=seasonality_mode
+        )
+        x = problem.pack(init)
+        x += np.random.default_rng(0).uniform(0, 0.01, len(x))
+
+        error = check_grad(
+            lambda z: problem.scaled_objective(z)[0],
+            lambda z: problem.scaled_objective(z)[1],
+            x,
+        )
+
+        assert error < 1e-3 * np.linalg.norm(problem.scaled_objective(x)[1])
+
+    def test_rejects_logistic_growth(self):
+        history = site_history("01646500").tail(200).assign(cap=2000.0)
+
+        with pytest.raises(ValueError):
+            map_problem(history, growth="logistic")
+
+
+class TestNumpyBackend:
+    """Tests for in-process fits"""
+
+    @pytest.mark.parametrize("site_id", RECORDED_SITES)
+    def test_matches_stan_fit(self, site_id):
+        """Should reach at least Stan's posterior on real sites, scored by Stan"""
+        history = recorded_history(site_id)
+        stan = Prophet(interval_width=0.50)
+        numpy = NumpyProphet(interval_width=0.50)
+        forecasts = []
+        for model in (stan, numpy):
+            model.fit(history)
+            future = model.make_future_dataframe(periods=180, include_history=False)
+            forecasts.append(model.predict(future)["yhat"].to_numpy())
+        stan_density = stan_log_density(stan, history, stan.params)
+        numpy_density = stan_log_density(stan, history, numpy.params)
+
+        problem, _ = map_problem(history)
+        assert posterior_cost(problem, numpy.params) == pytest.approx(
+            -numpy_density, rel=1e-6
+        )
+        assert numpy_density >= stan_density - 1e-6 * abs(stan_density)
+        # cmdstan stops short of the optimum on these flashy series, so the
+        # forecasts agree closely rather than exactly
+        scale = history["y"].abs().max()
+        assert np.max(np.abs(forecasts[0] - forecasts[1])) < 5e-3 * scale
+
+    def test_fits_without_subprocesses_or_temp_files(self):
+        model = NumpyProphet()
+
+        with (
+            patch("subprocess.Popen", side_effect=AssertionError("spawned")),
+            patch("tempfile.mkdtemp", side_effect=AssertionError("temp dir")),
+        ):
+            model.fit(site_history("09380000"))
+
+        assert model.params["sigma_obs"].shape == (1, 1)
+        assert model.params["delta"].shape == (1, 25)
+
+    def test_rejects_mcmc_sampling(self):
+        with pytest.raises(ValueError, match="MAP"):
+            NumpyProphet(mcmc_samples=100)
+
+    def test_deadline_stops_the_fit(self):
+        with patch("flow_forecast.usgs.service.config.fit_backend", "numpy"):
+            with pytest.raises(FitDeadlineExceeded):
+                generate_forecast(site_history("09380000"), fit_deadline=1e-9)
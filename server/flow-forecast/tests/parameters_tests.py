@@ -0,0 +1,164 @@
+import datetime as dt
+import time
+from unittest.mock import patch
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from flow_forecast.app import app
+from flow_forecast.ratelimit import FairFitScheduler
+from flow_forecast.usgs import service
+from flow_forecast.usgs.service import (
+    get_daily_average_data_by_parameter,
+    split_time_series,
+)
+
+client = TestClient(app)
+
+START = dt.date(2024, 1, 1)
+END = dt.date(2024, 6, 30)
+
+
+def series(reading_parameter, values):
+    return {
+        "variable": {"variableCode": [{"value": reading_parameter}]},
+        "values": [{"value": values}],
+    }
+
+
+def forecast_frame(*args, history=None, **kwargs) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "past_value": [float(history["value"].iloc[-1])],
+            "forecast": [1100.0],
+            "lower_error_bound": [1000.0],
+            "upper_error_bound": [1200.0],
+        },
+        index=["1/1"],
+    )
+
+
+class TestSplitTimeSeries:
+    """Tests for matching time series to parameters"""
+
+    def test_matches_by_variable_code_not_order(self):
+        time_series = [series("00065", ["stage"]), series("00060", ["flow"])]
+
+        data = split_time_series(time_series, ["00060", "00065", "00010"])
+
+        assert data == {"00060": ["flow"], "00065": ["stage"], "00010": []}
+
+    def test_uncoded_series_only_serves_a_single_parameter(self):
+        uncoded = {"values": [{"value": ["flow"]}]}
+
+        assert split_time_series([uncoded], ["00060"]) == {"00060": ["flow"]}
+        assert split_time_series([uncoded], ["00060", "00065"]) == {
+            "00060": [],
+            "00065": [],
+        }
+
+
+class TestMultiParameterFetch:
+    """Tests for fetching several parameters in one USGS request"""
+
+    def test_one_request_returns_each_parameter(self, fake_usgs):
+        data = get_daily_average_data_by_parameter(
+            "01646500", ["00060", "00065"], START, END
+        )
+
+        assert set(data) == {"00060", "00065"}
+        assert len(data["00060"]) > 100
+        assert data["00060"] != data["00065"]
+        assert (
+            data["00060"]
+            == get_daily_average_data_by_parameter("01646500", ["00060"], START, END)[
+                "00060"
+            ]
+        )
+
+
+class TestParametersEndpoint:
+    """Tests for the multi-parameter forecast route"""
+
+    def test_fetches_once_and_fits_each_parameter(self, fake_usgs):
+        fetch = patch(
+            "flow_forecast.usgs.service.get_daily_average_data_by_parameter",
+            wraps=service.get_daily_average_data_by_parameter,
+        )
+        fit = patch(
+            "flow_forecast.usgs.router.generate_prophet_forecast",
+            side_effect=forecast_frame,
+        )
+        request = {"site_id": "01646500", "reading_parameters": ["00065", "00060"]}
+        with fetch as fetched, fit as fitted:
+            response = client.post("/usgs/forecast/parameters", json=request)
+            again = client.post("/usgs/forecast/parameters", json=request)
+            single = client.post(
+                "/usgs/forecast",
+                json={"site_id": "01646500", "reading_parameter": "00060"},
+            )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert list(body) == ["00065", "00060"]
+        assert body["00060"] != body["00065"]
+        assert fetched.call_count == 1
+        assert fetched.call_args.args[1] == ["00065", "00060"]
+        assert fitted.call_count == 2
+        # Both parameters, and the single-parameter route, share the cache
+        assert again.json() == body
+        assert single.json() == body["00060"]
+
+    def test_more_parameters_than_the_fit_quota(self, fake_usgs):
+        """Should queue fits beyond the client's quota instead of failing"""
+        scheduler = FairFitScheduler(slots=8, max_per_client=2)
+        peak = []
+
+        def fit_in_a_slot(*args, **kwargs):
+            with scheduler.slot():
+                peak.append(scheduler.usage("ip:testclient"))
+                time.sleep(0.05)
+                return forecast_frame(*args, **kwargs)
+
+        reading_parameters = ["00060", "00065", "00010", "00095", "00300"]
+        with (
+            patch("flow_forecast.usgs.router.fit_scheduler", scheduler),
+            patch(
+                "flow_forecast.usgs.router.generate_prophet_forecast",
+                side_effect=fit_in_a_slot,
+            ) as fitted,
+        ):
+            response = client.post(
+                "/usgs/forecast/parameters",
+                json={"site_id": "01646500", "reading_parameters": reading_parameters},
+            )
+
+        assert response.status_code == 200
+        assert list(response.json()) == reading_parameters
+        assert fitted.call_count == 5
+        assert max(peak) == 2
+
+    def test_validates_parameters(self):
+        def post(reading_parameters):
+            return client.post(
+                "/usgs/forecast/parameters",
+                json={"site_id": "01646500", "reading_parameters": reading_parameters},
+            )
+
+        assert post([]).status_code == 422
+        assert post(["00060", "abc"]).status_code == 422
+        assert post([f"{60 + i:05d}" for i in range(6)]).status_code == 422
+
+    def test_missing_parameter_is_a_bad_request(self):
+        reading = {"dateTime": "2024-01-01", "value": "1", "qualifiers": ["A"]}
+        with patch(
+            "flow_forecast.usgs.service.get_daily_average_data_by_parameter",
+            return_value={"00060": [reading], "00065": []},
+        ):
+            response = client.post(
+                "/usgs/forecast/parameters",
+                json={"site_id": "01646500", "reading_parameters": ["00060", "00065"]},
+            )
+
+        assert response.status_code == 400
+        assert "00065" in response.json()["detail"]
@@ -0,0 +1,138 @@
+import datetime as dt
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from flow_forecast.app import app
+from flow_forecast.model.percentiles import FlowClass
+from flow_forecast.percentiles import SitePercentiles, day_slots, percentile_store
+from flow_forecast.usgs import service
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def history():
+    rng = np.random.default_rng(3)
+    days = np.arange("2015-01-01", "2024-03-10", dtype="datetime64[D]")
+    values = rng.gamma(2.0, 100.0, len(days)).round(1)
+    values[rng.random(len(days)) < 0.05] = -999999
+    return days, values
+
+
+def brute_force_percentile(days, values, day):
+    same_day = (day_slots(days) == day_slots(day)) & (days < day) & (values > 0)
+    earlier = values[same_day]
+    latest = values[days == day][0]
+    return (
+        100
+        * ((earlier < latest).sum() + 0.5 * (earlier == latest).sum())
+        / len(earlier)
+    )
+
+
+class TestSitePercentiles:
+    """Tests for the incremental day-of-year percentile history"""
+
+    def test_ranks_latest_reading_against_earlier_years(self, history):
+        days, values = history
+
+        ranking = SitePercentiles(days, values).rank()
+
+        assert ranking.day == days[-1]
+        assert ranking.years == 9
+        assert ranking.percentile == pytest.approx(
+            brute_force_percentile(days, values, days[-1]), abs=0.01
+        )
+
+    def test_incremental_updates_match_a_rebuild(self, history):
+        days, values = history
+        site = SitePercentiles(days[:-400], values[:-400])
+
+        for day, value in zip(days[-400:], values[-400:]):
+            site.observe(day, value)
+
+        rebuilt = SitePercentiles(days, values)
+        for a, b in zip(site._state[2:], rebuilt._state[2:]):
+            np.testing.assert_array_equal(a, b)
+        assert site.rank() == rebuilt.rank()
+
+    def test_ignores_old_days_and_revises_the_latest(self, history):
+        days, values = history
+        site = SitePercentiles(days, values)
+
+        assert not site.observe(days[-10], 1.0)
+        assert not site.observe(days[-1] + np.timedelta64(1, "D"), -999999)
+        assert site.observe(days[-1], 5.0)
+
+        assert site.latest_value == 5.0
+        assert len(site) == len(SitePercentiles(days, values))
+
+    def test_leap_day_has_its_own_slot(self):
+        days = np.array(["2023-02-28", "2023-03-01", "2024-02-29"], "datetime64[D]")
+
+        assert day_slots(days).tolist() == [58, 60, 59]
+
+
+class TestPercentileEndpoint:
+    """Tests for the flow percentile endpoint"""
+
+    def test_loads_then_serves_from_memory(self, fake_usgs):
+        with patch.object(
+            service,
+            "get_daily_average_data",
+            wraps=service.get_daily_average_data,
+        ) as fetch:
+            first = client.get("/usgs/percentiles", params={"site_id": "01646500"})
+            second = client.get("/usgs/percentiles", params={"site_id": "01646500"})
+
+        assert first.status_code == 200
+        assert fetch.call_count == 1
+        (body,) = second.json()
+        assert body == first.json()[0]
+        assert body["years"] >= 1
+        assert 0 <= body["percentile"] <= 100
+        assert body["flow_class"] in {c.value for c in FlowClass}
+
+    def test_refresh_fetches_only_new_days(self, fake_usgs):
+        client.get("/usgs/percentiles", params={"site_id": "01646500"})
+        site = percentile_store.get(("01646500", "00060"))
+        latest = site.latest_day.astype(dt.date)
+
+        with (
+            patch.object(percentile_store, "refresh_seconds", 0),
+            patch.object(
+                service,
+                "get_daily_average_data",
+                wraps=service.get_daily_average_data,
+            ) as fetch,
+        ):
+            client.get("/usgs/percentiles", params={"site_id": "01646500"})
+
+        assert fetch.call_args.args[2] == latest
+
+    def test_bulk_reports_failures_per_site(self, fake_usgs):
+        real_fetch = service.get_daily_average_data
+
+        def fetch(site_id, *args):
+            if site_id == "09380000":
+                raise ConnectionError("USGS unavailable")
+            return real_fetch(site_id, *args)
+
+        with patch.object(service, "get_daily_average_data", side_effect=fetch):
+            body = client.get(
+                "/usgs/percentiles",
+                params={"site_id": ["01646500", "09380000", "01646500"]},
+            ).json()
+
+        assert [item["site_id"] for item in body] == ["01646500", "09380000"]
+        assert body[0]["error"] is None
+        assert body[1]["percentile"] is None
+        assert "USGS" in body[1]["error"]
+
+    def test_rejects_invalid_site_ids(self):
+        response = client.get("/usgs/percentiles", params={"site_id": "abc"})
+
+        assert response.status_code == 400
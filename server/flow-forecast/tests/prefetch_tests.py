@@ -0,0 +1,113 @@
+import asyncio
+import datetime as dt
+import random
+from collections import Counter
+from unittest.mock import patch
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from flow_forecast.app import app
+from flow_forecast.heavy_hitters import SpaceSaving
+from flow_forecast.metrics import metrics
+from flow_forecast.usgs.prefetch import HotSitePrefetcher
+
+client = TestClient(app)
+
+REQUEST = {"site_id": "01646500", "reading_parameter": "00060"}
+
+
+def forecast_frame(*args, **kwargs) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "past_value": [1000.0],
+            "forecast": [1100.0],
+            "lower_error_bound": [1000.0],
+            "upper_error_bound": [1200.0],
+        },
+        index=["1/1"],
+    )
+
+
+class TestSpaceSaving:
+    """Tests for the bounded heavy-hitters sketch"""
+
+    def test_keeps_heavy_hitters_within_error_bounds(self):
+        rng = random.Random(7)
+        stream = [f"hot-{i}" for i in range(5) for _ in range(200)]
+        stream += [f"cold-{rng.randrange(5000)}" for _ in range(3000)]
+        rng.shuffle(stream)
+        sketch = SpaceSaving(capacity=50)
+
+        for key in stream:
+            sketch.add(key)
+
+        true_counts = Counter(stream)
+        top = sketch.top(5)
+        assert len(sketch) == 50
+        assert {hitter.key for hitter in top} == {f"hot-{i}" for i in range(5)}
+        for hitter in sketch.top(50):
+            assert hitter.count - hitter.error <= true_counts[hitter.key]
+            assert true_counts[hitter.key] <= hitter.count
+
+    def test_decay_lets_new_demand_overtake_old(self):
+        sketch = SpaceSaving(capacity=2)
+        for _ in range(10):
+            sketch.add("old")
+        sketch.decay(0.1)
+        for _ in range(3):
+            sketch.add("new")
+        sketch.add("newer")
+
+        assert [hitter.key for hitter in sketch.top(2)] == ["new", "newer"]
+        assert sketch.top(2)[1].error == 1
+
+
+class TestHotSitePrefetcher:
+    """Tests for refreshing the hottest sites after USGS publishes"""
+
+    def test_next_run_is_the_next_publish_hour(self):
+        prefetcher = HotSitePrefetcher(top_k=1, hour_utc=12, decay=0.5)
+        morning = dt.datetime(2024, 7, 1, 9, 30, tzinfo=dt.timezone.utc)
+        evening = dt.datetime(2024, 7, 1, 12, 0, tzinfo=dt.timezone.utc)
+
+        assert prefetcher.next_run(morning) == morning.replace(hour=12, minute=0)
+        assert prefetcher.next_run(evening) == evening + dt.timedelta(days=1)
+
+    def test_prefetches_top_sites_and_counts_hits(self):
+        metrics.reset()
+        prefetcher = HotSitePrefetcher(top_k=2, hour_utc=12, decay=0.5)
+
+        with patch(
+            "flow_forecast.usgs.router.generate_prophet_forecast",
+            side_effect=forecast_frame,
+        ) as fit:
+            for site_id, requests in [
+                ("01646500", 3),
+                ("09380000", 2),
+                ("01010000", 1),
+            ]:
+                for _ in range(requests):
+                    client.post(
+                        "/usgs/forecast",
+                        json={"site_id": site_id, "reading_parameter": "00060"},
+                    )
+            fits_before = fit.call_count
+
+            refreshed = asyncio.run(prefetcher.prefetch_once())
+
+            assert refreshed == 2
+            assert fit.call_count == fits_before + 2
+            # Fresh entries from the earlier requests would be hits anyway,
+            # so only responses after the prefetch count towards its hit rate
+            response = client.post("/usgs/forecast", json=REQUEST)
+            client.post("/usgs/forecast", json=REQUEST)
+            asyncio.run(prefetcher.prefetch_once())
+
+        counters = metrics.snapshot()["counters"]["prefetch"]
+        demand = metrics.snapshot()["gauges"]["site_demand"]
+        assert response.headers["X-Forecast-Cache"] == "hit"
+        assert counters == {"refreshed": 4, "hit": 1, "unused": 1}
+        assert demand["tracked"] == 3
+        assert demand["hottest"][0]["site_id"] == "01646500"
+        assert demand["hottest"][0]["count"] == (3 * 0.5 + 2) * 0.5
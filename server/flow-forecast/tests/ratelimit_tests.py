@@ -0,0 +1,184 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from flow_forecast.app import app
+from flow_forecast.config import config
+from flow_forecast.ratelimit import (
+    FairFitScheduler,
+    FitQuotaExceeded,
+    RateLimiter,
+    fit_slot_count,
+)
+
+client = TestClient(app)
+
+OCEAN_BOX = {
+    "min_latitude": -40,
+    "min_longitude": -140,
+    "max_latitude": -39,
+    "max_longitude": -139,
+    "include_forecast": False,
+}
+
+
+@pytest.fixture
+def small_bucket():
+    limiter = RateLimiter(capacity=2, refill_per_second=0.5, max_clients=100)
+    with patch("flow_forecast.ratelimit.rate_limiter", limiter):
+        yield limiter
+
+
+class TestRateLimiter:
+    """Tests for the per-client token buckets"""
+
+    def test_empties_and_refills(self):
+        limiter = RateLimiter(capacity=2, refill_per_second=0.5, max_clients=10)
+        now = 1000.0
+
+        with patch("flow_forecast.ratelimit.time.monotonic", lambda: now):
+            assert limiter.take("a").remaining == 1
+            assert limiter.take("a").allowed
+            denied = limiter.take("a")
+            assert limiter.take("b").allowed
+
+            now += 2
+            assert limiter.take("a").allowed
+
+        assert not denied.allowed
+        assert denied.retry_after_seconds == pytest.approx(2)
+        assert denied.reset_seconds == pytest.approx(4)
+
+    def test_forgets_least_recently_seen_clients(self):
+        limiter = RateLimiter(capacity=1, refill_per_second=0.001, max_clients=2)
+
+        limiter.take("a")
+        limiter.take("b")
+        limiter.take("c")
+
+        assert limiter.take("a").allowed
+        assert not limiter.take("c").allowed
+
+
+class TestFairFitScheduler:
+    """Tests for round-robin fit slots"""
+
+    def wait_for_waiters(self, scheduler, count):
+        deadline = time.monotonic() + 5
+        while scheduler.stats()["waiting"] < count:
+            assert time.monotonic() < deadline
+            time.sleep(0.001)
+
+    def test_grants_slots_round_robin_across_clients(self):
+        scheduler = FairFitScheduler(slots=1, max_per_client=10)
+        granted = []
+        scheduler.acquire("greedy")
+
+        def fit(name, client):
+            with scheduler.slot(client):
+                granted.append(name)
+
+        threads = []
+        for name, client in [
+            ("greedy-1", "greedy"),
+            ("greedy-2", "greedy"),
+            ("greedy-3", "greedy"),
+            ("app-1", "app"),
+        ]:
+            thread = threading.Thread(target=fit, args=(name, client))
+            thread.start()
+            threads.append(thread)
+            self.wait_for_waiters(scheduler, len(threads))
+
+        scheduler.release("greedy")
+        for thread in threads:
+            thread.join(timeout=5)
+
+        assert granted == ["greedy-1", "app-1", "greedy-2", "greedy-3"]
+        assert scheduler.stats() == {"slots": 1, "free": 1, "waiting": 0, "clients": 0}
+
+    def test_limits_fits_in_flight_per_client(self):
+        scheduler = FairFitScheduler(slots=4, max_per_client=2)
+        scheduler.acquire("a")
+        scheduler.acquire("a")
+
+        with pytest.raises(FitQuotaExceeded):
+            scheduler.acquire("a")
+        scheduler.acquire("b")
+
+        assert scheduler.usage("a") == 2
+
+    @pytest.mark.parametrize(
+        "fit_slots, pool_workers, expected", [(3, 2, 3), (0, 2, 2), (0, 0, 8)]
+    )
+    def test_slot_count(self, fit_slots, pool_workers, expected):
+        """Should not serialize in-process fits to one slot"""
+        with (
+            patch.object(config, "fit_slots", fit_slots),
+            patch.object(config, "fit_pool_workers", pool_workers),
+            patch("flow_forecast.ratelimit.os.cpu_count", return_value=8),
+        ):
+            assert fit_slot_count() == expected
+
+
+class TestRateLimitedRoutes:
+    """Tests for rate limit headers and rejections on forecast routes"""
+
+    def test_reports_quota_and_rejects_when_empty(self, small_bucket):
+        first = client.get("/catalog/within", params=OCEAN_BOX)
+        client.get("/catalog/within", params=OCEAN_BOX)
+        rejected = client.get("/catalog/within", params=OCEAN_BOX)
+
+        assert first.status_code == 200
+        assert first.json() == []
+        assert first.headers["X-RateLimit-Limit"] == "2"
+        assert first.headers["X-RateLimit-Remaining"] == "1"
+        assert first.headers["X-Fit-Quota-Used"] == "0"
+        assert rejected.status_code == 429
+        assert int(rejected.headers["Retry-After"]) >= 1
+        assert rejected.headers["X-RateLimit-Remaining"] == "0"
+
+    def test_gauge_search_is_rate_limited(self, small_bucket):
+        for _ in range(2):
+            client.get("/catalog/gauges", params={"limit": 1})
+
+        rejected = client.get("/catalog/gauges", params={"limit": 1})
+
+        assert rejected.status_code == 429
+        assert int(rejected.headers["Retry-After"]) >= 1
+
+    def test_api_keys_get_their_own_buckets(self, small_bucket):
+        for _ in range(2):
+            client.get("/catalog/within", params=OCEAN_BOX)
+
+        response = client.get(
+            "/catalog/within", params=OCEAN_BOX, headers={"X-API-Key": "app"}
+        )
+
+        assert response.status_code == 200
+
+    def test_fit_quota_is_a_429(self):
+        with patch(
+            "flow_forecast.usgs.router.generate_prophet_forecast",
+            side_effect=FitQuotaExceeded("ip:testclient", 4),
+        ):
+            response = client.post(
+                "/usgs/forecast",
+                json={"site_id": "01646500", "reading_parameter": "00060"},
+            )
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "5"
+
+    def test_fit_quota_is_a_429_on_the_legacy_route(self):
+        with patch(
+            "flow_forecast.router.router.generate_prophet_forecast",
+            side_effect=FitQuotaExceeded("ip:testclient", 4),
+        ):
+            response = client.get("/forecast", params={"site_id": "01646500"})
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "5"
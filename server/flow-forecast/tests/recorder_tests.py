@@ -0,0 +1,90 @@
+import datetime as dt
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from flow_forecast.app import app
+from flow_forecast.usgs.recorder import INDEX_FILE, ResponseRecorder, normalize_url
+from flow_forecast.usgs.service import get_daily_average_data
+
+client = TestClient(app)
+
+START = dt.date(2023, 1, 1)
+END = dt.date(2024, 6, 30)
+
+
+def fetch(site_id: str = "01646500", end_date: dt.date = END) -> list[dict]:
+    return get_daily_average_data(site_id, "00060", START, end_date)
+
+
+@pytest.fixture
+def recorded(fake_usgs, tmp_path):
+    """Records one fetch from the fake USGS service, then replays offline"""
+    with patch(
+        "flow_forecast.usgs.service.usgs_recorder",
+        ResponseRecorder("record", tmp_path),
+    ):
+        live = fetch()
+
+    replayer = ResponseRecorder("replay", tmp_path)
+    with (
+        patch("flow_forecast.usgs.service.usgs_recorder", replayer),
+        patch(
+            "flow_forecast.usgs.service.base_usgs_url",
+            "http://usgs.invalid/nwis/dv/?format=json",
+        ),
+    ):
+        yield live, replayer
+
+
+class TestNormalizeUrl:
+    """Tests for the URLs recordings are addressed by"""
+
+    def test_ignores_host_and_parameter_order(self):
+        assert normalize_url(
+            "http://waterservices.usgs.gov/nwis/dv/?format=json&site=1&parameterCd=2"
+        ) == normalize_url(
+            "http://127.0.0.1:8100/nwis/dv?parameterCd=2&format=json&site=1"
+        )
+
+    def test_undated_drops_the_date_range(self):
+        url = "http://h/nwis/dv/?site=1&startDT=2023-01-01&endDT=2024-01-01"
+
+        assert normalize_url(url, dated=False) == "/nwis/dv?site=1"
+
+
+class TestResponseRecorder:
+    """Tests for recording USGS responses and replaying them"""
+
+    def test_replays_recorded_payload_offline(self, recorded, tmp_path):
+        live, _ = recorded
+
+        assert len(live) > 500
+        assert fetch() == live
+        assert len((tmp_path / INDEX_FILE).read_text().splitlines()) == 1
+        assert len(list(tmp_path.glob("*/*.json.gz"))) == 2
+
+    def test_other_dates_fall_back_to_the_latest_recording(self, recorded):
+        live, _ = recorded
+
+        assert fetch(end_date=END + dt.timedelta(days=1)) == live
+        with pytest.raises(ConnectionError, match="No recorded USGS response"):
+            fetch(site_id="09380000")
+
+    def test_injects_latency(self, recorded):
+        live, replayer = recorded
+        replayer.latency_ms = 50
+
+        started = time.perf_counter()
+        fetch()
+
+        assert time.perf_counter() - started >= 0.05
+
+    def test_unrecorded_site_is_a_bad_gateway(self, recorded):
+        response = client.post(
+            "/usgs/forecast", json={"site_id": "09380000", "reading_parameter": "00060"}
+        )
+
+        assert response.status_code == 502
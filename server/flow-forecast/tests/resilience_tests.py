@@ -0,0 +1,207 @@
+import datetime as dt
+import json
+import time
+from unittest.mock import Mock, patch
+
+import pandas as pd
+import pytest
+import urllib3
+from fastapi.testclient import TestClient
+
+from flow_forecast.app import app
+from flow_forecast.cache import ForecastCache, forecast_cache
+from flow_forecast.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from flow_forecast.model.forecast_spec import ForecastSpec
+from flow_forecast.usgs.service import (
+    get_daily_average_data,
+    resolve_training_window,
+    usgs_breaker,
+)
+
+client = TestClient(app)
+
+REQUEST = {
+    "site_id": "01646500",
+    "reading_parameter": "00060",
+    "start_date": "2023-01-01",
+    "end_date": "2023-12-31",
+}
+KEY = ForecastSpec(
+    site_id="01646500",
+    reading_parameter="00060",
+    start_date=resolve_training_window()[0],
+    end_date=dt.date(2023, 12, 31),
+)
+
+
+@pytest.fixture
+def sample_forecast_df():
+    return pd.DataFrame(
+        {
+            "past_value": [1000.0],
+            "forecast": [1100.0],
+            "lower_error_bound": [1000.0],
+            "upper_error_bound": [1200.0],
+        },
+        index=["1/1"],
+    )
+
+
+class TestCircuitBreaker:
+    """Tests for the circuit breaker state machine"""
+
+    def test_opens_after_threshold(self):
+        """Should fail fast once the failure threshold is reached"""
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+
+        breaker.record_failure()
+        breaker.check()
+        breaker.record_failure()
+
+        assert breaker.state == CircuitState.open
+        with pytest.raises(CircuitOpenError):
+            breaker.check()
+
+    def test_half_open_allows_single_trial(self):
+        """Should let exactly one trial call through after the reset timeout"""
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+
+        breaker.check()
+        with pytest.raises(CircuitOpenError):
+            breaker.check()
+
+        breaker.record_success()
+        assert breaker.state == CircuitState.closed
+
+    def test_failed_trial_reopens(self):
+        """Should re-open the circuit when the trial call fails"""
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+
+        breaker.check()
+        breaker.record_failure()
+
+        with pytest.raises(CircuitOpenError):
+            breaker.check()
+
+    @patch("flow_forecast.usgs.service.urllib3.PoolManager")
+    def test_usgs_client_fails_fast_when_open(self, mock_pool_manager):
+        """Should stop calling USGS after repeated transport errors"""
+        mock_pool_manager.return_value.request.side_effect = (
+            urllib3.exceptions.HTTPError("timed out")
+        )
+
+        for _ in range(usgs_breaker.failure_threshold):
+            with pytest.raises(ConnectionError):
+                get_daily_average_data(
+                    "01646500", "00060", dt.date(2023, 1, 1), dt.date(2023, 1, 31)
+                )
+
+        calls = mock_pool_manager.return_value.request.call_count
+        with pytest.raises(CircuitOpenError):
+            get_daily_average_data(
+                "01646500", "00060", dt.date(2023, 1, 1), dt.date(2023, 1, 31)
+            )
+        assert mock_pool_manager.return_value.request.call_count == calls
+
+    @patch("flow_forecast.usgs.service.urllib3.PoolManager")
+    def test_client_errors_do_not_trip_breaker(self, mock_pool_manager):
+        """Should not count 4xx responses as upstream failures"""
+        mock_response = Mock()
+        mock_response.status = 400
+        mock_response.data = json.dumps({}).encode("utf-8")
+        mock_pool_manager.return_value.request.return_value = mock_response
+
+        for _ in range(usgs_breaker.failure_threshold + 1):
+            with pytest.raises(ConnectionError, match="status 400"):
+                get_daily_average_data(
+                    "01646500", "00060", dt.date(2023, 1, 1), dt.date(2023, 1, 31)
+                )
+
+        assert usgs_breaker.state == CircuitState.closed
+
+
+class TestForecastCache:
+    """Tests for the forecast cache"""
+
+    def test_entries_go_stale_then_expire(self):
+        """Should report freshness and drop entries past the stale window"""
+        cache = ForecastCache(ttl_seconds=0.01, max_stale_seconds=0.05, max_entries=8)
+        cache.put("a", [])
+
+        assert cache.get("a").is_fresh
+        time.sleep(0.02)
+        assert not cache.get("a").is_fresh
+        time.sleep(0.05)
+        assert cache.get("a") is None
+
+    def test_evicts_least_recently_used(self):
+        """Should stay within max_entries"""
+        cache = ForecastCache(ttl_seconds=60, max_stale_seconds=60, max_entries=2)
+        cache.put("a", [])
+        cache.put("b", [])
+        cache.get("a")
+        cache.put("c", [])
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+
+    def test_single_refresh_in_flight(self):
+        """Should only allow one refresh per key at a time"""
+        cache = ForecastCache(ttl_seconds=60, max_stale_seconds=60, max_entries=2)
+
+        assert cache.begin_refresh("a")
+        assert not cache.begin_refresh("a")
+        cache.end_refresh("a")
+        assert cache.begin_refresh("a")
+
+
+class TestStaleWhileRevalidate:
+    """Tests for cache behaviour of /usgs/forecast"""
+
+    @patch("flow_forecast.usgs.router.generate_prophet_forecast")
+    def test_second_request_is_cache_hit(self, mock_forecast, sample_forecast_df):
+        """Should serve a repeat request from the cache"""
+        mock_forecast.return_value = sample_forecast_df
+
+        first = client.post("/usgs/forecast", json=REQUEST)
+        second = client.post("/usgs/forecast", json=REQUEST)
+
+        assert first.headers["X-Forecast-Cache"] == "miss"
+        assert second.headers["X-Forecast-Cache"] == "hit"
+        assert second.json() == first.json()
+        mock_forecast.assert_called_once()
+
+    @patch("flow_forecast.usgs.router.generate_prophet_forecast")
+    def test_stale_entry_served_during_outage(self, mock_forecast, sample_forecast_df):
+        """Should serve the last good forecast, marked stale, when USGS fails"""
+        mock_forecast.return_value = sample_forecast_df
+        client.post("/usgs/forecast", json=REQUEST)
+
+        mock_forecast.side_effect = ConnectionError("USGS API unreachable")
+        with patch.object(forecast_cache, "ttl_seconds", 0):
+            forecast_cache.put(KEY, forecast_cache.get(KEY).value)
+            response = client.post("/usgs/forecast", json=REQUEST)
+
+        assert response.status_code == 200
+        assert response.headers["X-Forecast-Cache"] == "stale"
+        assert response.json()[0]["past_value"] == 1000.0
+        # The background refresh ran, failed, and released the key
+        assert mock_forecast.call_count == 2
+        assert forecast_cache.begin_refresh(KEY)
+
+    @patch("flow_forecast.usgs.router.generate_prophet_forecast")
+    def test_background_refresh_replaces_stale_entry(
+        self, mock_forecast, sample_forecast_df
+    ):
+        """Should refresh a stale entry after responding"""
+        mock_forecast.return_value = sample_forecast_df
+        with patch.object(forecast_cache, "ttl_seconds", 0):
+            forecast_cache.put(KEY, [])
+            response = client.post("/usgs/forecast", json=REQUEST)
+
+        assert response.json() == []
+        assert len(forecast_cache.get(KEY).value) == 1
@@ -0,0 +1,158 @@
+import time
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from flow_forecast.app import app
+from flow_forecast.cache import forecast_cache
+from flow_forecast.config import config
+from flow_forecast.model.forecast_result import ForecastDataPoint
+from flow_forecast.model.usgs import USGSFlowForecastRequest
+from flow_forecast.snapshot import (
+    ForecastSnapshot,
+    SnapshotStore,
+    forecast_body,
+    write_snapshot,
+)
+from flow_forecast.usgs.router import forecast_spec
+
+client = TestClient(app)
+
+REQUEST = {"site_id": "01646500", "reading_parameter": "00060"}
+
+
+def forecast_frame(flow: float) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "past_value": [flow],
+            "forecast": [flow + 100],
+            "lower_error_bound": [flow],
+            "upper_error_bound": [flow + 200],
+        },
+        index=["1/1"],
+    )
+
+
+def points(flow: float) -> list[ForecastDataPoint]:
+    return [
+        ForecastDataPoint(
+            index="1/1",
+            past_value=flow,
+            forecast=flow + 100,
+            lower_error_bound=flow,
+            upper_error_bound=flow + 200,
+        )
+    ]
+
+
+@pytest.fixture
+def store(tmp_path):
+    """A snapshot store at a temporary path, served by the forecast routes"""
+    snapshots = SnapshotStore(
+        tmp_path / "forecasts.snap", ttl_seconds=3600, max_stale_seconds=86400
+    )
+    with patch("flow_forecast.usgs.router.forecast_snapshot", snapshots):
+        yield snapshots
+
+
+class TestSnapshotFile:
+    """Tests for writing and mapping snapshot files"""
+
+    def test_round_trips_stored_bodies(self, tmp_path):
+        path = tmp_path / "forecasts.snap"
+        spec = forecast_spec(USGSFlowForecastRequest(**REQUEST))
+        other = spec.model_copy(update={"site_id": "09380000"})
+
+        write_snapshot(path, [(spec, points(1000), 1.0), (other, points(50), 2.0)])
+        snapshot = ForecastSnapshot(path)
+
+        assert bytes(snapshot.body(snapshot.get(spec))) == forecast_body(points(1000))
+        assert bytes(snapshot.body(snapshot.get(other))) == forecast_body(points(50))
+        assert snapshot.get(spec.model_copy(update={"horizon_days": 7})) is None
+        assert list(tmp_path.iterdir()) == [path]
+
+    def test_rejects_other_files(self, tmp_path):
+        path = tmp_path / "forecasts.snap"
+        path.write_bytes(b"not a snapshot")
+
+        with pytest.raises(ValueError, match="not a forecast snapshot"):
+            ForecastSnapshot(path)
+
+
+class TestSnapshotServing:
+    """Tests for answering forecast requests from the snapshot"""
+
+    @patch("flow_forecast.usgs.router.generate_prophet_forecast")
+    def test_boots_warm_with_identical_bytes(self, fit, store):
+        fit.return_value = forecast_frame(1000.0)
+        computed = client.post("/usgs/forecast", json=REQUEST)
+        store.export(forecast_cache)
+        forecast_cache.clear()
+
+        served = client.post("/usgs/forecast", json=REQUEST)
+        delta = client.post("/usgs/forecast/delta", json=REQUEST).json()
+
+        assert fit.call_count == 1
+        assert [
+            {k: v for k, v in row.items() if k != "position"}
+            for row in delta["changes"]
+        ] == computed.json()
+        assert served.content == computed.content
+        assert served.headers["X-Forecast-Cache"] == "hit"
+        assert (
+            served.headers["X-Forecast-Version"]
+            == (computed.headers["X-Forecast-Version"])
+        )
+        assert "X-RateLimit-Remaining" in served.headers
+
+    @patch("flow_forecast.usgs.router.generate_prophet_forecast")
+    def test_swaps_to_a_replaced_file(self, fit, store):
+        spec = forecast_spec(USGSFlowForecastRequest(**REQUEST))
+        write_snapshot(store.path, [(spec, points(1000), time.time())])
+        assert store.load()
+        before = client.post("/usgs/forecast", json=REQUEST).json()
+
+        write_snapshot(store.path, [(spec, points(2000), time.time())])
+        assert store.load()
+        assert not store.load()
+        after = client.post("/usgs/forecast", json=REQUEST).json()
+
+        assert before[0]["past_value"] == 1000
+        assert after[0]["past_value"] == 2000
+        fit.assert_not_called()
+
+    @patch("flow_forecast.usgs.router.generate_prophet_forecast")
+    def test_stale_entries_are_refreshed_into_the_cache(self, fit, store):
+        fit.return_value = forecast_frame(2000.0)
+        spec = forecast_spec(USGSFlowForecastRequest(**REQUEST))
+        write_snapshot(store.path, [(spec, points(1000), time.time() - 7200)])
+        store.load()
+
+        stale = client.post("/usgs/forecast", json=REQUEST)
+        fresh = client.post("/usgs/forecast", json=REQUEST)
+        delta = client.post("/usgs/forecast/delta", json=REQUEST)
+
+        assert stale.headers["X-Forecast-Cache"] == "stale"
+        assert stale.json()[0]["past_value"] == 1000
+        assert fresh.headers["X-Forecast-Cache"] == "hit"
+        assert fresh.json()[0]["past_value"] == 2000
+        assert delta.json()["full"]
+        assert fit.call_count == 1
+
+    def test_export_needs_a_path(self):
+        with patch.object(config, "snapshot_admin_key", "admin"):
+            response = client.post("/snapshot/export", headers={"X-Admin-Key": "admin"})
+
+        assert response.status_code == 409
+
+    def test_admin_routes_need_the_admin_key(self):
+        def post(path, **headers):
+            return client.post(path, headers=headers).status_code
+
+        assert post("/snapshot/reload") == 403
+        with patch.object(config, "snapshot_admin_key", "admin"):
+            assert post("/snapshot/reload") == 403
+            assert post("/snapshot/export", **{"X-Admin-Key": "guess"}) == 403
+            assert post("/snapshot/reload", **{"X-Admin-Key": "admin"}) == 200
@@ -0,0 +1,222 @@
+import asyncio
+import datetime as dt
+import json
+import threading
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from flow_forecast.app import app
+from flow_forecast.cache import forecast_cache
+from flow_forecast.config import config
+from flow_forecast.model.forecast_result import ForecastDataPoint
+from flow_forecast.model.forecast_spec import ForecastSpec
+from flow_forecast.model.jobs import ForecastJob, ForecastJobStatus
+from flow_forecast.subscriptions import ForecastBroker, forecast_broker
+from flow_forecast.usgs.service import resolve_training_window
+from flow_forecast.usgs.updates import UpdatePoller
+
+client = TestClient(app)
+
+
+def spec_for(site_id: str) -> ForecastSpec:
+    start_date, end_date = resolve_training_window()
+    return ForecastSpec(
+        site_id=site_id,
+        reading_parameter="00060",
+        start_date=start_date,
+        end_date=end_date,
+        horizon_days=None,
+    )
+
+
+def forecast(value: float) -> list[ForecastDataPoint]:
+    return [
+        ForecastDataPoint(
+            index="1/1",
+            past_value=value,
+            forecast=None,
+            lower_error_bound=None,
+            upper_error_bound=None,
+        )
+    ]
+
+
+async def stream_events(query_string: bytes, count: int, on_event):
+    """Drives the subscribe endpoint over raw ASGI until `count` events arrive
+
+    The test client buffers whole responses, which never end for an event
+    stream, so this disconnects the client itself once it has enough.
+    """
+    headers, events = {}, []
+    enough = asyncio.Event()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await enough.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            headers.update(message["headers"])
+        elif message["type"] == "http.response.body":
+            for line in message.get("body", b"").decode().splitlines():
+                if line.startswith("data: ") and not enough.is_set():
+                    events.append(json.loads(line.removeprefix("data: ")))
+                    on_event(events)
+                    if len(events) == count:
+                        enough.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/usgs/forecast/subscribe",
+        "raw_path": b"/usgs/forecast/subscribe",
+        "root_path": "",
+        "query_string": query_string,
+        "headers": [],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+    await asyncio.wait_for(app(scope, receive, send), timeout=10)
+    return headers, events
+
+
+class TestForecastBroker:
+    """Tests for fanning forecasts out to subscribers"""
+
+    def test_publishes_from_other_threads_to_every_subscriber(self):
+        broker = ForecastBroker()
+        spec = spec_for("01646500")
+
+        async def scenario():
+            first = broker.subscribe([spec])
+            second = broker.subscribe([spec, spec_for("09380000")])
+            publisher = threading.Thread(
+                target=broker.publish, args=(spec, forecast(1.0))
+            )
+            publisher.start()
+            publisher.join()
+            return await first.next(1), await second.next(1)
+
+        first, second = asyncio.run(scenario())
+
+        assert [u.forecast[0].past_value for u in first] == [1.0]
+        assert [u.site_id for u in second] == ["01646500"]
+
+    def test_coalesces_updates_for_a_slow_subscriber(self):
+        broker = ForecastBroker()
+        spec = spec_for("01646500")
+
+        async def scenario():
+            subscription = broker.subscribe([spec])
+            broker.publish(spec, forecast(1.0))
+            broker.publish(spec, forecast(2.0))
+            await asyncio.sleep(0)
+            return await subscription.next(1)
+
+        updates = asyncio.run(scenario())
+
+        assert [u.forecast[0].past_value for u in updates] == [2.0]
+
+    def test_unsubscribed_specs_are_not_watched(self):
+        broker = ForecastBroker()
+
+        async def scenario():
+            subscription = broker.subscribe([spec_for("01646500")])
+            watched = broker.watched()
+            broker.unsubscribe(subscription)
+            return watched, await subscription.next(0.01)
+
+        watched, updates = asyncio.run(scenario())
+
+        assert [s.site_id for s in watched] == ["01646500"]
+        assert broker.watched() == []
+        assert broker.publish(spec_for("01646500"), forecast(1.0)) == 0
+        assert updates == []
+
+
+class TestUpdatePoller:
+    """Tests for detecting new daily values"""
+
+    def test_refreshes_watched_specs_when_a_new_value_arrives(self):
+        poller = UpdatePoller(interval_seconds=60, lookback_days=7, concurrency=2)
+        readings = iter(
+            [("2024-05-01", "10"), ("2024-05-01", "10"), ("2024-05-02", "12")]
+        )
+
+        async def scenario():
+            subscription = forecast_broker.subscribe([spec_for("01646500")])
+            try:
+                return [await poller.poll_once(dt.date(2024, 5, 2)) for _ in range(3)]
+            finally:
+                forecast_broker.unsubscribe(subscription)
+
+        with (
+            patch.object(poller, "latest_reading", lambda *args: next(readings)),
+            patch("flow_forecast.usgs.updates.run_forecast") as run,
+        ):
+            refreshed = asyncio.run(scenario())
+
+        assert refreshed == [0, 0, 1]
+        assert run.call_args.args[0] == spec_for("01646500")
+
+
+class TestSubscribeEndpoint:
+    """Tests for the Server-Sent Events subscription endpoint"""
+
+    def test_streams_cached_forecast_then_published_updates(self):
+        spec = spec_for("01646500")
+        forecast_cache.put(spec, forecast(1.0))
+
+        def on_event(events):
+            if len(events) == 1:
+                forecast_broker.publish(spec, forecast(2.0))
+
+        headers, events = asyncio.run(
+            stream_events(b"site_id=01646500", count=2, on_event=on_event)
+        )
+
+        assert headers[b"content-type"].startswith(b"text/event-stream")
+        assert [e["forecast"][0]["past_value"] for e in events] == [1.0, 2.0]
+        assert all(e["site_id"] == "01646500" for e in events)
+        assert forecast_broker.watched() == []
+
+    def test_rejects_too_many_sites(self):
+        site_ids = [f"{n:08d}" for n in range(51)]
+
+        response = client.get("/usgs/forecast/subscribe", params={"site_id": site_ids})
+
+        assert response.status_code == 400
+
+    def test_queues_at_most_the_configured_number_of_jobs(self):
+        forecast_cache.put(spec_for("01646500"), forecast(1.0))
+        site_ids = ["01646500"] + [f"{n:08d}" for n in range(7)]
+        query_string = "&".join(f"site_id={site_id}" for site_id in site_ids)
+        queued = ForecastJob(
+            job_id="queued",
+            status=ForecastJobStatus.queued,
+            submitted_at=dt.datetime.now(dt.timezone.utc),
+        )
+
+        with (
+            patch.object(config, "subscription_max_queued_forecasts", 3),
+            patch(
+                "flow_forecast.usgs.router.forecast_jobs.submit", return_value=queued
+            ) as submit,
+        ):
+            asyncio.run(
+                stream_events(
+                    query_string.encode(), count=1, on_event=lambda events: None
+                )
+            )
+
+        assert submit.call_count == 3
+        assert forecast_broker.watched() == []
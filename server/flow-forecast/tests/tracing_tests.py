@@ -0,0 +1,179 @@
+import json
+import os
+import subprocess
+import sys
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from flow_forecast import tracing
+from flow_forecast.app import app
+
+client = TestClient(app)
+
+requires_sdk = pytest.mark.skipif(
+    not tracing.is_available(), reason="opentelemetry is not installed"
+)
+
+
+@pytest.fixture(scope="module")
+def exported_spans():
+    """Routes spans to memory; the global provider can only be set once"""
+    sdk_trace = pytest.importorskip("opentelemetry.sdk.trace")
+    from opentelemetry import trace
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+
+    exporter = InMemorySpanExporter()
+    provider = sdk_trace.TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    return exporter
+
+
+@pytest.fixture
+def spans(exported_spans):
+    exported_spans.clear()
+    yield exported_spans
+    exported_spans.clear()
+
+
+def own_spans(exporter) -> list:
+    """Finished spans from this service, leaving out framework spans"""
+    return [
+        span
+        for span in exporter.get_finished_spans()
+        if span.instrumentation_scope.name == tracing.TRACER_NAME
+    ]
+
+
+@requires_sdk
+class TestPipelineSpans:
+    """Tests for spans around the forecast pipeline stages"""
+
+    @patch("flow_forecast.usgs.service.Prophet")
+    def test_records_stage_spans_in_one_trace(
+        self, mock_prophet_class, spans, fake_usgs
+    ):
+        mock_model = MagicMock()
+        mock_prophet_class.return_value = mock_model
+        mock_model.predict.return_value = pd.DataFrame(
+            {"yhat": np.ones(5), "yhat_lower": np.ones(5), "yhat_upper": np.ones(5)}
+        )
+
+        response = client.post(
+            "/usgs/forecast",
+            json={"site_id": "01646500", "reading_parameter": "00060"},
+        )
+
+        assert response.status_code == 200
+        by_name = {span.name: span for span in own_spans(spans)}
+        assert {
+            "usgs.forecast",
+            "forecast.run",
+            "usgs.fetch",
+            "forecast.clean",
+            "forecast.fit",
+            "forecast.predict",
+            "forecast.format_output",
+        } <= set(by_name)
+        assert len({span.context.trace_id for span in by_name.values()}) == 1
+
+        root = by_name["usgs.forecast"]
+        assert root.attributes["site_id"] == "01646500"
+        assert root.attributes["cache_status"] == "miss"
+
+        fetch = by_name["usgs.fetch"]
+        assert fetch.attributes["http.status_code"] == 200
+        assert fetch.attributes["rows"] > 365
+        assert (
+            by_name["forecast.clean"].attributes["input_rows"]
+            == (fetch.attributes["rows"])
+        )
+        assert by_name["forecast.fit"].parent.span_id == (
+            by_name["forecast.run"].context.span_id
+        )
+
+    def test_cache_hit_skips_pipeline_spans(self, spans, fake_usgs):
+        with patch(
+            "flow_forecast.usgs.router.generate_prophet_forecast",
+            return_value=pd.DataFrame(
+                {
+                    "past_value": [1.0],
+                    "forecast": [2.0],
+                    "lower_error_bound": [1.0],
+                    "upper_error_bound": [3.0],
+                },
+                index=["1/1"],
+            ),
+        ):
+            body = {"site_id": "01646500", "reading_parameter": "00060"}
+            client.post("/usgs/forecast", json=body)
+            spans.clear()
+            client.post("/usgs/forecast", json=body)
+
+        (only,) = own_spans(spans)
+        assert only.name == "usgs.forecast"
+        assert only.attributes["cache_status"] == "hit"
+
+
+@requires_sdk
+class TestContextPropagation:
+    """Tests for carrying trace context across the fit pool boundary"""
+
+    def test_carrier_links_child_span_to_parent(self, spans):
+        with tracing.span("parent") as parent:
+            carrier = tracing.inject_context()
+
+        # As the worker sees it: a plain dict, outside the parent's context
+        with tracing.attached_context(json.loads(json.dumps(carrier))):
+            with tracing.span("child"):
+                pass
+
+        child = next(s for s in own_spans(spans) if s.name == "child")
+        assert child.context.trace_id == parent.get_span_context().trace_id
+        assert child.parent.span_id == parent.get_span_context().span_id
+
+    def test_file_exporter_writes_json_lines(self, tmp_path):
+        path = tmp_path / "traces.jsonl"
+        script = (
+            "from flow_forecast import tracing\n"
+            f"tracing.configure_tracing('file', {str(path)!r})\n"
+            "with tracing.span('outer', site_id='01646500'):\n"
+            "    with tracing.span('inner', rows=3):\n"
+            "        pass\n"
+            "tracing.shutdown()\n"
+        )
+        subprocess.run(
+            [sys.executable, "-c", script],
+            check=True,
+            env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+        )
+
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [record["name"] for record in records] == ["inner", "outer"]
+        assert records[0]["attributes"] == {"rows": 3}
+        assert records[0]["parent_id"] == records[1]["context"]["span_id"]
+
+
+class TestTracingDisabled:
+    """Tests for the no-op fallback when OpenTelemetry is missing"""
+
+    def test_helpers_are_no_ops(self):
+        with (
+            patch.object(tracing, "trace", None),
+            patch.object(tracing, "propagate", None),
+        ):
+            with tracing.span("anything", site_id="01646500") as span:
+                span.set_attribute("rows", 1)
+                tracing.set_attributes(span, cache_status="hit")
+                assert tracing.inject_context() == {}
+            with tracing.attached_context({"traceparent": "ignored"}):
+                pass
+
+            assert not span.is_recording()
@@ -0,0 +1,145 @@
+import datetime as dt
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from flow_forecast.app import app
+from flow_forecast.config import config
+from flow_forecast.usgs.service import (
+    limit_training_rows,
+    prophet_model,
+    resolve_training_window,
+)
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def sample_forecast_df():
+    return pd.DataFrame(
+        {
+            "past_value": [1000.0],
+            "forecast": [1100.0],
+            "lower_error_bound": [1000.0],
+            "upper_error_bound": [1200.0],
+        },
+        index=["1/1"],
+    )
+
+
+def daily_history(start: str, end: str) -> pd.DataFrame:
+    ds = pd.date_range(start, end)
+    return pd.DataFrame({"ds": ds, "y": np.arange(len(ds), dtype=float) + 1})
+
+
+class TestResolveTrainingWindow:
+    """Tests for the server-side training window policy"""
+
+    def test_window_spans_configured_years(self):
+        """Should start January 1st training_window_years before today's year"""
+        start, end = resolve_training_window(today=dt.date(2025, 6, 15))
+
+        assert start == dt.date(2025 - config.training_window_years, 1, 1)
+        assert end == dt.date(2025, 12, 31)
+
+    def test_window_follows_year_rollover(self):
+        """Should move forward with the calendar rather than being fixed at import"""
+        before = resolve_training_window(today=dt.date(2025, 12, 31))
+        after = resolve_training_window(today=dt.date(2026, 1, 1))
+
+        assert after[0].year == before[0].year + 1
+
+    def test_caps_end_date_to_current_year(self):
+        """Should not fetch past the end of the current year"""
+        _, end = resolve_training_window(dt.date(2030, 1, 1), today=dt.date(2025, 3, 1))
+        assert end == dt.date(2025, 12, 31)
+
+    def test_rejects_end_before_window(self):
+        """Should reject an end date that precedes the training window"""
+        with pytest.raises(ValueError, match="end_date must be on or after"):
+            resolve_training_window(dt.date(1990, 1, 1), today=dt.date(2025, 3, 1))
+
+
+class TestLimitTrainingRows:
+    """Tests for fit-cost budgeting"""
+
+    def test_within_budget_is_unchanged(self):
+        history = daily_history("2024-01-01", "2024-12-31")
+        assert limit_training_rows(history, 1000) is history
+
+    def test_downsamples_older_history_to_budget(self):
+        """Should thin older years and keep the latest year at daily resolution"""
+        history = daily_history("1995-01-01", "2024-12-31")
+
+        result = limit_training_rows(history, 2000)
+
+        assert len(result) <= 2000
+        assert result["ds"].is_monotonic_increasing
+        assert result["ds"].iloc[0] == history["ds"].iloc[0]
+        pd.testing.assert_frame_equal(result.iloc[-366:], history.iloc[-366:])
+
+    def test_ignores_missing_values_when_counting(self):
+        """Should only count observed values against the budget"""
+        history = daily_history("2020-01-01", "2024-12-31")
+        history.loc[history.index % 2 == 0, "y"] = np.nan
+
+        assert limit_training_rows(history, 1000) is history
+
+        result = limit_training_rows(history, 500)
+        assert result["y"].notna().sum() <= 500
+        assert result["y"].iloc[:-1].notna().all()
+
+    def test_keeps_an_unobserved_last_day(self):
+        """Should keep trailing NaN days' end so the forecast starts after it"""
+        history = daily_history("2015-01-01", "2024-12-31")
+        history.loc[history.index[-5:], "y"] = np.nan
+
+        result = limit_training_rows(history, 1000)
+
+        assert result["y"].notna().sum() <= 1000
+        assert result["ds"].iloc[-1] == history["ds"].iloc[-1]
+        assert result["ds"].is_monotonic_increasing
+
+    def test_forecast_starts_after_trailing_unobserved_days(self):
+        """Should predict from the day after the history, not the last reading"""
+        history = daily_history("2021-01-01", "2023-12-31")
+        history.loc[history.index[-4:], "y"] = np.nan
+
+        model = prophet_model()
+        model.fit(limit_training_rows(history, 500))
+        future = model.make_future_dataframe(periods=3, include_history=False)
+
+        assert future["ds"].iloc[0] == pd.Timestamp("2024-01-01")
+
+
+class TestCanonicalWindowSharing:
+    """Tests that requests differing only in start_date share work"""
+
+    @patch("flow_forecast.usgs.router.generate_prophet_forecast")
+    def test_start_date_does_not_split_cache(self, mock_forecast, sample_forecast_df):
+        """Should serve the second request from the first one's cache entry"""
+        mock_forecast.return_value = sample_forecast_df
+        base = {"site_id": "01646500", "reading_parameter": "00060"}
+
+        first = client.post("/usgs/forecast", json={**base, "start_date": "1990-01-01"})
+        second = client.post(
+            "/usgs/forecast", json={**base, "start_date": "2024-06-01"}
+        )
+
+        assert first.headers["X-Forecast-Cache"] == "miss"
+        assert second.headers["X-Forecast-Cache"] == "hit"
+        mock_forecast.assert_called_once()
+
+    def test_end_date_before_window_is_400(self):
+        response = client.post(
+            "/usgs/forecast",
+            json={
+                "site_id": "01646500",
+                "reading_parameter": "00060",
+                "end_date": "1990-01-01",
+            },
+        )
+        assert response.status_code == 400
@@ -15,6 +15,7 @@ from flow_forecast.usgs.service import (
     get_cleaned_data,
     get_daily_average_data,
     get_forecast_length,
+    resolve_training_window,
 )
 
 # potomac at little falls siteId: 01646500
@@ -688,9 +689,10 @@ class TestForecastEndpoint:
 
         assert response.status_code == 200
 
-        # Verify custom dates were passed through
+        # The start date comes from the server's training window policy;
+        # the client's end date is kept
         call_args = mock_forecast.call_args[0]
-        assert call_args[2] == dt.date(2020, 1, 1)
+        assert call_args[2] == resolve_training_window()[0]
         assert call_args[3] == dt.date(2023, 12, 31)
 
 
@@ -0,0 +1,141 @@
+from unittest.mock import patch
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from flow_forecast.app import app
+from flow_forecast.cache import forecast_cache
+from flow_forecast.model.forecast_result import ForecastDataPoint
+from flow_forecast.versions import (
+    ForecastVersions,
+    forecast_delta,
+    forecast_version,
+    row_digests,
+)
+
+client = TestClient(app)
+
+REQUEST = {"site_id": "01646500", "reading_parameter": "00060"}
+
+
+def points(past: list, forecast: list, first_day: int = 1) -> list[ForecastDataPoint]:
+    rows = [(value, None) for value in past] + [(None, value) for value in forecast]
+    return [
+        ForecastDataPoint(
+            index=f"1/{day}",
+            past_value=past_value,
+            forecast=value,
+            lower_error_bound=None if value is None else value - 1,
+            upper_error_bound=None if value is None else value + 1,
+        )
+        for day, (past_value, value) in enumerate(rows, start=first_day)
+    ]
+
+
+def frame(forecast: list[ForecastDataPoint]) -> pd.DataFrame:
+    return pd.DataFrame([p.model_dump() for p in forecast]).set_index("index")
+
+
+def apply(held: list[dict], delta: dict) -> list[dict]:
+    rows = [row for row in held if row["index"] not in delta["removed"]]
+    for change in delta["changes"]:
+        position = change.pop("position")
+        same = [i for i, row in enumerate(rows) if row["index"] == change["index"]]
+        if same:
+            rows[same[0]] = change
+        else:
+            rows.insert(position, change)
+    return rows
+
+
+class TestForecastDelta:
+    """Tests for diffing forecast versions"""
+
+    def test_only_changed_rows_are_sent(self):
+        yesterday = points([10, 11], [12, 13, 14, 15, 16])
+        today = points([10, 11, 12.5], [13, 14, 15, 17])
+
+        delta = forecast_delta("v2", today, "v1", row_digests(yesterday))
+
+        assert not delta.full
+        assert [change.position for change in delta.changes] == [2, 6]
+        assert delta.removed == []
+
+    def test_rows_are_matched_by_index(self):
+        """Rows shifted by a moving window are not resent"""
+        yesterday = points([10, 11, 12], [13, 14, 15, 16])
+        today = points([11, 12, 13.5], [14, 15, 16, 17], first_day=2)
+
+        delta = forecast_delta("v2", today, "v1", row_digests(yesterday))
+
+        assert not delta.full
+        assert delta.removed == ["1/1"]
+        assert [change.index for change in delta.changes] == ["1/4", "1/8"]
+        held = [p.model_dump() for p in yesterday]
+        assert apply(held, delta.model_dump()) == [p.model_dump() for p in today]
+
+    def test_full_when_the_base_is_unknown_or_mostly_changed(self):
+        today = points([10, 11], [12, 13])
+
+        assert forecast_delta("v2", today).full
+        assert forecast_delta(
+            "v2", today, "v1", row_digests(points([1, 2], [3, 4]))
+        ).full
+
+    def test_versions_are_content_hashes_and_bounded(self):
+        versions = ForecastVersions(versions_per_spec=2, max_specs=8)
+        spec = "spec"
+        recorded = [versions.record(spec, points([day], [1])) for day in (1, 2, 3)]
+
+        assert recorded[0] == forecast_version(points([1], [1]))
+        assert versions.get(spec, recorded[0]) is None
+        assert versions.get(spec, recorded[2]).indices == ("1/1", "1/2")
+
+    def test_keeps_row_hashes_for_a_bounded_number_of_specs(self):
+        versions = ForecastVersions(versions_per_spec=2, max_specs=2)
+        forecast = points([1, 2], [3])
+        recorded = {spec: versions.record(spec, forecast) for spec in "abc"}
+
+        assert versions.get("a", recorded["a"]) is None
+        assert versions.get("c", recorded["c"]) == row_digests(forecast)
+        assert len(versions.get("c", recorded["c"]).digests) == 3 * 8
+
+
+class TestDeltaRoute:
+    """Tests for versioned forecast responses and delta requests"""
+
+    @patch("flow_forecast.usgs.router.generate_prophet_forecast")
+    def test_client_catches_up_with_a_delta(self, fit):
+        yesterday = points([10, 11], [12, 13, 14, 15, 16])
+        today = points([10, 11, 12.5], [13, 14, 15, 17])
+        fit.return_value = frame(yesterday)
+
+        first = client.post("/usgs/forecast", json=REQUEST)
+        forecast_cache.clear()
+        fit.return_value = frame(today)
+        delta = client.post(
+            "/usgs/forecast/delta",
+            json={**REQUEST, "base_version": first.headers["X-Forecast-Version"]},
+        )
+
+        assert delta.status_code == 200
+        body = delta.json()
+        assert not body["full"]
+        assert len(body["changes"]) == 2
+        assert body["version"] == delta.headers["X-Forecast-Version"]
+        assert apply(first.json(), body) == [p.model_dump() for p in today]
+
+    @patch("flow_forecast.usgs.router.generate_prophet_forecast")
+    def test_unknown_version_gets_the_full_forecast(self, fit):
+        fit.return_value = frame(points([10, 11], [12, 13]))
+
+        delta = client.post(
+            "/usgs/forecast/delta", json={**REQUEST, "base_version": "0123456789abcdef"}
+        ).json()
+        unchanged = client.post(
+            "/usgs/forecast/delta", json={**REQUEST, "base_version": delta["version"]}
+        ).json()
+
+        assert delta["full"] and delta["base_version"] is None
+        assert len(delta["changes"]) == 4 and delta["removed"] == []
+        assert not unchanged["full"] and unchanged["changes"] == []